@@ -0,0 +1,78 @@
+"""Бенчмарк: стоимость свайпа в поиске компании в зависимости от размера базы.
+
+Сравниваются:
+- анкета на свайп: курсор по очереди и ``get_profile`` на каждого кандидата;
+- ``CandidateEngine.next_candidate``: страницы по ``PAGE_SIZE`` с фоновой
+  подгрузкой следующей.
+
+Плюс время построения очереди (keyset-страницы, только поля для score).
+
+Запуск:
+    python benchmarks/bench_candidates.py [--sizes 1000,10000,50000] [--swipes 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.population import populate  # noqa: E402
+from db import Database  # noqa: E402
+from services.candidates import CandidateEngine  # noqa: E402
+
+
+async def run(size: int, swipes: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.init()
+        try:
+            await populate(db, size, likes_per_user=0, events=0, chats=0)
+            me = await db.get_user_id_by_telegram(1_000_000)
+            profile = dict(await db.get_profile(me) or {})
+            if not profile:
+                await db.upsert_profile(me, "🎿 Лыжи", "Средний", 25, "Москва", "", [], "м", None, None)
+                profile = dict(await db.get_profile(me))
+
+            engine = CandidateEngine(db)
+            start = time.perf_counter()
+            ranked = await engine.ranked(me, profile, {})
+            build = time.perf_counter() - start
+
+            cursor = None
+            start = time.perf_counter()
+            for _ in range(swipes):
+                key = ranked.after(cursor, 1)[0]
+                await db.get_profile(key[4])
+                # Между свайпами бот ждёт пользователя и Bot API
+                await asyncio.sleep(0)
+                cursor = key
+            per_profile = (time.perf_counter() - start) / swipes
+
+            cursor = None
+            start = time.perf_counter()
+            for _ in range(swipes):
+                cursor, _ = await engine.next_candidate(cursor, me, profile, {})
+                await asyncio.sleep(0)
+            paged = (time.perf_counter() - start) / swipes
+        finally:
+            await db.close()
+    print(
+        f"{size:>7} анкет  очередь {build * 1000:7.1f} ms  "
+        f"свайп: анкета на свайп {per_profile * 1e6:6.0f} µs, страницами {paged * 1e6:6.0f} µs"
+    )
+
+
+async def main(sizes: list, swipes: int) -> None:
+    for size in sizes:
+        await run(size, swipes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--swipes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.swipes))
@@ -0,0 +1,57 @@
+"""Бенчмарк: стоимость одного запроса с connect-per-call и с пулом.
+
+Запуск:
+    python benchmarks/bench_db_pool.py [--calls 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+
+
+async def get_user_connect_per_call(path: str, user_id: int):
+    """Старое поведение: новое соединение на каждый вызов."""
+    conn = await aiosqlite.connect(path)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA foreign_keys = ON;")
+    try:
+        async with conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)) as cursor:
+            return await cursor.fetchone()
+    finally:
+        await conn.close()
+
+
+async def measure(label: str, calls: int, func) -> None:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed / calls * 1_000_000:8.1f} µs/call  ({calls / elapsed:8.0f} calls/s)")
+
+
+async def main(calls: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = Database(path)
+        await db.init()
+        user_id = await db.upsert_user(1, "bench", "Bench")
+
+        await measure("connect-per-call", calls, lambda: get_user_connect_per_call(path, user_id))
+        await measure("pooled", calls, lambda: db.get_user_by_id(user_id))
+
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
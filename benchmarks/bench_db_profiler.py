@@ -0,0 +1,63 @@
+"""Бенчмарк: накладные расходы профилирования запросов (DB_PROFILE).
+
+Одни и те же вызовы ``Database`` с выключенным и включённым
+``QueryProfiler``: чтение по ключу, чтение пачки анкет и запись.
+Раунды чередуются, берётся лучший из ``--rounds``.
+
+Запуск:
+    python benchmarks/bench_db_profiler.py [--calls 2000] [--rounds 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+
+
+async def measure(calls: int, func: Callable[[int], Awaitable[object]]) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        await func(i)
+    return (time.perf_counter() - start) / calls
+
+
+async def main(calls: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.init()
+        user_ids = [await db.upsert_user(1000 + i, f"u{i}", "Bench") for i in range(100)]
+        for user_id in user_ids:
+            await db.upsert_profile(user_id, "🎿 Лыжи", "Средний", 25, "Москва", "", [], "м", None, None)
+
+        workloads: Dict[str, Callable[[int], Awaitable[object]]] = {
+            "get_user_by_id": lambda i: db.get_user_by_id(user_ids[i % 100]),
+            "get_profiles (20)": lambda i: db.get_profiles_by_user_ids(user_ids[i % 80:i % 80 + 20]),
+            "upsert_user": lambda i: db.upsert_user(1000 + i % 100, f"u{i}", "Bench"),
+        }
+        print(f"{calls} вызовов, лучший из {rounds} раундов")
+        for label, func in workloads.items():
+            best = {False: float("inf"), True: float("inf")}
+            for _ in range(rounds):
+                for enabled in (False, True):
+                    db.set_profiling(enabled=enabled)
+                    best[enabled] = min(best[enabled], await measure(calls, func))
+            overhead = best[True] / best[False] - 1
+            print(
+                f"{label:<18} выкл {best[False] * 1e6:7.1f} µs  вкл {best[True] * 1e6:7.1f} µs  "
+                f"({overhead:+.1%})"
+            )
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.rounds))
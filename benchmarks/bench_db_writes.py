@@ -0,0 +1,50 @@
+"""Бенчмарк: пропускная способность записи в зависимости от размера пачки.
+
+Запуск:
+    python benchmarks/bench_db_writes.py [--writes 5000] [--concurrency 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+
+
+async def run(batch: int, writes: int, concurrency: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), write_batch=batch)
+        await db.init()
+        user_id = await db.upsert_user(1, "bench", "Bench")
+        chat_id = await db.get_or_create_chat(user_id, user_id)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def write(i: int) -> None:
+            async with semaphore:
+                await db.add_chat_message(chat_id, user_id, f"message {i}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(write(i) for i in range(writes)))
+        elapsed = time.perf_counter() - start
+        await db.close()
+    return writes / elapsed
+
+
+async def main(writes: int, concurrency: int) -> None:
+    print(f"{writes} writes, {concurrency} concurrent writers")
+    for batch in (1, 8, 64, 256):
+        rate = await run(batch, writes, concurrency)
+        print(f"batch={batch:<4} {rate:9.0f} writes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.writes, args.concurrency))
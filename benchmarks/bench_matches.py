@@ -0,0 +1,196 @@
+"""Бенчмарк: экран «Контакты» и проверка мэтча на графе с миллионами лайков.
+
+Сравниваются раскладки мэтчей:
+- пара (min, max) в одной строке, join с ``OR`` по двум сторонам и только
+  ``UNIQUE(user1_id, user2_id)`` (как было до индексов 0004);
+- та же пара, ``UNION ALL`` двух сторон по индексам на каждую (0004);
+- ``match_edges``: ребро в обе стороны, один проход по индексу
+  ``(user_id, created_at)`` (0005).
+
+Все запросы идут через одно соединение; отдельной строкой — тот же запрос
+через ``Database`` (пул читателей и учёт запросов).
+
+Граф пишется напрямую пачками ``executemany``: ``--users`` пользователей,
+``--likes`` случайных лайков, доля взаимных — ``--mutual``.
+
+Запуск:
+    python benchmarks/bench_matches.py [--users 200000] [--likes 2000000] [--lookups 300]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiosqlite  # noqa: E402
+
+from db import Database  # noqa: E402
+
+OR_JOIN = """
+    SELECT u.*, p.ride_type, p.skill_level, p.city, p.about
+    FROM legacy_matches m
+    JOIN users u ON (
+        (m.user1_id = ? AND u.id = m.user2_id)
+        OR (m.user2_id = ? AND u.id = m.user1_id)
+    )
+    LEFT JOIN profiles p ON p.user_id = u.id
+    ORDER BY m.created_at DESC
+"""
+
+UNION_ALL = """
+    SELECT u.*, p.ride_type, p.skill_level, p.city, p.about, m.created_at AS matched_at
+    FROM legacy_matches m
+    JOIN users u ON u.id = m.user2_id
+    LEFT JOIN profiles p ON p.user_id = u.id
+    WHERE m.user1_id = ?
+    UNION ALL
+    SELECT u.*, p.ride_type, p.skill_level, p.city, p.about, m.created_at AS matched_at
+    FROM legacy_matches m
+    JOIN users u ON u.id = m.user1_id
+    LEFT JOIN profiles p ON p.user_id = u.id
+    WHERE m.user2_id = ?
+    ORDER BY matched_at DESC
+"""
+
+EDGES = """
+    SELECT u.*, p.ride_type, p.skill_level, p.city, p.about, m.created_at AS matched_at
+    FROM match_edges m
+    JOIN users u ON u.id = m.other_id
+    LEFT JOIN profiles p ON p.user_id = u.id
+    WHERE m.user_id = ?
+    ORDER BY m.created_at DESC
+"""
+
+PAIR_LOOKUP = "SELECT 1 FROM legacy_matches WHERE user1_id = ? AND user2_id = ?"
+EDGE_LOOKUP = "SELECT 1 FROM match_edges WHERE user_id = ? AND other_id = ?"
+
+LEGACY_INDEXES = """
+    CREATE INDEX idx_legacy_user1 ON legacy_matches(user1_id, created_at);
+    CREATE INDEX idx_legacy_user2 ON legacy_matches(user2_id, created_at);
+"""
+
+BATCH = 100_000
+
+
+async def build(path: str, users: int, likes: int, mutual: float, seed: int) -> list:
+    """Засеять граф, вернуть пары мэтчей."""
+    rng = random.Random(seed)
+    db = Database(path)
+    await db.init()
+    await db.close()
+
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute("PRAGMA journal_mode = WAL")
+        await conn.execute("PRAGMA synchronous = OFF")
+        await conn.executemany(
+            "INSERT INTO users (id, telegram_id, username, first_name) VALUES (?, ?, ?, ?)",
+            ((n, 1_000_000 + n, f"rider{n}", f"Райдер {n}") for n in range(1, users + 1)),
+        )
+        await conn.executemany(
+            "INSERT INTO profiles (user_id, ride_type, skill_level, age, city, about) VALUES (?, ?, ?, ?, ?, ?)",
+            ((n, "🎿 Лыжи", "Средний", 30, "Москва", "") for n in range(1, users + 1)),
+        )
+
+        pairs = set()
+        while len(pairs) < likes:
+            a, b = rng.randint(1, users), rng.randint(1, users)
+            if a == b:
+                continue
+            pairs.add((a, b))
+            if rng.random() < mutual:
+                pairs.add((b, a))
+        pairs_list = list(pairs)
+        for start in range(0, len(pairs_list), BATCH):
+            await conn.executemany(
+                "INSERT INTO likes (from_user_id, to_user_id) VALUES (?, ?)", pairs_list[start:start + BATCH]
+            )
+        matched = [(a, b) for a, b in pairs_list if a < b and (b, a) in pairs]
+
+        # Старая раскладка рядом; индексы 0004 добавляются после замера OR-join
+        await conn.executescript(
+            """
+            CREATE TABLE legacy_matches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user1_id INTEGER NOT NULL,
+                user2_id INTEGER NOT NULL,
+                created_at TEXT,
+                UNIQUE(user1_id, user2_id)
+            );
+            """
+        )
+        stamped = [(a, b, f"2025-01-01 00:{n // 60 % 60:02d}:{n % 60:02d}") for n, (a, b) in enumerate(matched)]
+        await conn.executemany("INSERT INTO legacy_matches (user1_id, user2_id, created_at) VALUES (?, ?, ?)", stamped)
+        await conn.executemany(
+            "INSERT INTO match_edges (user_id, other_id, created_at) VALUES (?, ?, ?)",
+            [edge for a, b, at in stamped for edge in ((a, b, at), (b, a, at))],
+        )
+        await conn.commit()
+    return matched
+
+
+async def timed(calls: list) -> float:
+    start = time.perf_counter()
+    for call in calls:
+        await call()
+    return (time.perf_counter() - start) / len(calls)
+
+
+async def main(users: int, likes: int, mutual: float, lookups: int, seed: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        matched = await build(path, users, likes, mutual, seed)
+        print(
+            f"{users} пользователей, {likes} лайков, {len(matched)} мэтчей "
+            f"(засеяно за {time.perf_counter() - start:.1f} s)"
+        )
+
+        rng = random.Random(seed)
+        sample = rng.sample(matched, min(lookups, len(matched)))
+        people = [rng.choice(pair) for pair in sample]
+
+        async with aiosqlite.connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+
+            async def rows(sql: str, params: tuple) -> int:
+                async with conn.execute(sql, params) as cursor:
+                    return len(await cursor.fetchall())
+
+            # OR-join без индекса второй стороны проходит users: берём меньше пользователей
+            or_join = await timed([lambda u=u: rows(OR_JOIN, (u, u)) for u in people[: max(1, lookups // 30)]])
+            await conn.executescript(LEGACY_INDEXES)
+            union = await timed([lambda u=u: rows(UNION_ALL, (u, u)) for u in people])
+            edges = await timed([lambda u=u: rows(EDGES, (u,)) for u in people])
+            pair_old = await timed([lambda a=a, b=b: rows(PAIR_LOOKUP, (min(a, b), max(a, b))) for a, b in sample])
+            pair_new = await timed([lambda a=a, b=b: rows(EDGE_LOOKUP, (b, a)) for a, b in sample])
+
+        db = Database(path, profile=False)
+        await db.init()
+        try:
+            via_db = await timed([lambda u=u: db.get_user_matches(u) for u in people])
+        finally:
+            await db.close()
+
+    print("Контакты (мэтчи пользователя):")
+    print(f"  пара + OR-join        {or_join * 1e6:9.0f} µs")
+    print(f"  пара + UNION ALL      {union * 1e6:9.0f} µs")
+    print(f"  match_edges           {edges * 1e6:9.0f} µs")
+    print(f"  match_edges, Database {via_db * 1e6:9.0f} µs")
+    print("Проверка мэтча:")
+    print(f"  пара (min, max)       {pair_old * 1e6:9.0f} µs")
+    print(f"  match_edges           {pair_new * 1e6:9.0f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--likes", type=int, default=2_000_000)
+    parser.add_argument("--mutual", type=float, default=0.15)
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.likes, args.mutual, args.lookups, args.seed))
@@ -0,0 +1,70 @@
+"""Бенчмарк: скалярный calculate_match_score против векторного score_batch.
+
+Запуск:
+    python benchmarks/bench_matching.py [--sizes 10000 100000 1000000] [--scalar-limit 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.matching import LEVELS, CandidateBlock, calculate_match_score, score_batch  # noqa: E402
+
+CITIES = ["Москва", "Санкт-Петербург", "Сочи", "Кировск", "Екатеринбург", None]
+RIDE_TYPES = ["🏂 Сноуборд", "🎿 Лыжи"]
+
+
+def make_profiles(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        located = rng.random() < 0.5
+        profiles.append({
+            "ride_type": rng.choice(RIDE_TYPES),
+            "skill_level": rng.choice(LEVELS),
+            "city": rng.choice(CITIES),
+            "age": rng.randint(14, 60),
+            "location_lat": rng.uniform(43, 68) if located else None,
+            "location_lon": rng.uniform(30, 90) if located else None,
+            "about": rng.choice(["", "Катаю по выходным"]),
+            "photos": rng.choice([None, '["photo"]']),
+        })
+    return profiles
+
+
+def main(sizes: list, scalar_limit: int) -> None:
+    user = make_profiles(1, seed=0)[0]
+    user_lat, user_lon = 55.7558, 37.6173
+
+    print(f"{'candidates':>10} {'scalar, ms':>12} {'block, ms':>10} {'batch, ms':>10} {'speedup':>8}")
+    for size in sizes:
+        profiles = make_profiles(size)
+
+        start = time.perf_counter()
+        block = CandidateBlock.from_profiles(profiles)
+        block_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        batch = score_batch(user, block, user_lat, user_lon)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        if size <= scalar_limit:
+            start = time.perf_counter()
+            scalar = [calculate_match_score(user, p, user_lat, user_lon) for p in profiles]
+            scalar_ms = (time.perf_counter() - start) * 1000
+            assert batch.tolist() == scalar, "batch и scalar разошлись"
+            print(f"{size:>10} {scalar_ms:>12.1f} {block_ms:>10.1f} {batch_ms:>10.1f} {scalar_ms / batch_ms:>7.0f}x")
+        else:
+            print(f"{size:>10} {'—':>12} {block_ms:>10.1f} {batch_ms:>10.1f} {'—':>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--scalar-limit", type=int, default=100_000,
+                        help="Скалярный проход только для блоков не больше этого размера")
+    args = parser.parse_args()
+    main(args.sizes, args.scalar_limit)
@@ -0,0 +1,93 @@
+"""Бенчмарк: рассылка прямыми send_message против OutboundDispatcher.
+
+Фейковый Telegram как настоящий отвечает RetryAfter, если за последнюю
+секунду отправлено больше ``--limit`` сообщений. Прямой цикл с
+параллельными отправками упирается во flood control и теряет сообщения,
+диспетчер держит темп и доставляет всё.
+
+Запуск:
+    python benchmarks/bench_outbound.py [--messages 300] [--limit 30] [--send-ms 40]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.outbound import OutboundDispatcher  # noqa: E402
+
+
+class FloodControlBot:
+    """Бот с глобальным лимитом сообщений в секунду, как у Telegram."""
+
+    def __init__(self, limit: int, latency: float) -> None:
+        self.limit = limit
+        self.latency = latency
+        self.window = deque()
+        self.sent = 0
+        self.floods = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1:
+            self.window.popleft()
+        if len(self.window) >= self.limit:
+            self.floods += 1
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Flood control", retry_after=1)
+        self.window.append(now)
+        self.sent += 1
+
+
+async def direct(bot: FloodControlBot, messages: int, concurrency: int) -> None:
+    """Как раньше: send_message без учёта лимитов, ошибки — «не доставлено»."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(chat_id: int) -> None:
+        async with semaphore:
+            try:
+                await bot.send_message(chat_id, "📢 рассылка")
+            except Exception:
+                pass
+
+    await asyncio.gather(*(send(chat_id) for chat_id in range(messages)))
+
+
+async def dispatched(bot: FloodControlBot, messages: int, rate: float, workers: int) -> None:
+    outbound = OutboundDispatcher(bot, rate=rate, workers=workers)
+    await asyncio.gather(*(outbound.send(chat_id, "📢 рассылка") for chat_id in range(messages)))
+    await outbound.close()
+
+
+async def main(messages: int, limit: int, send_ms: int, workers: int) -> None:
+    print(f"{messages} сообщений, лимит {limit}/с, отправка {send_ms} мс, {workers} параллельных")
+    for label, run in (
+        ("напрямую", lambda bot: direct(bot, messages, workers)),
+        ("диспетчер", lambda bot: dispatched(bot, messages, limit * 0.9, workers)),
+    ):
+        bot = FloodControlBot(limit, send_ms / 1000)
+        start = time.perf_counter()
+        await run(bot)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<10} {elapsed:6.2f} s  доставлено {bot.sent:>4}/{messages}  "
+            f"RetryAfter {bot.floods:>4}  {bot.sent / elapsed:6.1f} msg/s"
+        )
+
+
+if __name__ == "__main__":
+    logging.getLogger("services.outbound").setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--send-ms", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.limit, args.send_ms, args.workers))
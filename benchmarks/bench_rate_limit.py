@@ -0,0 +1,114 @@
+"""Бенчмарк: проверка rate limit на 100k пользователей.
+
+Сравниваются:
+- прежний лимитер: список времён запросов на пользователя, фильтрация
+  списка на каждом запросе — O(rate_limit) на проверку, записи не удаляются;
+- ``RateLimiter`` (GCRA): одно число на пользователя в ``array('d')``, O(1),
+  слоты простаивающих освобождаются.
+
+Время — модельное (без ``time.time()``): ``users`` пользователей делают по
+``per-user`` запросов вперемешку за ``period`` секунд, затем все замолкают на
+период и приходит ещё ``users`` запросов от новых пользователей.
+Память — ``tracemalloc`` (после активной фазы и после простоя).
+
+Дополнительно: ``SharedRateLimiter`` (SQLite) — проверок в секунду.
+
+Запуск:
+    python benchmarks/bench_rate_limit.py [--users 100000] [--per-user 10] [--rate 30] [--period 60]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+from services.rate_limiter import RateLimiter, SharedRateLimiter  # noqa: E402
+
+
+class ListRateLimiter:
+    """Прежняя реализация ``RateLimitMiddleware`` (без aiogram)."""
+
+    def __init__(self, rate_limit: int, period: float) -> None:
+        self.rate_limit = rate_limit
+        self.period = period
+        self.user_requests: Dict[int, list] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.user_requests)
+
+    def hit(self, user_id: int, now: float) -> bool:
+        self.user_requests[user_id] = [t for t in self.user_requests[user_id] if now - t < self.period]
+        if len(self.user_requests[user_id]) >= self.rate_limit:
+            return False
+        self.user_requests[user_id].append(now)
+        return True
+
+
+def workload(users: int, per_user: int, period: float) -> List[tuple]:
+    rng = random.Random(42)
+    hits = [(user_id, rng.uniform(0, period)) for user_id in range(users) for _ in range(per_user)]
+    hits.sort(key=lambda hit: hit[1])
+    # Простой в период, затем новые пользователи
+    hits += [(users + user_id, 2 * period + user_id / users) for user_id in range(users)]
+    return hits
+
+
+def run(label: str, make: Callable[[], object], hits: List[tuple], users: int, per_user: int) -> None:
+    tracemalloc.start()
+    limiter = make()
+    first = users * per_user
+    start = time.perf_counter()
+    for user_id, now in hits[:first]:
+        limiter.hit(user_id, now)
+    elapsed = time.perf_counter() - start
+    active = tracemalloc.get_traced_memory()[0]
+    for user_id, now in hits[first:]:
+        limiter.hit(user_id, now)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        f"{label:<16} {elapsed / first * 1e6:6.2f} мкс/проверку  {first / elapsed:9.0f} проверок/с  "
+        f"память: {active / 2**20:5.1f} МБ, после простоя и {users} новых: {after / 2**20:5.1f} МБ, "
+        f"{len(limiter)} записей"
+    )
+
+
+async def run_shared(checks: int, rate: int, period: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.init()
+        limiter = SharedRateLimiter(db, "message", rate, period)
+        start = time.perf_counter()
+        # Параллельно, как обновления от разных пользователей
+        await asyncio.gather(*(limiter.acquire(user_id % 1000) for user_id in range(checks)))
+        elapsed = time.perf_counter() - start
+        await db.close()
+    print(f"{'SQLite (общий)':<16} {elapsed / checks * 1e6:6.0f} мкс/проверку  {checks / elapsed:9.0f} проверок/с")
+
+
+def main(users: int, per_user: int, rate: int, period: float, shared_checks: int) -> None:
+    hits = workload(users, per_user, period)
+    print(f"{users} пользователей × {per_user} запросов, лимит {rate} за {period:.0f} с")
+    run("Списки времён", lambda: ListRateLimiter(rate, period), hits, users, per_user)
+    run("GCRA", lambda: RateLimiter(rate, period), hits, users, per_user)
+    if shared_checks:
+        asyncio.run(run_shared(shared_checks, rate, period))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--per-user", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=30)
+    parser.add_argument("--period", type=float, default=60)
+    parser.add_argument("--shared-checks", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.users, args.per_user, args.rate, args.period, args.shared_checks)
@@ -0,0 +1,57 @@
+"""Бенчмарк: погода без кэша (клиент на запрос) против WeatherService.
+
+Против локального фейкового OpenWeatherMap с задержкой ответа: ``riders``
+пользователей одновременно открывают каждый из ``resorts`` курортов.
+
+Запуск:
+    python benchmarks/bench_weather.py [--resorts 10] [--riders 50] [--delay-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.weather import WeatherService, parse_weather  # noqa: E402
+from tests.fake_owm import FakeOpenWeatherMap  # noqa: E402
+
+
+async def get_weather_uncached(url: str, lat: float, lon: float) -> dict:
+    """Старое поведение: новый AsyncClient и запрос к API на каждый вызов."""
+    async with httpx.AsyncClient() as client:
+        resp = await client.get(url, params={"lat": lat, "lon": lon, "appid": "key"}, timeout=5)
+        return parse_weather(resp.json())
+
+
+async def run(label: str, owm: FakeOpenWeatherMap, points: list, riders: int, get) -> None:
+    owm.requests = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(get(lat, lon) for lat, lon in points for _ in range(riders)))
+    elapsed = time.perf_counter() - start
+    calls = len(points) * riders
+    print(f"{label:<18} {elapsed * 1000:8.1f} ms  {calls / elapsed:8.0f} calls/s  upstream={owm.requests}")
+
+
+async def main(resorts: int, riders: int, delay_ms: int) -> None:
+    points = [(43.0 + i * 0.5, 40.0 + i * 0.5) for i in range(resorts)]
+    async with FakeOpenWeatherMap(delay=delay_ms / 1000) as owm:
+        print(f"{resorts} курортов × {riders} одновременных открытий, API отвечает за {delay_ms} мс")
+        await run("без кэша", owm, points, riders, lambda lat, lon: get_weather_uncached(owm.url, lat, lon))
+
+        service = WeatherService("key", base_url=owm.url)
+        await run("WeatherService", owm, points, riders, service.get)
+        await run("WeatherService, hot", owm, points, riders, service.get)
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resorts", type=int, default=10)
+    parser.add_argument("--riders", type=int, default=50)
+    parser.add_argument("--delay-ms", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.resorts, args.riders, args.delay_ms))
@@ -0,0 +1,94 @@
+"""Бенчмарк: утренняя рассылка о снеге — по курорту за раз против конвейера.
+
+Все засеянные курорты с подписчиками, снег на каждом ``--snowy``-м.
+Погода — фейковый OpenWeatherMap с задержкой, Telegram — фейковый бот с
+задержкой отправки.
+
+Запуск:
+    python benchmarks/bench_weather_alerts.py [--subscribers 20] [--api-ms 150] [--send-ms 30] [--skip-old]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+from services.outbound import OutboundDispatcher  # noqa: E402
+from services.weather import WeatherService, is_snowing  # noqa: E402
+from services.weather_alerts import run_snow_alerts, snow_alert_text  # noqa: E402
+from tests.fake_owm import FakeOpenWeatherMap  # noqa: E402
+from tests.test_outbound import FakeBot  # noqa: E402
+
+
+async def old_notifier(db: Database, weather_service: WeatherService, bot: FakeBot, pause: float) -> int:
+    """Прежний цикл: по курорту за раз, пауза после каждого курорта со снегом."""
+    sent = 0
+    for resort in await db.list_resorts():
+        subscribers = await db.get_weather_subscribers(resort["id"])
+        if not subscribers:
+            continue
+        weather = await weather_service.get(resort["lat"], resort["lon"])
+        if not weather or not is_snowing(weather):
+            continue
+        text = snow_alert_text(resort, weather)
+        for sub in subscribers:
+            await bot.send_message(sub["telegram_id"], text)
+            sent += 1
+        await asyncio.sleep(pause)
+    return sent
+
+
+async def main(subscribers: int, api_ms: int, send_ms: int, snowy: int, rate: float, skip_old: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.init()
+        resorts = db.resort_catalogue.resorts
+        telegram_id = 0
+        for resort in resorts:
+            for _ in range(subscribers):
+                telegram_id += 1
+                user_id = await db.upsert_user(telegram_id, f"u{telegram_id}", "Райдер")
+                await db.subscribe_weather(user_id, resort["id"])
+
+        async with FakeOpenWeatherMap(delay=api_ms / 1000) as owm:
+            for resort in resorts[::snowy]:
+                owm.descriptions[(resort["lat"], resort["lon"])] = "снег"
+            print(
+                f"{len(resorts)} курортов × {subscribers} подписчиков, снег на {len(resorts[::snowy])}, "
+                f"API {api_ms} мс, отправка {send_ms} мс, лимит {rate:.0f} msg/s"
+            )
+
+            if not skip_old:
+                weather_service = WeatherService("key", base_url=owm.url, ttl=0, stale_ttl=0)
+                start = time.perf_counter()
+                sent = await old_notifier(db, weather_service, FakeBot(latency=send_ms / 1000), pause=1.0)
+                elapsed = time.perf_counter() - start
+                print(f"{'по курорту':<12} {elapsed:7.2f} s  {sent} сообщений  {sent / elapsed:7.1f} msg/s")
+                await weather_service.close()
+
+            weather_service = WeatherService("key", base_url=owm.url, ttl=0, stale_ttl=0)
+            outbound = OutboundDispatcher(FakeBot(latency=send_ms / 1000), rate=rate)
+            stats = await run_snow_alerts(db, weather_service, outbound)
+            print(
+                f"{'конвейер':<12} {stats['seconds']:7.2f} s  {stats['delivered']} сообщений  "
+                f"{stats['messages_per_second']:7.1f} msg/s  (погода {stats['fetch_seconds']:.2f} s)"
+            )
+            await outbound.close()
+            await weather_service.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=20, help="Подписчиков на курорт")
+    parser.add_argument("--api-ms", type=int, default=150)
+    parser.add_argument("--send-ms", type=int, default=30)
+    parser.add_argument("--snowy", type=int, default=3, help="Снег на каждом N-м курорте")
+    parser.add_argument("--rate", type=float, default=25)
+    parser.add_argument("--skip-old", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.api_ms, args.send_ms, args.snowy, args.rate, args.skip_old))
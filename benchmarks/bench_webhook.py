@@ -0,0 +1,87 @@
+"""Бенчмарк: webhook end-to-end, обновлений в секунду.
+
+Фейковый Telegram доставляет ``updates`` обновлений на webhook бота
+(``connections`` соединений, как ``max_connections`` у setWebhook), бот
+отвечает на каждое через фейковый Bot API с задержкой ``latency-ms``.
+Время — от первого запроса до последнего ``sendMessage``.
+
+Сравниваются:
+- aiogram ``SimpleRequestHandler`` без фоновой обработки (ответ Telegram
+  ждёт обработчик) — пропускная способность упирается в число соединений;
+- ``QueuedRequestHandler``: ответ сразу, обработка воркерами из очереди.
+
+Запуск:
+    python benchmarks/bench_webhook.py [--updates 2000] [--connections 40] [--latency-ms 100]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Tuple
+
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.webhook import WebhookServer  # noqa: E402
+from tests.fake_telegram import FakeTelegram, make_update, push_updates  # noqa: E402
+from tests.test_webhook import SECRET, ping_dispatcher  # noqa: E402
+
+
+async def start_simple(dp, bot) -> Tuple[web.AppRunner, int]:
+    app = web.Application()
+    SimpleRequestHandler(dp, bot, handle_in_background=False, secret_token=SECRET).register(app, path="/webhook")
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def run(label: str, telegram: FakeTelegram, port: int, updates: int, connections: int) -> None:
+    telegram.sent.clear()
+    start = time.perf_counter()
+    counters = await push_updates(
+        f"http://127.0.0.1:{port}/webhook",
+        (make_update(i, 10_000 + i) for i in range(updates)),
+        SECRET,
+        connections=connections,
+    )
+    accepted = time.perf_counter() - start
+    await telegram.wait_sent(updates, timeout=120)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<22} {elapsed:6.2f} s  {updates / elapsed:7.0f} upd/s  "
+        f"(приём {accepted:5.2f} s, 429: {counters['retried']}, ответов: {len(telegram.sent)})"
+    )
+
+
+async def main(updates: int, connections: int, latency_ms: int, workers: int, queue: int) -> None:
+    logging.getLogger("aiogram").setLevel(logging.WARNING)
+    async with FakeTelegram(latency=latency_ms / 1000) as telegram:
+        print(f"{updates} обновлений, {connections} соединений, Bot API отвечает за {latency_ms} мс")
+        bot = telegram.bot()
+
+        runner, port = await start_simple(ping_dispatcher(), bot)
+        await run("SimpleRequestHandler", telegram, port, updates, connections)
+        await runner.cleanup()
+
+        server = WebhookServer(ping_dispatcher(), bot, secret_token=SECRET, queue_size=queue, workers=workers)
+        await server.start("127.0.0.1", 0)
+        await run(f"Queued ({workers} воркеров)", telegram, server.port, updates, connections)
+        await server.stop()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--latency-ms", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--queue", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates, args.connections, args.latency_ms, args.workers, args.queue))
@@ -0,0 +1,393 @@
+"""Нагрузочный прогон: сценарии пользователей против живого бота.
+
+Бот запускается отдельным процессом (``bot.py``, polling) против локального
+фейкового Bot API (``TELEGRAM_API_URL``) и фейковой погоды — сеть не нужна.
+База — синтетическая (``benchmarks/population.py``) или готовая через ``--db``.
+
+Виртуальные пользователи (``--concurrency`` одновременно) проходят сценарии:
+
+- ``create_profile`` — новый пользователь: /start, пол, катание, уровень,
+  возраст, геолокация, о себе;
+- ``browse`` — поиск компании и 20 анкет подряд с лайками;
+- ``resort`` — ближайшие склоны и карточка склона с погодой.
+
+Шаг — обновление от пользователя до ответа бота, которого ждёт сценарий.
+Для каждого сценария — p50/p95/p99 шага и всего сценария и пропускная
+способность. Как регрессионный гейт: ``--max-p95-ms``, ``--baseline``
+(сравнение p95 шага с сохранённым ``--save``) и ненулевой код выхода.
+
+Запуск:
+    python benchmarks/loadtest.py [--users 5000] [--journeys 300] [--concurrency 20]
+        [--mix create_profile=1,browse=2,resort=2] [--shards 1] [--api-latency-ms 0]
+        [--save result.json] [--baseline result.json] [--tolerance 0.25] [--max-p95-ms 0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import signal
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.population import Population, populate  # noqa: E402
+from db import Database  # noqa: E402
+from tests.fake_owm import FakeOpenWeatherMap  # noqa: E402
+from tests.fake_telegram import TOKEN, FakeTelegram, buttons, make_callback, make_location, make_update  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Telegram id новых пользователей (сценарий create_profile), не пересекаются с базой
+NEW_USERS_BASE = 5_000_000
+_new_users = itertools.count(NEW_USERS_BASE)
+
+Expect = Callable[[Dict[str, Any]], bool]
+
+
+class JourneyError(Exception):
+    """Бот не ответил так, как ждёт сценарий."""
+
+
+def has_button(prefix: str) -> Expect:
+    """Сообщение с inline-кнопкой, ``callback_data`` которой начинается с ``prefix``."""
+    return lambda message: any(data.startswith(prefix) for data in buttons(message["reply_markup"]))
+
+
+def contains(text: str) -> Expect:
+    """Сообщение, в тексте или подписи которого есть ``text``."""
+    return lambda message: text in message["text"]
+
+
+def any_of(*expects: Expect) -> Expect:
+    return lambda message: any(expect(message) for expect in expects)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy по умолчанию)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Rider:
+    """Виртуальный пользователь: шлёт обновления и ждёт ответа бота в своём чате."""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, telegram: FakeTelegram, chat_id: int, rng: random.Random, timeout: float) -> None:
+        self.telegram = telegram
+        self.chat_id = chat_id
+        self.rng = rng
+        self.timeout = timeout
+        self.steps: List[float] = []
+        self.last: Optional[Dict[str, Any]] = None
+
+    async def _step(self, update: Dict[str, Any], expect: Expect, what: str) -> Dict[str, Any]:
+        after = len(self.telegram.messages.get(self.chat_id, []))
+        start = time.perf_counter()
+        self.telegram.feed(update)
+        message = await self.telegram.wait_message(self.chat_id, expect, after, self.timeout)
+        if message is None:
+            raise JourneyError(f"нет ответа на {what} за {self.timeout:.0f} s")
+        self.steps.append(time.perf_counter() - start)
+        self.last = message
+        return message
+
+    async def send(self, text: str, expect: Expect) -> Dict[str, Any]:
+        return await self._step(make_update(next(self._update_ids), self.chat_id, text), expect, repr(text))
+
+    async def location(self, lat: float, lon: float, expect: Expect) -> Dict[str, Any]:
+        update = make_location(next(self._update_ids), self.chat_id, lat, lon)
+        return await self._step(update, expect, "геолокацию")
+
+    async def press(self, data: str, expect: Expect) -> Dict[str, Any]:
+        message_id = self.last["message_id"] if self.last else 1
+        update = make_callback(next(self._update_ids), self.chat_id, data, message_id)
+        return await self._step(update, expect, f"кнопку {data!r}")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# СЦЕНАРИИ
+# ═══════════════════════════════════════════════════════════════════
+
+CANDIDATE = any_of(
+    has_button("buddy:like:"), has_button("event:join:"), contains("закончились"), contains("Пока нет райдеров")
+)
+
+
+async def create_profile(rider: Rider) -> None:
+    """Регистрация нового пользователя без фото, город — геолокацией."""
+    await rider.send("/start", has_button("profile:skip_photo"))
+    await rider.press("profile:skip_photo", has_button("pgender:"))
+    await rider.press(f"pgender:{rider.rng.choice('мж')}", has_button("ride:"))
+    await rider.press(rider.rng.choice(("ride:🏂 Сноуборд", "ride:🎿 Лыжи")), has_button("plevel:"))
+    await rider.press(rider.rng.choice(("plevel:Новичок", "plevel:Средний")), contains("возраст"))
+    await rider.send(str(rider.rng.randint(16, 50)), contains("город"))
+    await rider.location(55.75 + rider.rng.uniform(-1, 1), 37.62 + rider.rng.uniform(-1, 1), contains("о себе"))
+    await rider.send("Катаю по выходным", contains("Профиль сохранён"))
+
+
+async def browse(rider: Rider, likes: int = 20) -> None:
+    """Поиск компании: ``likes`` анкет подряд, профилям — лайк, событиям — пропуск."""
+    await rider.send("🔍 Искать компанию", has_button("buddy:start"))
+    card = await rider.press("buddy:start", CANDIDATE)
+    for _ in range(likes):
+        actions = buttons(card["reply_markup"])
+        if not actions:
+            break
+        like = next((data for data in actions if data.startswith("buddy:like:")), "buddy:skip")
+        card = await rider.press(like, CANDIDATE)
+
+
+async def resort(rider: Rider) -> None:
+    """Ближайшие склоны по сохранённой геолокации и карточка одного из них."""
+    listing = await rider.send("🏔️ Склоны", has_button("resort:"))
+    resorts = [data for data in buttons(listing["reply_markup"]) if data.startswith("resort:")]
+    await rider.press(rider.rng.choice(resorts), contains("Трасс"))
+
+
+JOURNEYS: Dict[str, Callable[[Rider], Awaitable[None]]] = {
+    "create_profile": create_profile,
+    "browse": browse,
+    "resort": resort,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ПРОГОН
+# ═══════════════════════════════════════════════════════════════════
+
+@dataclass
+class JourneyStats:
+    durations: List[float] = field(default_factory=list)
+    steps: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        return {
+            "ok": len(self.durations),
+            "errors": len(self.errors),
+            "p50": percentile(self.durations, 0.5),
+            "p95": percentile(self.durations, 0.95),
+            "p99": percentile(self.durations, 0.99),
+            "step_p50": percentile(self.steps, 0.5),
+            "step_p95": percentile(self.steps, 0.95),
+            "step_p99": percentile(self.steps, 0.99),
+            "per_second": len(self.durations) / elapsed if elapsed else 0.0,
+            "steps_per_second": len(self.steps) / elapsed if elapsed else 0.0,
+        }
+
+
+async def run_journeys(
+    telegram: FakeTelegram,
+    population: Population,
+    mix: Dict[str, float],
+    journeys: int,
+    concurrency: int,
+    timeout: float = 10.0,
+    seed: int = 1,
+) -> Dict[str, Dict[str, float]]:
+    """Пройти ``journeys`` сценариев в пропорции ``mix`` по ``concurrency``
+    одновременно. Пользователи из базы берутся без повторов, пока хватает."""
+    rng = random.Random(seed)
+    plan = rng.choices(list(mix), weights=list(mix.values()), k=journeys)
+    riders = list(population.located)
+    rng.shuffle(riders)
+    existing = itertools.cycle(riders)
+    stats = {name: JourneyStats() for name in mix}
+    queue: "asyncio.Queue[str]" = asyncio.Queue()
+    for name in plan:
+        queue.put_nowait(name)
+
+    async def worker() -> None:
+        while not queue.empty():
+            name = queue.get_nowait()
+            chat_id = next(_new_users) if name == "create_profile" else next(existing)
+            rider = Rider(telegram, chat_id, random.Random(rng.random()), timeout)
+            start = time.perf_counter()
+            try:
+                await JOURNEYS[name](rider)
+            except JourneyError as e:
+                stats[name].errors.append(str(e))
+            else:
+                stats[name].durations.append(time.perf_counter() - start)
+            stats[name].steps.extend(rider.steps)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for name, journey in stats.items():
+        for error in sorted(set(journey.errors))[:3]:
+            print(f"{name}: {error}")
+    return {name: stats[name].summary(elapsed) for name in mix}
+
+
+@asynccontextmanager
+async def bot_process(
+    db_path: str, telegram: FakeTelegram, weather_url: str, shards: int = 1, log_path: Optional[str] = None
+) -> AsyncIterator[asyncio.subprocess.Process]:
+    """``bot.py`` отдельным процессом против фейковых Bot API и погоды;
+    готов, когда начал забирать обновления."""
+    env = dict(
+        os.environ,
+        BOT_TOKEN=TOKEN,
+        DATABASE_PATH=db_path,
+        TELEGRAM_API_URL=telegram.url,
+        WEATHER_API_KEY="loadtest",
+        WEATHER_API_URL=weather_url,
+        WEBHOOK_URL="",
+        SHARD_WORKERS=str(shards),
+        METRICS_PORT="0",
+        ADMIN_IDS="",
+    )
+    log_path = log_path or os.devnull
+    with open(log_path, "wb") as log:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(ROOT, "bot.py"), cwd=ROOT, env=env, stdout=log, stderr=log
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while not any(method == "getUpdates" for method, _ in telegram.calls):
+                if process.returncode is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"бот не запустился, лог: {log_path}")
+                await asyncio.sleep(0.05)
+            yield process
+        finally:
+            if process.returncode is None:
+                process.send_signal(signal.SIGINT)
+                try:
+                    await asyncio.wait_for(process.wait(), 30)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+
+
+def located_riders(db_path: str) -> Population:
+    """Пользователи готовой базы с профилем и геолокацией."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            """
+            SELECT u.telegram_id FROM users u JOIN profiles p ON p.user_id = u.id
+            WHERE p.location_lat IS NOT NULL AND p.location_lon IS NOT NULL
+            """
+        ).fetchall()
+    return Population(users=[row[0] for row in rows], located=[row[0] for row in rows])
+
+
+def check(
+    results: Dict[str, Dict[str, float]],
+    baseline: Optional[Dict[str, Dict[str, float]]],
+    tolerance: float,
+    max_p95_ms: float,
+) -> List[str]:
+    """Нарушения гейта: ошибки сценариев, p95 шага выше порога или базы."""
+    failures = []
+    for name, summary in results.items():
+        if summary["errors"]:
+            failures.append(f"{name}: {summary['errors']:.0f} сценариев с ошибкой")
+        if max_p95_ms and summary["step_p95"] * 1000 > max_p95_ms:
+            failures.append(f"{name}: p95 шага {summary['step_p95'] * 1000:.1f} ms > {max_p95_ms:.0f} ms")
+        base = (baseline or {}).get(name)
+        if base and base["step_p95"] and summary["step_p95"] > base["step_p95"] * (1 + tolerance):
+            failures.append(
+                f"{name}: p95 шага {summary['step_p95'] * 1000:.1f} ms, в базе "
+                f"{base['step_p95'] * 1000:.1f} ms (+{summary['step_p95'] / base['step_p95'] - 1:.0%})"
+            )
+    return failures
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    print(
+        f"{'сценарий':<15} {'ok':>5} {'ошиб':>5}   {'шаг p50':>8} {'p95':>8} {'p99':>8}   "
+        f"{'сценарий p50':>12} {'p95':>8} {'p99':>8}   {'сцен/с':>7} {'шаг/с':>7}"
+    )
+    for name, s in results.items():
+        print(
+            f"{name:<15} {s['ok']:>5.0f} {s['errors']:>5.0f}   "
+            f"{s['step_p50'] * 1000:>6.1f}ms {s['step_p95'] * 1000:>6.1f}ms {s['step_p99'] * 1000:>6.1f}ms   "
+            f"{s['p50'] * 1000:>10.0f}ms {s['p95'] * 1000:>6.0f}ms {s['p99'] * 1000:>6.0f}ms   "
+            f"{s['per_second']:>7.1f} {s['steps_per_second']:>7.1f}"
+        )
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"неизвестный сценарий {name!r}, есть: {', '.join(JOURNEYS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path:
+            population = located_riders(db_path)
+        else:
+            db_path = os.path.join(tmp, "loadtest.db")
+            db = Database(db_path)
+            await db.init()
+            try:
+                population = await populate(db, args.users, seed=args.seed)
+            finally:
+                await db.close()
+        print(
+            f"База: {len(population.located)} райдеров с геолокацией; {args.journeys} сценариев, "
+            f"{args.concurrency} одновременно, воркеров бота: {args.shards}, Bot API отвечает за {args.api_latency_ms} мс"
+        )
+
+        async with FakeTelegram(latency=args.api_latency_ms / 1000) as telegram, FakeOpenWeatherMap() as owm:
+            async with bot_process(db_path, telegram, owm.url, args.shards, args.log):
+                if args.warmup:
+                    await run_journeys(
+                        telegram, population, args.mix, args.warmup, args.concurrency, args.timeout, args.seed + 1
+                    )
+                results = await run_journeys(
+                    telegram, population, args.mix, args.journeys, args.concurrency, args.timeout, args.seed
+                )
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check(results, baseline, args.tolerance, args.max_p95_ms)
+    for failure in failures:
+        print(f"РЕГРЕССИЯ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="готовая база вместо синтетической (бот будет в неё писать)")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--journeys", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("create_profile=1,browse=2,resort=2"))
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--api-latency-ms", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log", help="куда писать вывод бота")
+    parser.add_argument("--save", help="сохранить результаты в JSON (база для --baseline)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона: p95 шага не хуже чем на --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="порог p95 шага (0 — без порога)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
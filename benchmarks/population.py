@@ -0,0 +1,172 @@
+"""Синтетическая база для нагрузочных прогонов.
+
+Заполняет БД бота через ``Database``: ``users`` пользователей, у большинства
+профиль (часть с фото и геолокацией рядом с курортами), лайки с долей
+взаимных и мэтчей, события на курортах, чаты с сообщениями. Записи идут
+пачками параллельных вызовов, поэтому WriteQueue коммитит их группами.
+
+Telegram id пользователей — ``TELEGRAM_BASE + i``; одинаковый ``seed`` даёт
+одинаковую базу.
+
+Запуск:
+    python benchmarks/population.py [--db bot.db] [--users 10000] [--likes 10]
+        [--events 200] [--chats 2000] [--seed 1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Awaitable, Iterable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database  # noqa: E402
+
+TELEGRAM_BASE = 1_000_000
+RIDE_TYPES = ("🏂 Сноуборд", "🎿 Лыжи")
+LEVELS = ("Новичок", "Средний", "Продвинутый")
+CITIES = ("Москва", "Санкт-Петербург", "Екатеринбург", "Казань", "Новосибирск", "Сочи")
+CHUNK = 500
+
+
+@dataclass
+class Population:
+    """Кто есть в сгенерированной базе (telegram id)."""
+
+    users: List[int] = field(default_factory=list)
+    # С профилем и геолокацией: могут искать компанию и смотреть склоны без вопросов
+    located: List[int] = field(default_factory=list)
+    likes: int = 0
+    matches: int = 0
+    events: int = 0
+    chats: int = 0
+
+
+async def _in_chunks(calls: Iterable[Awaitable], size: int = CHUNK) -> list:
+    """Выполнить вызовы пачками по ``size`` одновременных."""
+    results: list = []
+    chunk: List[Awaitable] = []
+    for call in calls:
+        chunk.append(call)
+        if len(chunk) >= size:
+            results.extend(await asyncio.gather(*chunk))
+            chunk = []
+    if chunk:
+        results.extend(await asyncio.gather(*chunk))
+    return results
+
+
+async def populate(
+    db: Database,
+    users: int,
+    likes_per_user: int = 10,
+    events: int = 200,
+    chats: int = 2000,
+    seed: int = 1,
+) -> Population:
+    """Заполнить ``db`` синтетическими пользователями и связями между ними."""
+    rng = random.Random(seed)
+    population = Population()
+    resorts = await db.list_resorts()
+
+    telegram_ids = [TELEGRAM_BASE + i for i in range(users)]
+    user_ids = await _in_chunks(
+        db.upsert_user(telegram_id, f"rider{i}", f"Райдер {i}") for i, telegram_id in enumerate(telegram_ids)
+    )
+    population.users = telegram_ids
+
+    profiles = []
+    for i, user_id in enumerate(user_ids):
+        if rng.random() < 0.1:
+            continue
+        lat = lon = None
+        if rng.random() < 0.8:
+            resort = rng.choice(resorts)
+            lat = resort["lat"] + rng.uniform(-1.0, 1.0)
+            lon = resort["lon"] + rng.uniform(-1.0, 1.0)
+            population.located.append(telegram_ids[i])
+        photos = [f"photo-{user_id}-{n}" for n in range(rng.choice((0, 0, 1, 1, 2, 3)))]
+        profiles.append(db.upsert_profile(
+            user_id,
+            rng.choice(RIDE_TYPES),
+            rng.choice(LEVELS),
+            rng.randint(16, 55),
+            rng.choice(CITIES),
+            f"Катаю с {rng.randint(2000, 2023)} года",
+            photos,
+            rng.choice(("м", "ж")),
+            lat,
+            lon,
+        ))
+    await _in_chunks(profiles)
+
+    pairs = set()
+    for user_id in user_ids:
+        for target in rng.sample(user_ids, min(likes_per_user, len(user_ids))):
+            if target != user_id:
+                pairs.add((user_id, target))
+                # Часть лайков взаимная — из них мэтчи
+                if rng.random() < 0.15:
+                    pairs.add((target, user_id))
+    await _in_chunks(db.add_like(a, b) for a, b in pairs)
+    population.likes = len(pairs)
+    mutual = [(a, b) for a, b in pairs if a < b and (b, a) in pairs]
+    await _in_chunks(db.add_match(a, b) for a, b in mutual)
+    population.matches = len(mutual)
+
+    today = date.today()
+    event_ids = await _in_chunks(
+        db.create_event(
+            rng.choice(user_ids),
+            rng.choice(resorts)["id"],
+            (today + timedelta(days=rng.randint(1, 60))).isoformat(),
+            rng.choice(LEVELS + ("Любой",)),
+            f"https://t.me/+event{n}",
+            description="Едем кататься",
+        )
+        for n in range(events)
+    )
+    population.events = len(event_ids)
+
+    # Анонимный чат открывается и до мэтча — берём любые пары с лайком
+    liked = sorted((a, b) for a, b in pairs if a < b)
+    chat_pairs = rng.sample(liked, min(chats, len(liked)))
+    chat_ids = await _in_chunks(db.get_or_create_chat(a, b) for a, b in chat_pairs)
+    await _in_chunks(
+        db.add_chat_message(chat_id, rng.choice(pair), f"Привет! Сообщение {n}")
+        for chat_id, pair in zip(chat_ids, chat_pairs)
+        for n in range(rng.randint(1, 5))
+    )
+    population.chats = len(chat_ids)
+    return population
+
+
+async def main(path: str, users: int, likes: int, events: int, chats: int, seed: int) -> None:
+    db = Database(path)
+    await db.init()
+    start = time.perf_counter()
+    try:
+        population = await populate(db, users, likes, events, chats, seed)
+    finally:
+        await db.close()
+    print(
+        f"{path}: {len(population.users)} пользователей ({len(population.located)} с геолокацией), "
+        f"{population.likes} лайков, {population.matches} мэтчей, {population.events} событий, "
+        f"{population.chats} чатов за {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bot.db")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--likes", type=int, default=10)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.db, args.users, args.likes, args.events, args.chats, args.seed))
@@ -1,16 +1,42 @@
 """Главный файл бота — точка входа."""
 import asyncio
 import logging
+import signal
+import socket
 import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 
-from config import load_config
+from config import Config, load_config
 from db import Database
 from handlers import setup_routers
-from middlewares import LoggingMiddleware, RateLimitMiddleware, StateRestoreMiddleware
+from middlewares import (
+    ApiMetricsMiddleware,
+    HandlerMetricsMiddleware,
+    IdentityMiddleware,
+    LoggingMiddleware,
+    RateLimitMiddleware,
+    UpdateMetricsMiddleware,
+)
+from services.broadcasts import BroadcastManager
+from services.candidates import CandidateEngine
+from services.fsm_storage import SQLiteStorage
+from services.geo import GeoDirectory
+from services.identity import IdentityCache
+from services.metrics import Metrics, start_metrics_server
+from services.outbound import OutboundDispatcher
+from services.rate_limiter import SharedRateLimiter
+from services.reminders import ReminderScheduler
+from services.sharding import EventBridge, ShardChannel, ShardRouter
+from services.weather import WeatherService
+from services.weather_alerts import run_snow_alerts
+from services.webhook import run_webhook
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,43 +55,28 @@ logger = logging.getLogger(__name__)
 # BACKGROUND TASKS
 # ═══════════════════════════════════════════════════════════════════
 
-async def reminder_checker(bot: Bot, db: Database) -> None:
-    """Background task to check and send reminders."""
+async def event_cleanup(db: Database) -> None:
+    """Background task: деактивация прошедших событий раз в сутки."""
     while True:
         try:
-            from datetime import datetime
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            reminders = await db.get_pending_reminders(current_time)
-            
-            for reminder in reminders:
-                try:
-                    await bot.send_message(
-                        reminder["telegram_id"],
-                        f"🔔 <b>Напоминание!</b>\n\n"
-                        f"Завтра событие на {reminder['resort_name']}!\n"
-                        f"📆 {reminder['event_date']}\n\n"
-                        f"👥 Группа: {reminder['telegram_group_link']}",
-                    )
-                    await db.mark_reminder_sent(reminder["id"])
-                except Exception as e:
-                    logger.error(f"Failed to send reminder {reminder['id']}: {e}")
-            
-            # Cleanup old events
             cleaned = await db.cleanup_old_events()
             if cleaned > 0:
                 logger.info(f"Cleaned up {cleaned} old events")
-                
         except Exception as e:
-            logger.error(f"Reminder checker error: {e}")
+            logger.error(f"Event cleanup error: {e}")
         
-        await asyncio.sleep(3600)  # Check every hour
+        await asyncio.sleep(24 * 3600)
 
 
-async def weather_notifier(bot: Bot, db: Database, config) -> None:
+async def weather_notifier(
+    db: Database,
+    weather_service: WeatherService,
+    outbound: OutboundDispatcher,
+    concurrency: int,
+) -> None:
     """Background task для уведомлений о погоде."""
     while True:
         try:
-            from services.weather import get_weather, format_weather
             from datetime import datetime
             
             # Проверяем погоду раз в день в 8:00
@@ -74,33 +85,7 @@ async def weather_notifier(bot: Bot, db: Database, config) -> None:
                 await asyncio.sleep(3600)
                 continue
             
-            resorts = await db.list_resorts()
-            
-            for resort in resorts:
-                subscribers = await db.get_weather_subscribers(resort["id"])
-                if not subscribers:
-                    continue
-                
-                # Получаем погоду
-                weather = await get_weather(resort["lat"], resort["lon"], config.weather_api_key)
-                if not weather:
-                    continue
-                
-                # Проверяем снег
-                if "snow" in weather.get("description", "").lower():
-                    text = (
-                        f"❄️ <b>Снег на {resort['name']}!</b>\n\n"
-                        f"{format_weather(weather)}\n\n"
-                        "Отличный день для катания!"
-                    )
-                    
-                    for sub in subscribers:
-                        try:
-                            await bot.send_message(sub["telegram_id"], text)
-                        except Exception as e:
-                            logger.error(f"Failed to send weather to {sub['telegram_id']}: {e}")
-                    
-                    await asyncio.sleep(1)  # Rate limit
+            await run_snow_alerts(db, weather_service, outbound, concurrency=concurrency)
             
         except Exception as e:
             logger.error(f"Weather notifier error: {e}")
@@ -112,47 +97,274 @@ async def weather_notifier(bot: Bot, db: Database, config) -> None:
 # MAIN
 # ═══════════════════════════════════════════════════════════════════
 
-async def main() -> None:
-    """Точка входа."""
-    config = load_config()
-    
+def create_bot(config: Config) -> Bot:
+    """Бот; с ``TELEGRAM_API_URL`` — через свой Bot API сервер."""
+    session = None
+    if config.telegram_api_url:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.telegram_api_url))
+    return Bot(
+        token=config.bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+def rate_limit_middleware(db: Database, config: Config, namespace: str, rate_limit: int) -> RateLimitMiddleware:
+    """Лимит запросов: в памяти процесса (с шардированием пользователь всегда
+    в одном воркере) или в SQLite при ``RATE_LIMIT_SHARED``."""
+    limiter = None
+    if config.rate_limit_shared:
+        limiter = SharedRateLimiter(db, namespace, rate_limit, config.rate_limit_period)
+    return RateLimitMiddleware(rate_limit=rate_limit, period=config.rate_limit_period, limiter=limiter)
+
+
+@asynccontextmanager
+async def bot_runtime(
+    config: Config, shards: int = 1, background: bool = True, metrics_port: Optional[int] = None
+) -> AsyncIterator[Tuple[Bot, Dispatcher]]:
+    """Собрать бота: БД, сервисы, dispatcher с DI и роутерами.
+
+    Args:
+        config: Конфигурация
+        shards: Сколько процессов делят лимит исходящих сообщений
+        background: Запускать фоновые задачи (в шардированном режиме — только в одном воркере)
+        metrics_port: Порт ``/metrics`` вместо ``config.metrics_port`` (0 — без сервера)
+    """
     # Инициализация БД
-    db = Database(config.database_path)
+    db = Database(
+        config.database_path,
+        pool_size=config.db_pool_size,
+        write_batch=config.db_write_batch,
+        profile=config.db_profile,
+        slow_query_ms=config.slow_query_ms,
+    )
     await db.init()
     logger.info("Database initialized")
     
-    # Создание бота
-    bot = Bot(
-        token=config.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    # Геоиндекс курортов и райдеров (дальше обновляется по событиям БД)
+    geo = GeoDirectory(db)
+    await geo.load()
+    
+    # Погода: общий пул соединений, кэш и склейка одновременных запросов
+    weather_service = WeatherService(
+        config.weather_api_key,
+        base_url=config.weather_api_url,
+        ttl=config.weather_cache_ttl,
     )
     
-    # Dispatcher
-    dp = Dispatcher()
+    # Создание бота; время и ошибки запросов к Bot API — в метрики
+    metrics = Metrics()
+    bot = create_bot(config)
+    bot.session.middleware(ApiMetricsMiddleware(metrics))
+    
+    # Исходящие рассылки идут через общую очередь с ограничением скорости;
+    # лимит Telegram общий на бота, поэтому процессы делят его поровну
+    outbound = OutboundDispatcher(
+        bot,
+        rate=config.outbound_rate / shards,
+        workers=config.outbound_workers,
+        chat_rate=config.outbound_chat_rate,
+    )
+    outbound.start()
+    
+    # Рассылки админа: фоновые задания с чекпоинтами, прерванные — продолжаем
+    broadcasts = BroadcastManager(db, bot, outbound, chunk_size=config.broadcast_chunk)
+    
+    # Напоминания о событиях: heap в памяти, отправка точно в срок. Только
+    # там, где идут фоновые задачи: иначе события reminder_added копились бы
+    # в heap, который никто не разбирает
+    reminders = ReminderScheduler(db, outbound) if background else None
+    if background:
+        await broadcasts.resume()
+        await reminders.load()
+        reminders.start()
+    
+    # Dispatcher: состояние и данные FSM хранятся в SQLite
+    storage = SQLiteStorage(db, cache_size=config.fsm_cache_size, flush_ms=config.state_flush_ms)
+    dp = Dispatcher(storage=storage)
+    
+    # Метрики: полное время обновления снаружи, время обработчика — внутри,
+    # после фильтров (обработчик уже выбран), для всех типов обновлений
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(HandlerMetricsMiddleware(metrics))
+    metrics.gauge(
+        "bot_queue_depth",
+        lambda: [
+            ({"queue": "outbound"}, outbound.depth),
+            ({"queue": "db_write"}, db.write_depth),
+            ({"queue": "reminders"}, len(reminders) if reminders is not None else 0),
+            ({"queue": "broadcasts"}, broadcasts.running),
+        ],
+    )
+    metrics.gauge(
+        "bot_db_method_seconds",
+        lambda: [({"method": method}, total) for method, (_, total) in db.profiler.by_method().items()],
+    )
+    metrics.gauge(
+        "bot_db_method_calls",
+        lambda: [({"method": method}, calls) for method, (calls, _) in db.profiler.by_method().items()],
+    )
+    metrics.stats("outbound", outbound.stats)
+    if reminders is not None:
+        metrics.stats("reminders", reminders.stats)
+    metrics.stats("weather", weather_service.stats)
+    identity = IdentityCache(db, size=config.identity_cache_size)
+    metrics.stats("identity", identity.stats)
     
     # Регистрация middleware
     dp.message.middleware(LoggingMiddleware())
-    dp.message.middleware(RateLimitMiddleware(rate_limit=30, period=60))
-    dp.message.middleware(StateRestoreMiddleware())
+    dp.callback_query.middleware(LoggingMiddleware())
+    dp.message.middleware(rate_limit_middleware(db, config, "message", config.rate_limit_messages))
+    dp.callback_query.middleware(rate_limit_middleware(db, config, "callback", config.rate_limit_callbacks))
+    # После rate limit: отбитые обновления не трогают БД
+    dp.message.middleware(IdentityMiddleware(identity))
+    dp.callback_query.middleware(IdentityMiddleware(identity))
     
     # Dependency Injection
     dp["db"] = db
     dp["config"] = config
+    dp["geo"] = geo
+    dp["weather_service"] = weather_service
+    dp["outbound"] = outbound
+    dp["broadcasts"] = broadcasts
+    dp["metrics"] = metrics
+    dp["candidates"] = CandidateEngine(db, max_queues=config.candidate_queues, geo=geo)
     
     # Регистрация роутеров
     router = setup_routers()
     dp.include_router(router)
     
     # Запуск background tasks
-    asyncio.create_task(reminder_checker(bot, db))
-    asyncio.create_task(weather_notifier(bot, db, config))
+    if background:
+        asyncio.create_task(event_cleanup(db))
+        asyncio.create_task(weather_notifier(db, weather_service, outbound, config.weather_concurrency))
     
-    logger.info("🏂 Snow Crew started!")
+    if metrics_port is None:
+        metrics_port = config.metrics_port
+    metrics_runner = await start_metrics_server(metrics, config.metrics_host, metrics_port) if metrics_port else None
     
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        yield bot, dp
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if reminders is not None:
+            await reminders.close()
+        await broadcasts.close()
+        await outbound.close()
         await bot.session.close()
+        await storage.close()
+        await weather_service.close()
+        await db.close()
+
+
+async def main() -> None:
+    """Точка входа."""
+    config = load_config()
+    if config.shard_workers > 1:
+        await run_sharded(config)
+        return
+    
+    async with bot_runtime(config) as (bot, dp):
+        logger.info("🏂 Snow Crew started!")
+        if config.webhook_url:
+            await run_webhook(
+                dp,
+                bot,
+                url=config.webhook_url,
+                secret_token=config.webhook_secret,
+                path=config.webhook_path,
+                host=config.webhook_host,
+                port=config.webhook_port,
+                queue_size=config.webhook_queue,
+                workers=config.webhook_workers,
+                metrics=dp["metrics"],
+            )
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SHARDING
+# ═══════════════════════════════════════════════════════════════════
+
+async def run_sharded(config: Config) -> None:
+    """Фронт: принимает обновления и раздаёт их воркерам по пользователю."""
+    # Схема и миграции — один раз, до старта воркеров
+    db = Database(config.database_path, pool_size=1)
+    await db.init()
+    await db.close()
+    
+    router = ShardRouter(config.shard_workers, target=shard_worker_main)
+    await router.start()
+    bot = create_bot(config)
+    # Роутеры здесь только для списка используемых типов обновлений
+    dp = Dispatcher()
+    dp.include_router(setup_routers())
+    logger.info(f"🏂 Snow Crew started with {config.shard_workers} shard workers!")
+    
+    # Метрики фронта: очередь webhook и раздача по воркерам
+    metrics = Metrics()
+    metrics.gauge(
+        "bot_shard_updates",
+        lambda: [({"shard": str(index)}, count) for index, count in enumerate(router.stats["routed"])],
+    )
+    metrics.gauge(
+        "bot_shard_restarts",
+        lambda: [({"shard": str(index)}, count) for index, count in enumerate(router.stats["restarts"])],
+    )
+    metrics_runner = None
+    if config.metrics_port:
+        metrics_runner = await start_metrics_server(metrics, config.metrics_host, config.metrics_port)
+    
+    try:
+        if config.webhook_url:
+            await run_webhook(
+                dp,
+                bot,
+                url=config.webhook_url,
+                secret_token=config.webhook_secret,
+                path=config.webhook_path,
+                host=config.webhook_host,
+                port=config.webhook_port,
+                queue_size=config.webhook_queue,
+                workers=config.webhook_workers,
+                process=router.route,
+                metrics=metrics,
+            )
+        else:
+            await bot.delete_webhook()
+            await router.poll(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await router.close()
+        await bot.session.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+async def shard_worker(index: int, sock: socket.socket) -> None:
+    """Воркер: свой dispatcher и сервисы, обновления — от фронта."""
+    config = load_config()
+    channel = await ShardChannel.connect(sock)
+    # Фоновые задачи (напоминания, погода, рассылки) — только в нулевом воркере
+    metrics_port = config.metrics_port + 1 + index if config.metrics_port else 0
+    async with bot_runtime(
+        config, shards=config.shard_workers, background=index == 0, metrics_port=metrics_port
+    ) as (bot, dp):
+        bridge = EventBridge(dp["db"], channel)
+        logger.info(f"Shard {index} ready")
+        await channel.serve(lambda update: dp.feed_raw_update(bot, update), on_event=bridge.apply)
+    logger.info(f"Shard {index} stopped")
+
+
+def shard_worker_main(index: int, sock: socket.socket) -> None:
+    """Точка входа воркер-процесса."""
+    # Ctrl+C получает вся группа процессов; воркер останавливает фронт
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(shard_worker(index, sock))
 
 
 if __name__ == "__main__":
@@ -11,6 +11,36 @@ class Config:
     database_path: str
     weather_api_key: str
     admin_ids: List[int] = field(default_factory=list)
+    db_pool_size: int = 4
+    db_write_batch: int = 64
+    db_profile: bool = True
+    slow_query_ms: float = 100
+    state_flush_ms: int = 500
+    fsm_cache_size: int = 10000
+    candidate_queues: int = 1000
+    identity_cache_size: int = 50000
+    weather_api_url: str = "https://api.openweathermap.org/data/2.5/weather"
+    weather_cache_ttl: int = 600
+    weather_concurrency: int = 8
+    outbound_rate: float = 25
+    outbound_workers: int = 8
+    outbound_chat_rate: float = 1
+    broadcast_chunk: int = 500
+    telegram_api_url: str = ""
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str = ""
+    webhook_queue: int = 1000
+    webhook_workers: int = 16
+    shard_workers: int = 1
+    rate_limit_messages: int = 30
+    rate_limit_callbacks: int = 60
+    rate_limit_period: int = 60
+    rate_limit_shared: bool = False
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
 
 
 def load_config() -> Config:
@@ -27,9 +57,95 @@ def load_config() -> Config:
     if admin_ids_str:
         admin_ids = [int(x.strip()) for x in admin_ids_str.split(",") if x.strip().isdigit()]
     
+    # Количество соединений-читателей в пуле БД
+    db_pool_size = int(os.getenv("DB_POOL_SIZE", "4").strip() or 4)
+    # Максимум мутаций в одном групповом коммите
+    db_write_batch = int(os.getenv("DB_WRITE_BATCH", "64").strip() or 64)
+    # Статистика запросов по методам Database (переключается /dbprof) и порог slow query log
+    db_profile = os.getenv("DB_PROFILE", "1").strip().lower() not in ("0", "false", "no")
+    slow_query_ms = float(os.getenv("SLOW_QUERY_MS", "100").strip() or 100)
+    # Как часто сбрасывать изменённые ключи FSM в fsm_storage (окно потери)
+    state_flush_ms = int(os.getenv("STATE_FLUSH_MS", "500").strip() or 500)
+    # Сколько ключей FSM держать в LRU-кэше перед SQLite
+    fsm_cache_size = int(os.getenv("FSM_CACHE_SIZE", "10000").strip() or 10000)
+    # Сколько очередей кандидатов поиска компании держать в памяти
+    candidate_queues = int(os.getenv("CANDIDATE_QUEUES", "1000").strip() or 1000)
+    # Сколько пользователей держать в кэше telegram_id → user_id
+    identity_cache_size = int(os.getenv("IDENTITY_CACHE_SIZE", "50000").strip() or 50000)
+    # Адрес метода погоды (можно подменить локальным фейковым сервером)
+    weather_api_url = os.getenv("WEATHER_API_URL", "").strip() or "https://api.openweathermap.org/data/2.5/weather"
+    # Сколько секунд погода на курорте считается свежей
+    weather_cache_ttl = int(os.getenv("WEATHER_CACHE_TTL", "600").strip() or 600)
+    # Сколько запросов погоды одновременно при утренней рассылке о снеге
+    weather_concurrency = int(os.getenv("WEATHER_CONCURRENCY", "8").strip() or 8)
+    # Темп исходящих рассылок (сообщений в секунду) и число параллельных отправок
+    outbound_rate = float(os.getenv("OUTBOUND_RATE", "25").strip() or 25)
+    outbound_workers = int(os.getenv("OUTBOUND_WORKERS", "8").strip() or 8)
+    # Сообщений в секунду в один чат
+    outbound_chat_rate = float(os.getenv("OUTBOUND_CHAT_RATE", "1").strip() or 1)
+    # Получателей рассылки в одной пачке (между чекпоинтами)
+    broadcast_chunk = int(os.getenv("BROADCAST_CHUNK", "500").strip() or 500)
+    # Свой Bot API сервер (локальный или фейковый для нагрузочных тестов)
+    telegram_api_url = os.getenv("TELEGRAM_API_URL", "").strip()
+    
+    # Webhook: если задан WEBHOOK_URL, бот принимает обновления по HTTP вместо polling
+    webhook_url = os.getenv("WEBHOOK_URL", "").strip()
+    webhook_path = os.getenv("WEBHOOK_PATH", "/webhook").strip() or "/webhook"
+    webhook_host = os.getenv("WEBHOOK_HOST", "0.0.0.0").strip() or "0.0.0.0"
+    webhook_port = int(os.getenv("WEBHOOK_PORT", "8080").strip() or 8080)
+    webhook_secret = os.getenv("WEBHOOK_SECRET", "").strip()
+    if webhook_url and not webhook_secret:
+        raise RuntimeError("WEBHOOK_SECRET is required when WEBHOOK_URL is set")
+    # Сколько обновлений ждёт обработки, дальше Telegram получает 429 и повторит позже
+    webhook_queue = int(os.getenv("WEBHOOK_QUEUE", "1000").strip() or 1000)
+    webhook_workers = int(os.getenv("WEBHOOK_WORKERS", "16").strip() or 16)
+    # Воркер-процессов обработки обновлений (1 — всё в одном процессе)
+    shard_workers = int(os.getenv("SHARD_WORKERS", "1").strip() or 1)
+    # Лимиты запросов пользователя за период: сообщения и нажатия кнопок отдельно
+    rate_limit_messages = int(os.getenv("RATE_LIMIT_MESSAGES", "30").strip() or 30)
+    rate_limit_callbacks = int(os.getenv("RATE_LIMIT_CALLBACKS", "60").strip() or 60)
+    rate_limit_period = int(os.getenv("RATE_LIMIT_PERIOD", "60").strip() or 60)
+    # Хранить лимиты в SQLite, общие для всех процессов (нужно без SHARD_WORKERS,
+    # например при нескольких ботах за балансировщиком)
+    rate_limit_shared = os.getenv("RATE_LIMIT_SHARED", "").strip().lower() in ("1", "true", "yes")
+    # Метрики Prometheus на http://METRICS_HOST:METRICS_PORT/metrics (0 — выключены);
+    # с SHARD_WORKERS воркеры слушают METRICS_PORT+1, METRICS_PORT+2, ...
+    metrics_host = os.getenv("METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+    metrics_port = int(os.getenv("METRICS_PORT", "0").strip() or 0)
+    
     return Config(
         bot_token=bot_token,
         database_path=database_path,
         weather_api_key=weather_api_key,
         admin_ids=admin_ids,
+        db_pool_size=db_pool_size,
+        db_write_batch=db_write_batch,
+        db_profile=db_profile,
+        slow_query_ms=slow_query_ms,
+        state_flush_ms=state_flush_ms,
+        fsm_cache_size=fsm_cache_size,
+        candidate_queues=candidate_queues,
+        identity_cache_size=identity_cache_size,
+        weather_api_url=weather_api_url,
+        weather_cache_ttl=weather_cache_ttl,
+        weather_concurrency=weather_concurrency,
+        outbound_rate=outbound_rate,
+        outbound_workers=outbound_workers,
+        outbound_chat_rate=outbound_chat_rate,
+        broadcast_chunk=broadcast_chunk,
+        telegram_api_url=telegram_api_url,
+        webhook_url=webhook_url,
+        webhook_path=webhook_path,
+        webhook_host=webhook_host,
+        webhook_port=webhook_port,
+        webhook_secret=webhook_secret,
+        webhook_queue=webhook_queue,
+        webhook_workers=webhook_workers,
+        shard_workers=shard_workers,
+        rate_limit_messages=rate_limit_messages,
+        rate_limit_callbacks=rate_limit_callbacks,
+        rate_limit_period=rate_limit_period,
+        rate_limit_shared=rate_limit_shared,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
     )
@@ -1,336 +1,550 @@
 """База данных — все SQL-операции."""
 import aiosqlite
+import asyncio
 import json
 import logging
+import math
+import time
 from contextlib import asynccontextmanager
-from typing import Iterable, List, Optional, Set
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple,
+)
+
+from services.metrics import add_update_time
+from services.migrations import MIGRATIONS_DIR, Migration, Migrator, deferred_online
+from services.query_profiler import QueryProfiler, current_method, track_methods
 
 logger = logging.getLogger(__name__)
 
-RESORTS_SEED = [
-    # МОСКВА
-    {"name": "КАНТ (Нагорная)", "lat": 55.6760, "lon": 37.5720, "address": "Москва", "site": "https://kant-sport.ru/", "trails_count": 11, "trail_levels": "зелёные, синие, красные", "lifts_count": 7, "rescue_phone": "+74959092443"},
-    {"name": "Крылатское", "lat": 55.7530, "lon": 37.4480, "address": "Москва", "site": "https://krylatskoe-ski.ru/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+74991448878"},
-    {"name": "Лата Трэк", "lat": 55.7906, "lon": 37.5736, "address": "Москва", "site": "https://spusk.ru/", "trails_count": 3, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": "+74993174777"},
-    # МОСКОВСКАЯ ОБЛАСТЬ
-    {"name": "Сорочаны", "lat": 56.0090, "lon": 37.3600, "address": "Московская область", "site": "https://sorochany.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 8, "rescue_phone": "+74955025255"},
-    {"name": "Волен", "lat": 56.0603, "lon": 37.3904, "address": "Московская область", "site": "https://volen.ru/", "trails_count": 13, "trail_levels": "зелёные, синие, красные", "lifts_count": 10, "rescue_phone": "+74955012323"},
-    {"name": "Степаново", "lat": 56.0621, "lon": 37.4012, "address": "Московская область", "site": "https://stepanovo-park.ru/", "trails_count": 8, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+74955012000"},
-    {"name": "Чулково (Клуб Тягачева)", "lat": 55.6547, "lon": 37.9636, "address": "Московская область", "site": "https://chulkovo-club.ru/", "trails_count": 7, "trail_levels": "зелёные, синие, красные", "lifts_count": 4, "rescue_phone": "+74955842222"},
-    {"name": "Лоза", "lat": 56.3000, "lon": 38.1330, "address": "Московская область", "site": "https://loza-ski.ru/", "trails_count": 4, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": None},
-    # САНКТ-ПЕТЕРБУРГ И ОБЛАСТЬ
-    {"name": "Охта-Парк", "lat": 60.0906, "lon": 30.3894, "address": "Санкт-Петербург", "site": "https://ohta-park.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 6, "rescue_phone": "+78123356666"},
-    {"name": "Игора", "lat": 60.5189, "lon": 30.1997, "address": "Ленинградская область", "site": "https://igora.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 8, "rescue_phone": "+78124565900"},
-    {"name": "Северный склон", "lat": 60.0415, "lon": 30.3749, "address": "Санкт-Петербург", "site": "https://sevsklon.ru/", "trails_count": 6, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+78129241111"},
-    {"name": "Туутари-Парк", "lat": 59.7006, "lon": 30.2003, "address": "Ленинградская область", "site": "https://tuutari-park.ru/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+78127770170"},
-    {"name": "Золотая Долина", "lat": 60.5560, "lon": 29.7200, "address": "Ленинградская область", "site": "https://zolotaya-dolina.ru/", "trails_count": 12, "trail_levels": "зелёные, синие, красные", "lifts_count": 6, "rescue_phone": "+78137841111"},
-    # УРАЛ
-    {"name": "Гора Белая", "lat": 57.4936, "lon": 59.9375, "address": "Свердловская область", "site": "https://ski-gora-belaya.ru/", "trails_count": 7, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+73435070707"},
-    {"name": "Уктус", "lat": 56.7793, "lon": 60.6416, "address": "Екатеринбург", "site": "https://uktus.com/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 4, "rescue_phone": "+73433898989"},
-    {"name": "Пильная", "lat": 56.9300, "lon": 59.9500, "address": "Свердловская область", "site": "https://pilnaya.ru/", "trails_count": 6, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": None},
-    # ЧЕЛЯБИНСКАЯ ОБЛАСТЬ
-    {"name": "Солнечная Долина", "lat": 54.9857, "lon": 60.2217, "address": "Челябинская область", "site": "https://solnechnaya-dolina.com/", "trails_count": 12, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 8, "rescue_phone": "+73519777777"},
-    {"name": "Банное (Металлург-Магнитогорск)", "lat": 53.5900, "lon": 58.9700, "address": "Челябинская область", "site": "https://ski-bannoe.ru/", "trails_count": 6, "trail_levels": "синие, красные", "lifts_count": 4, "rescue_phone": "+73473633333"},
-    # БАШКОРТОСТАН
-    {"name": "Абзаково", "lat": 53.8200, "lon": 58.6000, "address": "Башкортостан", "site": "https://abzakovo.com/", "trails_count": 13, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 9, "rescue_phone": "+73519579600"},
-    # СОЧИ
-    {"name": "Роза Хутор", "lat": 43.6570, "lon": 40.2970, "address": "Сочи, Краснодарский край", "site": "https://roza-khutor.com/", "trails_count": 105, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 32, "rescue_phone": "+78622437100"},
-    {"name": "Газпром Лаура", "lat": 43.6628, "lon": 40.2665, "address": "Сочи, Краснодарский край", "site": "https://polyanaski.ru/", "trails_count": 35, "trail_levels": "зелёные, синие, красные", "lifts_count": 10, "rescue_phone": "+78622437000"},
-    {"name": "Красная Поляна", "lat": 43.6730, "lon": 40.2710, "address": "Сочи, Краснодарский край", "site": "https://krasnayapolyanaresort.ru/", "trails_count": 30, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 13, "rescue_phone": "+78622437200"},
-    # КЕМЕРОВСКАЯ ОБЛАСТЬ
-    {"name": "Шерегеш", "lat": 52.9150, "lon": 87.9850, "address": "Кемеровская область", "site": "https://sheregesh.su/", "trails_count": 40, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 19, "rescue_phone": "+73845337911"},
-    # КАРАЧАЕВО-ЧЕРКЕСИЯ
-    {"name": "Архыз", "lat": 43.5600, "lon": 41.2200, "address": "Карачаево-Черкесия", "site": "https://arhyz-resort.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные", "lifts_count": 8, "rescue_phone": "+78782226600"},
-    {"name": "Домбай", "lat": 43.2880, "lon": 41.6280, "address": "Карачаево-Черкесия", "site": "https://dombaj.ru/", "trails_count": 14, "trail_levels": "синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+78782259111"},
-    # КАБАРДИНО-БАЛКАРИЯ
-    {"name": "Эльбрус (Азау)", "lat": 43.2700, "lon": 42.4700, "address": "Кабардино-Балкария", "site": "https://elbrus.su/", "trails_count": 20, "trail_levels": "синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+78663871899"},
-    # МУРМАНСКАЯ ОБЛАСТЬ
-    {"name": "Большой Вудъявр", "lat": 67.6120, "lon": 33.6770, "address": "Мурманская область", "site": "https://bigwood.ru/", "trails_count": 25, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 10, "rescue_phone": "+78155332211"},
-    # САХАЛИН
-    {"name": "Горный Воздух", "lat": 46.9590, "lon": 142.7470, "address": "Сахалин", "site": "https://gornyvozdukh.ru/", "trails_count": 9, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+74242467777"},
-    # КАЗАНЬ
-    {"name": "Свияжские Холмы", "lat": 55.7825, "lon": 48.8890, "address": "Татарстан", "site": "https://sviyaga-ski.ru/", "trails_count": 6, "trail_levels": "зелёные, синие, красные", "lifts_count": 4, "rescue_phone": "+78432777700"},
-    # НИЖНИЙ НОВГОРОД
-    {"name": "Хабарское", "lat": 56.1440, "lon": 44.0900, "address": "Нижегородская область", "site": "https://habarskoe.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+78314666000"},
-    # НОВОСИБИРСК
-    {"name": "Горский", "lat": 54.9840, "lon": 82.9080, "address": "Новосибирск", "site": None, "trails_count": 4, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": None},
-    # КРАСНОЯРСК
-    {"name": "Бобровый Лог", "lat": 55.9680, "lon": 92.7950, "address": "Красноярск", "site": "https://bobrovylog.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+73912691111"},
-]
+# PRAGMA для каждого соединения. WAL позволяет читателям не блокировать
+# писателя; synchronous=NORMAL в WAL-режиме безопасен и делает fsync только
+# на чекпоинтах, а не на каждый коммит.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -16000,  # ~16 МБ страничного кэша на соединение
+    "mmap_size": 128 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
 
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
 
-class Database:
-    def __init__(self, path: str) -> None:
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class LikeResult:
+    """Итог ``Database.like_and_match``: какие уведомления отправлять."""
+
+    liked: bool  # лайк записан этим вызовом (а не был раньше)
+    matched: bool  # этим вызовом создан мэтч
+
+
+class ConnectionPool:
+    """Пул долгоживущих соединений: несколько читателей и один писатель.
+
+    Открытие соединения в aiosqlite — это новый поток, connect и PRAGMA,
+    поэтому соединения создаются один раз в ``open()`` и переиспользуются.
+    Писатель один: SQLite всё равно сериализует запись, а общая транзакция
+    на одном соединении защищена локом.
+    """
+
+    def __init__(self, path: str, readers: int = 4) -> None:
         self._path = path
+        self._readers_count = max(1, readers)
+        self._idle_readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._readers: List[aiosqlite.Connection] = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
 
-    @asynccontextmanager
-    async def connection(self) -> aiosqlite.Connection:
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
         conn = await aiosqlite.connect(self._path)
         conn.row_factory = aiosqlite.Row
-        await conn.execute("PRAGMA foreign_keys = ON;")
+        for name, value in SQLITE_PRAGMAS.items():
+            await conn.execute(f"PRAGMA {name} = {value};")
+        return conn
+
+    async def open(self) -> None:
+        """Открыть писателя и читателей."""
+        if self.is_open:
+            return
+        self._writer = await self._connect()
+        for _ in range(self._readers_count):
+            conn = await self._connect()
+            self._readers.append(conn)
+            self._idle_readers.put_nowait(conn)
+        logger.info(f"Connection pool opened: 1 writer, {self._readers_count} readers")
+
+    async def close(self) -> None:
+        """Закрыть все соединения (дожидается занятого писателя)."""
+        if not self.is_open:
+            return
+        async with self._writer_lock:
+            await self._writer.close()
+            self._writer = None
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        self._idle_readers = asyncio.Queue()
+        logger.info("Connection pool closed")
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self.is_open:
+            raise RuntimeError("Connection pool is not open")
+        conn = await self._idle_readers.get()
         try:
             yield conn
         finally:
-            await conn.close()
+            self._idle_readers.put_nowait(conn)
 
-    async def init(self) -> None:
-        """Инициализация БД."""
-        async with self.connection() as conn:
-            await conn.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id INTEGER NOT NULL UNIQUE,
-                    username TEXT,
-                    first_name TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    last_state TEXT
-                );
-
-                CREATE TABLE IF NOT EXISTS profiles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL UNIQUE,
-                    photos TEXT,
-                    gender TEXT,
-                    ride_type TEXT NOT NULL,
-                    skill_level TEXT NOT NULL,
-                    age INTEGER NOT NULL,
-                    city TEXT NOT NULL,
-                    location_lat REAL,
-                    location_lon REAL,
-                    about TEXT NOT NULL,
-                    ride_plan TEXT,
-                    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS likes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    from_user_id INTEGER NOT NULL,
-                    to_user_id INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(from_user_id, to_user_id),
-                    FOREIGN KEY(from_user_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(to_user_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS matches (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user1_id INTEGER NOT NULL,
-                    user2_id INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user1_id, user2_id),
-                    FOREIGN KEY(user1_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(user2_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS blocks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    blocker_id INTEGER NOT NULL,
-                    blocked_id INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(blocker_id, blocked_id),
-                    FOREIGN KEY(blocker_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(blocked_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS resorts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    lat REAL NOT NULL,
-                    lon REAL NOT NULL,
-                    address TEXT,
-                    site TEXT,
-                    trails_count INTEGER,
-                    trail_levels TEXT,
-                    lifts_count INTEGER,
-                    rescue_phone TEXT
-                );
-
-                CREATE TABLE IF NOT EXISTS reviews (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    resort_id INTEGER NOT NULL,
-                    rating INTEGER NOT NULL,
-                    text TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, resort_id),
-                    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(resort_id) REFERENCES resorts(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    creator_id INTEGER NOT NULL,
-                    resort_id INTEGER NOT NULL,
-                    event_date TEXT NOT NULL,
-                    skill_level TEXT NOT NULL,
-                    photo_file_id TEXT,
-                    telegram_group_link TEXT NOT NULL,
-                    description TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    is_active INTEGER DEFAULT 1,
-                    FOREIGN KEY(creator_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(resort_id) REFERENCES resorts(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS instructors (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    telegram_link TEXT NOT NULL,
-                    city TEXT NOT NULL,
-                    resorts TEXT NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS event_reminders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    event_id INTEGER NOT NULL,
-                    remind_at TEXT NOT NULL,
-                    sent INTEGER DEFAULT 0,
-                    UNIQUE(user_id, event_id),
-                    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(event_id) REFERENCES events(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS chats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user1_id INTEGER NOT NULL,
-                    user2_id INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user1_id, user2_id),
-                    FOREIGN KEY(user1_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(user2_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS chat_messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    sender_id INTEGER NOT NULL,
-                    text TEXT NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(chat_id) REFERENCES chats(id) ON DELETE CASCADE,
-                    FOREIGN KEY(sender_id) REFERENCES users(id) ON DELETE CASCADE
-                );
-
-                CREATE TABLE IF NOT EXISTS weather_subscriptions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    resort_id INTEGER NOT NULL,
-                    UNIQUE(user_id, resort_id),
-                    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
-                    FOREIGN KEY(resort_id) REFERENCES resorts(id) ON DELETE CASCADE
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_profiles_city ON profiles(city);
-                CREATE INDEX IF NOT EXISTS idx_profiles_ride_type ON profiles(ride_type);
-                CREATE INDEX IF NOT EXISTS idx_profiles_skill_level ON profiles(skill_level);
-                CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date);
-                CREATE INDEX IF NOT EXISTS idx_events_resort ON events(resort_id);
-                CREATE INDEX IF NOT EXISTS idx_instructors_city ON instructors(city);
-                CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON event_reminders(remind_at);
-                CREATE INDEX IF NOT EXISTS idx_blocks_blocker ON blocks(blocker_id);
-                CREATE INDEX IF NOT EXISTS idx_reviews_resort ON reviews(resort_id);
-                CREATE INDEX IF NOT EXISTS idx_chat_messages_chat ON chat_messages(chat_id);
-                """
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self.is_open:
+            raise RuntimeError("Connection pool is not open")
+        async with self._writer_lock:
+            conn = self._writer
+            try:
+                yield conn
+            finally:
+                # Незакоммиченная транзакция не должна достаться следующему
+                if conn.in_transaction:
+                    await conn.rollback()
+
+
+class WriteQueue:
+    """Единственная задача-писатель с групповыми коммитами.
+
+    Мутации ставятся в очередь как корутины ``op(conn)``. Задача забирает
+    всё, что накопилось (до ``max_batch``), и выполняет пачку в одной
+    транзакции — один fsync на пачку вместо одного на клик. Каждая операция
+    обёрнута в SAVEPOINT, поэтому ошибка одной не откатывает соседние.
+    Вызывающий получает результат только после COMMIT.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 64) -> None:
+        self._pool = pool
+        self._max_batch = max(1, max_batch)
+        self._queue: "asyncio.Queue[Optional[Tuple[WriteOp, asyncio.Future]]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """Сколько операций ждёт записи."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="db-writer")
+
+    async def stop(self) -> None:
+        """Дописать очередь и остановить задачу."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, op: WriteOp) -> Any:
+        if self._task is None:
+            raise RuntimeError("Write queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self._max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+            if stopping:
+                return
+
+    async def _commit_batch(self, batch: List[Tuple[WriteOp, asyncio.Future]]) -> None:
+        outcomes: List[Tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+        try:
+            async with self._pool.writer() as conn:
+                await conn.execute("BEGIN IMMEDIATE")
+                for op, future in batch:
+                    await conn.execute("SAVEPOINT write_op")
+                    try:
+                        result = await op(conn)
+                    except Exception as e:
+                        await conn.execute("ROLLBACK TO write_op")
+                        await conn.execute("RELEASE write_op")
+                        outcomes.append((future, None, e))
+                    else:
+                        await conn.execute("RELEASE write_op")
+                        outcomes.append((future, result, None))
+                await conn.commit()
+        except Exception as e:
+            logger.error(f"Write batch of {len(batch)} failed: {e}")
+            outcomes = [(future, None, e) for _, future in batch]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class WriteBehindBuffer:
+    """Буфер отложенной записи: последнее значение на ключ, сброс пачкой.
+
+    ``put`` только запоминает значение в памяти. Фоновая задача раз в
+    ``interval`` секунд (или сразу, если накопилось ``max_pending`` ключей)
+    отдаёт весь набор изменённых ключей в ``flush`` одним вызовом. Пока
+    пачка пишется, её значения по-прежнему отдаёт ``get``. При остановке
+    буфер сбрасывается. Окно потери при падении процесса ограничено
+    ``interval``.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Dict[Hashable, Any]], Awaitable[None]],
+        interval: float = 0.5,
+        max_pending: int = 1000,
+    ) -> None:
+        self._flush = flush
+        self._interval = interval
+        self._max_pending = max_pending
+        self._pending: Dict[Hashable, Any] = {}
+        self._inflight: Dict[Hashable, Any] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._pending[key] = value
+        if len(self._pending) >= self._max_pending:
+            self._wakeup.set()
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        """Несброшенное (или ещё не закоммиченное) значение ключа или ``default``."""
+        value = self._pending.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._inflight.get(key, default)
+        return value
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="write-behind")
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу и сбросить остаток."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        # До коммита пачка не видна в БД: читатели берут значения отсюда
+        self._inflight = batch
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            logger.error(f"Write-behind flush of {len(batch)} keys failed: {e}")
+            # Возвращаем несброшенное, не затирая более свежие значения
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+        finally:
+            self._inflight = {}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+Resort = Mapping[str, Any]
+
+
+class ResortCatalogue:
+    """Неизменяемый снимок таблицы ``resorts`` с готовыми выборками.
+
+    Строится один раз при старте и заново — только через
+    ``Database.reload_resorts`` (сидирование, правка курортов). Записи —
+    read-only словари, у каждого снимка свой ``version``.
+    """
+
+    __slots__ = ("version", "resorts", "by_id", "by_address", "cities", "rescue", "trig")
+
+    def __init__(self, version: int, rows: Iterable[Any]) -> None:
+        resorts = tuple(MappingProxyType(dict(row)) for row in rows)
+        by_address: Dict[str, List[Resort]] = {}
+        for resort in resorts:
+            if resort["address"] is not None:
+                by_address.setdefault(resort["address"], []).append(resort)
+
+        self.version = version
+        self.resorts: Tuple[Resort, ...] = resorts
+        self.by_id: Mapping[int, Resort] = MappingProxyType({resort["id"]: resort for resort in resorts})
+        self.by_address: Mapping[str, Tuple[Resort, ...]] = MappingProxyType({
+            address: tuple(sorted(items, key=lambda resort: resort["name"]))
+            for address, items in by_address.items()
+        })
+        self.cities: Tuple[str, ...] = tuple(sorted(by_address))
+        self.rescue: Tuple[Resort, ...] = tuple(resort for resort in resorts if resort["rescue_phone"])
+        # (lat, lon в радианах, cos(lat)) — для расстояний без пересчёта
+        self.trig: Mapping[int, Tuple[float, float, float]] = MappingProxyType({
+            resort["id"]: (
+                math.radians(resort["lat"]),
+                math.radians(resort["lon"]),
+                math.cos(math.radians(resort["lat"])),
             )
-            await conn.commit()
-        await self._ensure_new_columns()
-        await self._seed_resorts()
-        logger.info("Database initialized")
+            for resort in resorts
+        })
 
-    async def _ensure_new_columns(self) -> None:
-        """Миграция: добавление новых колонок."""
-        async with self.connection() as conn:
-            # Profiles columns
-            async with conn.execute("PRAGMA table_info(profiles)") as cursor:
-                columns = {row["name"] for row in await cursor.fetchall()}
-            if "location_lat" not in columns:
-                await conn.execute("ALTER TABLE profiles ADD COLUMN location_lat REAL")
-            if "location_lon" not in columns:
-                await conn.execute("ALTER TABLE profiles ADD COLUMN location_lon REAL")
-            if "photos" not in columns:
-                await conn.execute("ALTER TABLE profiles ADD COLUMN photos TEXT")
-            if "gender" not in columns:
-                await conn.execute("ALTER TABLE profiles ADD COLUMN gender TEXT")
-            if "ride_plan" not in columns:
-                await conn.execute("ALTER TABLE profiles ADD COLUMN ride_plan TEXT")
-            
-            # Resorts columns
-            async with conn.execute("PRAGMA table_info(resorts)") as cursor:
-                resort_columns = {row["name"] for row in await cursor.fetchall()}
-            if "rescue_phone" not in resort_columns:
-                await conn.execute("ALTER TABLE resorts ADD COLUMN rescue_phone TEXT")
-            
-            await conn.commit()
+    def __len__(self) -> int:
+        return len(self.resorts)
 
-    async def _seed_resorts(self) -> None:
-        """Заполнение курортов."""
-        async with self.connection() as conn:
-            async with conn.execute("SELECT COUNT(*) as cnt FROM resorts") as cursor:
-                row = await cursor.fetchone()
-                if row["cnt"] >= len(RESORTS_SEED):
-                    for resort in RESORTS_SEED:
-                        if resort.get("rescue_phone"):
-                            await conn.execute(
-                                "UPDATE resorts SET rescue_phone = ? WHERE name = ?",
-                                (resort["rescue_phone"], resort["name"]),
-                            )
-                    await conn.commit()
-                    return
-            await conn.execute("DELETE FROM resorts")
-            await conn.executemany(
-                """
-                INSERT INTO resorts (
-                    name, lat, lon, address, site,
-                    trails_count, trail_levels, lifts_count, rescue_phone
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                [
-                    (
-                        resort["name"],
-                        resort["lat"],
-                        resort["lon"],
-                        resort.get("address"),
-                        resort.get("site"),
-                        resort.get("trails_count"),
-                        resort.get("trail_levels"),
-                        resort.get("lifts_count"),
-                        resort.get("rescue_phone"),
-                    )
-                    for resort in RESORTS_SEED
-                ],
+    def by_city(self, city: str) -> Tuple[Resort, ...]:
+        """Курорты, в адресе которых есть ``city`` (как ``LIKE %city%``), по имени."""
+        found = [resort for address, items in self.by_address.items() if city in address for resort in items]
+        return tuple(sorted(found, key=lambda resort: resort["name"]))
+
+    def distance_km(self, resort_id: int, lat: float, lon: float) -> float:
+        """Haversine от точки до курорта по заранее посчитанным координатам."""
+        resort_lat, resort_lon, resort_cos = self.trig[resort_id]
+        lat_rad = math.radians(lat)
+        a = (
+            math.sin((resort_lat - lat_rad) / 2) ** 2
+            + math.cos(lat_rad) * resort_cos * math.sin((resort_lon - math.radians(lon)) / 2) ** 2
+        )
+        return 2 * 6371.0 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class Database:
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        write_batch: int = 64,
+        profile: bool = True,
+        slow_query_ms: float = 100.0,
+        migrations_dir: Path = MIGRATIONS_DIR,
+    ) -> None:
+        self._path = path
+        self._migrations_dir = migrations_dir
+        self._online_migrations: Optional[asyncio.Task] = None
+        self._pool = ConnectionPool(path, readers=pool_size)
+        self._writes = WriteQueue(self._pool, max_batch=write_batch)
+        self._listeners: List[Callable[..., None]] = []
+        self._resorts: Optional[ResortCatalogue] = None
+        self._resorts_version = 0
+        # Статистика запросов по методам и slow query log (переключается на лету)
+        self.profiler = QueryProfiler(profile, slow_query_ms, explain=self._explain)
+
+    @property
+    def write_depth(self) -> int:
+        """Мутаций в очереди писателя."""
+        return self._writes.depth
+
+    def add_listener(self, listener: Callable[..., None]) -> None:
+        """Подписаться на изменения: ``listener(event, *args)`` после коммита.
+
+        События: profile_changed, profile_located (user_id, lat, lon),
+        profile_deleted, like_added, like_removed, user_blocked,
+        user_unblocked, users_undeliverable (telegram_ids),
+        events_changed, resorts_changed (catalogue),
+        reminder_added (reminder_id, remind_at),
+        profiling_changed (enabled, slow_ms).
+        """
+        self._listeners.append(listener)
+
+    def emit(self, event: str, *args: Any) -> None:
+        """Передать слушателям событие, случившееся вне этого процесса."""
+        if event == "profiling_changed":
+            self._apply_profiling(*args)
+        self._notify(event, *args)
+
+    def set_profiling(self, enabled: Optional[bool] = None, slow_ms: Optional[float] = None) -> None:
+        """Включить/выключить профилирование запросов или сменить порог
+        slow query log (в шардированном режиме — во всех процессах)."""
+        self._apply_profiling(enabled, slow_ms)
+        self._notify("profiling_changed", enabled, slow_ms)
+
+    def _apply_profiling(self, enabled: Optional[bool], slow_ms: Optional[float]) -> None:
+        if enabled is not None:
+            self.profiler.enabled = enabled
+        if slow_ms is not None:
+            self.profiler.slow_ms = slow_ms
+
+    def _notify(self, event: str, *args: Any) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event, *args)
+            except Exception as e:
+                logger.error(f"Listener failed on {event}{args}: {e}")
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение для чтения из пула (время идёт в метрики обновления)."""
+        start = time.perf_counter()
+        try:
+            async with self._pool.reader() as conn:
+                yield self.profiler.wrap(conn)
+        finally:
+            add_update_time("db", time.perf_counter() - start)
+
+    def _writer(self):
+        """Единственное соединение для записи (только init и миграции)."""
+        return self._pool.writer()
+
+    async def _submit_write(self, op: WriteOp) -> Any:
+        """Выполнить мутацию через задачу-писателя."""
+        if self.profiler.enabled:
+            # Писатель выполняет op в своей задаче: метод запоминаем здесь
+            op = self._profiled_op(op, current_method())
+        start = time.perf_counter()
+        try:
+            return await self._writes.submit(op)
+        finally:
+            add_update_time("db", time.perf_counter() - start)
+
+    def _profiled_op(self, op: WriteOp, method: str) -> WriteOp:
+        async def profiled(conn: aiosqlite.Connection) -> Any:
+            return await op(self.profiler.wrap(conn, method))
+
+        return profiled
+
+    async def _explain(self, sql: str, params: Any) -> List[str]:
+        """``EXPLAIN QUERY PLAN`` на читателе: дерево плана строками с отступами."""
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+            return []
+        async with self._pool.reader() as conn:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()) as cursor:
+                rows = await cursor.fetchall()
+        depth: Dict[int, int] = {0: -1}
+        plan = []
+        for row in rows:
+            depth[row["id"]] = depth.get(row["parent"], -1) + 1
+            plan.append("  " * depth[row["id"]] + row["detail"])
+        return plan
+
+    async def _execute_write(self, sql: str, params: Iterable[Any] = ()) -> aiosqlite.Cursor:
+        """Выполнить один изменяющий запрос через задачу-писателя."""
+        async def op(conn: aiosqlite.Connection) -> aiosqlite.Cursor:
+            return await conn.execute(sql, params)
+
+        return await self._submit_write(op)
+
+    async def close(self) -> None:
+        """Сбросить отложенные записи, дописать очередь и закрыть пул."""
+        await self.wait_migrations()
+        await self._writes.stop()
+        await self.profiler.join()
+        await self._pool.close()
+
+    async def init(self) -> None:
+        """Открыть пул и довести схему до последней миграции.
+
+        Online-миграции (индексы) в конце списка на непустой базе строятся
+        в фоне, уже после старта; дождаться их — ``wait_migrations``.
+        """
+        await self._pool.open()
+        migrator = Migrator(self._migrations_dir)
+        async with self._writer() as conn:
+            applied = await migrator.applied(conn)
+            pending = migrator.pending(applied)
+            online = deferred_online(pending) if applied else []
+            for migration in pending:
+                if migration not in online:
+                    await migrator.apply(conn, migration)
+        if pending:
+            logger.info(f"Schema migrated to {migrator.latest:04d} ({len(pending) - len(online)} applied)")
+        await self.reload_resorts()
+        self._writes.start()
+        if online:
+            self._online_migrations = asyncio.create_task(
+                self._apply_online(migrator, online), name="db-online-migrations"
             )
-            await conn.commit()
+        logger.info("Database initialized")
+
+    async def _apply_online(self, migrator: Migrator, migrations: List[Migration]) -> None:
+        """Online-миграции по одной, каждая под локом писателя (пачки записей ждут её)."""
+        for migration in migrations:
+            try:
+                async with self._writer() as conn:
+                    await migrator.apply(conn, migration)
+            except Exception as e:
+                logger.error(f"Online migration {migration} failed: {e}")
+                return
+
+    async def wait_migrations(self) -> None:
+        """Дождаться фоновых online-миграций."""
+        if self._online_migrations is not None:
+            await self._online_migrations
 
     # ═══════════════════════════════════════════════════════════════════
     # USERS
     # ═══════════════════════════════════════════════════════════════════
 
     async def upsert_user(self, telegram_id: int, username: str, first_name: str) -> int:
-        """Создать или обновить пользователя."""
-        async with self.connection() as conn:
-            await conn.execute(
+        """Создать или обновить пользователя, вернуть user_id."""
+        async def op(conn: aiosqlite.Connection) -> int:
+            async with conn.execute(
                 """
                 INSERT INTO users (telegram_id, username, first_name)
                 VALUES (?, ?, ?)
                 ON CONFLICT(telegram_id) DO UPDATE SET
                     username = excluded.username,
-                    first_name = excluded.first_name
+                    first_name = excluded.first_name,
+                    undeliverable = 0
+                RETURNING id
                 """,
                 (telegram_id, username, first_name),
-            )
-            await conn.commit()
-            async with conn.execute(
-                "SELECT id FROM users WHERE telegram_id = ?",
-                (telegram_id,),
             ) as cursor:
                 row = await cursor.fetchone()
                 return row["id"]
 
+        return await self._submit_write(op)
+
+    async def get_user_identity(self, telegram_id: int) -> Optional[aiosqlite.Row]:
+        """id, имя из Telegram и признак недоступности — для кэша идентичности."""
+        async with self._reader() as conn:
+            async with conn.execute(
+                "SELECT id, username, first_name, undeliverable FROM users WHERE telegram_id = ?",
+                (telegram_id,),
+            ) as cursor:
+                return await cursor.fetchone()
+
     async def get_user_by_id(self, user_id: int) -> Optional[aiosqlite.Row]:
         """Получить пользователя по ID."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT * FROM users WHERE id = ?",
                 (user_id,),
@@ -339,7 +553,7 @@ class Database:
 
     async def get_user_id_by_telegram(self, telegram_id: int) -> Optional[int]:
         """Получить user_id по telegram_id."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT id FROM users WHERE telegram_id = ?",
                 (telegram_id,),
@@ -349,28 +563,74 @@ class Database:
 
     async def get_all_users(self) -> Iterable[aiosqlite.Row]:
         """Получить всех пользователей."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute("SELECT * FROM users") as cursor:
                 return await cursor.fetchall()
 
-    async def update_user_state(self, telegram_id: int, state: Optional[str]) -> None:
-        """Обновить состояние FSM в БД."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE users SET last_state = ? WHERE telegram_id = ?",
-                (state, telegram_id),
-            )
-            await conn.commit()
+    # ═══════════════════════════════════════════════════════════════════
+    # FSM STORAGE
+    # ═══════════════════════════════════════════════════════════════════
 
-    async def get_user_state(self, telegram_id: int) -> Optional[str]:
-        """Получить сохранённое состояние FSM."""
-        async with self.connection() as conn:
+    async def get_fsm_record(self, key: str) -> Optional[aiosqlite.Row]:
+        """Получить состояние и данные FSM по ключу хранилища."""
+        async with self._reader() as conn:
             async with conn.execute(
-                "SELECT last_state FROM users WHERE telegram_id = ?",
-                (telegram_id,),
+                "SELECT state, data FROM fsm_storage WHERE key = ?",
+                (key,),
             ) as cursor:
+                return await cursor.fetchone()
+
+    async def save_fsm_records(self, records: Dict[str, Tuple[Optional[str], Optional[bytes]]]) -> None:
+        """Записать пачку ключей FSM одной транзакцией (пустые — удалить)."""
+        upserts = [(key, state, data) for key, (state, data) in records.items() if state or data]
+        deletes = [(key,) for key, (state, data) in records.items() if not (state or data)]
+
+        async def op(conn: aiosqlite.Connection) -> None:
+            if upserts:
+                await conn.executemany(
+                    """
+                    INSERT INTO fsm_storage (key, state, data, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        updated_at = excluded.updated_at
+                    """,
+                    upserts,
+                )
+            if deletes:
+                await conn.executemany("DELETE FROM fsm_storage WHERE key = ?", deletes)
+
+        await self._submit_write(op)
+
+    # ═══════════════════════════════════════════════════════════════════
+    # RATE LIMITS
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def rate_limit_hit(self, key: str, now: float, interval: float, tolerance: float) -> float:
+        """Шаг GCRA для ключа: 0 — запрос пропущен, иначе — секунд до следующего.
+
+        Чтение и запись TAT идут в одной транзакции ``BEGIN IMMEDIATE``,
+        поэтому шаг атомарен и между процессами.
+        """
+        async def op(conn: aiosqlite.Connection) -> float:
+            async with conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)) as cursor:
                 row = await cursor.fetchone()
-                return row["last_state"] if row else None
+            tat = max(row["tat"], now) if row else now
+            if tat - now > tolerance:
+                return tat - tolerance - now
+            await conn.execute(
+                "INSERT INTO rate_limits (key, tat) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                (key, tat + interval),
+            )
+            return 0.0
+
+        return await self._submit_write(op)
+
+    async def cleanup_rate_limits(self, now: float) -> int:
+        """Удалить ключи с полным ведром (TAT в прошлом)."""
+        cursor = await self._execute_write("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+        return cursor.rowcount
 
     # ═══════════════════════════════════════════════════════════════════
     # PROFILES
@@ -378,7 +638,7 @@ class Database:
 
     async def get_profile(self, user_id: int) -> Optional[aiosqlite.Row]:
         """Получить профиль пользователя."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT p.*, u.username, u.first_name
@@ -405,93 +665,88 @@ class Database:
     ) -> None:
         """Создать или обновить профиль."""
         photos_json = json.dumps(photos) if photos else None
-        async with self.connection() as conn:
-            await conn.execute(
-                """
-                INSERT INTO profiles (
-                    user_id, ride_type, skill_level, age, city, about, photos, gender, location_lat, location_lon
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET
-                    ride_type = excluded.ride_type,
-                    skill_level = excluded.skill_level,
-                    age = excluded.age,
-                    city = excluded.city,
-                    about = excluded.about,
-                    photos = excluded.photos,
-                    gender = excluded.gender,
-                    location_lat = excluded.location_lat,
-                    location_lon = excluded.location_lon
-                """,
-                (user_id, ride_type, skill_level, age, city, about, photos_json, gender, location_lat, location_lon),
-            )
-            await conn.commit()
+        await self._execute_write(
+            """
+            INSERT INTO profiles (
+                user_id, ride_type, skill_level, age, city, about, photos, gender, location_lat, location_lon
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                ride_type = excluded.ride_type,
+                skill_level = excluded.skill_level,
+                age = excluded.age,
+                city = excluded.city,
+                about = excluded.about,
+                photos = excluded.photos,
+                gender = excluded.gender,
+                location_lat = excluded.location_lat,
+                location_lon = excluded.location_lon
+            """,
+            (user_id, ride_type, skill_level, age, city, about, photos_json, gender, location_lat, location_lon),
+        )
+        self._notify("profile_changed", user_id)
+        self._notify("profile_located", user_id, location_lat, location_lon)
 
     async def update_profile_photos(self, user_id: int, photos: List[str]) -> None:
         """Обновить фото профиля."""
         photos_json = json.dumps(photos) if photos else None
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET photos = ? WHERE user_id = ?",
-                (photos_json, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET photos = ? WHERE user_id = ?",
+            (photos_json, user_id),
+        )
+        self._notify("profile_changed", user_id)
 
     async def update_profile_city(
         self, user_id: int, city: str, lat: Optional[float], lon: Optional[float]
     ) -> None:
         """Обновить город профиля."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET city = ?, location_lat = ?, location_lon = ? WHERE user_id = ?",
-                (city, lat, lon, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET city = ?, location_lat = ?, location_lon = ? WHERE user_id = ?",
+            (city, lat, lon, user_id),
+        )
+        self._notify("profile_changed", user_id)
+        self._notify("profile_located", user_id, lat, lon)
 
     async def update_profile_level(self, user_id: int, level: str) -> None:
         """Обновить уровень."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET skill_level = ? WHERE user_id = ?",
-                (level, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET skill_level = ? WHERE user_id = ?",
+            (level, user_id),
+        )
+        self._notify("profile_changed", user_id)
 
     async def update_profile_ride_type(self, user_id: int, ride_type: str) -> None:
         """Обновить тип катания."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET ride_type = ? WHERE user_id = ?",
-                (ride_type, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET ride_type = ? WHERE user_id = ?",
+            (ride_type, user_id),
+        )
+        self._notify("profile_changed", user_id)
 
     async def update_about(self, user_id: int, about: str) -> None:
         """Обновить описание профиля."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET about = ? WHERE user_id = ?",
-                (about, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET about = ? WHERE user_id = ?",
+            (about, user_id),
+        )
+        self._notify("profile_changed", user_id)
 
     async def delete_profile(self, user_id: int) -> None:
         """Удалить профиль."""
-        async with self.connection() as conn:
-            await conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
-            await conn.commit()
+        await self._execute_write("DELETE FROM profiles WHERE user_id = ?", (user_id,))
+        self._notify("profile_deleted", user_id)
 
     async def update_profile_location(self, user_id: int, lat: float, lon: float) -> None:
         """Обновить геолокацию."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "UPDATE profiles SET location_lat = ?, location_lon = ? WHERE user_id = ?",
-                (lat, lon, user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "UPDATE profiles SET location_lat = ?, location_lon = ? WHERE user_id = ?",
+            (lat, lon, user_id),
+        )
+        self._notify("profile_changed", user_id)
+        self._notify("profile_located", user_id, lat, lon)
 
     async def get_all_profiles(self, current_user_id: int) -> Iterable[aiosqlite.Row]:
         """Получить все профили (кроме текущего)."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT p.*, u.username, u.first_name
@@ -504,12 +759,42 @@ class Database:
             ) as cursor:
                 return await cursor.fetchall()
 
+    async def get_profile_locations(self) -> Iterable[aiosqlite.Row]:
+        """Координаты всех профилей с геолокацией (для геоиндекса)."""
+        async with self._reader() as conn:
+            async with conn.execute(
+                """
+                SELECT user_id, location_lat, location_lon
+                FROM profiles
+                WHERE location_lat IS NOT NULL AND location_lon IS NOT NULL
+                """
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def get_profiles_by_user_ids(self, user_ids: Iterable[int]) -> Iterable[aiosqlite.Row]:
+        """Получить профили нескольких пользователей одним запросом."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        placeholders = ", ".join("?" * len(user_ids))
+        async with self._reader() as conn:
+            async with conn.execute(
+                f"""
+                SELECT p.*, u.username, u.first_name
+                FROM profiles p
+                JOIN users u ON u.id = p.user_id
+                WHERE p.user_id IN ({placeholders})
+                """,
+                user_ids,
+            ) as cursor:
+                return await cursor.fetchall()
+
     async def get_filtered_profiles(
         self,
         current_user_id: int,
         ride_type: Optional[str] = None,
         skill_level: Optional[str] = None,
-        limit: int = 100,
+        limit: Optional[int] = None,
     ) -> Iterable[aiosqlite.Row]:
         """Получить профили с фильтрами."""
         query = """
@@ -527,10 +812,49 @@ class Database:
             query += " AND p.skill_level = ?"
             params.append(skill_level)
         
+        query += " ORDER BY p.id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        async with self._reader() as conn:
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+    async def get_candidate_profiles(
+        self,
+        current_user_id: int,
+        ride_type: Optional[str] = None,
+        skill_level: Optional[str] = None,
+        before_id: Optional[int] = None,
+        limit: int = 1000,
+    ) -> Iterable[aiosqlite.Row]:
+        """Страница анкет для ранжирования, от новых к старым (keyset по ``p.id``).
+
+        Только поля, нужные для score: вместо текста и фото — признак их
+        наличия. Следующая страница — ``before_id`` = ``id`` последней строки.
+        """
+        query = """
+            SELECT p.id, p.user_id, p.ride_type, p.skill_level, p.city, p.age,
+                   p.location_lat, p.location_lon,
+                   p.about <> '' AS about, p.photos IS NOT NULL AS photos
+            FROM profiles p
+            WHERE p.user_id != ?
+        """
+        params: list = [current_user_id]
+        if ride_type:
+            query += " AND p.ride_type = ?"
+            params.append(ride_type)
+        if skill_level:
+            query += " AND p.skill_level = ?"
+            params.append(skill_level)
+        if before_id is not None:
+            query += " AND p.id < ?"
+            params.append(before_id)
         query += " ORDER BY p.id DESC LIMIT ?"
         params.append(limit)
         
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(query, params) as cursor:
                 return await cursor.fetchall()
 
@@ -540,25 +864,23 @@ class Database:
 
     async def add_like(self, from_user_id: int, to_user_id: int) -> None:
         """Добавить лайк."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "INSERT OR IGNORE INTO likes (from_user_id, to_user_id) VALUES (?, ?)",
-                (from_user_id, to_user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "INSERT OR IGNORE INTO likes (from_user_id, to_user_id) VALUES (?, ?)",
+            (from_user_id, to_user_id),
+        )
+        self._notify("like_added", from_user_id, to_user_id)
 
     async def remove_like(self, from_user_id: int, to_user_id: int) -> None:
         """Убрать лайк."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "DELETE FROM likes WHERE from_user_id = ? AND to_user_id = ?",
-                (from_user_id, to_user_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "DELETE FROM likes WHERE from_user_id = ? AND to_user_id = ?",
+            (from_user_id, to_user_id),
+        )
+        self._notify("like_removed", from_user_id, to_user_id)
 
     async def has_like(self, from_user_id: int, to_user_id: int) -> bool:
         """Проверить наличие лайка."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?",
                 (from_user_id, to_user_id),
@@ -566,30 +888,59 @@ class Database:
                 return await cursor.fetchone() is not None
 
     async def add_match(self, user1_id: int, user2_id: int) -> None:
-        """Добавить мэтч."""
-        user_low = min(user1_id, user2_id)
-        user_high = max(user1_id, user2_id)
-        async with self.connection() as conn:
-            await conn.execute(
-                "INSERT OR IGNORE INTO matches (user1_id, user2_id) VALUES (?, ?)",
-                (user_low, user_high),
+        """Добавить мэтч — ребро в обе стороны одной транзакцией."""
+        async def op(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(
+                "INSERT OR IGNORE INTO match_edges (user_id, other_id) VALUES (?, ?)",
+                [(user1_id, user2_id), (user2_id, user1_id)],
             )
-            await conn.commit()
+
+        await self._submit_write(op)
 
     async def has_match(self, user1_id: int, user2_id: int) -> bool:
         """Проверить наличие мэтча."""
-        user_low = min(user1_id, user2_id)
-        user_high = max(user1_id, user2_id)
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
-                "SELECT 1 FROM matches WHERE user1_id = ? AND user2_id = ?",
-                (user_low, user_high),
+                "SELECT 1 FROM match_edges WHERE user_id = ? AND other_id = ?",
+                (user1_id, user2_id),
             ) as cursor:
                 return await cursor.fetchone() is not None
 
+    async def like_and_match(self, from_user_id: int, to_user_id: int) -> LikeResult:
+        """Лайк и мэтч при взаимности — одной операцией очереди записи.
+
+        Лайк и рёбра мэтча вставляются с ``RETURNING`` в одной транзакции
+        писателя, поэтому при двойном клике или встречных лайках каждое
+        уведомление достаётся ровно одному вызову.
+        """
+        async def op(conn: aiosqlite.Connection) -> LikeResult:
+            async with conn.execute(
+                "INSERT OR IGNORE INTO likes (from_user_id, to_user_id) VALUES (?, ?) RETURNING id",
+                (from_user_id, to_user_id),
+            ) as cursor:
+                liked = await cursor.fetchone() is not None
+            # Рёбра из встречного лайка: нет его — нет и вставки
+            async with conn.execute(
+                """
+                INSERT OR IGNORE INTO match_edges (user_id, other_id)
+                SELECT to_user_id, from_user_id FROM likes WHERE from_user_id = ? AND to_user_id = ?
+                UNION ALL
+                SELECT from_user_id, to_user_id FROM likes WHERE from_user_id = ? AND to_user_id = ?
+                RETURNING user_id
+                """,
+                (to_user_id, from_user_id, to_user_id, from_user_id),
+            ) as cursor:
+                matched = bool(await cursor.fetchall())
+            return LikeResult(liked=liked, matched=matched)
+
+        result = await self._submit_write(op)
+        if result.liked:
+            self._notify("like_added", from_user_id, to_user_id)
+        return result
+
     async def get_already_liked(self, user_id: int) -> Set[int]:
         """Получить ID уже лайкнутых."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT to_user_id FROM likes WHERE from_user_id = ?",
                 (user_id,),
@@ -599,7 +950,7 @@ class Database:
 
     async def get_who_liked_me(self, user_id: int) -> Iterable[aiosqlite.Row]:
         """Получить тех, кто лайкнул меня (но я не лайкнул их)."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT u.*, p.ride_type, p.skill_level, p.city, p.about, p.photos
@@ -615,20 +966,18 @@ class Database:
                 return await cursor.fetchall()
 
     async def get_user_matches(self, user_id: int) -> Iterable[aiosqlite.Row]:
-        """Получить мэтчи пользователя."""
-        async with self.connection() as conn:
+        """Получить мэтчи пользователя, новые первыми (проход по индексу рёбер)."""
+        async with self._reader() as conn:
             async with conn.execute(
                 """
-                SELECT u.*, p.ride_type, p.skill_level, p.city, p.about
-                FROM matches m
-                JOIN users u ON (
-                    (m.user1_id = ? AND u.id = m.user2_id)
-                    OR (m.user2_id = ? AND u.id = m.user1_id)
-                )
+                SELECT u.*, p.ride_type, p.skill_level, p.city, p.about, m.created_at AS matched_at
+                FROM match_edges m
+                JOIN users u ON u.id = m.other_id
                 LEFT JOIN profiles p ON p.user_id = u.id
+                WHERE m.user_id = ?
                 ORDER BY m.created_at DESC
                 """,
-                (user_id, user_id),
+                (user_id,),
             ) as cursor:
                 return await cursor.fetchall()
 
@@ -638,7 +987,7 @@ class Database:
 
     async def block_user(self, blocker_id: int, blocked_id: int) -> None:
         """Заблокировать пользователя."""
-        async with self.connection() as conn:
+        async def op(conn: aiosqlite.Connection) -> None:
             await conn.execute(
                 "INSERT OR IGNORE INTO blocks (blocker_id, blocked_id) VALUES (?, ?)",
                 (blocker_id, blocked_id),
@@ -648,26 +997,25 @@ class Database:
                 "DELETE FROM likes WHERE (from_user_id = ? AND to_user_id = ?) OR (from_user_id = ? AND to_user_id = ?)",
                 (blocker_id, blocked_id, blocked_id, blocker_id),
             )
-            user_low = min(blocker_id, blocked_id)
-            user_high = max(blocker_id, blocked_id)
-            await conn.execute(
-                "DELETE FROM matches WHERE user1_id = ? AND user2_id = ?",
-                (user_low, user_high),
+            await conn.executemany(
+                "DELETE FROM match_edges WHERE user_id = ? AND other_id = ?",
+                [(blocker_id, blocked_id), (blocked_id, blocker_id)],
             )
-            await conn.commit()
+
+        await self._submit_write(op)
+        self._notify("user_blocked", blocker_id, blocked_id)
 
     async def unblock_user(self, blocker_id: int, blocked_id: int) -> None:
         """Разблокировать пользователя."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "DELETE FROM blocks WHERE blocker_id = ? AND blocked_id = ?",
-                (blocker_id, blocked_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "DELETE FROM blocks WHERE blocker_id = ? AND blocked_id = ?",
+            (blocker_id, blocked_id),
+        )
+        self._notify("user_unblocked", blocker_id, blocked_id)
 
     async def get_blocked_users(self, user_id: int) -> Set[int]:
         """Получить ID заблокированных."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT blocked_id FROM blocks WHERE blocker_id = ?",
                 (user_id,),
@@ -677,7 +1025,7 @@ class Database:
 
     async def is_blocked(self, user1_id: int, user2_id: int) -> bool:
         """Проверить, заблокирован ли кто-то из двух."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT 1 FROM blocks 
@@ -691,38 +1039,39 @@ class Database:
     # RESORTS
     # ═══════════════════════════════════════════════════════════════════
 
-    async def list_resorts(self) -> Iterable[aiosqlite.Row]:
-        """Список курортов."""
-        async with self.connection() as conn:
-            async with conn.execute("SELECT * FROM resorts") as cursor:
-                return await cursor.fetchall()
+    @property
+    def resort_catalogue(self) -> ResortCatalogue:
+        """Текущий снимок курортов (загружается в ``init``)."""
+        if self._resorts is None:
+            raise RuntimeError("Resort catalogue is not loaded, call init() first")
+        return self._resorts
+
+    async def reload_resorts(self) -> ResortCatalogue:
+        """Перечитать курорты и разослать новый снимок (``resorts_changed``)."""
+        async with self._reader() as conn:
+            async with conn.execute("SELECT * FROM resorts ORDER BY id") as cursor:
+                rows = await cursor.fetchall()
+        self._resorts_version += 1
+        self._resorts = ResortCatalogue(self._resorts_version, rows)
+        logger.info(f"Resort catalogue v{self._resorts_version} loaded: {len(self._resorts)} resorts")
+        self._notify("resorts_changed", self._resorts)
+        return self._resorts
 
-    async def get_resort(self, resort_id: int) -> Optional[aiosqlite.Row]:
+    async def list_resorts(self) -> Tuple[Resort, ...]:
+        """Список курортов (из каталога в памяти)."""
+        return self.resort_catalogue.resorts
+
+    async def get_resort(self, resort_id: int) -> Optional[Resort]:
         """Получить курорт."""
-        async with self.connection() as conn:
-            async with conn.execute(
-                "SELECT * FROM resorts WHERE id = ?",
-                (resort_id,),
-            ) as cursor:
-                return await cursor.fetchone()
+        return self.resort_catalogue.by_id.get(resort_id)
 
     async def get_resort_cities(self) -> List[str]:
         """Получить города с курортами."""
-        async with self.connection() as conn:
-            async with conn.execute(
-                "SELECT DISTINCT address FROM resorts WHERE address IS NOT NULL ORDER BY address"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [row["address"] for row in rows]
+        return list(self.resort_catalogue.cities)
 
-    async def get_resorts_by_city(self, city: str) -> Iterable[aiosqlite.Row]:
+    async def get_resorts_by_city(self, city: str) -> Tuple[Resort, ...]:
         """Получить курорты по городу."""
-        async with self.connection() as conn:
-            async with conn.execute(
-                "SELECT * FROM resorts WHERE address LIKE ? ORDER BY name",
-                (f"%{city}%",),
-            ) as cursor:
-                return await cursor.fetchall()
+        return self.resort_catalogue.by_city(city)
 
     # ═══════════════════════════════════════════════════════════════════
     # REVIEWS
@@ -730,16 +1079,14 @@ class Database:
 
     async def add_review(self, user_id: int, resort_id: int, rating: int, text: Optional[str]) -> None:
         """Добавить отзыв."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "INSERT OR REPLACE INTO reviews (user_id, resort_id, rating, text) VALUES (?, ?, ?, ?)",
-                (user_id, resort_id, rating, text),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "INSERT OR REPLACE INTO reviews (user_id, resort_id, rating, text) VALUES (?, ?, ?, ?)",
+            (user_id, resort_id, rating, text),
+        )
 
     async def get_user_resort_review(self, user_id: int, resort_id: int) -> Optional[aiosqlite.Row]:
         """Получить отзыв пользователя на курорт."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT * FROM reviews WHERE user_id = ? AND resort_id = ?",
                 (user_id, resort_id),
@@ -748,7 +1095,7 @@ class Database:
 
     async def get_resort_reviews(self, resort_id: int, limit: int = 20) -> Iterable[aiosqlite.Row]:
         """Получить отзывы на курорт."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT r.*, u.first_name, u.username
@@ -764,7 +1111,7 @@ class Database:
 
     async def get_resort_rating(self, resort_id: int) -> dict:
         """Получить средний рейтинг курорта."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT AVG(rating) as avg, COUNT(*) as count FROM reviews WHERE resort_id = ?",
                 (resort_id,),
@@ -787,22 +1134,21 @@ class Database:
         description: Optional[str] = None,
     ) -> int:
         """Создать событие."""
-        async with self.connection() as conn:
-            cursor = await conn.execute(
-                """
-                INSERT INTO events (
-                    creator_id, resort_id, event_date, skill_level,
-                    telegram_group_link, photo_file_id, description
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (creator_id, resort_id, event_date, skill_level, telegram_group_link, photo_file_id, description),
-            )
-            await conn.commit()
-            return cursor.lastrowid
+        cursor = await self._execute_write(
+            """
+            INSERT INTO events (
+                creator_id, resort_id, event_date, skill_level,
+                telegram_group_link, photo_file_id, description
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (creator_id, resort_id, event_date, skill_level, telegram_group_link, photo_file_id, description),
+        )
+        self._notify("events_changed")
+        return cursor.lastrowid
 
     async def get_active_events(self) -> Iterable[aiosqlite.Row]:
         """Получить активные события."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT e.*, r.name as resort_name, r.address as resort_address,
@@ -818,7 +1164,7 @@ class Database:
 
     async def get_event(self, event_id: int) -> Optional[aiosqlite.Row]:
         """Получить событие."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT e.*, r.name as resort_name, r.address as resort_address,
@@ -832,9 +1178,29 @@ class Database:
             ) as cursor:
                 return await cursor.fetchone()
 
+    async def get_events_by_ids(self, event_ids: Iterable[int]) -> Iterable[aiosqlite.Row]:
+        """Получить несколько событий одним запросом."""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return []
+        placeholders = ", ".join("?" * len(event_ids))
+        async with self._reader() as conn:
+            async with conn.execute(
+                f"""
+                SELECT e.*, r.name as resort_name, r.address as resort_address,
+                       u.first_name as creator_name, u.username as creator_username
+                FROM events e
+                JOIN resorts r ON r.id = e.resort_id
+                JOIN users u ON u.id = e.creator_id
+                WHERE e.id IN ({placeholders})
+                """,
+                event_ids,
+            ) as cursor:
+                return await cursor.fetchall()
+
     async def get_user_events(self, user_id: int) -> Iterable[aiosqlite.Row]:
         """Получить события пользователя."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT e.*, r.name as resort_name
@@ -849,18 +1215,17 @@ class Database:
 
     async def deactivate_event(self, event_id: int) -> None:
         """Деактивировать событие."""
-        async with self.connection() as conn:
-            await conn.execute("UPDATE events SET is_active = 0 WHERE id = ?", (event_id,))
-            await conn.commit()
+        await self._execute_write("UPDATE events SET is_active = 0 WHERE id = ?", (event_id,))
+        self._notify("events_changed")
 
     async def cleanup_old_events(self) -> int:
         """Деактивировать старые события."""
-        async with self.connection() as conn:
-            cursor = await conn.execute(
-                "UPDATE events SET is_active = 0 WHERE is_active = 1 AND date(event_date) < date('now', '-7 days')"
-            )
-            await conn.commit()
-            return cursor.rowcount
+        cursor = await self._execute_write(
+            "UPDATE events SET is_active = 0 WHERE is_active = 1 AND date(event_date) < date('now', '-7 days')"
+        )
+        if cursor.rowcount:
+            self._notify("events_changed")
+        return cursor.rowcount
 
     # ═══════════════════════════════════════════════════════════════════
     # CHATS
@@ -870,7 +1235,7 @@ class Database:
         """Получить или создать чат."""
         user_low = min(user1_id, user2_id)
         user_high = max(user1_id, user2_id)
-        async with self.connection() as conn:
+        async def op(conn: aiosqlite.Connection) -> int:
             async with conn.execute(
                 "SELECT id FROM chats WHERE user1_id = ? AND user2_id = ?",
                 (user_low, user_high),
@@ -883,21 +1248,20 @@ class Database:
                 "INSERT INTO chats (user1_id, user2_id) VALUES (?, ?)",
                 (user_low, user_high),
             )
-            await conn.commit()
             return cursor.lastrowid
 
+        return await self._submit_write(op)
+
     async def add_chat_message(self, chat_id: int, sender_id: int, text: str) -> None:
         """Добавить сообщение в чат."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "INSERT INTO chat_messages (chat_id, sender_id, text) VALUES (?, ?, ?)",
-                (chat_id, sender_id, text),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "INSERT INTO chat_messages (chat_id, sender_id, text) VALUES (?, ?, ?)",
+            (chat_id, sender_id, text),
+        )
 
     async def get_chat_messages(self, chat_id: int, limit: int = 20) -> Iterable[aiosqlite.Row]:
         """Получить сообщения чата."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT * FROM chat_messages
@@ -915,17 +1279,15 @@ class Database:
 
     async def add_instructor(self, name: str, telegram_link: str, city: str, resorts: str) -> int:
         """Добавить инструктора."""
-        async with self.connection() as conn:
-            cursor = await conn.execute(
-                "INSERT INTO instructors (name, telegram_link, city, resorts) VALUES (?, ?, ?, ?)",
-                (name, telegram_link, city, resorts),
-            )
-            await conn.commit()
-            return cursor.lastrowid
+        cursor = await self._execute_write(
+            "INSERT INTO instructors (name, telegram_link, city, resorts) VALUES (?, ?, ?, ?)",
+            (name, telegram_link, city, resorts),
+        )
+        return cursor.lastrowid
 
     async def get_instructor_cities(self) -> List[str]:
         """Получить города с инструкторами."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT DISTINCT city FROM instructors ORDER BY city"
             ) as cursor:
@@ -934,7 +1296,7 @@ class Database:
 
     async def get_instructors_by_city(self, city: str) -> Iterable[aiosqlite.Row]:
         """Получить инструкторов по городу."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 "SELECT * FROM instructors WHERE city = ? ORDER BY name",
                 (city,),
@@ -946,39 +1308,65 @@ class Database:
     # ═══════════════════════════════════════════════════════════════════
 
     async def add_event_reminder(self, user_id: int, event_id: int, remind_at: str) -> None:
-        """Добавить напоминание."""
-        async with self.connection() as conn:
-            await conn.execute(
+        """Добавить напоминание (слушатели получают ``reminder_added``)."""
+        async def op(conn: aiosqlite.Connection) -> Optional[int]:
+            cursor = await conn.execute(
                 "INSERT OR IGNORE INTO event_reminders (user_id, event_id, remind_at) VALUES (?, ?, ?)",
                 (user_id, event_id, remind_at),
             )
-            await conn.commit()
+            return cursor.lastrowid if cursor.rowcount else None
+
+        reminder_id = await self._submit_write(op)
+        if reminder_id is not None:
+            self._notify("reminder_added", reminder_id, remind_at)
+
+    async def get_scheduled_reminders(self) -> Iterable[aiosqlite.Row]:
+        """``id`` и ``remind_at`` всех неотправленных напоминаний (для планировщика).
 
-    async def get_pending_reminders(self, current_time: str) -> Iterable[aiosqlite.Row]:
-        """Получить напоминания для отправки."""
-        async with self.connection() as conn:
+        CROSS JOIN фиксирует порядок: от частичного индекса неотправленных к
+        событию по ключу, а не проход по всем событиям.
+        """
+        async with self._reader() as conn:
             async with conn.execute(
                 """
-                SELECT r.*, e.event_date, e.telegram_group_link, 
+                SELECT r.id, r.remind_at FROM event_reminders r
+                CROSS JOIN events e ON e.id = r.event_id
+                WHERE r.sent = 0 AND e.is_active = 1
+                """
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def get_due_reminders(self, reminder_ids: Iterable[int]) -> Iterable[aiosqlite.Row]:
+        """Данные для отправки наступивших напоминаний (уже отправленные и
+        напоминания неактивных событий пропускаются)."""
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return []
+        placeholders = ", ".join("?" * len(reminder_ids))
+        async with self._reader() as conn:
+            async with conn.execute(
+                f"""
+                SELECT r.*, e.event_date, e.telegram_group_link,
                        rs.name as resort_name, u.telegram_id
                 FROM event_reminders r
                 JOIN events e ON e.id = r.event_id
                 JOIN resorts rs ON rs.id = e.resort_id
                 JOIN users u ON u.id = r.user_id
-                WHERE r.sent = 0 AND r.remind_at <= ? AND e.is_active = 1
+                WHERE r.id IN ({placeholders}) AND r.sent = 0 AND e.is_active = 1
                 """,
-                (current_time,),
+                reminder_ids,
             ) as cursor:
                 return await cursor.fetchall()
 
-    async def mark_reminder_sent(self, reminder_id: int) -> None:
-        """Отметить напоминание как отправленное."""
-        async with self.connection() as conn:
-            await conn.execute(
+    async def mark_reminders_sent(self, reminder_ids: Iterable[int]) -> None:
+        """Отметить напоминания отправленными одной транзакцией."""
+        async def op(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(
                 "UPDATE event_reminders SET sent = 1 WHERE id = ?",
-                (reminder_id,),
+                [(reminder_id,) for reminder_id in reminder_ids],
             )
-            await conn.commit()
+
+        await self._submit_write(op)
 
     # ═══════════════════════════════════════════════════════════════════
     # WEATHER SUBSCRIPTIONS
@@ -986,25 +1374,21 @@ class Database:
 
     async def subscribe_weather(self, user_id: int, resort_id: int) -> None:
         """Подписаться на погоду."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "INSERT OR IGNORE INTO weather_subscriptions (user_id, resort_id) VALUES (?, ?)",
-                (user_id, resort_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "INSERT OR IGNORE INTO weather_subscriptions (user_id, resort_id) VALUES (?, ?)",
+            (user_id, resort_id),
+        )
 
     async def unsubscribe_weather(self, user_id: int, resort_id: int) -> None:
         """Отписаться от погоды."""
-        async with self.connection() as conn:
-            await conn.execute(
-                "DELETE FROM weather_subscriptions WHERE user_id = ? AND resort_id = ?",
-                (user_id, resort_id),
-            )
-            await conn.commit()
+        await self._execute_write(
+            "DELETE FROM weather_subscriptions WHERE user_id = ? AND resort_id = ?",
+            (user_id, resort_id),
+        )
 
     async def get_weather_subscribers(self, resort_id: int) -> Iterable[aiosqlite.Row]:
         """Получить подписчиков на погоду."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT u.telegram_id FROM weather_subscriptions ws
@@ -1015,9 +1399,23 @@ class Database:
             ) as cursor:
                 return await cursor.fetchall()
 
+    async def get_weather_subscribers_by_resort(self) -> Dict[int, List[int]]:
+        """telegram_id подписчиков по всем курортам одним запросом."""
+        subscribers: Dict[int, List[int]] = {}
+        async with self._reader() as conn:
+            async with conn.execute(
+                """
+                SELECT ws.resort_id, u.telegram_id FROM weather_subscriptions ws
+                JOIN users u ON u.id = ws.user_id
+                """
+            ) as cursor:
+                async for row in cursor:
+                    subscribers.setdefault(row["resort_id"], []).append(row["telegram_id"])
+        return subscribers
+
     async def get_user_weather_subscriptions(self, user_id: int) -> Iterable[aiosqlite.Row]:
         """Получить подписки пользователя."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             async with conn.execute(
                 """
                 SELECT r.* FROM weather_subscriptions ws
@@ -1028,19 +1426,111 @@ class Database:
             ) as cursor:
                 return await cursor.fetchall()
 
+    # ═══════════════════════════════════════════════════════════════════
+    # BROADCASTS
+    # ═══════════════════════════════════════════════════════════════════
+
+    async def create_broadcast(self, admin_chat_id: int, text: str) -> int:
+        """Создать задание рассылки, вернуть его id."""
+        async def op(conn: aiosqlite.Connection) -> int:
+            cursor = await conn.execute(
+                """
+                INSERT INTO broadcasts (admin_chat_id, text, total)
+                SELECT ?, ?, COUNT(*) FROM users WHERE undeliverable = 0
+                """,
+                (admin_chat_id, text),
+            )
+            return cursor.lastrowid
+
+        return await self._submit_write(op)
+
+    async def get_broadcast(self, broadcast_id: int) -> Optional[aiosqlite.Row]:
+        """Получить задание рассылки."""
+        async with self._reader() as conn:
+            async with conn.execute(
+                "SELECT * FROM broadcasts WHERE id = ?",
+                (broadcast_id,),
+            ) as cursor:
+                return await cursor.fetchone()
+
+    async def get_unfinished_broadcasts(self) -> Iterable[aiosqlite.Row]:
+        """Задания, прерванные остановкой бота."""
+        async with self._reader() as conn:
+            async with conn.execute(
+                "SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id"
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def get_broadcast_recipients(self, after_user_id: int, limit: int) -> Iterable[aiosqlite.Row]:
+        """Следующая пачка получателей: keyset по ``users.id``, без недоступных."""
+        async with self._reader() as conn:
+            async with conn.execute(
+                """
+                SELECT id, telegram_id FROM users
+                WHERE id > ? AND undeliverable = 0
+                ORDER BY id
+                LIMIT ?
+                """,
+                (after_user_id, limit),
+            ) as cursor:
+                return await cursor.fetchall()
+
+    async def set_broadcast_progress_message(self, broadcast_id: int, message_id: int) -> None:
+        """Запомнить сообщение админу, в котором показывается прогресс."""
+        await self._execute_write(
+            "UPDATE broadcasts SET progress_message_id = ? WHERE id = ?",
+            (message_id, broadcast_id),
+        )
+
+    async def save_broadcast_checkpoint(
+        self,
+        broadcast_id: int,
+        last_user_id: int,
+        sent: int,
+        failed: int,
+        blocked: int,
+        undeliverable: Iterable[int] = (),
+        finished: bool = False,
+    ) -> None:
+        """Сохранить прогресс пачки и пометить недоступных пользователей — одной транзакцией."""
+        async def op(conn: aiosqlite.Connection) -> None:
+            await conn.executemany(
+                "UPDATE users SET undeliverable = 1 WHERE telegram_id = ?",
+                [(telegram_id,) for telegram_id in undeliverable],
+            )
+            await conn.execute(
+                """
+                UPDATE broadcasts SET
+                    last_user_id = ?,
+                    sent = sent + ?,
+                    failed = failed + ?,
+                    blocked = blocked + ?,
+                    status = CASE WHEN ? THEN 'done' ELSE status END,
+                    finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE finished_at END
+                WHERE id = ?
+                """,
+                (last_user_id, sent, failed, blocked, finished, finished, broadcast_id),
+            )
+
+        undeliverable = list(undeliverable)
+        await self._submit_write(op)
+        if undeliverable:
+            self._notify("users_undeliverable", undeliverable)
+
     # ═══════════════════════════════════════════════════════════════════
     # STATISTICS
     # ═══════════════════════════════════════════════════════════════════
 
     async def get_stats(self) -> dict:
         """Получить статистику."""
-        async with self.connection() as conn:
+        async with self._reader() as conn:
             stats = {}
             async with conn.execute("SELECT COUNT(*) as cnt FROM users") as cursor:
                 stats["users"] = (await cursor.fetchone())["cnt"]
             async with conn.execute("SELECT COUNT(*) as cnt FROM profiles") as cursor:
                 stats["profiles"] = (await cursor.fetchone())["cnt"]
-            async with conn.execute("SELECT COUNT(*) as cnt FROM matches") as cursor:
+            # Каждый мэтч — два ребра
+            async with conn.execute("SELECT COUNT(*) / 2 as cnt FROM match_edges") as cursor:
                 stats["matches"] = (await cursor.fetchone())["cnt"]
             async with conn.execute("SELECT COUNT(*) as cnt FROM likes") as cursor:
                 stats["likes"] = (await cursor.fetchone())["cnt"]
@@ -1051,3 +1541,7 @@ class Database:
             async with conn.execute("SELECT COUNT(*) as cnt FROM blocks") as cursor:
                 stats["blocks"] = (await cursor.fetchone())["cnt"]
             return stats
+
+
+# Запросы каждого метода учитываются под его именем (QueryProfiler)
+track_methods(Database, exclude=("_submit_write", "_execute_write", "_explain"))
@@ -2,13 +2,16 @@
 import logging
 
 from aiogram import F, Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
 from config import load_config
 from db import Database
 from keyboards import BACK_KB, MAIN_MENU
+from services.broadcasts import BroadcastManager
+from services.metrics import Metrics, perf_report
+from services.query_profiler import profile_report
 from states import AddInstructorStates, BroadcastStates
 
 from .common import set_state
@@ -38,13 +41,42 @@ async def cmd_stats(message: Message, db: Database) -> None:
     )
 
 
+@router.message(Command("perf"))
+async def cmd_perf(message: Message, metrics: Metrics) -> None:
+    """Производительность: дорогие роутеры и обработчики, БД, Bot API, очереди."""
+    if message.from_user.id not in config.admin_ids:
+        return
+    
+    await message.answer(perf_report(metrics), reply_markup=MAIN_MENU)
+
+
+@router.message(Command("dbprof"))
+async def cmd_dbprof(message: Message, command: CommandObject, db: Database) -> None:
+    """Профилирование запросов: /dbprof [on|off|reset|<порог в мс>]."""
+    if message.from_user.id not in config.admin_ids:
+        return
+    
+    arg = (command.args or "").strip().lower()
+    if arg in ("on", "off"):
+        db.set_profiling(enabled=arg == "on")
+    elif arg == "reset":
+        db.profiler.reset()
+    elif arg.replace(".", "", 1).isdigit():
+        db.set_profiling(slow_ms=float(arg))
+    elif arg:
+        await message.answer("Использование: /dbprof [on|off|reset|порог в мс]")
+        return
+    
+    await message.answer(profile_report(db.profiler), reply_markup=MAIN_MENU)
+
+
 @router.message(Command("addinst"))
 async def admin_add_instructor(message: Message, state: FSMContext, db: Database) -> None:
     """Добавление инструктора (только для админов)."""
     if message.from_user.id not in config.admin_ids:
         return
     
-    await set_state(db, state, message.from_user.id, AddInstructorStates.waiting_name)
+    await set_state(state, AddInstructorStates.waiting_name)
     await message.answer(
         "🎓 <b>Добавление инструктора</b>\n\n"
         "Введи <b>имя</b> инструктора:",
@@ -56,12 +88,12 @@ async def admin_add_instructor(message: Message, state: FSMContext, db: Database
 async def admin_inst_name(message: Message, state: FSMContext, db: Database) -> None:
     """Имя инструктора."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
     await state.update_data(inst_name=message.text.strip())
-    await set_state(db, state, message.from_user.id, AddInstructorStates.waiting_telegram)
+    await set_state(state, AddInstructorStates.waiting_telegram)
     await message.answer("Введи <b>ссылку на Telegram</b> (например @username или https://t.me/username):")
 
 
@@ -69,12 +101,12 @@ async def admin_inst_name(message: Message, state: FSMContext, db: Database) ->
 async def admin_inst_telegram(message: Message, state: FSMContext, db: Database) -> None:
     """Telegram инструктора."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
     await state.update_data(inst_telegram=message.text.strip())
-    await set_state(db, state, message.from_user.id, AddInstructorStates.waiting_city)
+    await set_state(state, AddInstructorStates.waiting_city)
     await message.answer("Введи <b>город</b>:")
 
 
@@ -82,12 +114,12 @@ async def admin_inst_telegram(message: Message, state: FSMContext, db: Database)
 async def admin_inst_city(message: Message, state: FSMContext, db: Database) -> None:
     """Город инструктора."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
     await state.update_data(inst_city=message.text.strip())
-    await set_state(db, state, message.from_user.id, AddInstructorStates.waiting_resorts)
+    await set_state(state, AddInstructorStates.waiting_resorts)
     await message.answer("Введи <b>список склонов</b> через запятую:")
 
 
@@ -95,7 +127,7 @@ async def admin_inst_city(message: Message, state: FSMContext, db: Database) ->
 async def admin_inst_resorts(message: Message, state: FSMContext, db: Database) -> None:
     """Склоны инструктора."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
@@ -108,7 +140,7 @@ async def admin_inst_resorts(message: Message, state: FSMContext, db: Database)
             city=data["inst_city"],
             resorts=message.text.strip(),
         )
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer(
             f"✅ Инструктор добавлен!\n\n"
             f"👤 {data['inst_name']}\n"
@@ -127,7 +159,7 @@ async def admin_broadcast_start(message: Message, state: FSMContext, db: Databas
     if message.from_user.id not in config.admin_ids:
         return
     
-    await set_state(db, state, message.from_user.id, BroadcastStates.waiting_message)
+    await set_state(state, BroadcastStates.waiting_message)
     await message.answer(
         "📢 <b>Рассылка</b>\n\n"
         "Напиши сообщение для всех пользователей:",
@@ -136,32 +168,19 @@ async def admin_broadcast_start(message: Message, state: FSMContext, db: Databas
 
 
 @router.message(BroadcastStates.waiting_message, F.text)
-async def admin_broadcast_send(message: Message, state: FSMContext, db: Database) -> None:
-    """Отправка рассылки."""
+async def admin_broadcast_send(
+    message: Message, state: FSMContext, db: Database, broadcasts: BroadcastManager
+) -> None:
+    """Запуск рассылки: отправка идёт в фоне, прогресс — отдельным сообщением."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
-    from aiogram import Bot
-    bot: Bot = message.bot
-    
-    users = await db.get_all_users()
-    sent = 0
-    failed = 0
-    
-    for user in users:
-        try:
-            await bot.send_message(user["telegram_id"], message.text)
-            sent += 1
-        except Exception:
-            failed += 1
-    
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer(
-        f"📢 Рассылка завершена\n\n"
-        f"✅ Отправлено: {sent}\n"
-        f"❌ Не доставлено: {failed}",
+        "📢 Рассылка запущена. Прогресс будет обновляться в сообщении ниже.",
         reply_markup=MAIN_MENU,
     )
-    logger.info(f"Admin {message.from_user.id} sent broadcast: {sent} sent, {failed} failed")
+    broadcast_id = await broadcasts.submit(message.chat.id, message.text)
+    logger.info(f"Admin {message.from_user.id} started broadcast {broadcast_id}")
@@ -1,8 +1,8 @@
 """Поиск компании с фильтрами и умным матчингом."""
 import logging
-from typing import List, Tuple
+from typing import Any
 
-from aiogram import Bot, F, Router
+from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
@@ -14,10 +14,11 @@ from keyboards import (
     buddy_filter_kb,
     who_liked_kb,
 )
+from services.candidates import CandidateEngine
+from services.outbound import PRIORITY_HIGH, OutboundDispatcher
 from states import BuddySearchStates, BuddyFilterStates
 
 from .common import (
-    ensure_user,
     format_event,
     format_profile,
     send_profile_with_photos,
@@ -28,79 +29,9 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
-def calculate_match_score(
-    user_profile: dict,
-    candidate_profile: dict,
-    user_lat: float = None,
-    user_lon: float = None,
-) -> int:
-    """Расчёт релевантности кандидата (0-100)."""
-    from services.resorts import haversine_km
-    
-    score = 0
-    
-    # Тот же тип катания (+20)
-    if user_profile.get("ride_type") == candidate_profile.get("ride_type"):
-        score += 20
-    
-    # Тот же уровень (+15), соседний уровень (+5)
-    levels = ["Новичок", "Средний", "Продвинутый"]
-    user_level = user_profile.get("skill_level", "")
-    cand_level = candidate_profile.get("skill_level", "")
-    if user_level in levels and cand_level in levels:
-        level_diff = abs(levels.index(user_level) - levels.index(cand_level))
-        if level_diff == 0:
-            score += 15
-        elif level_diff == 1:
-            score += 5
-    
-    # Тот же город (+20)
-    if user_profile.get("city") == candidate_profile.get("city"):
-        score += 20
-    
-    # Близкий возраст (+10 если разница <5 лет)
-    user_age = user_profile.get("age", 0)
-    cand_age = candidate_profile.get("age", 0)
-    if user_age and cand_age:
-        age_diff = abs(user_age - cand_age)
-        if age_diff <= 5:
-            score += 10
-        elif age_diff <= 10:
-            score += 5
-    
-    # Близкая геолокация (+20 если <50 км)
-    if (
-        user_lat and user_lon
-        and candidate_profile.get("location_lat")
-        and candidate_profile.get("location_lon")
-    ):
-        dist = haversine_km(
-            user_lat, user_lon,
-            candidate_profile["location_lat"],
-            candidate_profile["location_lon"],
-        )
-        if dist < 10:
-            score += 20
-        elif dist < 50:
-            score += 10
-        elif dist < 100:
-            score += 5
-    
-    # Есть описание (+5)
-    if candidate_profile.get("about"):
-        score += 5
-    
-    # Есть фото (+10)
-    if candidate_profile.get("photos"):
-        score += 10
-    
-    return score
-
-
 @router.message(F.text == "🔍 Искать компанию")
-async def buddy_menu(message: Message, state: FSMContext, db: Database) -> None:
+async def buddy_menu(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Меню поиска компании."""
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
     
     if not profile:
@@ -129,16 +60,17 @@ async def buddy_menu(message: Message, state: FSMContext, db: Database) -> None:
 
 
 @router.callback_query(F.data == "buddy:start")
-async def buddy_start_search(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def buddy_start_search(
+    query: CallbackQuery, state: FSMContext, db: Database, candidates: CandidateEngine, user_id: int
+) -> None:
     """Начать просмотр анкет."""
     # Обновляем telegram_id на случай если его нет
     data = await state.get_data()
     if not data.get("telegram_id"):
-        user_id = await ensure_user(db, query)
         await state.update_data(telegram_id=query.from_user.id, current_user_id=user_id)
     
-    await set_state(db, state, query.from_user.id, BuddySearchStates.browsing)
-    await start_buddy_browsing(query.message, state, db)
+    await set_state(state, BuddySearchStates.browsing)
+    await start_buddy_browsing(query.message, state, db, candidates)
     await query.answer()
 
 
@@ -146,7 +78,7 @@ async def buddy_start_search(query: CallbackQuery, state: FSMContext, db: Databa
 async def buddy_filter_ride(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Фильтр по типу катания."""
     from keyboards import ride_type_filter_kb
-    await set_state(db, state, query.from_user.id, BuddyFilterStates.waiting_ride)
+    await set_state(state, BuddyFilterStates.waiting_ride)
     await query.message.answer("🎿 Выбери тип катания:", reply_markup=ride_type_filter_kb())
     await query.answer()
 
@@ -162,7 +94,7 @@ async def buddy_filter_ride_got(query: CallbackQuery, state: FSMContext, db: Dat
     else:
         filters["ride_type"] = ride_type
     await state.update_data(filters=filters)
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer(
         f"✅ Фильтр применён: <b>{ride_type if ride_type != 'any' else 'Любой'}</b>",
         reply_markup=buddy_filter_kb(),
@@ -174,7 +106,7 @@ async def buddy_filter_ride_got(query: CallbackQuery, state: FSMContext, db: Dat
 async def buddy_filter_level(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Фильтр по уровню."""
     from keyboards import level_filter_kb
-    await set_state(db, state, query.from_user.id, BuddyFilterStates.waiting_level)
+    await set_state(state, BuddyFilterStates.waiting_level)
     await query.message.answer("📊 Выбери уровень:", reply_markup=level_filter_kb())
     await query.answer()
 
@@ -190,7 +122,7 @@ async def buddy_filter_level_got(query: CallbackQuery, state: FSMContext, db: Da
     else:
         filters["skill_level"] = level
     await state.update_data(filters=filters)
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer(
         f"✅ Фильтр применён: <b>{level if level != 'any' else 'Любой'}</b>",
         reply_markup=buddy_filter_kb(),
@@ -206,7 +138,20 @@ async def buddy_filter_clear(query: CallbackQuery, state: FSMContext, db: Databa
     await query.answer()
 
 
-async def start_buddy_browsing(message: Message, state: FSMContext, db: Database) -> None:
+def _search_params(data: dict) -> dict:
+    """Параметры поиска из FSM-данных для движка кандидатов."""
+    return {
+        "user_id": data.get("current_user_id"),
+        "user_profile": data.get("user_profile", {}),
+        "filters": data.get("filters", {}),
+        "user_lat": data.get("user_lat"),
+        "user_lon": data.get("user_lon"),
+    }
+
+
+async def start_buddy_browsing(
+    message: Message, state: FSMContext, db: Database, candidates: CandidateEngine
+) -> None:
     """Начать просмотр анкет с учётом фильтров и умного матчинга."""
     data = await state.get_data()
     
@@ -218,66 +163,16 @@ async def start_buddy_browsing(message: Message, state: FSMContext, db: Database
         await message.answer("❌ Ошибка. Попробуй /start", reply_markup=MAIN_MENU)
         return
     
-    filters = data.get("filters", {})
-    user_profile = data.get("user_profile", {})
-    user_lat = data.get("user_lat")
-    user_lon = data.get("user_lon")
-    
-    # Получаем профили с фильтрами
-    profiles = await db.get_filtered_profiles(
-        current_user_id=user_id,
-        ride_type=filters.get("ride_type"),
-        skill_level=filters.get("skill_level"),
-        limit=100,
-    )
-    
-    # Получаем события
-    events = await db.get_active_events()
-    
-    # Убираем заблокированных и уже лайкнутых
-    already_liked = await db.get_already_liked(user_id)
-    blocked_users = await db.get_blocked_users(user_id)
-    
-    # Собираем кандидатов с рейтингом
-    candidates: List[Tuple[str, int, int]] = []  # (type, id, score)
-    
-    # profiles — итератор, конвертируем в список
-    profiles_list = list(profiles)
-    
-    logger.info(f"Buddy search: user_id={user_id}, profiles_count={len(profiles_list)}, already_liked={already_liked}, blocked={blocked_users}")
-    
-    for row in profiles_list:
-        row_user_id = row["user_id"]
-        # Пропускаем себя, заблокированных и уже лайкнутых
-        if row_user_id == user_id:
-            logger.debug(f"Skipping self: {row_user_id}")
-            continue
-        if row_user_id in already_liked:
-            logger.debug(f"Skipping already liked: {row_user_id}")
-            continue
-        if row_user_id in blocked_users:
-            logger.debug(f"Skipping blocked: {row_user_id}")
-            continue
-        profile_dict = dict(row)
-        score = calculate_match_score(user_profile, profile_dict, user_lat, user_lon)
-        candidates.append(("profile", row_user_id, score))
-        logger.info(f"Added candidate: user_id={row_user_id}, score={score}")
-    
-    for row in events:
-        if row["creator_id"] != user_id and row["creator_id"] not in blocked_users:
-            candidates.append(("event", row["id"], 50))  # Средний приоритет для событий
-    
-    # Сортируем по score (убывание)
-    candidates.sort(key=lambda x: x[2], reverse=True)
+    # Очередь строится один раз и дальше обновляется инкрементально
+    ranked = await candidates.ranked(**_search_params(data))
     
-    # Убираем score для хранения
-    candidates_list = [(c[0], c[1]) for c in candidates]
+    # В FSM храним только курсор — ключ последнего показанного кандидата
+    await state.update_data(candidate_cursor=None)
     
-    await state.update_data(candidates=candidates_list, candidate_index=0)
-    
-    if not candidates_list:
+    if not len(ranked):
         if telegram_id:
-            await set_state(db, state, telegram_id, None)
+            await set_state(state, None)
+        filters = data.get("filters", {})
         filter_hint = ""
         if filters:
             filter_hint = "\n\n💡 Попробуй сбросить фильтры."
@@ -288,64 +183,53 @@ async def start_buddy_browsing(message: Message, state: FSMContext, db: Database
         )
         return
     
-    await message.answer(f"🔍 Найдено: {len(candidates_list)}")
-    await show_next_candidate(message, state, db)
+    await message.answer(f"🔍 Найдено: {len(ranked)}")
+    await show_next_candidate(message, state, db, candidates)
 
 
-async def show_next_candidate(message: Message, state: FSMContext, db: Database) -> None:
+async def show_next_candidate(
+    message: Message, state: FSMContext, db: Database, candidates: CandidateEngine
+) -> None:
     """Показать следующего кандидата."""
     data = await state.get_data()
-    index = data.get("candidate_index", 0)
-    candidates = data.get("candidates", [])
+    cursor = data.get("candidate_cursor")
     telegram_id = data.get("telegram_id")
     
-    logger.info(f"show_next_candidate: index={index}, total={len(candidates)}, telegram_id={telegram_id}")
+    candidate = None
+    if data.get("current_user_id"):
+        candidate = await candidates.next_candidate(cursor, **_search_params(data))
     
-    if not candidates or index >= len(candidates):
+    if candidate is None:
         if telegram_id:
-            await set_state(db, state, telegram_id, None)
-        # Очищаем state чтобы повторные нажатия не вызывали проблем
-        await state.update_data(candidates=[], candidate_index=0)
+            await set_state(state, None)
+        # Сбрасываем курсор чтобы повторные нажатия не вызывали проблем
+        await state.update_data(candidate_cursor=None)
         await message.answer("🏁 Анкеты закончились!", reply_markup=MAIN_MENU)
         return
     
-    candidate_type, candidate_id = candidates[index]
-    await state.update_data(
-        candidate_index=index + 1,
-        current_candidate_type=candidate_type,
-        current_candidate_id=candidate_id,
-    )
+    # В FSM — только курсор; анкета уже подгружена страницей движка
+    key, row = candidate
+    await state.update_data(candidate_cursor=key)
     
-    if candidate_type == "profile":
-        await show_profile_candidate(message, state, db, candidate_id)
+    if key[3] == "profile":
+        await show_profile_candidate(message, data, row)
     else:
-        await show_event_candidate(message, state, db, candidate_id)
+        await show_event_candidate(message, row)
 
 
-async def show_profile_candidate(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
+async def show_profile_candidate(message: Message, data: dict, profile: Any) -> None:
     """Показать профиль кандидата."""
-    profile = await db.get_profile(user_id)
-    if not profile:
-        await show_next_candidate(message, state, db)
-        return
-    
     profile_dict = dict(profile)
-    data = await state.get_data()
-    user_lat = data.get("user_lat")
-    user_lon = data.get("user_lon")
-    text = format_profile(profile_dict, user_lat, user_lon)
-    
-    await send_profile_with_photos(message, profile_dict, text, buddy_actions_kb(user_id=user_id))
+    text = format_profile(profile_dict, data.get("user_lat"), data.get("user_lon"))
+    await send_profile_with_photos(
+        message, profile_dict, text, buddy_actions_kb(user_id=profile_dict["user_id"])
+    )
 
 
-async def show_event_candidate(message: Message, state: FSMContext, db: Database, event_id: int) -> None:
+async def show_event_candidate(message: Message, event: Any) -> None:
     """Показать событие."""
-    event = await db.get_event(event_id)
-    if not event:
-        await show_next_candidate(message, state, db)
-        return
-    
     event_dict = dict(event)
+    event_id = event_dict["id"]
     text = format_event(event_dict)
     
     if event_dict.get("photo_file_id"):
@@ -359,10 +243,16 @@ async def show_event_candidate(message: Message, state: FSMContext, db: Database
 
 
 @router.callback_query(F.data.startswith("buddy:like:"))
-async def buddy_like(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def buddy_like(
+    query: CallbackQuery,
+    state: FSMContext,
+    db: Database,
+    candidates: CandidateEngine,
+    outbound: OutboundDispatcher,
+    user_id: int,
+) -> None:
     """Лайк профиля."""
     target_user_id = int(query.data.split(":")[2])
-    user_id = await ensure_user(db, query)
     
     if not user_id:
         await query.answer("Ошибка", show_alert=True)
@@ -373,36 +263,32 @@ async def buddy_like(query: CallbackQuery, state: FSMContext, db: Database) -> N
     if not data.get("telegram_id"):
         await state.update_data(telegram_id=query.from_user.id, current_user_id=user_id)
     
-    # Проверяем, не лайкали ли уже (race condition fix)
-    if await db.has_like(user_id, target_user_id):
-        await show_next_candidate(query.message, state, db)
+    # Лайк и мэтч одной транзакцией: при двойном клике второй вызов ничего не создаёт
+    result = await db.like_and_match(user_id, target_user_id)
+    if not result.liked and not result.matched:
+        await show_next_candidate(query.message, state, db, candidates)
         await query.answer("Уже лайкнуто")
         return
     
-    await db.add_like(user_id, target_user_id)
-    
-    # Уведомляем о лайке
-    await notify_like(db, user_id, target_user_id, query.bot)
+    if result.liked:
+        await notify_like(db, user_id, target_user_id, outbound)
     
-    # Проверяем взаимность
-    if await db.has_like(target_user_id, user_id):
-        # Проверяем, нет ли уже мэтча (race condition fix)
-        if not await db.has_match(user_id, target_user_id):
-            await db.add_match(user_id, target_user_id)
-            await notify_match(db, user_id, target_user_id, query.from_user.id, query.bot)
-            await query.message.answer("🎿 <b>Взаимный интерес!</b>")
+    if result.matched:
+        await notify_match(db, user_id, target_user_id, query.from_user.id, outbound)
+        await query.message.answer("🎿 <b>Взаимный интерес!</b>")
     
-    await show_next_candidate(query.message, state, db)
+    await show_next_candidate(query.message, state, db, candidates)
     await query.answer("👍")
 
 
 @router.callback_query(F.data.startswith("event:join:"))
-async def event_join(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def event_join(
+    query: CallbackQuery, state: FSMContext, db: Database, candidates: CandidateEngine, user_id: int
+) -> None:
     """Присоединиться к событию."""
     # Убеждаемся что данные есть в state
     data = await state.get_data()
     if not data.get("telegram_id"):
-        user_id = await ensure_user(db, query)
         await state.update_data(telegram_id=query.from_user.id, current_user_id=user_id)
     
     event_id = int(query.data.split(":")[2])
@@ -410,7 +296,7 @@ async def event_join(query: CallbackQuery, state: FSMContext, db: Database) -> N
     
     if not event:
         await query.answer("Событие не найдено", show_alert=True)
-        await show_next_candidate(query.message, state, db)
+        await show_next_candidate(query.message, state, db, candidates)
         return
     
     await query.message.answer(
@@ -419,27 +305,30 @@ async def event_join(query: CallbackQuery, state: FSMContext, db: Database) -> N
         f"👥 Вступай в группу: {event['telegram_group_link']}",
     )
     
-    await show_next_candidate(query.message, state, db)
+    await show_next_candidate(query.message, state, db, candidates)
     await query.answer("👍")
 
 
 @router.callback_query(F.data == "buddy:skip")
-async def buddy_skip(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def buddy_skip(
+    query: CallbackQuery, state: FSMContext, db: Database, candidates: CandidateEngine
+) -> None:
     """Пропустить анкету."""
     # Убеждаемся что telegram_id есть в state
     data = await state.get_data()
     if not data.get("telegram_id"):
         await state.update_data(telegram_id=query.from_user.id)
     
-    await show_next_candidate(query.message, state, db)
+    await show_next_candidate(query.message, state, db, candidates)
     await query.answer("👎")
 
 
 @router.callback_query(F.data.startswith("buddy:block:"))
-async def buddy_block(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def buddy_block(
+    query: CallbackQuery, state: FSMContext, db: Database, candidates: CandidateEngine, user_id: int
+) -> None:
     """Заблокировать пользователя."""
     target_user_id = int(query.data.split(":")[2])
-    user_id = await ensure_user(db, query)
     
     # Убеждаемся что данные есть в state
     data = await state.get_data()
@@ -450,7 +339,7 @@ async def buddy_block(query: CallbackQuery, state: FSMContext, db: Database) ->
         await db.block_user(user_id, target_user_id)
         logger.info(f"User {query.from_user.id} blocked user_id {target_user_id}")
     
-    await show_next_candidate(query.message, state, db)
+    await show_next_candidate(query.message, state, db, candidates)
     await query.answer("🚫 Заблокировано")
 
 
@@ -459,9 +348,8 @@ async def buddy_block(query: CallbackQuery, state: FSMContext, db: Database) ->
 # ═══════════════════════════════════════════════════════════════════
 
 @router.callback_query(F.data == "buddy:who_liked")
-async def who_liked_me(query: CallbackQuery, db: Database) -> None:
+async def who_liked_me(query: CallbackQuery, db: Database, user_id: int) -> None:
     """Показать кто лайкнул."""
-    user_id = await ensure_user(db, query)
     if not user_id:
         await query.answer("Ошибка", show_alert=True)
         return
@@ -503,27 +391,23 @@ async def view_liker(query: CallbackQuery, state: FSMContext, db: Database) -> N
 
 
 @router.callback_query(F.data.startswith("likeback:"))
-async def like_back(query: CallbackQuery, db: Database) -> None:
+async def like_back(query: CallbackQuery, db: Database, outbound: OutboundDispatcher, user_id: int) -> None:
     """Лайкнуть в ответ."""
     target_user_id = int(query.data.split(":")[1])
-    user_id = await ensure_user(db, query)
     
     if not user_id:
         await query.answer("Ошибка", show_alert=True)
         return
     
-    await db.add_like(user_id, target_user_id)
-    
-    # Это точно мэтч, т.к. тот уже лайкнул нас
-    if not await db.has_match(user_id, target_user_id):
-        await db.add_match(user_id, target_user_id)
-        await notify_match(db, user_id, target_user_id, query.from_user.id, query.bot)
+    # Это точно мэтч, т.к. тот уже лайкнул нас; уведомляем, только если он новый
+    if (await db.like_and_match(user_id, target_user_id)).matched:
+        await notify_match(db, user_id, target_user_id, query.from_user.id, outbound)
     
     await query.message.answer("🎿 <b>Взаимный интерес!</b>", reply_markup=back_to_menu_kb())
     await query.answer("👍")
 
 
-async def notify_like(db: Database, from_user_id: int, to_user_id: int, bot: Bot) -> None:
+async def notify_like(db: Database, from_user_id: int, to_user_id: int, outbound: OutboundDispatcher) -> None:
     """Уведомить пользователя что его лайкнули."""
     from_user = await db.get_user_by_id(from_user_id)
     to_user = await db.get_user_by_id(to_user_id)
@@ -535,17 +419,16 @@ async def notify_like(db: Database, from_user_id: int, to_user_id: int, bot: Bot
         return
     
     name = from_user["first_name"] if from_user["first_name"] else "Кто-то"
-    try:
-        await bot.send_message(
-            to_user["telegram_id"],
-            f"🏂 <b>{name}</b> предлагает катнуть!\n\n"
-            "Загляни в «🔍 Искать компанию» → «Кто меня лайкнул».",
-        )
-    except Exception:
-        pass
+    outbound.send(
+        to_user["telegram_id"],
+        f"🏂 <b>{name}</b> предлагает катнуть!\n\n"
+        "Загляни в «🔍 Искать компанию» → «Кто меня лайкнул».",
+    )
 
 
-async def notify_match(db: Database, user_id: int, candidate_id: int, telegram_id: int, bot: Bot) -> None:
+async def notify_match(
+    db: Database, user_id: int, candidate_id: int, telegram_id: int, outbound: OutboundDispatcher
+) -> None:
     """Уведомить обоих о взаимном интересе."""
     target_user = await db.get_user_by_id(candidate_id)
     current_user = await db.get_user_by_id(user_id)
@@ -555,13 +438,12 @@ async def notify_match(db: Database, user_id: int, candidate_id: int, telegram_i
     current_link = f"@{current_user['username']}" if current_user["username"] else f"tg://user?id={current_user['telegram_id']}"
     candidate_link = f"@{target_user['username']}" if target_user["username"] else f"tg://user?id={target_user['telegram_id']}"
     
-    await bot.send_message(telegram_id, f"💬 Напиши: {candidate_link}")
+    # Своё сообщение ждём, чтобы оно пришло раньше ответа хендлера
+    await outbound.send(telegram_id, f"💬 Напиши: {candidate_link}", priority=PRIORITY_HIGH)
     
     if target_user["telegram_id"] != telegram_id:
-        try:
-            await bot.send_message(
-                target_user["telegram_id"],
-                f"🎿 <b>Пойдём катать?</b>\n\n💬 Напиши: {current_link}",
-            )
-        except Exception:
-            pass
+        outbound.send(
+            target_user["telegram_id"],
+            f"🎿 <b>Пойдём катать?</b>\n\n💬 Напиши: {current_link}",
+            priority=PRIORITY_HIGH,
+        )
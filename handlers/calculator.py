@@ -10,7 +10,7 @@ from keyboards import BACK_KB, MAIN_MENU, gender_kb, snowboard_style_kb
 from services.equipment import calculate_snowboard_size
 from states import SnowboardCalcStates
 
-from .common import ensure_user, set_state
+from .common import set_state
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -19,8 +19,7 @@ router = Router()
 @router.message(F.text == "📐 Размер сноуборда")
 async def calc_start(message: Message, state: FSMContext, db: Database) -> None:
     """Начало расчёта размера сноуборда."""
-    await ensure_user(db, message)
-    await set_state(db, state, message.from_user.id, SnowboardCalcStates.waiting_gender)
+    await set_state(state, SnowboardCalcStates.waiting_gender)
     await message.answer("👤 Выбери <b>пол</b>:", reply_markup=gender_kb())
 
 
@@ -29,7 +28,7 @@ async def calc_gender(query: CallbackQuery, state: FSMContext, db: Database) ->
     """Выбор пола."""
     gender = query.data.split(":")[1]
     await state.update_data(gender=gender)
-    await set_state(db, state, query.from_user.id, SnowboardCalcStates.waiting_weight)
+    await set_state(state, SnowboardCalcStates.waiting_weight)
     await query.message.answer("⚖️ Введи свой <b>вес</b> в кг (например, 70):", reply_markup=BACK_KB)
     await query.answer()
 
@@ -45,7 +44,7 @@ async def calc_weight(message: Message, state: FSMContext, db: Database) -> None
         await message.answer("❌ Вес должен быть от 30 до 200 кг")
         return
     await state.update_data(weight=weight)
-    await set_state(db, state, message.from_user.id, SnowboardCalcStates.waiting_style)
+    await set_state(state, SnowboardCalcStates.waiting_style)
     await message.answer("🏔️ Выбери <b>стиль катания</b>:", reply_markup=snowboard_style_kb())
 
 
@@ -61,7 +60,7 @@ async def calc_style(query: CallbackQuery, state: FSMContext, db: Database) -> N
         style=style,
     )
     
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     
     await query.message.answer(
         f"🏂 <b>Рекомендуемый размер сноуборда:</b>\n\n"
@@ -1,25 +1,25 @@
 """Анонимный чат через бота."""
 import logging
 
-from aiogram import Bot, F, Router
+from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from db import Database
 from keyboards import MAIN_MENU, back_to_menu_kb, chat_actions_kb
+from services.outbound import PRIORITY_HIGH, OutboundDispatcher
 from states import ChatStates
 
-from .common import ensure_user, set_state
+from .common import set_state
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
 @router.callback_query(F.data.regexp(r"^chat:\d+$"))
-async def start_chat(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def start_chat(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Начать анонимный чат."""
     target_user_id = int(query.data.split(":")[1])
-    user_id = await ensure_user(db, query)
     
     if not user_id:
         await query.answer("Ошибка", show_alert=True)
@@ -41,7 +41,7 @@ async def start_chat(query: CallbackQuery, state: FSMContext, db: Database) -> N
         chat_partner_id=target_user_id,
         chat_partner_name=target_name,
     )
-    await set_state(db, state, query.from_user.id, ChatStates.chatting)
+    await set_state(state, ChatStates.chatting)
     
     # Показываем последние сообщения
     messages = await db.get_chat_messages(chat_id, limit=10)
@@ -62,13 +62,15 @@ async def start_chat(query: CallbackQuery, state: FSMContext, db: Database) -> N
 
 
 @router.message(ChatStates.chatting)
-async def chat_message(message: Message, state: FSMContext, db: Database, bot: Bot) -> None:
+async def chat_message(
+    message: Message, state: FSMContext, db: Database, outbound: OutboundDispatcher, user_id: int
+) -> None:
     """Сообщение в чате."""
     if not message.text:
         return
     
     if message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Чат закрыт.", reply_markup=MAIN_MENU)
         return
     
@@ -78,12 +80,10 @@ async def chat_message(message: Message, state: FSMContext, db: Database, bot: B
     partner_name = data.get("chat_partner_name", "Райдер")
     
     if not chat_id or not partner_id:
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("❌ Ошибка чата. Попробуй снова.", reply_markup=MAIN_MENU)
         return
     
-    user_id = await ensure_user(db, message)
-    
     # Ограничиваем длину сообщения
     text = message.text[:1000]
     
@@ -96,14 +96,13 @@ async def chat_message(message: Message, state: FSMContext, db: Database, bot: B
         my_profile = await db.get_profile(user_id)
         my_name = my_profile["first_name"] if my_profile else "Райдер"
         
-        try:
-            await bot.send_message(
-                partner["telegram_id"],
-                f"💬 <b>Сообщение от {my_name}:</b>\n\n{text}",
-                reply_markup=back_to_menu_kb(),
-            )
-        except Exception:
-            pass  # Партнёр заблокировал бота
+        # Если партнёр заблокировал бота, диспетчер просто запишет ошибку в лог
+        outbound.send(
+            partner["telegram_id"],
+            f"💬 <b>Сообщение от {my_name}:</b>\n\n{text}",
+            priority=PRIORITY_HIGH,
+            reply_markup=back_to_menu_kb(),
+        )
     
     await message.answer(f"✅ Отправлено\n\n📝 Напиши ещё:", reply_markup=chat_actions_kb())
 
@@ -111,6 +110,6 @@ async def chat_message(message: Message, state: FSMContext, db: Database, bot: B
 @router.callback_query(F.data == "chat:end")
 async def end_chat(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Завершить чат."""
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer("💬 Чат завершён.", reply_markup=MAIN_MENU)
     await query.answer()
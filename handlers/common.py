@@ -5,9 +5,8 @@ import logging
 from typing import List, Optional
 
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message, InputMediaPhoto
+from aiogram.types import Message, InputMediaPhoto
 
-from db import Database
 from keyboards import MAIN_MENU
 from services.resorts import haversine_km
 
@@ -93,25 +92,12 @@ def get_photos(profile: dict) -> List[str]:
         return []
 
 
-async def ensure_user(db: Database, msg_or_cb: Message | CallbackQuery) -> int:
-    """Создаёт или обновляет пользователя, возвращает user_id."""
-    user = msg_or_cb.from_user
-    return await db.upsert_user(
-        telegram_id=user.id,
-        username=user.username or "",
-        first_name=user.first_name or "",
-    )
-
-
-async def set_state(db: Database, fsm: FSMContext, telegram_id: int, state) -> None:
-    """Устанавливает состояние FSM и сохраняет в БД."""
+async def set_state(fsm: FSMContext, state) -> None:
+    """Устанавливает состояние FSM (``None`` — сброс вместе с данными)."""
     if state:
         await fsm.set_state(state)
-        state_value = state.state if hasattr(state, "state") else str(state)
     else:
         await fsm.clear()
-        state_value = None
-    await db.update_user_state(telegram_id, state_value)
 
 
 async def send_main_menu(message: Message, text: str = "Выбери действие:") -> None:
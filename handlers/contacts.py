@@ -8,16 +8,13 @@ from aiogram.types import CallbackQuery, Message
 from db import Database
 from keyboards import MAIN_MENU, contacts_kb
 
-from .common import ensure_user
-
 logger = logging.getLogger(__name__)
 router = Router()
 
 
 @router.message(F.text == "🤝 Контакты")
-async def contacts_menu(message: Message, state: FSMContext, db: Database) -> None:
+async def contacts_menu(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Список контактов (мэтчей)."""
-    user_id = await ensure_user(db, message)
     matches = await db.get_user_matches(user_id)
     matches_list = list(matches)
     
@@ -22,7 +22,7 @@ from keyboards import (
 )
 from states import EventStates
 
-from .common import ensure_user, set_state, truncate
+from .common import set_state, truncate
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -33,9 +33,8 @@ router = Router()
 # ═══════════════════════════════════════════════════════════════════
 
 @router.message(F.text == "📅 Создать событие")
-async def event_create_start(message: Message, state: FSMContext, db: Database) -> None:
+async def event_create_start(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Начало создания события."""
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
     
     if not profile:
@@ -45,7 +44,7 @@ async def event_create_start(message: Message, state: FSMContext, db: Database)
         )
         return
     
-    await set_state(db, state, message.from_user.id, EventStates.waiting_group_link)
+    await set_state(state, EventStates.waiting_group_link)
     await message.answer(
         "📅 <b>Создание события</b>\n\n"
         "Событие — это групповой выезд на курорт.\n\n"
@@ -62,7 +61,7 @@ async def event_create_start(message: Message, state: FSMContext, db: Database)
 async def event_got_group_link(message: Message, state: FSMContext, db: Database) -> None:
     """Получена ссылка на группу."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
@@ -72,7 +71,7 @@ async def event_got_group_link(message: Message, state: FSMContext, db: Database
         return
     
     await state.update_data(telegram_group_link=link)
-    await set_state(db, state, message.from_user.id, EventStates.waiting_photo)
+    await set_state(state, EventStates.waiting_photo)
     await message.answer(
         "📸 Пришли фото/обложку события (необязательно):",
         reply_markup=event_photo_kb(),
@@ -83,7 +82,7 @@ async def event_got_group_link(message: Message, state: FSMContext, db: Database
 async def event_skip_photo(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Пропустить фото события."""
     await state.update_data(photo_file_id=None)
-    await set_state(db, state, query.from_user.id, EventStates.waiting_resort)
+    await set_state(state, EventStates.waiting_resort)
     
     resorts = await db.list_resorts()
     await query.message.answer(
@@ -98,7 +97,7 @@ async def event_got_photo(message: Message, state: FSMContext, db: Database) ->
     """Получено фото события."""
     photo = message.photo[-1]
     await state.update_data(photo_file_id=photo.file_id)
-    await set_state(db, state, message.from_user.id, EventStates.waiting_resort)
+    await set_state(state, EventStates.waiting_resort)
     
     resorts = await db.list_resorts()
     await message.answer(
@@ -120,7 +119,7 @@ async def event_got_resort(query: CallbackQuery, state: FSMContext, db: Database
     resort = await db.get_resort(resort_id)
     
     await state.update_data(resort_id=resort_id, resort_name=resort["name"])
-    await set_state(db, state, query.from_user.id, EventStates.waiting_date)
+    await set_state(state, EventStates.waiting_date)
     await query.message.answer(
         f"📆 Курорт: <b>{resort['name']}</b>\n\n"
         "Введи дату события (например: 25.01.2026 или 25-28 января):",
@@ -133,12 +132,12 @@ async def event_got_resort(query: CallbackQuery, state: FSMContext, db: Database
 async def event_got_date(message: Message, state: FSMContext, db: Database) -> None:
     """Получена дата события."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
     await state.update_data(event_date=message.text.strip()[:50])
-    await set_state(db, state, message.from_user.id, EventStates.waiting_level)
+    await set_state(state, EventStates.waiting_level)
     await message.answer(
         "🎿 Выбери уровень участников:",
         reply_markup=event_level_kb(),
@@ -150,7 +149,7 @@ async def event_got_level(query: CallbackQuery, state: FSMContext, db: Database)
     """Выбран уровень."""
     level = query.data.split(":")[1]
     await state.update_data(skill_level=level)
-    await set_state(db, state, query.from_user.id, EventStates.waiting_description)
+    await set_state(state, EventStates.waiting_description)
     await query.message.answer(
         "💬 Добавь описание события (необязательно):\n\n"
         "Например: «Фрирайд по целине, нужен свой транспорт»\n\n"
@@ -171,7 +170,7 @@ async def event_skip_description(message: Message, state: FSMContext, db: Databa
 async def event_got_description(message: Message, state: FSMContext, db: Database) -> None:
     """Получено описание события."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
@@ -203,10 +202,9 @@ async def show_event_preview(message: Message, state: FSMContext, db: Database)
 
 
 @router.callback_query(F.data == "event:confirm")
-async def event_confirm(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def event_confirm(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Подтверждение создания события."""
     data = await state.get_data()
-    user_id = await ensure_user(db, query)
     
     event_id = await db.create_event(
         creator_id=user_id,
@@ -218,7 +216,7 @@ async def event_confirm(query: CallbackQuery, state: FSMContext, db: Database) -
         description=data.get("description"),
     )
     
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer(
         f"✅ Событие создано!\n\n"
         f"Теперь оно будет показываться в поиске компании.\n"
@@ -234,9 +232,8 @@ async def event_confirm(query: CallbackQuery, state: FSMContext, db: Database) -
 # ═══════════════════════════════════════════════════════════════════
 
 @router.message(F.text == "🗓️ Мои события")
-async def my_events_menu(message: Message, state: FSMContext, db: Database) -> None:
+async def my_events_menu(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Список событий пользователя."""
-    user_id = await ensure_user(db, message)
     events = await db.get_user_events(user_id)
     events_list = list(events)
     
@@ -255,9 +252,8 @@ async def my_events_menu(message: Message, state: FSMContext, db: Database) -> N
 
 
 @router.callback_query(F.data == "nav:my_events")
-async def cb_my_events(query: CallbackQuery, db: Database) -> None:
+async def cb_my_events(query: CallbackQuery, db: Database, user_id: int) -> None:
     """Inline-возврат к списку событий."""
-    user_id = await ensure_user(db, query)
     events = await db.get_user_events(user_id)
     events_list = list(events)
     
@@ -269,9 +265,8 @@ async def cb_my_events(query: CallbackQuery, db: Database) -> None:
 
 
 @router.callback_query(F.data == "nav:create_event")
-async def cb_create_event(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def cb_create_event(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Создание события через inline."""
-    user_id = await ensure_user(db, query)
     profile = await db.get_profile(user_id)
     
     if not profile:
@@ -279,7 +274,7 @@ async def cb_create_event(query: CallbackQuery, state: FSMContext, db: Database)
         await query.answer()
         return
     
-    await set_state(db, state, query.from_user.id, EventStates.waiting_group_link)
+    await set_state(state, EventStates.waiting_group_link)
     await query.message.answer(
         "📅 <b>Создание события</b>\n\n"
         "📎 <b>Пришли ссылку на Telegram-группу:</b>",
@@ -400,10 +395,9 @@ async def view_event(query: CallbackQuery, db: Database) -> None:
 
 
 @router.callback_query(F.data.startswith("remind:"))
-async def set_reminder(query: CallbackQuery, db: Database) -> None:
+async def set_reminder(query: CallbackQuery, db: Database, user_id: int) -> None:
     """Установить напоминание."""
     event_id = int(query.data.split(":")[1])
-    user_id = await ensure_user(db, query)
     event = await db.get_event(event_id)
     
     if not event:
@@ -18,11 +18,10 @@ from keyboards import (
     profile_photo_kb,
     ride_type_kb,
 )
-from services.resorts import haversine_km
+from services.geo import GeoDirectory
 from states import ProfileStates, EditProfileStates, EditDescriptionStates
 
 from .common import (
-    ensure_user,
     format_profile,
     send_profile_with_photos,
     set_state,
@@ -38,9 +37,8 @@ router = Router()
 # ═══════════════════════════════════════════════════════════════════
 
 @router.message(F.text == "👤 Профиль")
-async def profile_menu(message: Message, state: FSMContext, db: Database) -> None:
+async def profile_menu(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Показать профиль или начать регистрацию."""
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
     
     if profile:
@@ -49,7 +47,7 @@ async def profile_menu(message: Message, state: FSMContext, db: Database) -> Non
         await send_profile_with_photos(message, profile_dict, text, profile_actions_kb())
         return
     
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_photos)
+    await set_state(state, ProfileStates.waiting_photos)
     await state.update_data(photos=[])
     await message.answer(
         "📸 Пришли фото для профиля (можно несколько) или пропусти.",
@@ -66,7 +64,7 @@ async def profile_menu(message: Message, state: FSMContext, db: Database) -> Non
 async def profile_skip_photo(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Пропустить добавление фото."""
     await state.update_data(photos=[])
-    await set_state(db, state, query.from_user.id, ProfileStates.waiting_gender)
+    await set_state(state, ProfileStates.waiting_gender)
     await query.message.answer("👤 Выбери <b>пол</b>:", reply_markup=profile_gender_kb())
     await query.answer()
 
@@ -80,7 +78,7 @@ async def profile_got_photo(message: Message, state: FSMContext, db: Database) -
     photos.append(photo.file_id)
     await state.update_data(photos=photos)
     
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_more_photos)
+    await set_state(state, ProfileStates.waiting_more_photos)
     await message.answer(
         f"✅ Фото добавлено ({len(photos)}/10)\n\nДобавить ещё или продолжить?",
         reply_markup=profile_more_photos_kb(),
@@ -123,7 +121,7 @@ async def profile_want_more(query: CallbackQuery) -> None:
 @router.callback_query(F.data == "profile:photos_done")
 async def profile_photos_done(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Фото добавлены, переход к выбору пола."""
-    await set_state(db, state, query.from_user.id, ProfileStates.waiting_gender)
+    await set_state(state, ProfileStates.waiting_gender)
     await query.message.answer("👤 Выбери <b>пол</b>:", reply_markup=profile_gender_kb())
     await query.answer()
 
@@ -133,7 +131,7 @@ async def profile_gender(query: CallbackQuery, state: FSMContext, db: Database)
     """Выбор пола."""
     gender = query.data.split(":")[1]
     await state.update_data(gender=gender)
-    await set_state(db, state, query.from_user.id, ProfileStates.waiting_ride_type)
+    await set_state(state, ProfileStates.waiting_ride_type)
     await query.message.answer("🎿 Выбери тип катания:", reply_markup=ride_type_kb())
     await query.answer()
 
@@ -143,7 +141,7 @@ async def profile_ride_type(query: CallbackQuery, state: FSMContext, db: Databas
     """Выбор типа катания."""
     ride_type = query.data.split(":", 1)[1]
     await state.update_data(ride_type=ride_type)
-    await set_state(db, state, query.from_user.id, ProfileStates.waiting_skill_level)
+    await set_state(state, ProfileStates.waiting_skill_level)
     await query.message.answer("📊 Выбери уровень:", reply_markup=profile_level_kb())
     await query.answer()
 
@@ -153,7 +151,7 @@ async def profile_skill_level(query: CallbackQuery, state: FSMContext, db: Datab
     """Выбор уровня катания."""
     level = query.data.split(":")[1]
     await state.update_data(skill_level=level)
-    await set_state(db, state, query.from_user.id, ProfileStates.waiting_age)
+    await set_state(state, ProfileStates.waiting_age)
     await query.message.answer("🎂 Введи свой возраст:", reply_markup=BACK_KB)
     await query.answer()
 
@@ -169,7 +167,7 @@ async def profile_age(message: Message, state: FSMContext, db: Database) -> None
         await message.answer("❌ Возраст должен быть от 12 до 80 лет.")
         return
     await state.update_data(age=age)
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_city)
+    await set_state(state, ProfileStates.waiting_city)
     await message.answer(
         "📍 Введи <b>город</b> или отправь геолокацию:",
         reply_markup=LOCATION_KB,
@@ -177,15 +175,16 @@ async def profile_age(message: Message, state: FSMContext, db: Database) -> None
 
 
 @router.message(ProfileStates.waiting_city, F.location)
-async def profile_city_location(message: Message, state: FSMContext, db: Database) -> None:
+async def profile_city_location(
+    message: Message, state: FSMContext, db: Database, geo: GeoDirectory
+) -> None:
     """Город через геолокацию."""
     loc = message.location
-    resorts = await db.list_resorts()
-    nearest = min(resorts, key=lambda r: haversine_km(loc.latitude, loc.longitude, r["lat"], r["lon"]))
-    city = nearest["address"] if nearest else "Неизвестно"
+    nearest = geo.nearest_resorts(loc.latitude, loc.longitude, 1)
+    city = nearest[0][0]["address"] if nearest else "Неизвестно"
     
     await state.update_data(city=city, location_lat=loc.latitude, location_lon=loc.longitude)
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_about)
+    await set_state(state, ProfileStates.waiting_about)
     await message.answer(
         f"📍 Определено: <b>{city}</b>\n\n💬 Напиши пару слов о себе:",
         reply_markup=BACK_KB,
@@ -198,18 +197,17 @@ async def profile_city_text(message: Message, state: FSMContext, db: Database) -
     if not message.text or message.text == "◀️ Назад":
         return
     await state.update_data(city=message.text.strip()[:100], location_lat=None, location_lon=None)
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_about)
+    await set_state(state, ProfileStates.waiting_about)
     await message.answer("💬 Напиши пару слов о себе:", reply_markup=BACK_KB)
 
 
 @router.message(ProfileStates.waiting_about)
-async def profile_about(message: Message, state: FSMContext, db: Database) -> None:
+async def profile_about(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Описание профиля — финальный шаг."""
     if not message.text or message.text == "◀️ Назад":
         return
     
     data = await state.get_data()
-    user_id = await ensure_user(db, message)
     
     await db.upsert_profile(
         user_id=user_id,
@@ -224,7 +222,7 @@ async def profile_about(message: Message, state: FSMContext, db: Database) -> No
         location_lon=data.get("location_lon"),
     )
     
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     
     profile = await db.get_profile(user_id)
     profile_dict = dict(profile)
@@ -251,7 +249,7 @@ async def profile_edit_menu(query: CallbackQuery, state: FSMContext, db: Databas
 @router.callback_query(F.data == "profile:edit_photos")
 async def profile_edit_photos(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Редактирование фото."""
-    await set_state(db, state, query.from_user.id, EditProfileStates.waiting_photos)
+    await set_state(state, EditProfileStates.waiting_photos)
     await state.update_data(photos=[], edit_mode=True)
     await query.message.answer("📸 Пришли новые фото:", reply_markup=BACK_KB)
     await query.message.answer("👇", reply_markup=profile_photo_kb())
@@ -261,7 +259,7 @@ async def profile_edit_photos(query: CallbackQuery, state: FSMContext, db: Datab
 @router.callback_query(F.data == "profile:edit_city")
 async def profile_edit_city(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Редактирование города."""
-    await set_state(db, state, query.from_user.id, EditProfileStates.waiting_city)
+    await set_state(state, EditProfileStates.waiting_city)
     await query.message.answer(
         "📍 Введи новый <b>город</b> или отправь геолокацию:",
         reply_markup=LOCATION_KB,
@@ -272,7 +270,7 @@ async def profile_edit_city(query: CallbackQuery, state: FSMContext, db: Databas
 @router.callback_query(F.data == "profile:edit_about")
 async def profile_edit_about(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Редактирование описания."""
-    await set_state(db, state, query.from_user.id, EditProfileStates.waiting_about)
+    await set_state(state, EditProfileStates.waiting_about)
     await query.message.answer("💬 Напиши новое описание:", reply_markup=BACK_KB)
     await query.answer()
 
@@ -280,7 +278,7 @@ async def profile_edit_about(query: CallbackQuery, state: FSMContext, db: Databa
 @router.callback_query(F.data == "profile:edit_level")
 async def profile_edit_level(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Редактирование уровня."""
-    await set_state(db, state, query.from_user.id, EditProfileStates.waiting_level)
+    await set_state(state, EditProfileStates.waiting_level)
     await query.message.answer("📊 Выбери новый уровень:", reply_markup=profile_level_kb())
     await query.answer()
 
@@ -288,7 +286,7 @@ async def profile_edit_level(query: CallbackQuery, state: FSMContext, db: Databa
 @router.callback_query(F.data == "profile:edit_ride")
 async def profile_edit_ride(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Редактирование типа катания."""
-    await set_state(db, state, query.from_user.id, EditProfileStates.waiting_ride)
+    await set_state(state, EditProfileStates.waiting_ride)
     await query.message.answer("🎿 Выбери тип катания:", reply_markup=ride_type_kb())
     await query.answer()
 
@@ -310,77 +308,72 @@ async def edit_profile_photo(message: Message, state: FSMContext, db: Database)
 
 
 @router.callback_query(EditProfileStates.waiting_photos, F.data == "profile:photos_done")
-async def edit_profile_photos_done(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def edit_profile_photos_done(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Сохранение новых фото."""
     data = await state.get_data()
-    user_id = await ensure_user(db, query)
     
     await db.update_profile_photos(user_id, data.get("photos", []))
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer("✅ Фото обновлены!", reply_markup=MAIN_MENU)
     await query.answer()
 
 
 @router.message(EditProfileStates.waiting_city, F.location)
-async def edit_profile_city_location(message: Message, state: FSMContext, db: Database) -> None:
+async def edit_profile_city_location(
+    message: Message, state: FSMContext, db: Database, geo: GeoDirectory, user_id: int
+) -> None:
     """Обновление города через геолокацию."""
     loc = message.location
-    resorts = await db.list_resorts()
-    nearest = min(resorts, key=lambda r: haversine_km(loc.latitude, loc.longitude, r["lat"], r["lon"]))
-    city = nearest["address"] if nearest else "Неизвестно"
+    nearest = geo.nearest_resorts(loc.latitude, loc.longitude, 1)
+    city = nearest[0][0]["address"] if nearest else "Неизвестно"
     
-    user_id = await ensure_user(db, message)
     await db.update_profile_city(user_id, city, loc.latitude, loc.longitude)
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer(f"✅ Город обновлён: <b>{city}</b>", reply_markup=MAIN_MENU)
 
 
 @router.message(EditProfileStates.waiting_city, F.text)
-async def edit_profile_city_text(message: Message, state: FSMContext, db: Database) -> None:
+async def edit_profile_city_text(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Обновление города текстом."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
-    user_id = await ensure_user(db, message)
     await db.update_profile_city(user_id, message.text.strip()[:100], None, None)
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer("✅ Город обновлён!", reply_markup=MAIN_MENU)
 
 
 @router.message(EditProfileStates.waiting_about)
-async def edit_profile_about(message: Message, state: FSMContext, db: Database) -> None:
+async def edit_profile_about(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Обновление описания."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
-    user_id = await ensure_user(db, message)
     await db.update_about(user_id, truncate(message.text.strip(), 500))
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer("✅ Описание обновлено!", reply_markup=MAIN_MENU)
 
 
 @router.callback_query(EditProfileStates.waiting_level, F.data.startswith("plevel:"))
-async def edit_profile_level(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def edit_profile_level(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Обновление уровня."""
     level = query.data.split(":")[1]
-    user_id = await ensure_user(db, query)
     await db.update_profile_level(user_id, level)
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer(f"✅ Уровень обновлён: <b>{level}</b>", reply_markup=MAIN_MENU)
     await query.answer()
 
 
 @router.callback_query(EditProfileStates.waiting_ride, F.data.startswith("ride:"))
-async def edit_profile_ride(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def edit_profile_ride(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Обновление типа катания."""
     ride_type = query.data.split(":", 1)[1]
-    user_id = await ensure_user(db, query)
     await db.update_profile_ride_type(user_id, ride_type)
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer(f"✅ Тип катания обновлён: <b>{ride_type}</b>", reply_markup=MAIN_MENU)
     await query.answer()
 
@@ -390,11 +383,10 @@ async def edit_profile_ride(query: CallbackQuery, state: FSMContext, db: Databas
 # ═══════════════════════════════════════════════════════════════════
 
 @router.callback_query(F.data == "profile:delete")
-async def profile_delete(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def profile_delete(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Удаление профиля."""
-    user_id = await ensure_user(db, query)
     await db.delete_profile(user_id)
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer("🗑️ Профиль удалён.", reply_markup=MAIN_MENU)
     await query.answer()
     logger.info(f"User {query.from_user.id} deleted profile")
@@ -405,9 +397,8 @@ async def profile_delete(query: CallbackQuery, state: FSMContext, db: Database)
 # ═══════════════════════════════════════════════════════════════════
 
 @router.message(F.text == "🎿 Где катаюсь")
-async def edit_riding_plans(message: Message, state: FSMContext, db: Database) -> None:
+async def edit_riding_plans(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Редактирование планов катания."""
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
     
     if not profile:
@@ -418,7 +409,7 @@ async def edit_riding_plans(message: Message, state: FSMContext, db: Database) -
         return
     
     current_about = profile["about"] if profile["about"] else ""
-    await set_state(db, state, message.from_user.id, EditDescriptionStates.waiting_description)
+    await set_state(state, EditDescriptionStates.waiting_description)
     
     hint = ""
     if current_about:
@@ -434,16 +425,15 @@ async def edit_riding_plans(message: Message, state: FSMContext, db: Database) -
 
 
 @router.message(EditDescriptionStates.waiting_description, F.text)
-async def edit_riding_plans_got(message: Message, state: FSMContext, db: Database) -> None:
+async def edit_riding_plans_got(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Сохранение планов катания."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
-    user_id = await ensure_user(db, message)
     new_about = truncate(message.text.strip(), 500)
     
     await db.update_about(user_id, new_about)
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer("✅ Планы сохранены! Теперь их увидят другие райдеры.", reply_markup=MAIN_MENU)
@@ -5,7 +5,6 @@ from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
-from config import load_config
 from db import Database
 from keyboards import (
     LOCATION_KB,
@@ -16,29 +15,27 @@ from keyboards import (
     resort_detail_kb,
     resorts_list_kb,
 )
-from services.resorts import haversine_km, sort_by_distance
-from services.weather import format_weather, get_weather
+from services.geo import GeoDirectory
+from services.weather import WeatherService, format_weather
 from states import ResortStates
 
-from .common import ensure_user, set_state
+from .common import set_state
 
 logger = logging.getLogger(__name__)
 router = Router()
-config = load_config()
 
 
 @router.message(F.text == "🏔️ Склоны")
-async def resorts_menu(message: Message, state: FSMContext, db: Database) -> None:
+async def resorts_menu(message: Message, state: FSMContext, db: Database, geo: GeoDirectory, user_id: int) -> None:
     """Меню склонов."""
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
     
     if profile and profile["location_lat"] is not None and profile["location_lon"] is not None:
         await state.update_data(user_lat=profile["location_lat"], user_lon=profile["location_lon"])
-        await show_resorts(message, state, db, profile["location_lat"], profile["location_lon"])
+        await show_resorts(message, state, db, geo, profile["location_lat"], profile["location_lon"])
         return
     
-    await set_state(db, state, message.from_user.id, ResortStates.waiting_location)
+    await set_state(state, ResortStates.waiting_location)
     await message.answer(
         "📍 Отправь свою геолокацию, чтобы найти ближайшие склоны.",
         reply_markup=LOCATION_KB,
@@ -46,26 +43,26 @@ async def resorts_menu(message: Message, state: FSMContext, db: Database) -> Non
 
 
 @router.message(ResortStates.waiting_location, F.location)
-async def resorts_got_location(message: Message, state: FSMContext, db: Database) -> None:
+async def resorts_got_location(
+    message: Message, state: FSMContext, db: Database, geo: GeoDirectory, user_id: int
+) -> None:
     """Получена геолокация для склонов."""
     loc = message.location
-    user_id = await ensure_user(db, message)
     
     profile = await db.get_profile(user_id)
     if profile:
         await db.update_profile_location(user_id, loc.latitude, loc.longitude)
     
     await state.update_data(user_lat=loc.latitude, user_lon=loc.longitude)
-    await show_resorts(message, state, db, loc.latitude, loc.longitude)
+    await show_resorts(message, state, db, geo, loc.latitude, loc.longitude)
 
 
-async def show_resorts(message: Message, state: FSMContext, db: Database, lat: float, lon: float) -> None:
+async def show_resorts(
+    message: Message, state: FSMContext, db: Database, geo: GeoDirectory, lat: float, lon: float
+) -> None:
     """Показать ближайшие склоны."""
-    await set_state(db, state, message.from_user.id, None)
-    resorts_rows = await db.list_resorts()
-    resorts = [dict(row) for row in resorts_rows]
-    sorted_resorts = sort_by_distance(lat, lon, resorts)
-    top5 = sorted_resorts[:5]
+    await set_state(state, None)
+    top5 = geo.nearest_resorts(lat, lon, 5)
     
     await message.answer(
         "🏔️ <b>Ближайшие склоны:</b>",
@@ -74,19 +71,16 @@ async def show_resorts(message: Message, state: FSMContext, db: Database, lat: f
 
 
 @router.callback_query(F.data == "nav:resorts")
-async def cb_nav_resorts(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def cb_nav_resorts(query: CallbackQuery, state: FSMContext, db: Database, geo: GeoDirectory) -> None:
     """Возврат к списку склонов."""
     data = await state.get_data()
     lat = data.get("user_lat")
     lon = data.get("user_lon")
     if lat is None or lon is None:
         await query.message.answer("📍 Отправь геолокацию снова.", reply_markup=LOCATION_KB)
-        await set_state(db, state, query.from_user.id, ResortStates.waiting_location)
+        await set_state(state, ResortStates.waiting_location)
     else:
-        resorts_rows = await db.list_resorts()
-        resorts = [dict(row) for row in resorts_rows]
-        sorted_resorts = sort_by_distance(lat, lon, resorts)
-        top5 = sorted_resorts[:5]
+        top5 = geo.nearest_resorts(lat, lon, 5)
         await query.message.answer("🏔️ <b>Ближайшие склоны:</b>", reply_markup=resorts_list_kb(top5))
     await query.answer()
 
@@ -127,7 +121,9 @@ async def cb_city_resorts(query: CallbackQuery, db: Database) -> None:
 
 
 @router.callback_query(F.data.startswith("resort:"))
-async def resort_details(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def resort_details(
+    query: CallbackQuery, state: FSMContext, db: Database, weather_service: WeatherService
+) -> None:
     """Детали склона."""
     resort_id = int(query.data.split(":")[1])
     resort = await db.get_resort(resort_id)
@@ -138,14 +134,14 @@ async def resort_details(query: CallbackQuery, state: FSMContext, db: Database)
     data = await state.get_data()
     dist_str = ""
     if data.get("user_lat") and data.get("user_lon"):
-        dist = haversine_km(data["user_lat"], data["user_lon"], resort["lat"], resort["lon"])
+        dist = db.resort_catalogue.distance_km(resort_id, data["user_lat"], data["user_lon"])
         dist_str = f"\n📏 <b>{dist:.0f} км</b> от тебя" if dist >= 1 else f"\n📏 <b>{dist * 1000:.0f} м</b> от тебя"
     
     site_str = f'<a href="{resort["site"]}">{resort["site"]}</a>' if resort["site"] else "—"
     
     # Погода
     weather_str = ""
-    weather = await get_weather(resort["lat"], resort["lon"], config.weather_api_key)
+    weather = await weather_service.get(resort["lat"], resort["lon"])
     if weather:
         weather_str = f"\n\n<b>Погода сейчас:</b>\n{format_weather(weather)}"
     
@@ -9,14 +9,14 @@ from db import Database
 from keyboards import BACK_KB, MAIN_MENU, back_to_menu_kb, review_rating_kb
 from states import ReviewStates
 
-from .common import ensure_user, set_state, truncate
+from .common import set_state, truncate
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
 @router.callback_query(F.data.startswith("review:"))
-async def start_review(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def start_review(query: CallbackQuery, state: FSMContext, db: Database, user_id: int) -> None:
     """Начать оставлять отзыв."""
     resort_id = int(query.data.split(":")[1])
     resort = await db.get_resort(resort_id)
@@ -25,8 +25,6 @@ async def start_review(query: CallbackQuery, state: FSMContext, db: Database) ->
         await query.answer("Курорт не найден", show_alert=True)
         return
     
-    user_id = await ensure_user(db, query)
-    
     # Проверяем, не оставлял ли уже отзыв
     existing = await db.get_user_resort_review(user_id, resort_id)
     if existing:
@@ -34,7 +32,7 @@ async def start_review(query: CallbackQuery, state: FSMContext, db: Database) ->
         return
     
     await state.update_data(review_resort_id=resort_id, review_resort_name=resort["name"])
-    await set_state(db, state, query.from_user.id, ReviewStates.waiting_rating)
+    await set_state(state, ReviewStates.waiting_rating)
     await query.message.answer(
         f"⭐ <b>Отзыв на {resort['name']}</b>\n\n"
         "Выбери оценку:",
@@ -48,7 +46,7 @@ async def review_rating(query: CallbackQuery, state: FSMContext, db: Database) -
     """Получена оценка."""
     rating = int(query.data.split(":")[1])
     await state.update_data(review_rating=rating)
-    await set_state(db, state, query.from_user.id, ReviewStates.waiting_text)
+    await set_state(state, ReviewStates.waiting_text)
     await query.message.answer(
         f"⭐ Оценка: <b>{rating}/5</b>\n\n"
         "Напиши комментарий (или /skip чтобы пропустить):",
@@ -58,26 +56,27 @@ async def review_rating(query: CallbackQuery, state: FSMContext, db: Database) -
 
 
 @router.message(ReviewStates.waiting_text, F.text == "/skip")
-async def review_skip_text(message: Message, state: FSMContext, db: Database) -> None:
+async def review_skip_text(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Пропустить текст отзыва."""
-    await save_review(message, state, db, None)
+    await save_review(message, state, db, user_id, None)
 
 
 @router.message(ReviewStates.waiting_text)
-async def review_text(message: Message, state: FSMContext, db: Database) -> None:
+async def review_text(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Получен текст отзыва."""
     if not message.text or message.text == "◀️ Назад":
-        await set_state(db, state, message.from_user.id, None)
+        await set_state(state, None)
         await message.answer("Отменено.", reply_markup=MAIN_MENU)
         return
     
-    await save_review(message, state, db, truncate(message.text.strip(), 500))
+    await save_review(message, state, db, user_id, truncate(message.text.strip(), 500))
 
 
-async def save_review(message: Message, state: FSMContext, db: Database, text: str | None) -> None:
+async def save_review(
+    message: Message, state: FSMContext, db: Database, user_id: int, text: str | None
+) -> None:
     """Сохранить отзыв."""
     data = await state.get_data()
-    user_id = await ensure_user(db, message)
     
     await db.add_review(
         user_id=user_id,
@@ -86,7 +85,7 @@ async def save_review(message: Message, state: FSMContext, db: Database, text: s
         text=text,
     )
     
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await message.answer(
         f"✅ Спасибо за отзыв на <b>{data['review_resort_name']}</b>!",
         reply_markup=MAIN_MENU,
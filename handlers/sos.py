@@ -7,116 +7,56 @@ from aiogram.types import CallbackQuery, Message
 
 from db import Database
 from keyboards import sos_back_kb
-from services.resorts import haversine_km
-
-from .common import ensure_user
+from services.geo import GeoDirectory
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+SOS_RADIUS_KM = 100
 
-@router.message(F.text == "🆘 SOS")
-async def sos_menu(message: Message, state: FSMContext, db: Database) -> None:
-    """SOS — телефоны спасателей."""
-    user_id = await ensure_user(db, message)
+
+async def sos_text(db: Database, geo: GeoDirectory, user_id: int, geo_hint: bool) -> str:
+    """Текст SOS: спасатели ближайших курортов (или всех — без геолокации)."""
     profile = await db.get_profile(user_id)
-    
-    resorts = await db.list_resorts()
-    resorts_list = []
-    
     user_lat = profile["location_lat"] if profile and profile["location_lat"] else None
     user_lon = profile["location_lon"] if profile and profile["location_lon"] else None
-    
-    for r in resorts:
-        if not r["rescue_phone"]:
-            continue
-        resort_dict = dict(r)
-        if user_lat and user_lon:
-            dist = haversine_km(user_lat, user_lon, r["lat"], r["lon"])
-            if dist <= 100:
-                resort_dict["distance"] = dist
-                resorts_list.append(resort_dict)
-        else:
-            resorts_list.append(resort_dict)
-    
-    resorts_list.sort(key=lambda x: x.get("distance", 9999))
-    
-    if not resorts_list and user_lat:
-        all_resorts = []
-        for r in resorts:
-            if r["rescue_phone"]:
-                resort_dict = dict(r)
-                resort_dict["distance"] = haversine_km(user_lat, user_lon, r["lat"], r["lon"])
-                all_resorts.append(resort_dict)
-        all_resorts.sort(key=lambda x: x["distance"])
-        resorts_list = all_resorts[:5]
-    
+
+    if user_lat and user_lon:
+        # Курорты со спасателями в радиусе, иначе — 5 ближайших
+        resorts_list = geo.resorts_within(user_lat, user_lon, SOS_RADIUS_KM, rescue_only=True)
+        if not resorts_list:
+            resorts_list = geo.nearest_resorts(user_lat, user_lon, 5, rescue_only=True)
+    else:
+        resorts_list = [(resort, None) for resort in db.resort_catalogue.rescue]
+
     lines = ["🆘 <b>Экстренная помощь</b>\n"]
     lines.append("📞 <b>Единая служба спасения: 112</b>\n")
     
     if resorts_list:
         lines.append("━━━━━━━━━━━━━━━━━━━━\n")
-        for resort in resorts_list[:8]:
-            dist_str = f" ({resort['distance']:.0f} км)" if resort.get("distance") else ""
+        for resort, distance in resorts_list[:8]:
+            dist_str = f" ({distance:.0f} км)" if distance else ""
             lines.append(f"🏔️ <b>{resort['name']}</b>{dist_str}")
             lines.append(f"📞 <code>{resort['rescue_phone']}</code>\n")
     
-    geo_hint = ""
-    if not user_lat:
-        geo_hint = "\n💡 <i>Обнови геолокацию в профиле для показа ближайших курортов.</i>"
+    hint = ""
+    if geo_hint and not user_lat:
+        hint = "\n💡 <i>Обнови геолокацию в профиле для показа ближайших курортов.</i>"
     
-    lines.append(f"\n⚠️ Нажми на номер, чтобы скопировать.{geo_hint}")
-    
-    await message.answer("\n".join(lines), reply_markup=sos_back_kb())
+    lines.append(f"\n⚠️ Нажми на номер, чтобы скопировать.{hint}")
+    return "\n".join(lines)
+
+
+@router.message(F.text == "🆘 SOS")
+async def sos_menu(message: Message, state: FSMContext, db: Database, geo: GeoDirectory, user_id: int) -> None:
+    """SOS — телефоны спасателей."""
+    text = await sos_text(db, geo, user_id, geo_hint=True)
+    await message.answer(text, reply_markup=sos_back_kb())
 
 
 @router.callback_query(F.data == "nav:sos")
-async def cb_sos(query: CallbackQuery, state: FSMContext, db: Database) -> None:
+async def cb_sos(query: CallbackQuery, state: FSMContext, db: Database, geo: GeoDirectory, user_id: int) -> None:
     """SOS через inline."""
-    user_id = await ensure_user(db, query)
-    profile = await db.get_profile(user_id)
-    
-    resorts = await db.list_resorts()
-    resorts_list = []
-    
-    user_lat = profile["location_lat"] if profile and profile["location_lat"] else None
-    user_lon = profile["location_lon"] if profile and profile["location_lon"] else None
-    
-    for r in resorts:
-        if not r["rescue_phone"]:
-            continue
-        resort_dict = dict(r)
-        if user_lat and user_lon:
-            dist = haversine_km(user_lat, user_lon, r["lat"], r["lon"])
-            if dist <= 100:
-                resort_dict["distance"] = dist
-                resorts_list.append(resort_dict)
-        else:
-            resorts_list.append(resort_dict)
-    
-    resorts_list.sort(key=lambda x: x.get("distance", 9999))
-    
-    if not resorts_list and user_lat:
-        all_resorts = []
-        for r in resorts:
-            if r["rescue_phone"]:
-                resort_dict = dict(r)
-                resort_dict["distance"] = haversine_km(user_lat, user_lon, r["lat"], r["lon"])
-                all_resorts.append(resort_dict)
-        all_resorts.sort(key=lambda x: x["distance"])
-        resorts_list = all_resorts[:5]
-    
-    lines = ["🆘 <b>Экстренная помощь</b>\n"]
-    lines.append("📞 <b>Единая служба спасения: 112</b>\n")
-    
-    if resorts_list:
-        lines.append("━━━━━━━━━━━━━━━━━━━━\n")
-        for resort in resorts_list[:8]:
-            dist_str = f" ({resort['distance']:.0f} км)" if resort.get("distance") else ""
-            lines.append(f"🏔️ <b>{resort['name']}</b>{dist_str}")
-            lines.append(f"📞 <code>{resort['rescue_phone']}</code>\n")
-    
-    lines.append("\n⚠️ Нажми на номер, чтобы скопировать.")
-    
-    await query.message.answer("\n".join(lines), reply_markup=sos_back_kb())
+    text = await sos_text(db, geo, user_id, geo_hint=False)
+    await query.message.answer(text, reply_markup=sos_back_kb())
     await query.answer()
@@ -10,19 +10,18 @@ from db import Database
 from keyboards import BACK_KB, MAIN_MENU, profile_photo_kb
 from states import ProfileStates
 
-from .common import ensure_user, send_main_menu, set_state
+from .common import send_main_menu, set_state
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext, db: Database) -> None:
+async def cmd_start(message: Message, state: FSMContext, db: Database, user_id: int) -> None:
     """Команда /start — приветствие или регистрация."""
     logger.info(f"cmd_start called for user {message.from_user.id}")
-    user_id = await ensure_user(db, message)
     profile = await db.get_profile(user_id)
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     
     logger.info(f"User {message.from_user.id} started bot, has_profile={profile is not None}")
     
@@ -34,7 +33,7 @@ async def cmd_start(message: Message, state: FSMContext, db: Database) -> None:
         return
     
     # Нет профиля — начинаем регистрацию
-    await set_state(db, state, message.from_user.id, ProfileStates.waiting_photos)
+    await set_state(state, ProfileStates.waiting_photos)
     await state.update_data(photos=[])
     await message.answer(
         "Привет! Давай создадим профиль.\n\n"
@@ -47,14 +46,14 @@ async def cmd_start(message: Message, state: FSMContext, db: Database) -> None:
 @router.message(F.text.in_(["◀️ Назад", "🏠 Меню"]))
 async def cmd_back(message: Message, state: FSMContext, db: Database) -> None:
     """Возврат в главное меню."""
-    await set_state(db, state, message.from_user.id, None)
+    await set_state(state, None)
     await send_main_menu(message, "Главное меню")
 
 
 @router.callback_query(F.data == "nav:menu")
 async def cb_nav_menu(query: CallbackQuery, state: FSMContext, db: Database) -> None:
     """Inline-кнопка возврата в меню."""
-    await set_state(db, state, query.from_user.id, None)
+    await set_state(state, None)
     await query.message.answer("Главное меню", reply_markup=MAIN_MENU)
     await query.answer()
 
@@ -1,6 +1,14 @@
 """Middleware пакет."""
+from .identity import IdentityMiddleware
 from .logging import LoggingMiddleware
+from .metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware
 from .rate_limit import RateLimitMiddleware
-from .state_restore import StateRestoreMiddleware
 
-__all__ = ["LoggingMiddleware", "RateLimitMiddleware", "StateRestoreMiddleware"]
+__all__ = [
+    "ApiMetricsMiddleware",
+    "HandlerMetricsMiddleware",
+    "IdentityMiddleware",
+    "LoggingMiddleware",
+    "RateLimitMiddleware",
+    "UpdateMetricsMiddleware",
+]
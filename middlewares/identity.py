@@ -0,0 +1,29 @@
+"""Middleware идентификации пользователя."""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.identity import IdentityCache
+
+
+class IdentityMiddleware(BaseMiddleware):
+    """Один раз на обновление: ``user_id`` отправителя в данные обработчика.
+
+    Обработчики получают его аргументом ``user_id: int`` вместо
+    ``upsert_user`` в начале каждого из них.
+    """
+
+    def __init__(self, identity: IdentityCache) -> None:
+        self.identity = identity
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and "user_id" not in data:
+            data["user_id"] = await self.identity.resolve(user.id, user.username or "", user.first_name or "")
+        return await handler(event, data)
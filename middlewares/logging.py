@@ -4,7 +4,7 @@ import time
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Update
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
 
 logger = logging.getLogger(__name__)
 
@@ -24,15 +24,19 @@ class LoggingMiddleware(BaseMiddleware):
         user_id = None
         event_type = "unknown"
         
+        # Зарегистрирован на dp.message и dp.callback_query, но понимает и Update;
+        # дальше по цепочке всегда уходит исходное событие
+        inner = event
         if isinstance(event, Update):
-            if event.message:
-                user_id = event.message.from_user.id if event.message.from_user else None
-                event_type = "message"
-                if event.message.text:
-                    event_type = f"message:{event.message.text[:30]}"
-            elif event.callback_query:
-                user_id = event.callback_query.from_user.id if event.callback_query.from_user else None
-                event_type = f"callback:{event.callback_query.data}"
+            inner = event.message or event.callback_query or event
+        if isinstance(inner, Message):
+            user_id = inner.from_user.id if inner.from_user else None
+            event_type = "message"
+            if inner.text:
+                event_type = f"message:{inner.text[:30]}"
+        elif isinstance(inner, CallbackQuery):
+            user_id = inner.from_user.id if inner.from_user else None
+            event_type = f"callback:{inner.data}"
         
         try:
             result = await handler(event, data)
@@ -0,0 +1,104 @@
+"""Middleware для метрик производительности."""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from services.metrics import Metrics, add_update_time, current_update_time, update_timings
+
+logger = logging.getLogger(__name__)
+
+
+def handler_labels(data: Dict[str, Any]) -> Dict[str, str]:
+    """Роутер и обработчик, выбранные фильтрами: ``handlers.profile.cmd_profile``."""
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return {"router": "unknown", "handler": "unknown"}
+    module = getattr(callback, "__module__", "") or ""
+    return {
+        "router": module.rsplit(".", 1)[-1],
+        "handler": getattr(callback, "__qualname__", repr(callback)),
+    }
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware ``dp.update``: полное время обновления, БД и Bot API в нём."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        start = time.perf_counter()
+        with update_timings() as timings:
+            try:
+                result = await handler(event, data)
+            finally:
+                self.metrics.observe("bot_update_seconds", time.perf_counter() - start, type=update_type)
+                self.metrics.observe("bot_update_db_seconds", timings.get("db", 0.0), type=update_type)
+                self.metrics.observe("bot_update_api_seconds", timings.get("api", 0.0), type=update_type)
+        if result is UNHANDLED:
+            self.metrics.inc("bot_updates_unhandled_total", type=update_type)
+        return result
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: время и ошибки по обработчику, выбранному фильтрами."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        labels = handler_labels(data)
+        start = time.perf_counter()
+        db_before = current_update_time("db")
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.metrics.inc("bot_handler_errors_total", **labels)
+            raise
+        finally:
+            self.metrics.observe("bot_handler_seconds", time.perf_counter() - start, **labels)
+            self.metrics.inc("bot_handler_db_seconds_total", current_update_time("db") - db_before, **labels)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время и ошибки каждого запроса к Bot API."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            self.metrics.inc("bot_api_errors_total", method=name, error=type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("bot_api_seconds", elapsed, method=name)
+            add_update_time("api", elapsed)
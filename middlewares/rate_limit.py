@@ -1,27 +1,41 @@
 """Middleware для rate limiting."""
 import logging
-import time
-from collections import defaultdict
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message, TelegramObject
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from services.rate_limiter import RateLimiter, SharedRateLimiter
 
 logger = logging.getLogger(__name__)
 
+RATE_LIMIT_TEXT = "⚠️ Слишком много запросов. Подожди немного."
+
 
 class RateLimitMiddleware(BaseMiddleware):
-    """Ограничение частоты запросов."""
+    """Ограничение частоты запросов (GCRA, O(1) на проверку).
 
-    def __init__(self, rate_limit: int = 30, period: int = 60):
+    Один экземпляр — один лимит: для сообщений и для нажатий кнопок
+    регистрируются отдельные экземпляры.
+    """
+
+    def __init__(
+        self,
+        rate_limit: int = 30,
+        period: int = 60,
+        burst: Optional[int] = None,
+        limiter: Optional[Union[RateLimiter, SharedRateLimiter]] = None,
+    ):
         """
         Args:
-            rate_limit: Максимум сообщений за период
+            rate_limit: Максимум запросов за период
             period: Период в секундах
+            burst: Сколько запросов подряд без пауз (по умолчанию — ``rate_limit``)
+            limiter: Готовый лимитер (например, общий для процессов ``SharedRateLimiter``)
         """
         self.rate_limit = rate_limit
         self.period = period
-        self.user_requests: Dict[int, list] = defaultdict(list)
+        self.limiter = limiter or RateLimiter(rate_limit, period, burst)
 
     async def __call__(
         self,
@@ -29,30 +43,18 @@ class RateLimitMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        if not isinstance(event, Message):
+        if not isinstance(event, (Message, CallbackQuery)):
             return await handler(event, data)
-        
+
         user_id = event.from_user.id if event.from_user else None
         if not user_id:
             return await handler(event, data)
-        
-        current_time = time.time()
-        
-        # Очищаем старые записи
-        self.user_requests[user_id] = [
-            t for t in self.user_requests[user_id]
-            if current_time - t < self.period
-        ]
-        
-        # Проверяем лимит
-        if len(self.user_requests[user_id]) >= self.rate_limit:
-            logger.warning(f"Rate limit exceeded for user {user_id}")
-            await event.answer(
-                "⚠️ Слишком много запросов. Подожди немного.",
-            )
+
+        retry_after = await self.limiter.acquire(user_id)
+        if retry_after:
+            logger.warning(f"Rate limit exceeded for user {user_id}, retry in {retry_after:.1f}s")
+            # Сообщению — ответ в чат, кнопке — всплывающая подсказка (и «часики» снимаются)
+            await event.answer(RATE_LIMIT_TEXT)
             return None
-        
-        # Добавляем текущий запрос
-        self.user_requests[user_id].append(current_time)
-        
+
         return await handler(event, data)
@@ -0,0 +1,31 @@
+"""Колонки, которые старые версии бота добавляли при каждом старте.
+
+На базе, созданной ``0001_initial``, ничего не делает; базы до
+версионирования схемы догоняет до неё.
+"""
+import aiosqlite
+
+COLUMNS = {
+    "profiles": {
+        "location_lat": "REAL",
+        "location_lon": "REAL",
+        "photos": "TEXT",
+        "gender": "TEXT",
+        "ride_plan": "TEXT",
+    },
+    "resorts": {
+        "rescue_phone": "TEXT",
+    },
+    "users": {
+        "undeliverable": "INTEGER NOT NULL DEFAULT 0",
+    },
+}
+
+
+async def upgrade(conn: aiosqlite.Connection) -> None:
+    for table, columns in COLUMNS.items():
+        async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        for column, definition in columns.items():
+            if column not in existing:
+                await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
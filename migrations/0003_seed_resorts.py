@@ -0,0 +1,95 @@
+"""Справочник курортов.
+
+Данные лежат в самой миграции и покрыты её контрольной суммой: новые или
+исправленные курорты — только новой миграцией, этот файл не правится.
+
+Если курортов меньше, чем в справочнике, таблица заполняется заново;
+иначе (база старой версии) только дописываются телефоны спасателей.
+"""
+import aiosqlite
+
+RESORTS = (
+    # МОСКВА
+    {"name": "КАНТ (Нагорная)", "lat": 55.6760, "lon": 37.5720, "address": "Москва", "site": "https://kant-sport.ru/", "trails_count": 11, "trail_levels": "зелёные, синие, красные", "lifts_count": 7, "rescue_phone": "+74959092443"},
+    {"name": "Крылатское", "lat": 55.7530, "lon": 37.4480, "address": "Москва", "site": "https://krylatskoe-ski.ru/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+74991448878"},
+    {"name": "Лата Трэк", "lat": 55.7906, "lon": 37.5736, "address": "Москва", "site": "https://spusk.ru/", "trails_count": 3, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": "+74993174777"},
+    # МОСКОВСКАЯ ОБЛАСТЬ
+    {"name": "Сорочаны", "lat": 56.0090, "lon": 37.3600, "address": "Московская область", "site": "https://sorochany.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 8, "rescue_phone": "+74955025255"},
+    {"name": "Волен", "lat": 56.0603, "lon": 37.3904, "address": "Московская область", "site": "https://volen.ru/", "trails_count": 13, "trail_levels": "зелёные, синие, красные", "lifts_count": 10, "rescue_phone": "+74955012323"},
+    {"name": "Степаново", "lat": 56.0621, "lon": 37.4012, "address": "Московская область", "site": "https://stepanovo-park.ru/", "trails_count": 8, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+74955012000"},
+    {"name": "Чулково (Клуб Тягачева)", "lat": 55.6547, "lon": 37.9636, "address": "Московская область", "site": "https://chulkovo-club.ru/", "trails_count": 7, "trail_levels": "зелёные, синие, красные", "lifts_count": 4, "rescue_phone": "+74955842222"},
+    {"name": "Лоза", "lat": 56.3000, "lon": 38.1330, "address": "Московская область", "site": "https://loza-ski.ru/", "trails_count": 4, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": None},
+    # САНКТ-ПЕТЕРБУРГ И ОБЛАСТЬ
+    {"name": "Охта-Парк", "lat": 60.0906, "lon": 30.3894, "address": "Санкт-Петербург", "site": "https://ohta-park.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 6, "rescue_phone": "+78123356666"},
+    {"name": "Игора", "lat": 60.5189, "lon": 30.1997, "address": "Ленинградская область", "site": "https://igora.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 8, "rescue_phone": "+78124565900"},
+    {"name": "Северный склон", "lat": 60.0415, "lon": 30.3749, "address": "Санкт-Петербург", "site": "https://sevsklon.ru/", "trails_count": 6, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+78129241111"},
+    {"name": "Туутари-Парк", "lat": 59.7006, "lon": 30.2003, "address": "Ленинградская область", "site": "https://tuutari-park.ru/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": "+78127770170"},
+    {"name": "Золотая Долина", "lat": 60.5560, "lon": 29.7200, "address": "Ленинградская область", "site": "https://zolotaya-dolina.ru/", "trails_count": 12, "trail_levels": "зелёные, синие, красные", "lifts_count": 6, "rescue_phone": "+78137841111"},
+    # УРАЛ
+    {"name": "Гора Белая", "lat": 57.4936, "lon": 59.9375, "address": "Свердловская область", "site": "https://ski-gora-belaya.ru/", "trails_count": 7, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+73435070707"},
+    {"name": "Уктус", "lat": 56.7793, "lon": 60.6416, "address": "Екатеринбург", "site": "https://uktus.com/", "trails_count": 5, "trail_levels": "зелёные, синие", "lifts_count": 4, "rescue_phone": "+73433898989"},
+    {"name": "Пильная", "lat": 56.9300, "lon": 59.9500, "address": "Свердловская область", "site": "https://pilnaya.ru/", "trails_count": 6, "trail_levels": "зелёные, синие", "lifts_count": 3, "rescue_phone": None},
+    # ЧЕЛЯБИНСКАЯ ОБЛАСТЬ
+    {"name": "Солнечная Долина", "lat": 54.9857, "lon": 60.2217, "address": "Челябинская область", "site": "https://solnechnaya-dolina.com/", "trails_count": 12, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 8, "rescue_phone": "+73519777777"},
+    {"name": "Банное (Металлург-Магнитогорск)", "lat": 53.5900, "lon": 58.9700, "address": "Челябинская область", "site": "https://ski-bannoe.ru/", "trails_count": 6, "trail_levels": "синие, красные", "lifts_count": 4, "rescue_phone": "+73473633333"},
+    # БАШКОРТОСТАН
+    {"name": "Абзаково", "lat": 53.8200, "lon": 58.6000, "address": "Башкортостан", "site": "https://abzakovo.com/", "trails_count": 13, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 9, "rescue_phone": "+73519579600"},
+    # СОЧИ
+    {"name": "Роза Хутор", "lat": 43.6570, "lon": 40.2970, "address": "Сочи, Краснодарский край", "site": "https://roza-khutor.com/", "trails_count": 105, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 32, "rescue_phone": "+78622437100"},
+    {"name": "Газпром Лаура", "lat": 43.6628, "lon": 40.2665, "address": "Сочи, Краснодарский край", "site": "https://polyanaski.ru/", "trails_count": 35, "trail_levels": "зелёные, синие, красные", "lifts_count": 10, "rescue_phone": "+78622437000"},
+    {"name": "Красная Поляна", "lat": 43.6730, "lon": 40.2710, "address": "Сочи, Краснодарский край", "site": "https://krasnayapolyanaresort.ru/", "trails_count": 30, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 13, "rescue_phone": "+78622437200"},
+    # КЕМЕРОВСКАЯ ОБЛАСТЬ
+    {"name": "Шерегеш", "lat": 52.9150, "lon": 87.9850, "address": "Кемеровская область", "site": "https://sheregesh.su/", "trails_count": 40, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 19, "rescue_phone": "+73845337911"},
+    # КАРАЧАЕВО-ЧЕРКЕСИЯ
+    {"name": "Архыз", "lat": 43.5600, "lon": 41.2200, "address": "Карачаево-Черкесия", "site": "https://arhyz-resort.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные", "lifts_count": 8, "rescue_phone": "+78782226600"},
+    {"name": "Домбай", "lat": 43.2880, "lon": 41.6280, "address": "Карачаево-Черкесия", "site": "https://dombaj.ru/", "trails_count": 14, "trail_levels": "синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+78782259111"},
+    # КАБАРДИНО-БАЛКАРИЯ
+    {"name": "Эльбрус (Азау)", "lat": 43.2700, "lon": 42.4700, "address": "Кабардино-Балкария", "site": "https://elbrus.su/", "trails_count": 20, "trail_levels": "синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+78663871899"},
+    # МУРМАНСКАЯ ОБЛАСТЬ
+    {"name": "Большой Вудъявр", "lat": 67.6120, "lon": 33.6770, "address": "Мурманская область", "site": "https://bigwood.ru/", "trails_count": 25, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 10, "rescue_phone": "+78155332211"},
+    # САХАЛИН
+    {"name": "Горный Воздух", "lat": 46.9590, "lon": 142.7470, "address": "Сахалин", "site": "https://gornyvozdukh.ru/", "trails_count": 9, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+74242467777"},
+    # КАЗАНЬ
+    {"name": "Свияжские Холмы", "lat": 55.7825, "lon": 48.8890, "address": "Татарстан", "site": "https://sviyaga-ski.ru/", "trails_count": 6, "trail_levels": "зелёные, синие, красные", "lifts_count": 4, "rescue_phone": "+78432777700"},
+    # НИЖНИЙ НОВГОРОД
+    {"name": "Хабарское", "lat": 56.1440, "lon": 44.0900, "address": "Нижегородская область", "site": "https://habarskoe.ru/", "trails_count": 10, "trail_levels": "зелёные, синие, красные", "lifts_count": 5, "rescue_phone": "+78314666000"},
+    # НОВОСИБИРСК
+    {"name": "Горский", "lat": 54.9840, "lon": 82.9080, "address": "Новосибирск", "site": None, "trails_count": 4, "trail_levels": "зелёные, синие", "lifts_count": 2, "rescue_phone": None},
+    # КРАСНОЯРСК
+    {"name": "Бобровый Лог", "lat": 55.9680, "lon": 92.7950, "address": "Красноярск", "site": "https://bobrovylog.ru/", "trails_count": 15, "trail_levels": "зелёные, синие, красные, чёрные", "lifts_count": 7, "rescue_phone": "+73912691111"},
+)
+
+
+async def upgrade(conn: aiosqlite.Connection) -> None:
+    async with conn.execute("SELECT COUNT(*) FROM resorts") as cursor:
+        count = (await cursor.fetchone())[0]
+    if count >= len(RESORTS):
+        await conn.executemany(
+            "UPDATE resorts SET rescue_phone = ? WHERE name = ?",
+            [(resort["rescue_phone"], resort["name"]) for resort in RESORTS if resort.get("rescue_phone")],
+        )
+        return
+
+    await conn.execute("DELETE FROM resorts")
+    await conn.executemany(
+        """
+        INSERT INTO resorts (
+            name, lat, lon, address, site,
+            trails_count, trail_levels, lifts_count, rescue_phone
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                resort["name"],
+                resort["lat"],
+                resort["lon"],
+                resort.get("address"),
+                resort.get("site"),
+                resort.get("trails_count"),
+                resort.get("trail_levels"),
+                resort.get("lifts_count"),
+                resort.get("rescue_phone"),
+            )
+            for resort in RESORTS
+        ],
+    )
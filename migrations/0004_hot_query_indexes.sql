@@ -0,0 +1,46 @@
+-- online
+-- Индексы под горячие запросы (проверяются tests/test_query_plans.py).
+
+-- Кто меня лайкнул: фильтр по получателю и сортировка по времени из индекса;
+-- from_user_id в индексе — join без обращения к таблице
+CREATE INDEX IF NOT EXISTS idx_likes_to_created ON likes(to_user_id, created_at, from_user_id);
+
+-- Мэтчи пользователя: по индексу на каждую сторону пары, новые первыми
+-- (get_user_matches сливает обе ветки UNION ALL без сортировки)
+CREATE INDEX IF NOT EXISTS idx_matches_user1_created ON matches(user1_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_matches_user2_created ON matches(user2_id, created_at);
+
+-- Последние сообщения чата без сортировки
+CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_created ON chat_messages(chat_id, created_at);
+DROP INDEX IF EXISTS idx_chat_messages_chat;
+
+-- Неотправленные напоминания: частичный индекс только по ним
+CREATE INDEX IF NOT EXISTS idx_reminders_pending ON event_reminders(remind_at, event_id) WHERE sent = 0;
+DROP INDEX IF EXISTS idx_reminders_remind_at;
+
+-- Активные события: календарь по дате, события автора, чистка прошедших
+-- (event_date — текст пользователя, чистка сравнивает date(event_date))
+CREATE INDEX IF NOT EXISTS idx_events_active_date ON events(event_date) WHERE is_active = 1;
+CREATE INDEX IF NOT EXISTS idx_events_active_day ON events(date(event_date)) WHERE is_active = 1;
+CREATE INDEX IF NOT EXISTS idx_events_creator ON events(creator_id, is_active, event_date);
+DROP INDEX IF EXISTS idx_events_date;
+
+-- Отзывы курорта, новые первыми
+CREATE INDEX IF NOT EXISTS idx_reviews_resort_created ON reviews(resort_id, created_at);
+DROP INDEX IF EXISTS idx_reviews_resort;
+
+-- Инструкторы города по имени
+CREATE INDEX IF NOT EXISTS idx_instructors_city_name ON instructors(city, name);
+DROP INDEX IF EXISTS idx_instructors_city;
+
+-- Подписчики погоды курорта; telegram_id — через users по PK
+CREATE INDEX IF NOT EXISTS idx_weather_subscriptions_resort ON weather_subscriptions(resort_id, user_id);
+
+-- Внешние ключи на users без индекса: проверка FK и каскадное удаление
+-- пользователя проходили по всей таблице
+CREATE INDEX IF NOT EXISTS idx_chat_messages_sender ON chat_messages(sender_id);
+CREATE INDEX IF NOT EXISTS idx_chats_user2 ON chats(user2_id);
+CREATE INDEX IF NOT EXISTS idx_blocks_blocked ON blocks(blocked_id);
+
+-- Незавершённые рассылки при старте
+CREATE INDEX IF NOT EXISTS idx_broadcasts_running ON broadcasts(id) WHERE status = 'running';
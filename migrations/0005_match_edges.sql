@@ -0,0 +1,23 @@
+-- Мэтч хранится двумя рёбрами (user_id → other_id и обратно): мэтчи
+-- пользователя — один проход по индексу (user_id, created_at), проверка
+-- пары — поиск по ключу без нормализации (min, max).
+
+CREATE TABLE IF NOT EXISTS match_edges (
+    user_id INTEGER NOT NULL,
+    other_id INTEGER NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, other_id),
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY(other_id) REFERENCES users(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO match_edges (user_id, other_id, created_at)
+SELECT user1_id, user2_id, created_at FROM matches
+UNION ALL
+SELECT user2_id, user1_id, created_at FROM matches;
+
+DROP TABLE matches;
+
+CREATE INDEX IF NOT EXISTS idx_match_edges_user_created ON match_edges(user_id, created_at);
+-- Для каскадного удаления пользователя (внешний ключ other_id)
+CREATE INDEX IF NOT EXISTS idx_match_edges_other ON match_edges(other_id);
@@ -0,0 +1,175 @@
+"""Рассылки админа: задания в БД с чекпоинтами и фоновым выполнением.
+
+Получатели читаются пачками по ``users.id`` (keyset), после каждой пачки
+прогресс сохраняется в таблицу ``broadcasts``. После перезапуска бота
+незавершённые задания продолжаются с последнего чекпоинта — повторно
+может прийти не больше одной пачки. Админ видит прогресс в одном
+редактируемом сообщении. Пользователи, заблокировавшие бота, помечаются
+``undeliverable`` и в следующие рассылки не попадают.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Set
+
+from aiogram import Bot
+
+from db import Database
+from services.outbound import PRIORITY_BULK, OutboundDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+def progress_text(job: Any, finished: bool = False) -> str:
+    """Текст сообщения админу о ходе рассылки."""
+    done = job["sent"] + job["failed"] + job["blocked"]
+    status = "✅ Рассылка завершена" if finished else "⏳ Идёт рассылка"
+    return (
+        f"📢 {status} #{job['id']}\n\n"
+        f"📬 Обработано: {done} из {job['total']}\n"
+        f"✅ Отправлено: {job['sent']}\n"
+        f"🚫 Заблокировали бота: {job['blocked']}\n"
+        f"❌ Не доставлено: {job['failed']}"
+    )
+
+
+class BroadcastManager:
+    """Запускает, продолжает и отслеживает задания рассылки."""
+
+    def __init__(
+        self,
+        db: Database,
+        bot: Bot,
+        outbound: OutboundDispatcher,
+        chunk_size: int = 500,
+        progress_interval: float = 3.0,
+    ) -> None:
+        """
+        Args:
+            db: База данных
+            bot: Бот (для сообщения о прогрессе)
+            outbound: Диспетчер исходящих сообщений
+            chunk_size: Получателей в пачке между чекпоинтами
+            progress_interval: Не чаще раза в столько секунд обновлять прогресс
+        """
+        self._db = db
+        self._bot = bot
+        self._outbound = outbound
+        self._chunk_size = max(1, chunk_size)
+        self._progress_interval = progress_interval
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._blocked: Set[int] = set()
+        outbound.add_listener(self._on_outbound)
+
+    def _on_outbound(self, event: str, *args: Any) -> None:
+        if event == "chat_blocked":
+            # Любые отправки, не только рассылки: пометим при следующем чекпоинте
+            self._blocked.add(args[0])
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    async def resume(self) -> None:
+        """Продолжить задания, прерванные остановкой бота."""
+        for job in await self._db.get_unfinished_broadcasts():
+            logger.info(f"Resuming broadcast {job['id']} after user {job['last_user_id']}")
+            self._spawn(job["id"])
+
+    async def submit(self, admin_chat_id: int, text: str) -> int:
+        """Создать задание, показать админу прогресс и запустить в фоне."""
+        broadcast_id = await self._db.create_broadcast(admin_chat_id, text)
+        job = await self._db.get_broadcast(broadcast_id)
+        try:
+            progress = await self._bot.send_message(admin_chat_id, progress_text(job))
+            await self._db.set_broadcast_progress_message(broadcast_id, progress.message_id)
+        except Exception as e:
+            logger.error(f"Failed to report broadcast {broadcast_id} progress: {e}")
+        self._spawn(broadcast_id)
+        return broadcast_id
+
+    def _spawn(self, broadcast_id: int) -> None:
+        if broadcast_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(broadcast_id), name=f"broadcast-{broadcast_id}")
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def join(self) -> None:
+        """Дождаться всех запущенных заданий."""
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Остановить задания; они продолжатся с чекпоинта при следующем запуске."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, broadcast_id: int) -> None:
+        try:
+            await self._deliver(broadcast_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Задание остаётся 'running' и продолжится после перезапуска
+            logger.error(f"Broadcast {broadcast_id} failed: {e}")
+
+    async def _deliver(self, broadcast_id: int) -> None:
+        job = await self._db.get_broadcast(broadcast_id)
+        if job is None or job["status"] != "running":
+            return
+        after = job["last_user_id"]
+        reported = time.monotonic()
+
+        while True:
+            recipients = await self._db.get_broadcast_recipients(after, self._chunk_size)
+            results = await asyncio.gather(
+                *(
+                    self._outbound.send(recipient["telegram_id"], job["text"], priority=PRIORITY_BULK)
+                    for recipient in recipients
+                )
+            )
+            undeliverable = set(self._blocked)
+            self._blocked -= undeliverable
+            blocked = sum(
+                1
+                for recipient, delivered in zip(recipients, results)
+                if not delivered and recipient["telegram_id"] in undeliverable
+            )
+            sent = sum(results)
+            finished = len(recipients) < self._chunk_size
+            if recipients:
+                after = recipients[-1]["id"]
+            await self._db.save_broadcast_checkpoint(
+                broadcast_id,
+                after,
+                sent=sent,
+                failed=len(results) - sent - blocked,
+                blocked=blocked,
+                undeliverable=undeliverable,
+                finished=finished,
+            )
+
+            if finished or time.monotonic() - reported >= self._progress_interval:
+                job = await self._db.get_broadcast(broadcast_id)
+                await self._report(job, finished)
+                reported = time.monotonic()
+            if finished:
+                logger.info(
+                    f"Broadcast {broadcast_id} done: sent={job['sent']}, "
+                    f"blocked={job['blocked']}, failed={job['failed']}"
+                )
+                return
+
+    async def _report(self, job: Any, finished: bool) -> None:
+        if not job["progress_message_id"]:
+            return
+        try:
+            await self._bot.edit_message_text(
+                progress_text(job, finished),
+                chat_id=job["admin_chat_id"],
+                message_id=job["progress_message_id"],
+            )
+        except Exception as e:
+            logger.debug(f"Broadcast {job['id']} progress not updated: {e}")
@@ -0,0 +1,406 @@
+"""Очередь кандидатов для поиска компании.
+
+Для каждого ищущего пользователя держится ранжированный набор кандидатов
+(анкеты и события). Набор строится один раз и дальше обновляется
+инкрементально по событиям ``Database`` (лайки, блокировки, изменения
+анкет и событий), поэтому повторный «Искать компанию» не пересобирает его
+с нуля. Сессия просмотра — это курсор (ключ последнего показанного
+кандидата), следующий кандидат находится бинарным поиском.
+
+Для ранжирования анкеты читаются keyset-страницами и только нужные для
+score поля. Полные анкеты и события для показа подгружаются страницами по
+``PAGE_SIZE`` после курсора; когда в странице остаётся половина, следующая
+загружается в фоне — свайп не ждёт БД и не зависит от размера очереди.
+"""
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from db import Database
+from services.geo import GeoDirectory
+from services.matching import LOCATION_BONUS_KM, CandidateBlock, calculate_match_score, score_batch
+
+logger = logging.getLogger(__name__)
+
+# Ключ ранжирования: (-score, порядок типа, тай-брейк, тип, id).
+# Анкеты при равном score идут раньше событий, анкеты — от новых к старым
+# (как ORDER BY p.id DESC), события — по дате.
+RankKey = Tuple[int, int, Any, str, int]
+
+EVENT_SCORE = 50  # Средний приоритет для событий
+PAGE_SIZE = 20  # Кандидатов в странице показа
+BUILD_PAGE = 1000  # Анкет в keyset-странице при построении очереди
+
+
+def profile_key(score: int, profile_row_id: int, user_id: int) -> RankKey:
+    return (-score, 0, -profile_row_id, "profile", user_id)
+
+
+def event_key(event_date: str, event_id: int) -> RankKey:
+    return (-EVENT_SCORE, 1, event_date, "event", event_id)
+
+
+def _item(key: RankKey) -> Tuple[str, int]:
+    return key[3], key[4]
+
+
+class RankedCandidates:
+    """Отсортированный набор кандидатов с поиском по курсору.
+
+    Поиск следующего после курсора — O(log n); вставка и удаление — O(log n)
+    на поиск позиции плюс сдвиг хвоста списка.
+    """
+
+    def __init__(self) -> None:
+        self._keys: List[RankKey] = []
+        self._by_item: Dict[Tuple[str, int], RankKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, item: Tuple[str, int]) -> bool:
+        return item in self._by_item
+
+    def upsert(self, key: RankKey) -> None:
+        self.discard(key[3], key[4])
+        insort(self._keys, key)
+        self._by_item[(key[3], key[4])] = key
+
+    def discard(self, kind: str, item_id: int) -> None:
+        key = self._by_item.pop((kind, item_id), None)
+        if key is None:
+            return
+        index = bisect_left(self._keys, key)
+        del self._keys[index]
+
+    def after(self, cursor: Optional[RankKey], limit: int = 1) -> List[RankKey]:
+        """Следующие ``limit`` кандидатов строго после курсора."""
+        start = 0 if cursor is None else bisect_right(self._keys, tuple(cursor))
+        return self._keys[start:start + limit]
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        return list(self._by_item)
+
+
+class _Queue:
+    """Очередь одного пользователя и всё, что нужно для её обновления."""
+
+    __slots__ = (
+        "user_id", "profile", "filters", "lat", "lon", "liked", "blocked", "ranked", "page", "rows", "tail", "prefetch",
+    )
+
+    def __init__(
+        self,
+        user_id: int,
+        profile: dict,
+        filters: dict,
+        lat: Optional[float],
+        lon: Optional[float],
+        liked: Set[int],
+        blocked: Set[int],
+    ) -> None:
+        self.user_id = user_id
+        self.profile = profile
+        self.filters = filters
+        self.lat = lat
+        self.lon = lon
+        self.liked = liked
+        self.blocked = blocked
+        self.ranked = RankedCandidates()
+        # Страница показа: ключи после курсора по порядку и строки к ним;
+        # tail — последний загруженный ключ, с него продолжит подгрузка
+        self.page: Deque[RankKey] = deque()
+        self.rows: Dict[Tuple[str, int], Any] = {}
+        self.tail: Optional[RankKey] = None
+        self.prefetch: Optional[asyncio.Task] = None
+
+    def matches(self, profile: dict, filters: dict, lat: Optional[float], lon: Optional[float]) -> bool:
+        return self.profile == profile and self.filters == filters and self.lat == lat and self.lon == lon
+
+    def accepts(self, row: Any) -> bool:
+        user_id = row["user_id"]
+        if user_id == self.user_id or user_id in self.liked or user_id in self.blocked:
+            return False
+        ride_type = self.filters.get("ride_type")
+        if ride_type and row["ride_type"] != ride_type:
+            return False
+        skill_level = self.filters.get("skill_level")
+        if skill_level and row["skill_level"] != skill_level:
+            return False
+        return True
+
+    def apply_profile(self, row: Any) -> None:
+        # Подгруженная анкета устарела — при показе прочитаем заново
+        self.rows.pop(("profile", row["user_id"]), None)
+        if not self.accepts(row):
+            self.ranked.discard("profile", row["user_id"])
+            return
+        score = calculate_match_score(self.profile, dict(row), self.lat, self.lon)
+        self.ranked.upsert(profile_key(score, row["id"], row["user_id"]))
+
+    def apply_profiles(self, rows: Iterable[Any], nearby: Optional[Dict[int, float]] = None) -> None:
+        """Добавить много анкет сразу — score считается одним векторным проходом.
+
+        ``nearby`` — расстояния до райдеров в радиусе бонуса из геоиндекса,
+        остальные кандидаты бонуса за геолокацию не получают.
+        """
+        accepted = [dict(row) for row in rows if self.accepts(row)]
+        if not accepted:
+            return
+        distances = None
+        if nearby is not None:
+            distances = np.array([nearby.get(row["user_id"], np.nan) for row in accepted], dtype=np.float64)
+        block = CandidateBlock.from_profiles(accepted)
+        scores = score_batch(self.profile, block, self.lat, self.lon, distances)
+        for row, score in zip(accepted, scores.tolist()):
+            self.ranked.upsert(profile_key(score, row["id"], row["user_id"]))
+
+    def apply_events(self, events: Dict[int, Tuple[int, str]]) -> None:
+        for item in [item for item in self.rows if item[0] == "event"]:
+            del self.rows[item]
+        for kind, item_id in self.ranked.items():
+            if kind == "event" and item_id not in events:
+                self.ranked.discard(kind, item_id)
+        for event_id, (creator_id, event_date) in events.items():
+            if creator_id == self.user_id or creator_id in self.blocked:
+                self.ranked.discard("event", event_id)
+            else:
+                self.ranked.upsert(event_key(event_date, event_id))
+
+
+class CandidateEngine:
+    """Ранжированные очереди кандидатов с инкрементальным обновлением."""
+
+    def __init__(self, db: Database, max_queues: int = 1000, geo: Optional[GeoDirectory] = None) -> None:
+        """
+        Args:
+            db: БД, на события которой подписывается движок
+            max_queues: Сколько очередей держать в памяти (LRU)
+            geo: Геоиндекс — бонус за расстояние считается только для
+                райдеров поблизости, а не для всех анкет
+        """
+        self._db = db
+        self._geo = geo
+        self._queues: "OrderedDict[int, _Queue]" = OrderedDict()
+        self._max_queues = max(1, max_queues)
+        self._events: Optional[Dict[int, Tuple[int, str]]] = None
+        self._stale_profiles: Set[int] = set()
+        db.add_listener(self.handle)
+
+    async def ranked(
+        self,
+        user_id: int,
+        user_profile: dict,
+        filters: dict,
+        user_lat: Optional[float] = None,
+        user_lon: Optional[float] = None,
+    ) -> RankedCandidates:
+        """Актуальный набор кандидатов пользователя (строится при первом запросе)."""
+        queue = await self._queue(user_id, user_profile, filters, user_lat, user_lon)
+        return queue.ranked
+
+    async def next_candidate(
+        self,
+        cursor: Optional[RankKey],
+        user_id: int,
+        user_profile: dict,
+        filters: dict,
+        user_lat: Optional[float] = None,
+        user_lon: Optional[float] = None,
+    ) -> Optional[Tuple[RankKey, Any]]:
+        """Следующий кандидат после курсора: ключ (новый курсор) и строка
+        анкеты или события для показа; ``None``, если кандидаты кончились."""
+        queue = await self._queue(user_id, user_profile, filters, user_lat, user_lon)
+        while True:
+            following = queue.ranked.after(cursor, 1)
+            if not following:
+                return None
+            key = following[0]
+            item = (key[3], key[4])
+            # Показанные и пропавшие из очереди ключи — из страницы
+            while queue.page and queue.page[0] < key:
+                queue.rows.pop(_item(queue.page.popleft()), None)
+            if not queue.page and queue.prefetch is not None and not queue.prefetch.done():
+                # Страница кончилась раньше фоновой подгрузки — дождаться её
+                await queue.prefetch
+                continue
+            if not queue.page or queue.page[0] != key or item not in queue.rows:
+                await self._load_page(queue, cursor)
+            row = queue.rows.get(item)
+            if row is not None:
+                break
+            # Анкета или событие удалены, а событие БД ещё не дошло
+            queue.ranked.discard(*item)
+        if len(queue.page) <= PAGE_SIZE // 2 and (queue.prefetch is None or queue.prefetch.done()):
+            queue.prefetch = asyncio.create_task(self._prefetch(queue, queue.tail))
+        return key, row
+
+    async def _queue(
+        self,
+        user_id: int,
+        user_profile: dict,
+        filters: dict,
+        user_lat: Optional[float],
+        user_lon: Optional[float],
+    ) -> _Queue:
+        await self._sync()
+        queue = self._queues.get(user_id)
+        if queue is None or not queue.matches(user_profile, filters, user_lat, user_lon):
+            queue = await self._build(user_id, user_profile, filters, user_lat, user_lon)
+        self._queues.move_to_end(user_id)
+        return queue
+
+    async def _fetch_rows(self, keys: List[RankKey]) -> Dict[Tuple[str, int], Any]:
+        """Полные анкеты и события для ключей страницы — по запросу на тип."""
+        profile_ids = [key[4] for key in keys if key[3] == "profile"]
+        event_ids = [key[4] for key in keys if key[3] == "event"]
+        rows: Dict[Tuple[str, int], Any] = {}
+        for row in await self._db.get_profiles_by_user_ids(profile_ids):
+            rows[("profile", row["user_id"])] = row
+        for row in await self._db.get_events_by_ids(event_ids):
+            rows[("event", row["id"])] = row
+        return rows
+
+    async def _load_page(self, queue: _Queue, cursor: Optional[RankKey]) -> None:
+        """Заменить страницу показа кандидатами сразу после курсора."""
+        queue.page.clear()
+        queue.rows.clear()
+        queue.tail = None
+        keys = queue.ranked.after(cursor, PAGE_SIZE)
+        rows = await self._fetch_rows(keys)
+        queue.page = deque(key for key in keys if _item(key) in rows)
+        queue.rows = rows
+        queue.tail = keys[-1] if keys else None
+
+    async def _prefetch(self, queue: _Queue, last: RankKey) -> None:
+        """Догрузить в фоне следующую страницу после ``last``."""
+        try:
+            keys = queue.ranked.after(last, PAGE_SIZE)
+            rows = await self._fetch_rows(keys)
+        except Exception as e:
+            logger.warning(f"Candidate prefetch failed: user_id={queue.user_id}, {e}")
+            return
+        # Пока грузили, страницу могли перезагрузить — тогда эта уже не продолжение
+        if queue.tail != last or not keys:
+            return
+        for key in keys:
+            item = _item(key)
+            if item in rows:
+                queue.page.append(key)
+                queue.rows[item] = rows[item]
+        queue.tail = keys[-1]
+
+    async def _build(
+        self,
+        user_id: int,
+        user_profile: dict,
+        filters: dict,
+        user_lat: Optional[float],
+        user_lon: Optional[float],
+    ) -> _Queue:
+        queue = _Queue(
+            user_id,
+            user_profile,
+            dict(filters),
+            user_lat,
+            user_lon,
+            liked=await self._db.get_already_liked(user_id),
+            blocked=await self._db.get_blocked_users(user_id),
+        )
+        nearby = None
+        if self._geo is not None and user_lat and user_lon:
+            nearby = dict(self._geo.riders_within(user_lat, user_lon, LOCATION_BONUS_KM))
+        before_id = None
+        while True:
+            profiles = await self._db.get_candidate_profiles(
+                current_user_id=user_id,
+                ride_type=filters.get("ride_type"),
+                skill_level=filters.get("skill_level"),
+                before_id=before_id,
+                limit=BUILD_PAGE,
+            )
+            queue.apply_profiles(profiles, nearby)
+            if len(profiles) < BUILD_PAGE:
+                break
+            before_id = profiles[-1]["id"]
+        queue.apply_events(await self._active_events())
+
+        self._queues[user_id] = queue
+        while len(self._queues) > self._max_queues:
+            self._queues.popitem(last=False)
+        logger.info(f"Built candidate queue: user_id={user_id}, size={len(queue.ranked)}")
+        return queue
+
+    async def _active_events(self) -> Dict[int, Tuple[int, str]]:
+        if self._events is None:
+            rows = await self._db.get_active_events()
+            self._events = {row["id"]: (row["creator_id"], row["event_date"]) for row in rows}
+        return self._events
+
+    async def _sync(self) -> None:
+        """Применить накопленные изменения ко всем очередям."""
+        if self._stale_profiles:
+            user_ids, self._stale_profiles = self._stale_profiles, set()
+            if self._queues:
+                rows = {row["user_id"]: row for row in await self._db.get_profiles_by_user_ids(user_ids)}
+                for queue in self._queues.values():
+                    for user_id in user_ids:
+                        row = rows.get(user_id)
+                        if row is None:
+                            queue.ranked.discard("profile", user_id)
+                        else:
+                            queue.apply_profile(row)
+        if self._events is None and self._queues:
+            events = await self._active_events()
+            for queue in self._queues.values():
+                queue.apply_events(events)
+
+    # ═══════════════════════════════════════════════════════════════════
+    # СОБЫТИЯ БД
+    # ═══════════════════════════════════════════════════════════════════
+
+    def handle(self, event: str, *args: int) -> None:
+        """Слушатель изменений ``Database``."""
+        handler = getattr(self, f"_on_{event}", None)
+        if handler is not None:
+            handler(*args)
+
+    def _on_profile_changed(self, user_id: int) -> None:
+        # Своя анкета — база для score всей очереди, её проще пересобрать
+        self._queues.pop(user_id, None)
+        self._stale_profiles.add(user_id)
+
+    def _on_profile_deleted(self, user_id: int) -> None:
+        self._on_profile_changed(user_id)
+
+    def _on_like_added(self, from_user_id: int, to_user_id: int) -> None:
+        queue = self._queues.get(from_user_id)
+        if queue is not None:
+            queue.liked.add(to_user_id)
+            queue.ranked.discard("profile", to_user_id)
+
+    def _on_like_removed(self, from_user_id: int, to_user_id: int) -> None:
+        queue = self._queues.get(from_user_id)
+        if queue is not None:
+            queue.liked.discard(to_user_id)
+            self._stale_profiles.add(to_user_id)
+
+    def _on_user_blocked(self, blocker_id: int, blocked_id: int) -> None:
+        queue = self._queues.get(blocker_id)
+        if queue is not None:
+            queue.blocked.add(blocked_id)
+            queue.ranked.discard("profile", blocked_id)
+            if self._events is not None:
+                queue.apply_events(self._events)
+        # Блокировка удаляет лайки в обе стороны
+        self._on_like_removed(blocked_id, blocker_id)
+
+    def _on_user_unblocked(self, blocker_id: int, blocked_id: int) -> None:
+        self._queues.pop(blocker_id, None)
+
+    def _on_events_changed(self) -> None:
+        self._events = None
@@ -0,0 +1,115 @@
+"""FSM-хранилище aiogram поверх SQLite.
+
+Состояние и данные FSM (``candidates``, ``filters``, ``user_profile`` …)
+переживают перезапуск бота. Перед БД стоит LRU-кэш ограниченного размера,
+изменённые ключи пишутся пачками через write-behind буфер.
+"""
+import logging
+import pickle
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from db import Database, WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    __slots__ = ("state", "data")
+
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None) -> None:
+        self.state = state
+        self.data = data if data is not None else {}
+
+
+def _encode_key(key: StorageKey) -> str:
+    return (
+        f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:"
+        f"{key.business_connection_id or ''}:{key.destiny}"
+    )
+
+
+def encode_data(data: Dict[str, Any]) -> Optional[bytes]:
+    """Компактная бинарная сериализация данных FSM (пустые — NULL)."""
+    if not data:
+        return None
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_data(blob: Optional[bytes]) -> Dict[str, Any]:
+    if not blob:
+        return {}
+    return pickle.loads(blob)
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM: LRU-кэш в памяти + таблица ``fsm_storage``."""
+
+    def __init__(self, db: Database, cache_size: int = 10_000, flush_ms: int = 500) -> None:
+        """
+        Args:
+            db: Инициализированная БД
+            cache_size: Максимум ключей в LRU-кэше
+            flush_ms: Период сброса изменённых ключей в БД
+        """
+        self._db = db
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._dirty = WriteBehindBuffer(self._flush, interval=flush_ms / 1000)
+        self._started = False
+
+    async def _load(self, key: StorageKey) -> _Record:
+        db_key = _encode_key(key)
+        record = self._cache.get(db_key)
+        if record is not None:
+            self._cache.move_to_end(db_key)
+            return record
+
+        record = self._dirty.get(db_key, None)
+        if record is None:
+            row = await self._db.get_fsm_record(db_key)
+            record = _Record(row["state"], decode_data(row["data"])) if row else _Record()
+        self._remember(db_key, record)
+        return record
+
+    def _remember(self, db_key: str, record: _Record) -> None:
+        self._cache[db_key] = record
+        self._cache.move_to_end(db_key)
+        # Несброшенные и записываемые сейчас ключи _load берёт из write-behind буфера, не из БД
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _mark_dirty(self, key: StorageKey, record: _Record) -> None:
+        if not self._started:
+            self._dirty.start()
+            self._started = True
+        self._dirty.put(_encode_key(key), record)
+
+    async def _flush(self, records: Dict[str, _Record]) -> None:
+        await self._db.save_fsm_records(
+            {db_key: (record.state, encode_data(record.data)) for db_key, record in records.items()}
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._load(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._load(key)
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._load(key)).data.copy()
+
+    async def close(self) -> None:
+        """Сбросить изменённые ключи (вызывается и диспетчером, и из main)."""
+        await self._dirty.stop()
+        self._started = False
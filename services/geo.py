@@ -0,0 +1,197 @@
+"""Геоиндекс: поиск ближайших курортов и райдеров без полного перебора.
+
+Точки разложены по ячейкам сетки широта/долгота. Запрос по радиусу
+просматривает только ячейки ограничивающего прямоугольника окружности
+(с учётом полюсов и 180-го меридиана), k ближайших ищутся
+расширяющимся радиусом. Расстояния — тот же ``haversine_km``.
+"""
+import logging
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from db import Database, Resort, ResortCatalogue
+from services.resorts import haversine_km
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+Cell = Tuple[int, int]
+
+
+class GeoIndex:
+    """Сеточный индекс точек ``key -> (lat, lon)``."""
+
+    def __init__(self, cell_deg: float = 0.5) -> None:
+        """
+        Args:
+            cell_deg: Размер ячейки в градусах (0.5° ≈ 55 км по широте)
+        """
+        self._cell_deg = cell_deg
+        self._columns = math.ceil(360 / cell_deg)
+        self._cells: Dict[Cell, Dict[Hashable, Tuple[float, float]]] = {}
+        self._points: Dict[Hashable, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        row = math.floor((lat + 90) / self._cell_deg)
+        column = math.floor((lon + 180) / self._cell_deg) % self._columns
+        return row, column
+
+    def upsert(self, key: Hashable, lat: float, lon: float) -> None:
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._points[key] = cell
+
+    def remove(self, key: Hashable) -> None:
+        cell = self._points.pop(key, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def _bounds(self, lat: float, lon: float, radius_km: float) -> Tuple[range, Sequence[int]]:
+        """Строки и столбцы ячеек, покрывающих окружность радиуса ``radius_km``."""
+        delta = radius_km / EARTH_RADIUS_KM
+        lat_rad = math.radians(lat)
+        lat_min = math.degrees(lat_rad - delta)
+        lat_max = math.degrees(lat_rad + delta)
+        rows = range(
+            math.floor((max(lat_min, -90) + 90) / self._cell_deg),
+            math.floor((min(lat_max, 90) + 90) / self._cell_deg) + 1,
+        )
+
+        if lat_min <= -90 or lat_max >= 90 or math.sin(delta) >= math.cos(lat_rad):
+            # Окружность накрывает полюс — нужны все долготы
+            return rows, range(self._columns)
+        delta_lon = math.degrees(math.asin(math.sin(delta) / math.cos(lat_rad)))
+        first = math.floor((lon - delta_lon + 180) / self._cell_deg)
+        last = math.floor((lon + delta_lon + 180) / self._cell_deg)
+        if last - first + 1 >= self._columns:
+            return rows, range(self._columns)
+        return rows, [column % self._columns for column in range(first, last + 1)]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Hashable, float]]:
+        """Все точки не дальше ``radius_km``, от ближних к дальним."""
+        rows, columns = self._bounds(lat, lon, radius_km)
+        if len(rows) * len(columns) > len(self._cells):
+            # Непустых ячеек меньше, чем ячеек в прямоугольнике — дешевле обойти их
+            buckets: Iterable[Optional[dict]] = self._cells.values()
+        else:
+            buckets = (self._cells.get((row, column)) for row in rows for column in columns)
+
+        result: List[Tuple[Hashable, float]] = []
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for key, (point_lat, point_lon) in bucket.items():
+                dist = haversine_km(lat, lon, point_lat, point_lon)
+                if dist <= radius_km:
+                    result.append((key, dist))
+        result.sort(key=lambda item: item[1])
+        return result
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 1, max_km: Optional[float] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """``k`` ближайших точек (не дальше ``max_km``, если задано)."""
+        if k <= 0 or not self._points:
+            return []
+        limit = HALF_CIRCUMFERENCE_KM if max_km is None else max_km
+        radius = min(limit, self._cell_deg * 111.0)
+        while True:
+            found = self.within(lat, lon, radius)
+            # Всё, что вне радиуса, дальше любой найденной точки
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius = min(limit, radius * 2)
+
+
+class GeoDirectory:
+    """Геоиндексы бота: курорты (все и со спасателями) и райдеры.
+
+    Курорты индексируются по каталогу ``Database`` и переиндексируются
+    по ``resorts_changed``; райдеры — при старте и дальше по событию
+    ``profile_located``. Нулевые координаты, как и везде в боте, считаются
+    отсутствующими.
+    """
+
+    def __init__(self, db: Database, cell_deg: float = 0.5) -> None:
+        self._db = db
+        self._cell_deg = cell_deg
+        self._resorts: Dict[int, Resort] = {}
+        self._resort_index = GeoIndex(cell_deg)
+        self._rescue_index = GeoIndex(cell_deg)
+        self._rider_index = GeoIndex(cell_deg)
+        db.add_listener(self.handle)
+
+    async def load(self) -> None:
+        """Построить индексы по текущему содержимому БД."""
+        self._index_resorts(self._db.resort_catalogue)
+        for row in await self._db.get_profile_locations():
+            self._locate_rider(row["user_id"], row["location_lat"], row["location_lon"])
+        logger.info(f"Geo index built: resorts={len(self._resorts)}, riders={len(self._rider_index)}")
+
+    def _index_resorts(self, catalogue: ResortCatalogue) -> None:
+        resorts: Dict[int, Resort] = {}
+        resort_index = GeoIndex(self._cell_deg)
+        rescue_index = GeoIndex(self._cell_deg)
+        for resort in catalogue.resorts:
+            resorts[resort["id"]] = resort
+            resort_index.upsert(resort["id"], resort["lat"], resort["lon"])
+            if resort["rescue_phone"]:
+                rescue_index.upsert(resort["id"], resort["lat"], resort["lon"])
+        # Подмена целиком: запросы не видят наполовину построенный индекс
+        self._resorts, self._resort_index, self._rescue_index = resorts, resort_index, rescue_index
+
+    def _locate_rider(self, user_id: int, lat: Optional[float], lon: Optional[float]) -> None:
+        if lat and lon:
+            self._rider_index.upsert(user_id, lat, lon)
+        else:
+            self._rider_index.remove(user_id)
+
+    def _resort_results(self, found: List[Tuple[Hashable, float]]) -> List[Tuple[Resort, float]]:
+        return [(self._resorts[resort_id], dist) for resort_id, dist in found]
+
+    def nearest_resorts(
+        self, lat: float, lon: float, k: int = 1, rescue_only: bool = False
+    ) -> List[Tuple[Resort, float]]:
+        """``k`` ближайших курортов с расстояниями в км."""
+        index = self._rescue_index if rescue_only else self._resort_index
+        return self._resort_results(index.nearest(lat, lon, k))
+
+    def resorts_within(
+        self, lat: float, lon: float, radius_km: float, rescue_only: bool = False
+    ) -> List[Tuple[Resort, float]]:
+        """Курорты в радиусе ``radius_km``, от ближних к дальним."""
+        index = self._rescue_index if rescue_only else self._resort_index
+        return self._resort_results(index.within(lat, lon, radius_km))
+
+    def riders_within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """``(user_id, км)`` райдеров в радиусе, от ближних к дальним."""
+        return self._rider_index.within(lat, lon, radius_km)
+
+    def nearest_riders(self, lat: float, lon: float, k: int) -> List[Tuple[int, float]]:
+        return self._rider_index.nearest(lat, lon, k)
+
+    # ═══════════════════════════════════════════════════════════════════
+    # СОБЫТИЯ БД
+    # ═══════════════════════════════════════════════════════════════════
+
+    def handle(self, event: str, *args) -> None:
+        """Слушатель изменений ``Database``."""
+        if event == "profile_located":
+            self._locate_rider(*args)
+        elif event == "profile_deleted":
+            self._rider_index.remove(args[0])
+        elif event == "resorts_changed":
+            self._index_resorts(args[0])
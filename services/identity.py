@@ -0,0 +1,68 @@
+"""Кэш идентичности: telegram_id → user_id без записи на каждое обновление.
+
+Раньше каждый обработчик начинал с ``upsert_user`` — транзакция записи на
+каждое нажатие, даже если ничего не поменялось. Кэш помнит для telegram_id
+``user_id`` и имя из Telegram (LRU ограниченного размера). В БД пишем только
+для новых пользователей, при смене username/first_name и для помеченных
+недоступными: раз пользователь написал, рассылки снова ему доходят.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from db import Database
+
+
+class IdentityCache:
+    """LRU ``telegram_id → (user_id, username, first_name)`` перед таблицей users."""
+
+    def __init__(self, db: Database, size: int = 50_000) -> None:
+        """
+        Args:
+            db: БД, на события которой подписывается кэш
+            size: Сколько пользователей помнить
+        """
+        self._db = db
+        self._cache: "OrderedDict[int, Tuple[int, str, str]]" = OrderedDict()
+        self._size = max(1, size)
+        self.stats: Dict[str, int] = {"hits": 0, "reads": 0, "writes": 0}
+        db.add_listener(self.handle)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def resolve(self, telegram_id: int, username: str, first_name: str) -> int:
+        """user_id пользователя Telegram; создаёт и обновляет запись только при изменениях."""
+        cached = self._cache.get(telegram_id)
+        if cached is not None and cached[1] == username and cached[2] == first_name:
+            self._cache.move_to_end(telegram_id)
+            self.stats["hits"] += 1
+            return cached[0]
+
+        user_id = None
+        if cached is None:
+            # Не в кэше (первое обращение после старта) — чтение дешевле записи
+            self.stats["reads"] += 1
+            row = await self._db.get_user_identity(telegram_id)
+            if (
+                row is not None
+                and not row["undeliverable"]
+                and row["username"] == username
+                and row["first_name"] == first_name
+            ):
+                user_id = row["id"]
+        if user_id is None:
+            self.stats["writes"] += 1
+            user_id = await self._db.upsert_user(telegram_id, username, first_name)
+
+        self._cache[telegram_id] = (user_id, username, first_name)
+        self._cache.move_to_end(telegram_id)
+        while len(self._cache) > self._size:
+            self._cache.popitem(last=False)
+        return user_id
+
+    def handle(self, event: str, *args: Any) -> None:
+        """Слушатель ``Database``: недоступных забываем, чтобы следующее
+        обновление от них сняло пометку через ``upsert_user``."""
+        if event == "users_undeliverable":
+            for telegram_id in args[0]:
+                self._cache.pop(telegram_id, None)
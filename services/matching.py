@@ -0,0 +1,210 @@
+"""Умный матчинг: релевантность кандидата для поиска компании.
+
+``calculate_match_score`` считает одного кандидата, ``score_batch`` —
+целый колоночный блок кандидатов за один векторный проход NumPy. Оба
+дают одинаковый результат.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from services.resorts import haversine_km
+
+LEVELS = ["Новичок", "Средний", "Продвинутый"]
+EARTH_RADIUS_KM = 6371.0
+LOCATION_BONUS_KM = 100  # Дальше этого расстояния бонуса за геолокацию нет
+
+
+def calculate_match_score(
+    user_profile: dict,
+    candidate_profile: dict,
+    user_lat: float = None,
+    user_lon: float = None,
+) -> int:
+    """Расчёт релевантности кандидата (0-100)."""
+    score = 0
+    
+    # Тот же тип катания (+20)
+    if user_profile.get("ride_type") == candidate_profile.get("ride_type"):
+        score += 20
+    
+    # Тот же уровень (+15), соседний уровень (+5)
+    levels = LEVELS
+    user_level = user_profile.get("skill_level", "")
+    cand_level = candidate_profile.get("skill_level", "")
+    if user_level in levels and cand_level in levels:
+        level_diff = abs(levels.index(user_level) - levels.index(cand_level))
+        if level_diff == 0:
+            score += 15
+        elif level_diff == 1:
+            score += 5
+    
+    # Тот же город (+20)
+    if user_profile.get("city") == candidate_profile.get("city"):
+        score += 20
+    
+    # Близкий возраст (+10 если разница <5 лет)
+    user_age = user_profile.get("age", 0)
+    cand_age = candidate_profile.get("age", 0)
+    if user_age and cand_age:
+        age_diff = abs(user_age - cand_age)
+        if age_diff <= 5:
+            score += 10
+        elif age_diff <= 10:
+            score += 5
+    
+    # Близкая геолокация (+20 если <50 км)
+    if (
+        user_lat and user_lon
+        and candidate_profile.get("location_lat")
+        and candidate_profile.get("location_lon")
+    ):
+        dist = haversine_km(
+            user_lat, user_lon,
+            candidate_profile["location_lat"],
+            candidate_profile["location_lon"],
+        )
+        if dist < 10:
+            score += 20
+        elif dist < 50:
+            score += 10
+        elif dist < LOCATION_BONUS_KM:
+            score += 5
+    
+    # Есть описание (+5)
+    if candidate_profile.get("about"):
+        score += 5
+    
+    # Есть фото (+10)
+    if candidate_profile.get("photos"):
+        score += 10
+    
+    return score
+
+
+def _truthy_float(value: Any) -> float:
+    """Координата для векторного блока: «ложные» значения → NaN."""
+    return float(value) if value else np.nan
+
+
+@dataclass
+class CandidateBlock:
+    """Колоночный блок кандидатов для векторного скоринга.
+
+    Строки (тип катания, город) закодированы словарями блока, уровень —
+    индексом в ``LEVELS`` (-1 — неизвестный), пустые возраст и координаты —
+    NaN, как «ложные» значения в скалярной версии.
+    """
+
+    ride_type: np.ndarray
+    level: np.ndarray
+    city: np.ndarray
+    age: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    has_about: np.ndarray
+    has_photos: np.ndarray
+    ride_type_codes: Dict[Any, int]
+    city_codes: Dict[Any, int]
+
+    def __len__(self) -> int:
+        return len(self.age)
+
+    @classmethod
+    def from_profiles(cls, profiles: Iterable[Any]) -> "CandidateBlock":
+        ride_type_codes: Dict[Any, int] = {}
+        city_codes: Dict[Any, int] = {}
+        level_codes = {level: index for index, level in enumerate(LEVELS)}
+        ride_type: List[int] = []
+        level: List[int] = []
+        city: List[int] = []
+        age: List[float] = []
+        lat: List[float] = []
+        lon: List[float] = []
+        has_about: List[bool] = []
+        has_photos: List[bool] = []
+
+        for profile in profiles:
+            get = profile.get if isinstance(profile, dict) else dict(profile).get
+            ride_type.append(ride_type_codes.setdefault(get("ride_type"), len(ride_type_codes)))
+            city.append(city_codes.setdefault(get("city"), len(city_codes)))
+            level.append(level_codes.get(get("skill_level", ""), -1))
+            age.append(_truthy_float(get("age", 0)))
+            lat.append(_truthy_float(get("location_lat")))
+            lon.append(_truthy_float(get("location_lon")))
+            has_about.append(bool(get("about")))
+            has_photos.append(bool(get("photos")))
+
+        return cls(
+            ride_type=np.asarray(ride_type, dtype=np.int32),
+            level=np.asarray(level, dtype=np.int8),
+            city=np.asarray(city, dtype=np.int32),
+            age=np.asarray(age, dtype=np.float64),
+            lat=np.asarray(lat, dtype=np.float64),
+            lon=np.asarray(lon, dtype=np.float64),
+            has_about=np.asarray(has_about, dtype=bool),
+            has_photos=np.asarray(has_photos, dtype=bool),
+            ride_type_codes=ride_type_codes,
+            city_codes=city_codes,
+        )
+
+
+def haversine_km_batch(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Векторный ``haversine_km``: от одной точки до массива точек."""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(lat2 - lat1)
+    delta_lon = np.radians(lon2 - lon1)
+
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def score_batch(
+    user_profile: dict,
+    block: CandidateBlock,
+    user_lat: Optional[float] = None,
+    user_lon: Optional[float] = None,
+    distances: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Score всех кандидатов блока за один проход (как ``calculate_match_score``).
+
+    ``distances`` — готовые расстояния до кандидатов в км (NaN — дальше
+    100 км или нет координат), например из геоиндекса; без них расстояния
+    считаются по координатам блока.
+    """
+    scores = np.zeros(len(block), dtype=np.int64)
+
+    # Тот же тип катания (+20) и город (+20); -1 — значения нет в блоке
+    scores += 20 * (block.ride_type == block.ride_type_codes.get(user_profile.get("ride_type"), -1))
+    scores += 20 * (block.city == block.city_codes.get(user_profile.get("city"), -1))
+
+    # Тот же уровень (+15), соседний уровень (+5)
+    user_level = user_profile.get("skill_level", "")
+    if user_level in LEVELS:
+        level_diff = np.abs(block.level.astype(np.int16) - LEVELS.index(user_level))
+        known = block.level >= 0
+        scores += np.where(known & (level_diff == 0), 15, np.where(known & (level_diff == 1), 5, 0))
+
+    # Близкий возраст (+10 / +5)
+    user_age = user_profile.get("age", 0)
+    if user_age:
+        with np.errstate(invalid="ignore"):
+            age_diff = np.abs(block.age - user_age)
+            scores += np.where(age_diff <= 5, 10, np.where(age_diff <= 10, 5, 0))
+
+    # Близкая геолокация (+20 / +10 / +5)
+    if user_lat and user_lon:
+        with np.errstate(invalid="ignore"):
+            if distances is None:
+                dist = haversine_km_batch(user_lat, user_lon, block.lat, block.lon)
+            else:
+                dist = distances
+            scores += np.where(dist < 10, 20, np.where(dist < 50, 10, np.where(dist < LOCATION_BONUS_KM, 5, 0)))
+
+    # Есть описание (+5), есть фото (+10)
+    scores += 5 * block.has_about
+    scores += 10 * block.has_photos
+    return scores
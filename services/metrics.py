@@ -0,0 +1,297 @@
+"""Метрики производительности: гистограммы, счётчики, экспорт в Prometheus.
+
+``Metrics`` — реестр процесса:
+
+- ``observe(name, seconds, **labels)`` — гистограмма с фиксированными
+  корзинами (как у Prometheus), O(log корзин) на наблюдение;
+- ``inc(name, value, **labels)`` — счётчик;
+- ``gauge(name, collect)`` — значение, которое читается при экспорте
+  (глубины очередей);
+- ``render()`` — текстовый формат Prometheus для ``GET /metrics``.
+
+Время БД и Bot API внутри одного обновления копится через contextvar:
+``update_timings()`` открывает счёт в начале обновления, ``Database`` и
+middleware сессии бота добавляют в него ``add_update_time``.
+"""
+import bisect
+import html
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Корзины в секундах: от быстрых ответов из кэша до медленных внешних API
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Описания метрик для # HELP
+DESCRIPTIONS = {
+    "bot_update_seconds": "Полное время обработки обновления",
+    "bot_update_db_seconds": "Время в БД за одно обновление",
+    "bot_update_api_seconds": "Время в Bot API за одно обновление",
+    "bot_handler_seconds": "Время обработчика (по роутеру и обработчику)",
+    "bot_handler_db_seconds_total": "Время в БД внутри обработчика",
+    "bot_handler_errors_total": "Исключения обработчиков",
+    "bot_updates_unhandled_total": "Обновления, не попавшие ни в один обработчик",
+    "bot_api_seconds": "Время запроса к Bot API (по методу)",
+    "bot_api_errors_total": "Ошибки запросов к Bot API",
+    "bot_queue_depth": "Глубина очередей",
+    "bot_component_stats": "Счётчики компонентов (stats)",
+    "bot_shard_updates": "Обновлений отправлено в воркер",
+    "bot_db_method_seconds": "Время запросов по методам Database (с запуска или /dbprof reset)",
+    "bot_db_method_calls": "Запросов по методам Database (с запуска или /dbprof reset)",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "update_timings", default=None
+)
+
+
+@contextmanager
+def update_timings() -> Iterator[Dict[str, float]]:
+    """Счёт времени по видам (``db``, ``api``) для текущего обновления."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def add_update_time(kind: str, seconds: float) -> None:
+    """Добавить время к текущему обновлению (вне обновления — ничего)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[kind] = timings.get(kind, 0.0) + seconds
+
+
+def current_update_time(kind: str) -> float:
+    timings = _timings.get()
+    return timings.get(kind, 0.0) if timings else 0.0
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля: линейная интерполяция внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """Реестр метрик процесса."""
+
+    def __init__(self) -> None:
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, List[Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def gauge(self, name: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """Зарегистрировать значения, читаемые при экспорте: ``collect() -> [(labels, value)]``."""
+        self._gauges.setdefault(name, []).append(collect)
+
+    def stats(self, component: str, stats: Dict[str, float]) -> None:
+        """Экспортировать словарь ``stats`` компонента (outbound, reminders…)."""
+        self.gauge(
+            "bot_component_stats",
+            lambda: [({"component": component, "key": key}, value) for key, value in stats.items()],
+        )
+
+    def histograms(self, name: str) -> Dict[Labels, Histogram]:
+        return dict(self._histograms.get(name, {}))
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        return dict(self._counters.get(name, {}))
+
+    def gauges(self, name: str) -> List[Tuple[Dict[str, str], float]]:
+        values: List[Tuple[Dict[str, str], float]] = []
+        for collect in self._gauges.get(name, []):
+            try:
+                values.extend(collect())
+            except Exception as e:
+                logger.error(f"Gauge {name} failed: {e}")
+        return values
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str) -> None:
+            if name in DESCRIPTIONS:
+                lines.append(f"# HELP {name} {DESCRIPTIONS[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted(self._gauges):
+            header(name, "gauge")
+            for labels, value in self.gauges(name):
+                lines.append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """``GET /metrics``."""
+        return web.Response(
+            body=self.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+
+async def start_metrics_server(metrics: Metrics, host: str, port: int) -> web.AppRunner:
+    """HTTP-сервер с ``GET /metrics`` (для Prometheus, снаружи не открывать)."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics on http://{host}:{port}/metrics")
+    return runner
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} мс" if seconds < 10 else f"{seconds:.1f} с"
+
+
+def _merged(histograms: Iterable[Histogram]) -> Histogram:
+    total = Histogram()
+    for histogram in histograms:
+        total.merge(histogram)
+    return total
+
+
+def perf_report(metrics: Metrics, top: int = 10) -> str:
+    """Текст для админской ``/perf``: самые дорогие роутеры и обработчики,
+    время БД и Bot API, ошибки, очереди."""
+    handlers = metrics.histograms("bot_handler_seconds")
+    handler_db = metrics.counters("bot_handler_db_seconds_total")
+    lines = ["⏱ <b>Производительность</b> (с запуска процесса)", ""]
+
+    routers: Dict[str, Histogram] = {}
+    for labels, histogram in handlers.items():
+        routers.setdefault(dict(labels)["router"], Histogram()).merge(histogram)
+    lines.append("<b>Роутеры</b> — время всего · вызовов · p95:")
+    for router, histogram in sorted(routers.items(), key=lambda item: -item[1].sum)[:top]:
+        lines.append(f"• {html.escape(router)} — {_ms(histogram.sum)} · {histogram.count} · {_ms(histogram.quantile(0.95))}")
+
+    lines += ["", "<b>Обработчики</b> — время всего · вызовов · p95 · доля БД:"]
+    for labels, histogram in sorted(handlers.items(), key=lambda item: -item[1].sum)[:top]:
+        names = dict(labels)
+        db_share = handler_db.get(labels, 0.0) / histogram.sum if histogram.sum else 0.0
+        lines.append(
+            f"• {html.escape(names['router'])}.{html.escape(names['handler'])} — {_ms(histogram.sum)} · {histogram.count} · "
+            f"{_ms(histogram.quantile(0.95))} · {db_share:.0%}"
+        )
+
+    updates = _merged(metrics.histograms("bot_update_seconds").values())
+    if updates.count:
+        db = _merged(metrics.histograms("bot_update_db_seconds").values())
+        api = _merged(metrics.histograms("bot_update_api_seconds").values())
+        lines += [
+            "",
+            f"<b>Обновления</b>: {updates.count}, p50 {_ms(updates.quantile(0.5))}, "
+            f"p95 {_ms(updates.quantile(0.95))}; в среднем БД {_ms(db.sum / updates.count)}, "
+            f"Bot API {_ms(api.sum / updates.count)}",
+        ]
+
+    api_methods = metrics.histograms("bot_api_seconds")
+    if api_methods:
+        calls = sorted(api_methods.items(), key=lambda item: -item[1].sum)[:5]
+        lines.append(
+            "<b>Bot API</b>: "
+            + "; ".join(f"{dict(labels)['method']} {h.count} · p95 {_ms(h.quantile(0.95))}" for labels, h in calls)
+        )
+
+    handler_errors = sum(metrics.counters("bot_handler_errors_total").values())
+    api_errors = sum(metrics.counters("bot_api_errors_total").values())
+    unhandled = sum(metrics.counters("bot_updates_unhandled_total").values())
+    lines.append(f"<b>Ошибки</b>: обработчики {handler_errors:.0f}, Bot API {api_errors:.0f}, без обработчика {unhandled:.0f}")
+
+    queues = metrics.gauges("bot_queue_depth")
+    if queues:
+        lines.append("<b>Очереди</b>: " + " · ".join(f"{labels['queue']} {value:.0f}" for labels, value in queues))
+    return "\n".join(lines)
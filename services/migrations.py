@@ -0,0 +1,225 @@
+"""Версионированные миграции схемы SQLite.
+
+Миграции — файлы ``migrations/NNNN_имя.sql`` или ``NNNN_имя.py`` (с
+``async def upgrade(conn)``), применяются по возрастанию номера, каждая в
+своей транзакции. Применённые записываются в ``schema_version`` с
+контрольной суммой файла и временем выполнения, поэтому старт на
+актуальной схеме — один SELECT без DDL.
+
+SQL-миграция с первой строкой ``-- online`` может содержать только
+``CREATE INDEX``/``DROP INDEX``. На рабочей базе такие строятся в фоне
+после старта: бот уже отвечает, читатели (WAL) не ждут, записи ждут
+только на время построения индекса. Порядок при этом не меняется: в фон
+уходят только online-миграции после последней обычной, остальные
+применяются сразу. На пустой базе всё применяется сразу.
+
+Запуск (план, пробный прогон с откатом или применение):
+    python -m services.migrations [--db bot.db] [--dry-run | --apply]
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+_ONLINE_STATEMENT = re.compile(r"^(CREATE\s+(UNIQUE\s+)?INDEX|DROP\s+INDEX)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    checksum: str
+    online: bool = False
+
+    def __str__(self) -> str:
+        return f"{self.version:04d}_{self.name}{' (online)' if self.online else ''}"
+
+
+def split_statements(sql: str) -> List[str]:
+    """Разбить скрипт на законченные SQL-операторы (без пустых и комментариев)."""
+    statements = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statement = "\n".join(
+                part for part in buffer.strip().splitlines() if not part.lstrip().startswith("--")
+            ).strip()
+            if statement.rstrip(";").strip():
+                statements.append(statement)
+            buffer = ""
+    if buffer.strip() and not all(part.lstrip().startswith("--") for part in buffer.strip().splitlines()):
+        raise ValueError(f"Незаконченный SQL-оператор: {buffer.strip()[:80]}")
+    return statements
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """Миграции каталога по возрастанию номера."""
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(Path(directory).iterdir()):
+        match = _FILENAME.match(path.name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Два файла миграции с номером {version}: {migrations[version].path.name}, {path.name}")
+        source = path.read_bytes()
+        online = path.suffix == ".sql" and source.lstrip().startswith(b"-- online")
+        if online:
+            for statement in split_statements(source.decode()):
+                if not _ONLINE_STATEMENT.match(statement):
+                    raise ValueError(f"{path.name}: в online-миграции только индексы, а не {statement[:60]}")
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            path=path,
+            checksum=hashlib.sha256(source).hexdigest()[:16],
+            online=online,
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def deferred_online(pending: List[Migration]) -> List[Migration]:
+    """Online-миграции, которые можно отложить: хвост ``pending`` после
+    последней обычной (следующая обычная может зависеть от индекса или
+    удалить его таблицу)."""
+    tail: List[Migration] = []
+    for migration in reversed(pending):
+        if not migration.online:
+            break
+        tail.append(migration)
+    return tail[::-1]
+
+
+class Migrator:
+    """Применение миграций каталога к соединению."""
+
+    def __init__(self, directory: Path = MIGRATIONS_DIR) -> None:
+        self.migrations = discover(directory)
+
+    @property
+    def latest(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    async def applied(self, conn: aiosqlite.Connection) -> Dict[int, str]:
+        """Применённые версии и их контрольные суммы."""
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                duration_ms REAL NOT NULL,
+                applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        async with conn.execute("SELECT version, checksum FROM schema_version") as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+    def pending(self, applied: Dict[int, str]) -> List[Migration]:
+        """Неприменённые миграции; о правке уже применённых — предупреждение."""
+        known = {migration.version for migration in self.migrations}
+        for migration in self.migrations:
+            checksum = applied.get(migration.version)
+            if checksum is not None and checksum != migration.checksum:
+                logger.warning(f"Migration {migration} changed after it was applied")
+        unknown = sorted(set(applied) - known)
+        if unknown:
+            logger.warning(f"Database has migrations unknown to this version: {unknown}")
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    async def apply(self, conn: aiosqlite.Connection, migration: Migration) -> float:
+        """Применить миграцию в одной транзакции, вернуть секунды."""
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            elapsed = await self._run(conn, migration)
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+        logger.info(f"Migration {migration} applied in {elapsed * 1000:.1f}ms")
+        return elapsed
+
+    async def dry_run(self, conn: aiosqlite.Connection, migrations: List[Migration]) -> List[float]:
+        """Выполнить миграции в одной транзакции и откатить: время каждой."""
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            return [await self._run(conn, migration) for migration in migrations]
+        finally:
+            await conn.rollback()
+
+    async def _run(self, conn: aiosqlite.Connection, migration: Migration) -> float:
+        start = time.perf_counter()
+        if migration.path.suffix == ".sql":
+            for statement in split_statements(migration.path.read_text()):
+                await conn.execute(statement)
+        else:
+            await load_module(migration).upgrade(conn)
+        elapsed = time.perf_counter() - start
+        await conn.execute(
+            "INSERT INTO schema_version (version, name, checksum, duration_ms) VALUES (?, ?, ?, ?)",
+            (migration.version, migration.name, migration.checksum, elapsed * 1000),
+        )
+        return elapsed
+
+
+def load_module(migration: Migration):
+    """Модуль Python-миграции (``upgrade`` и данные, которые она пишет)."""
+    spec = importlib.util.spec_from_file_location(f"migrations.m{migration.version:04d}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def main(path: str, mode: str, directory: Optional[Path] = None) -> None:
+    migrator = Migrator(directory or MIGRATIONS_DIR)
+    conn = await aiosqlite.connect(path)
+    try:
+        await conn.execute("PRAGMA foreign_keys = ON")
+        applied = await migrator.applied(conn)
+        await conn.commit()
+        pending = migrator.pending(applied)
+        print(f"{path}: применённых миграций {len(applied)}, последняя в каталоге {migrator.latest:04d}")
+        if not pending:
+            print("Схема актуальна")
+            return
+        if mode == "plan":
+            for migration in pending:
+                print(f"  ожидает    {migration}")
+        elif mode == "dry-run":
+            for migration, elapsed in zip(pending, await migrator.dry_run(conn, pending)):
+                print(f"  проверена  {migration}  {elapsed * 1000:.1f} ms")
+            print("Изменения откачены")
+        else:
+            for migration in pending:
+                elapsed = await migrator.apply(conn, migration)
+                print(f"  применена  {migration}  {elapsed * 1000:.1f} ms")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Миграции схемы SQLite")
+    parser.add_argument("--db", default="bot.db")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--dry-run", action="store_true", help="выполнить ожидающие миграции и откатить")
+    group.add_argument("--apply", action="store_true", help="применить ожидающие миграции (и online)")
+    args = parser.parse_args()
+    asyncio.run(main(args.db, "apply" if args.apply else "dry-run" if args.dry_run else "plan"))
@@ -0,0 +1,248 @@
+"""Исходящие сообщения: общий диспетчер для всех рассылок и уведомлений.
+
+Никто, кроме ``OutboundDispatcher``, не вызывает ``bot.send_message`` для
+сообщений «не в ответ». Диспетчер:
+
+- держит общий темп ниже глобального лимита Telegram (~30 сообщений/с) и
+  не чаще ``chat_rate`` сообщений в секунду в один чат (token bucket);
+- раздаёт сообщения по приоритетам: мэтчи и чат раньше лайков, лайки и
+  напоминания раньше массовых рассылок;
+- на ``RetryAfter`` ставит отправку на паузу и повторяет сообщение;
+- сообщает слушателям о чатах, где бот заблокирован (``chat_blocked``);
+- отправляет параллельно несколькими воркерами.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+PRIORITY_HIGH = 0  # мэтчи, анонимный чат
+PRIORITY_NORMAL = 1  # лайки, напоминания
+PRIORITY_BULK = 2  # рассылки, погода
+
+MAX_RETRIES = 5
+
+
+class TokenBucket:
+    """Token bucket с резервированием: ``acquire`` ждёт ровно до своего токена."""
+
+    __slots__ = ("rate", "burst", "_tokens", "_updated")
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        """
+        Args:
+            rate: Токенов в секунду
+            burst: Ёмкость ведра (по умолчанию — ``rate``, но не меньше 1)
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Забрать токен, вернуть сколько секунд до его появления."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def is_full(self, now: float) -> bool:
+        """Ведро снова полное — его можно выбросить и создать заново."""
+        return self._tokens + (now - self._updated) * self.rate >= self.burst
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _Message:
+    __slots__ = ("chat_id", "text", "kwargs", "future", "priority", "attempts", "chat_slot")
+
+    def __init__(
+        self, chat_id: int, text: str, kwargs: Dict[str, Any], future: asyncio.Future, priority: int
+    ) -> None:
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.future = future
+        self.priority = priority
+        self.attempts = 0
+        self.chat_slot = False  # Токен чата уже зарезервирован
+
+
+class OutboundDispatcher:
+    """Очередь исходящих сообщений бота."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float = 25,
+        workers: int = 8,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+    ) -> None:
+        """
+        Args:
+            bot: Бот, через которого идёт отправка
+            rate: Сообщений в секунду на весь бот
+            workers: Сколько отправок одновременно в полёте
+            chat_rate: Сообщений в секунду в один чат
+            chat_burst: Сколько сообщений в чат можно отправить подряд
+        """
+        self._bot = bot
+        # Без запаса: ровный темп, ни одна секунда не превышает ``rate``
+        self._bucket = TokenBucket(rate, burst=1)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._workers_count = max(1, workers)
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, _Message]]" = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._paused_until = 0.0
+        self._outstanding = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._listeners: List[Callable[..., None]] = []
+        self.stats = {"sent": 0, "failed": 0, "blocked": 0, "retried": 0, "deferred": 0}
+
+    def add_listener(self, listener: Callable[..., None]) -> None:
+        """Подписаться на события доставки: ``listener(event, *args)``.
+
+        События: chat_blocked (chat_id) — бот заблокирован или аккаунт удалён.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, *args: Any) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event, *args)
+            except Exception as e:
+                logger.error(f"Listener failed on {event}{args}: {e}")
+
+    @property
+    def depth(self) -> int:
+        """Сообщений, ещё не отправленных (в очереди и отложенных)."""
+        return self._outstanding
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"outbound-{i}")
+                for i in range(self._workers_count)
+            ]
+
+    def send(
+        self, chat_id: int, text: str, priority: int = PRIORITY_NORMAL, **kwargs: Any
+    ) -> "asyncio.Future[bool]":
+        """Поставить сообщение в очередь.
+
+        Возвращает future: ``True`` — доставлено, ``False`` — нет. Ждать его
+        не обязательно.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._outstanding += 1
+        self._idle.clear()
+        self._enqueue(_Message(chat_id, text, kwargs, future, priority))
+        return future
+
+    def _enqueue(self, message: _Message) -> None:
+        self._queue.put_nowait((message.priority, next(self._seq), message))
+
+    def _finish(self, message: _Message, delivered: bool) -> None:
+        if not message.future.done():
+            message.future.set_result(delivered)
+        self._outstanding -= 1
+        if not self._outstanding:
+            self._idle.set()
+
+    def _chat_delay(self, chat_id: int) -> float:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10_000:
+                now = time.monotonic()
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_full(now)
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self._chat_rate, self._chat_burst)
+        return bucket.reserve()
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, message = await self._queue.get()
+            try:
+                if not message.chat_slot:
+                    message.chat_slot = True
+                    delay = self._chat_delay(message.chat_id)
+                    if delay > 0:
+                        # Чат ещё «остывает» — не держим воркер, вернём сообщение позже
+                        self.stats["deferred"] += 1
+                        loop.call_later(delay, self._enqueue, message)
+                        continue
+
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                await self._bucket.acquire()
+                await self._deliver(message)
+            except Exception as e:
+                logger.error(f"Outbound worker error for {message.chat_id}: {e}")
+                self._finish(message, False)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: _Message) -> None:
+        message.attempts += 1
+        try:
+            await self._bot.send_message(message.chat_id, message.text, **message.kwargs)
+        except TelegramRetryAfter as e:
+            # Flood control: пауза для всех отправок, сообщение — на повтор
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            if message.attempts < MAX_RETRIES:
+                self.stats["retried"] += 1
+                logger.warning(f"RetryAfter {e.retry_after}s for {message.chat_id}, retrying")
+                self._enqueue(message)
+                return
+            self.stats["failed"] += 1
+            logger.error(f"Giving up on {message.chat_id} after {message.attempts} attempts")
+            self._finish(message, False)
+            return
+        except TelegramForbiddenError as e:
+            # Повторять бесполезно: пользователь заблокировал бота
+            self.stats["failed"] += 1
+            self.stats["blocked"] += 1
+            logger.info(f"Chat {message.chat_id} is unreachable: {e.message}")
+            self._notify("chat_blocked", message.chat_id)
+            self._finish(message, False)
+            return
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Failed to send to {message.chat_id}: {e}")
+            self._finish(message, False)
+            return
+        self.stats["sent"] += 1
+        self._finish(message, True)
+
+    async def join(self) -> None:
+        """Дождаться отправки всего, что уже поставлено (включая повторы)."""
+        await self._idle.wait()
+
+    async def close(self) -> None:
+        """Доставить очередь и остановить воркеров."""
+        if self._workers:
+            await self.join()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,356 @@
+"""Профилирование запросов ``Database``: по методу и SQL, slow query log.
+
+``QueryProfiler`` считает для каждой пары (метод ``Database``, SQL):
+вызовы, суммарное время, гистограмму (p50/p95) и строки — прочитанные
+или изменённые. Запрос дольше ``slow_ms`` попадает в slow query log
+(логгер ``db.slow`` и последние записи в памяти для ``/dbprof``) вместе с
+``EXPLAIN QUERY PLAN``; план строится в фоне один раз на SQL.
+
+Как подключено:
+
+- ``track_methods`` оборачивает корутины ``Database`` и кладёт
+  имя метода в contextvar;
+- ``Database._reader`` и ``_submit_write`` отдают методам
+  ``ProfiledConnection`` — обёртку над соединением aiosqlite;
+- выключенный профайлер (``enabled = False``) не оборачивает соединения.
+
+Накладные расходы включённого — два ``perf_counter`` и поиск в словаре на
+запрос, поэтому он включён по умолчанию и переключается на лету.
+"""
+import asyncio
+import contextvars
+import functools
+import html
+import inspect
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("db.slow")
+
+# Корзины времени запроса: SQLite отвечает за десятки микросекунд
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Сколько разных SQL держать в статистике (остальные — в «прочие»)
+MAX_STATEMENTS = 500
+OTHER_STATEMENT = "<прочие>"
+
+_method: contextvars.ContextVar[str] = contextvars.ContextVar("db_method", default="<internal>")
+
+Explain = Callable[[str, Any], Awaitable[List[str]]]
+
+
+def track_method(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Запросы внутри ``func`` учитываются под её именем."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _method.set(name)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _method.reset(token)
+
+    return wrapper
+
+
+def track_methods(cls: type, exclude: Iterable[str] = ()) -> None:
+    """``track_method`` для всех корутин класса, кроме ``exclude``."""
+    for name, attr in list(vars(cls).items()):
+        if inspect.iscoroutinefunction(attr) and name not in exclude:
+            setattr(cls, name, track_method(attr))
+
+
+def current_method() -> str:
+    return _method.get()
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Одна строка, списки ``?, ?, ?`` (IN с переменной длиной) — в ``?…``."""
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?…", " ".join(sql.split()))
+
+
+class StatementStats:
+    __slots__ = ("method", "sql", "histogram", "rows")
+
+    def __init__(self, method: str, sql: str) -> None:
+        self.method = method
+        self.sql = sql
+        self.histogram = Histogram(QUERY_BUCKETS)
+        self.rows = 0
+
+    @property
+    def calls(self) -> int:
+        return self.histogram.count
+
+    @property
+    def total(self) -> float:
+        return self.histogram.sum
+
+
+class QueryProfiler:
+    """Статистика запросов и slow query log."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        slow_ms: float = 100.0,
+        explain: Optional[Explain] = None,
+        slow_log_size: int = 50,
+    ) -> None:
+        """
+        Args:
+            enabled: Считать ли запросы
+            slow_ms: Порог slow query log в миллисекундах
+            explain: ``explain(sql, params) -> строки плана`` (строит ``Database``)
+            slow_log_size: Сколько последних медленных запросов держать в памяти
+        """
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._explain = explain
+        self._statements: Dict[Tuple[str, str], StatementStats] = {}
+        self._plans: Dict[str, List[str]] = {}
+        self._explaining: Dict[str, asyncio.Task] = {}
+        self.slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+
+    def wrap(self, conn: aiosqlite.Connection, method: Optional[str] = None) -> Any:
+        """Соединение для метода (или как есть, если профайлер выключен)."""
+        if not self.enabled:
+            return conn
+        return ProfiledConnection(conn, self, method or current_method())
+
+    def reset(self) -> None:
+        self._statements.clear()
+        self.slow_log.clear()
+
+    def record(self, method: str, sql: str, elapsed: float, rows: int, params: Any = None) -> None:
+        normalized = normalize_sql(sql)
+        key = (method, normalized)
+        stats = self._statements.get(key)
+        if stats is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                key = (method, OTHER_STATEMENT)
+                stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(*key)
+        stats.histogram.observe(elapsed)
+        stats.rows += rows
+        if elapsed * 1000 >= self.slow_ms:
+            self._slow(method, sql, normalized, elapsed, rows, params)
+
+    async def join(self) -> None:
+        """Дождаться построения планов (перед закрытием пула и в тестах)."""
+        while self._explaining:
+            await asyncio.gather(*self._explaining.values(), return_exceptions=True)
+
+    def statements(self) -> List[StatementStats]:
+        """Статистика по (метод, SQL), самые дорогие по суммарному времени первыми."""
+        return sorted(self._statements.values(), key=lambda stats: -stats.total)
+
+    def plan(self, sql: str) -> Optional[List[str]]:
+        """Построенный план запроса (SQL исходный или из ``statements()``)."""
+        return self._plans.get(normalize_sql(sql))
+
+    def by_method(self) -> Dict[str, Tuple[int, float]]:
+        """Вызовов запросов и суммарное время по методам ``Database``."""
+        methods: Dict[str, Tuple[int, float]] = {}
+        for stats in self._statements.values():
+            calls, total = methods.get(stats.method, (0, 0.0))
+            methods[stats.method] = (calls + stats.calls, total + stats.total)
+        return methods
+
+    def _slow(self, method: str, sql: str, normalized: str, elapsed: float, rows: int, params: Any) -> None:
+        entry = {
+            "at": time.time(),
+            "method": method,
+            "sql": normalized,
+            "ms": elapsed * 1000,
+            "rows": rows,
+            "plan": self._plans.get(normalized),
+        }
+        self.slow_log.append(entry)
+        if entry["plan"] is not None or self._explain is None:
+            self._log_slow(entry)
+            return
+        if normalized in self._explaining:
+            self._log_slow(entry)
+            return
+        # План строится в фоне на соединении-читателе, не задерживая запрос
+        self._explaining[normalized] = asyncio.get_running_loop().create_task(
+            self._explain_and_log(entry, sql, params)
+        )
+
+    async def _explain_and_log(self, entry: Dict[str, Any], sql: str, params: Any) -> None:
+        try:
+            plan = await self._explain(sql, params)
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        finally:
+            self._explaining.pop(entry["sql"], None)
+        if len(self._plans) < MAX_STATEMENTS:
+            self._plans[entry["sql"]] = plan
+        entry["plan"] = plan
+        self._log_slow(entry)
+
+    @staticmethod
+    def _log_slow(entry: Dict[str, Any]) -> None:
+        plan = "\n".join(f"    {line}" for line in entry["plan"] or ())
+        slow_logger.warning(
+            f"Slow query {entry['ms']:.1f}ms in {entry['method']} ({entry['rows']} rows): {entry['sql']}"
+            + (f"\n{plan}" if plan else "")
+        )
+
+
+class ProfiledCursor:
+    """Курсор, считающий прочитанные строки; запрос учитывается при закрытии."""
+
+    __slots__ = ("_cursor", "_profiler", "_method", "_sql", "_params", "_start", "rows")
+
+    def __init__(
+        self, cursor: aiosqlite.Cursor, profiler: QueryProfiler, method: str, sql: str, params: Any, start: float
+    ) -> None:
+        self._cursor = cursor
+        self._profiler = profiler
+        self._method = method
+        self._sql = sql
+        self._params = params
+        self._start = start
+        self.rows = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    async def fetchone(self) -> Any:
+        row = await self._cursor.fetchone()
+        if row is not None:
+            self.rows += 1
+        return row
+
+    async def fetchmany(self, size: Optional[int] = None) -> Iterable[Any]:
+        rows = await (self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size))
+        self.rows += len(rows)
+        return rows
+
+    async def fetchall(self) -> Iterable[Any]:
+        rows = await self._cursor.fetchall()
+        self.rows += len(rows)
+        return rows
+
+    def __aiter__(self) -> Any:
+        return self._iterate()
+
+    async def _iterate(self) -> Any:
+        async for row in self._cursor:
+            self.rows += 1
+            yield row
+
+    async def close(self) -> None:
+        await self._cursor.close()
+        self._profiler.record(self._method, self._sql, time.perf_counter() - self._start, self.rows, self._params)
+
+
+class _ProfiledExecution:
+    """Как ``aiosqlite.context.Result``: можно ``await``, можно ``async with``."""
+
+    __slots__ = ("_result", "_profiler", "_method", "_sql", "_params", "_cursor")
+
+    def __init__(self, result: Any, profiler: QueryProfiler, method: str, sql: str, params: Any) -> None:
+        self._result = result
+        self._profiler = profiler
+        self._method = method
+        self._sql = sql
+        self._params = params
+        self._cursor: Optional[ProfiledCursor] = None
+
+    def __await__(self) -> Any:
+        return self._run().__await__()
+
+    async def _run(self) -> aiosqlite.Cursor:
+        # Без async with курсор не закрывают (INSERT/UPDATE): учитываем сразу,
+        # строки — rowcount
+        start = time.perf_counter()
+        cursor = await self._result
+        self._profiler.record(
+            self._method, self._sql, time.perf_counter() - start, max(cursor.rowcount, 0), self._params
+        )
+        return cursor
+
+    async def __aenter__(self) -> ProfiledCursor:
+        start = time.perf_counter()
+        cursor = await self._result
+        self._cursor = ProfiledCursor(cursor, self._profiler, self._method, self._sql, self._params, start)
+        return self._cursor
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._cursor is not None:
+            await self._cursor.close()
+
+
+class ProfiledConnection:
+    """Соединение aiosqlite, запросы которого учитываются под методом ``Database``."""
+
+    __slots__ = ("_conn", "_profiler", "_method")
+
+    def __init__(self, conn: aiosqlite.Connection, profiler: QueryProfiler, method: str) -> None:
+        self._conn = conn
+        self._profiler = profiler
+        self._method = method
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def execute(self, sql: str, parameters: Optional[Iterable[Any]] = None) -> _ProfiledExecution:
+        return _ProfiledExecution(self._conn.execute(sql, parameters), self._profiler, self._method, sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> _ProfiledExecution:
+        parameters = list(parameters)
+        return _ProfiledExecution(
+            self._conn.executemany(sql, parameters),
+            self._profiler,
+            self._method,
+            sql,
+            parameters[0] if parameters else None,
+        )
+
+
+def _short(sql: str, limit: int = 90) -> str:
+    return sql if len(sql) <= limit else sql[: limit - 1] + "…"
+
+
+def profile_report(profiler: QueryProfiler, top: int = 10, slow: int = 3) -> str:
+    """Текст для админской ``/dbprof``: самые дорогие запросы и последние медленные."""
+    state = "включено" if profiler.enabled else "выключено"
+    lines = [f"🗄 <b>Запросы к БД</b> — профилирование {state}, порог {profiler.slow_ms:g} мс", ""]
+
+    statements = profiler.statements()
+    if statements:
+        lines.append("<b>Самые дорогие</b> — время всего · вызовов · p95 · строк в среднем:")
+    for stats in statements[:top]:
+        lines.append(
+            f"• <b>{html.escape(stats.method)}</b> {stats.total * 1000:.0f} мс · {stats.calls} · "
+            f"{stats.histogram.quantile(0.95) * 1000:.1f} мс · {stats.rows / stats.calls:.1f}\n"
+            f"  <code>{html.escape(_short(stats.sql))}</code>"
+        )
+    if not statements:
+        lines.append("Запросов пока нет.")
+
+    entries = list(profiler.slow_log)[-slow:]
+    if entries:
+        lines += ["", f"<b>Медленные</b> (последние {len(entries)} из {len(profiler.slow_log)}):"]
+    for entry in reversed(entries):
+        plan = "\n".join(entry["plan"] or ["план строится…"])
+        lines.append(
+            f"• {html.escape(entry['method'])} {entry['ms']:.0f} мс, {entry['rows']} строк\n"
+            f"  <code>{html.escape(_short(entry['sql']))}</code>\n"
+            f"<pre>{html.escape(plan)}</pre>"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+"""Ограничение частоты запросов пользователей: GCRA.
+
+GCRA (generic cell rate algorithm) — token bucket, выраженный одним
+числом на пользователя: «теоретическое время прибытия» (TAT) следующего
+запроса. Запрос пропускается, если TAT опережает текущее время не больше
+чем на допуск ``interval * (burst - 1)``; проверка — O(1).
+
+``RateLimiter`` хранит TAT в ``array('d')`` по слотам, слоты освобождаются
+у пользователей, чьё ведро снова полное (TAT в прошлом): на каждом вызове
+проверяется пара слотов по кругу, плюс есть полный ``evict_idle``.
+``SharedRateLimiter`` хранит TAT в SQLite — лимит общий для всех процессов
+с одной БД.
+"""
+import time
+from array import array
+from typing import Dict, Hashable, List, Optional
+
+from db import Database
+
+
+class RateLimiter:
+    """GCRA в памяти процесса."""
+
+    def __init__(self, rate: int, period: float, burst: Optional[int] = None, sweep: int = 2) -> None:
+        """
+        Args:
+            rate: Запросов за период
+            period: Период в секундах
+            burst: Сколько запросов подряд можно без пауз (по умолчанию — ``rate``)
+            sweep: Сколько слотов проверять на простой при каждом запросе
+        """
+        self._interval = period / rate
+        self._tolerance = self._interval * (max(1, burst if burst is not None else rate) - 1)
+        self._sweep = sweep
+        self._slots: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = []
+        self._tats = array("d")
+        self._free: List[int] = []
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        """Пользователей, чьё ведро сейчас не полное (и ещё не выселенных)."""
+        return len(self._slots)
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Учесть запрос. 0 — пропустить, иначе — через сколько секунд можно."""
+        if now is None:
+            now = time.monotonic()
+        if self._sweep:
+            self._evict_some(now)
+        slot = self._slots.get(key)
+        tat = now if slot is None else max(self._tats[slot], now)
+        if tat - now > self._tolerance:
+            return tat - self._tolerance - now
+
+        if slot is None:
+            slot = self._allocate(key)
+        self._tats[slot] = tat + self._interval
+        return 0.0
+
+    async def acquire(self, key: Hashable) -> float:
+        return self.hit(key)
+
+    def _allocate(self, key: Hashable) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._tats.append(0.0)
+        self._slots[key] = slot
+        return slot
+
+    def _release(self, slot: int) -> None:
+        del self._slots[self._keys[slot]]
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def _evict_some(self, now: float) -> None:
+        size = len(self._keys)
+        for _ in range(min(self._sweep, size)):
+            if self._cursor >= size:
+                self._cursor = 0
+            slot = self._cursor
+            self._cursor += 1
+            if self._keys[slot] is not None and self._tats[slot] <= now:
+                self._release(slot)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Выселить всех, чьё ведро полное. Возвращает сколько выселено."""
+        if now is None:
+            now = time.monotonic()
+        evicted = 0
+        for slot, key in enumerate(self._keys):
+            if key is not None and self._tats[slot] <= now:
+                self._release(slot)
+                evicted += 1
+        return evicted
+
+
+class SharedRateLimiter:
+    """GCRA в SQLite: одна атомарная UPSERT на запрос, общий лимит для процессов."""
+
+    def __init__(
+        self,
+        db: Database,
+        namespace: str,
+        rate: int,
+        period: float,
+        burst: Optional[int] = None,
+        cleanup_every: float = 300.0,
+    ) -> None:
+        """
+        Args:
+            db: База данных
+            namespace: Префикс ключей (отдельные лимиты для сообщений и кнопок)
+            rate: Запросов за период
+            period: Период в секундах
+            burst: Сколько запросов подряд можно без пауз (по умолчанию — ``rate``)
+            cleanup_every: Как часто удалять записи простаивающих пользователей
+        """
+        self._db = db
+        self._namespace = namespace
+        self._interval = period / rate
+        self._tolerance = self._interval * (max(1, burst if burst is not None else rate) - 1)
+        self._cleanup_every = cleanup_every
+        self._next_cleanup = 0.0
+
+    async def acquire(self, key: Hashable) -> float:
+        """Учесть запрос. 0 — пропустить, иначе — через сколько секунд можно."""
+        # Время стены, а не monotonic: оно общее для процессов
+        now = time.time()
+        retry_after = await self._db.rate_limit_hit(
+            f"{self._namespace}:{key}", now, self._interval, self._tolerance
+        )
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self._cleanup_every
+            await self._db.cleanup_rate_limits(now)
+        return retry_after
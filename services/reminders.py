@@ -0,0 +1,142 @@
+"""Планировщик напоминаний о событиях.
+
+Неотправленные напоминания загружаются в min-heap по времени при старте,
+новые попадают туда по событию ``reminder_added`` от ``Database``.
+Планировщик спит ровно до ближайшего напоминания (или до нового, если оно
+раньше) и отправляет наступившие пачкой — БД трогается только когда есть
+что отправить.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from db import Database
+from services.outbound import OutboundDispatcher
+
+logger = logging.getLogger(__name__)
+
+REMIND_AT_FORMAT = "%Y-%m-%d %H:%M"
+# Не спать дольше: переход часов или перевод времени не сдвинет напоминания надолго
+MAX_SLEEP = 60.0
+# Через сколько секунд повторить недоставленное напоминание
+RETRY_DELAY = 3600.0
+
+
+def reminder_text(reminder: Any) -> str:
+    return (
+        f"🔔 <b>Напоминание!</b>\n\n"
+        f"Завтра событие на {reminder['resort_name']}!\n"
+        f"📆 {reminder['event_date']}\n\n"
+        f"👥 Группа: {reminder['telegram_group_link']}"
+    )
+
+
+def parse_remind_at(remind_at: str) -> float:
+    """``remind_at`` (локальное время) -> unix time; битые значения — «сейчас»."""
+    try:
+        return datetime.strptime(remind_at, REMIND_AT_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        logger.warning(f"Bad remind_at {remind_at!r}, sending now")
+        return time.time()
+
+
+class ReminderScheduler:
+    """Min-heap ``(время, reminder_id)`` и задача, отправляющая наступившие."""
+
+    def __init__(self, db: Database, outbound: OutboundDispatcher) -> None:
+        self._db = db
+        self._outbound = outbound
+        self._heap: List[Tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self.stats = {"scheduled": 0, "sent": 0, "failed": 0, "lag_max": 0.0}
+        db.add_listener(self.handle)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def load(self) -> None:
+        """Загрузить все неотправленные напоминания."""
+        for row in await self._db.get_scheduled_reminders():
+            self.schedule(row["id"], parse_remind_at(row["remind_at"]))
+        logger.info(f"Reminder scheduler loaded {len(self._heap)} reminders")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="reminders")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    def schedule(self, reminder_id: int, at: float) -> None:
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (at, reminder_id))
+        self.stats["scheduled"] += 1
+        if earliest is None or at < earliest:
+            # Новое напоминание раньше того, до которого спим
+            self._wakeup.set()
+
+    def handle(self, event: str, *args) -> None:
+        """Слушатель изменений ``Database``."""
+        if event == "reminder_added":
+            reminder_id, remind_at = args
+            self.schedule(reminder_id, parse_remind_at(remind_at))
+
+    def _pop_due(self, now: float) -> List[Tuple[float, int]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            due = self._pop_due(now)
+            if due:
+                task = asyncio.create_task(self._deliver(due))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+                continue
+
+            self._wakeup.clear()
+            timeout = min(self._heap[0][0] - now, MAX_SLEEP) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, due: Iterable[Tuple[float, int]]) -> None:
+        due_at = {reminder_id: at for at, reminder_id in due}
+        try:
+            reminders = await self._db.get_due_reminders(due_at)
+            results = await asyncio.gather(
+                *(self._outbound.send(reminder["telegram_id"], reminder_text(reminder)) for reminder in reminders)
+            )
+        except Exception as e:
+            logger.error(f"Reminder delivery failed: {e}")
+            retry_at = time.time() + RETRY_DELAY
+            for reminder_id in due_at:
+                self.schedule(reminder_id, retry_at)
+            return
+
+        sent_ids = []
+        now = time.time()
+        for reminder, delivered in zip(reminders, results):
+            if delivered:
+                sent_ids.append(reminder["id"])
+                self.stats["lag_max"] = max(self.stats["lag_max"], now - due_at[reminder["id"]])
+            else:
+                logger.error(f"Failed to send reminder {reminder['id']}")
+                self.schedule(reminder["id"], now + RETRY_DELAY)
+        self.stats["sent"] += len(sent_ids)
+        self.stats["failed"] += len(results) - len(sent_ids)
+        if sent_ids:
+            await self._db.mark_reminders_sent(sent_ids)
@@ -0,0 +1,341 @@
+"""Шардирование обработки обновлений по процессам.
+
+Фронт-процесс получает обновления (polling или webhook) и отправляет каждое
+в воркер-процесс по хэшу ``from_user.id``. Все обновления пользователя
+попадают в один воркер и обрабатываются там по порядку, разные
+пользователи — параллельно и на разных ядрах.
+
+Общее состояние:
+
+- FSM, rate limit, очередь кандидатов пользователя живут в том воркере,
+  куда всегда приходит этот пользователь, — кэши в памяти остаются верными;
+- всё остальное — в SQLite (WAL, ``busy_timeout``);
+- события ``Database`` (лайки, анкеты, блокировки, напоминания) воркер
+  пересылает фронту, фронт — остальным воркерам (``EventBridge``), и их
+  кэши и индексы инвалидируются так же, как в одном процессе.
+
+Протокол между фронтом и воркером — JSON по строке на сообщение через
+socketpair: ``{"update": {...}}`` и ``{"event": "...", "args": [...]}``.
+
+Упавший воркер фронт перезапускает с тем же номером (обновления, которые
+тот уже принял, теряются); после ``max_restarts`` перезапусков шарда фронт
+останавливается с ``ShardError``.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import zlib
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from db import Database
+
+if TYPE_CHECKING:
+    # aiogram тяжёлый при импорте, а воркеру-процессу он нужен только свой
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина строки протокола (обновление с длинным текстом и entities)
+LINE_LIMIT = 4 * 1024 * 1024
+
+# События, которые не пересылаются: каталог курортов каждый процесс читает сам
+LOCAL_EVENTS = {"resorts_changed"}
+
+Feed = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class ShardError(RuntimeError):
+    """Воркер-процесс упал и больше не перезапускается."""
+
+
+def update_user_id(update: Dict[str, Any]) -> Optional[int]:
+    """``from.id`` (или id чата) из сырого обновления Telegram."""
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        sender = value.get("from") or value.get("user")
+        if sender:
+            return sender["id"]
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return None
+
+
+def shard_for(user_id: Optional[int], shards: int) -> int:
+    """Номер воркера для пользователя (стабилен между перезапусками)."""
+    if user_id is None or shards <= 1:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % shards
+
+
+class KeyedSerializer:
+    """Выполняет задачи с одним ключом по очереди, с разными — параллельно.
+
+    Не больше ``max_inflight`` задач одновременно: ``submit`` ждёт места,
+    и воркер перестаёт читать сокет — фронт упирается в ``drain()``.
+    """
+
+    def __init__(self, max_inflight: int = 256) -> None:
+        self._tails: Dict[Any, asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._tasks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def submit(self, key: Any, job: Callable[[], Awaitable[Any]]) -> None:
+        await self._slots.acquire()
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._run(previous, job))
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._release(key, done))
+
+    def _release(self, key: Any, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+        self._slots.release()
+
+    async def _run(self, previous: Optional[asyncio.Task], job: Callable[[], Awaitable[Any]]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await job()
+        except Exception as e:
+            logger.error(f"Shard job failed: {e}")
+
+    async def join(self) -> None:
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+
+class ShardChannel:
+    """Сторона воркера: читает обновления и события, отправляет события."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, sock: socket.socket) -> "ShardChannel":
+        reader, writer = await asyncio.open_unix_connection(sock=sock, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if not self._writer.is_closing():
+            self._writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+
+    async def serve(
+        self,
+        feed: Feed,
+        on_event: Optional[Callable[[str, List[Any]], None]] = None,
+        max_inflight: int = 256,
+    ) -> None:
+        """Обрабатывать входящие до закрытия канала фронтом, затем доработать."""
+        serializer = KeyedSerializer(max_inflight)
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            update = message.get("update")
+            if update is not None:
+                await serializer.submit(update_user_id(update), lambda update=update: feed(update))
+            elif on_event is not None:
+                on_event(message["event"], message.get("args", []))
+        await serializer.join()
+        self._writer.close()
+
+
+class EventBridge:
+    """Пересылает события ``Database`` этого процесса в канал и применяет чужие."""
+
+    def __init__(self, db: Database, channel: ShardChannel) -> None:
+        self._db = db
+        self._channel = channel
+        self._applying = False
+        db.add_listener(self.handle)
+
+    def handle(self, event: str, *args: Any) -> None:
+        if self._applying or event in LOCAL_EVENTS:
+            return
+        self._channel.send({"event": event, "args": list(args)})
+
+    def apply(self, event: str, args: Sequence[Any]) -> None:
+        """Событие из другого процесса — слушателям этого, без пересылки назад."""
+        self._applying = True
+        try:
+            self._db.emit(event, *args)
+        finally:
+            self._applying = False
+
+
+class _Shard:
+    def __init__(self, index: int, process: Any, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.index = index
+        self.process = process
+        self.reader = reader
+        self.writer = writer
+        self.relay: Optional[asyncio.Task] = None
+        self.restarts = 0
+
+
+class ShardRouter:
+    """Фронт: запускает воркеров, раздаёт им обновления, пересылает события."""
+
+    def __init__(
+        self,
+        workers: int,
+        target: Callable[[int, socket.socket], None],
+        on_event: Optional[Callable[[int, str, List[Any]], None]] = None,
+        max_restarts: int = 3,
+    ) -> None:
+        """
+        Args:
+            workers: Сколько воркер-процессов
+            target: Точка входа воркера ``target(index, sock)`` (модульная функция)
+            on_event: Дополнительный слушатель событий воркеров во фронте
+            max_restarts: Сколько раз перезапускать упавший шард, потом ``ShardError``
+        """
+        self._workers = max(1, workers)
+        self._target = target
+        self._on_event = on_event
+        self._max_restarts = max_restarts
+        self._shards: List[_Shard] = []
+        self._respawn_lock = asyncio.Lock()
+        self._closing = False
+        self._failed: Optional[ShardError] = None
+        self.stats = {"routed": [0] * self._workers, "restarts": [0] * self._workers, "events": 0}
+
+    async def start(self) -> None:
+        for index in range(self._workers):
+            self._shards.append(await self._spawn(index))
+        logger.info(f"Started {self._workers} shard workers")
+
+    async def _spawn(self, index: int) -> _Shard:
+        context = multiprocessing.get_context("spawn")
+        parent, child = socket.socketpair()
+        process = context.Process(target=self._target, args=(index, child), name=f"shard-{index}")
+        process.start()
+        child.close()
+        reader, writer = await asyncio.open_unix_connection(sock=parent, limit=LINE_LIMIT)
+        shard = _Shard(index, process, reader, writer)
+        shard.relay = asyncio.create_task(self._relay(shard), name=f"shard-relay-{index}")
+        return shard
+
+    async def route(self, update: Dict[str, Any]) -> None:
+        """Отправить сырое обновление в воркер его пользователя."""
+        if self._failed is not None:
+            raise self._failed
+        index = shard_for(update_user_id(update), self._workers)
+        line = json.dumps({"update": update}, ensure_ascii=False).encode() + b"\n"
+        shard = self._shards[index]
+        if shard.writer.is_closing():
+            shard = await self._respawn(shard)
+        try:
+            shard.writer.write(line)
+            # Воркер не успевает — ждём, пока он вычитает сокет
+            await shard.writer.drain()
+        except ConnectionError:
+            # Воркер упал между проверкой и записью: повторяем в новый
+            shard = await self._respawn(shard)
+            shard.writer.write(line)
+            await shard.writer.drain()
+        self.stats["routed"][index] += 1
+
+    async def _respawn(self, dead: _Shard) -> _Shard:
+        """Заменить упавший воркер новым с тем же номером (один раз на падение)."""
+        async with self._respawn_lock:
+            if self._failed is not None:
+                raise self._failed
+            current = self._shards[dead.index]
+            if current is not dead:
+                return current
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, dead.process.join, 5.0)
+            if dead.process.is_alive():
+                dead.process.terminate()
+                await loop.run_in_executor(None, dead.process.join)
+            dead.writer.close()
+            exitcode = dead.process.exitcode
+            if self._closing:
+                raise ShardError(f"Shard {dead.index} exited with code {exitcode} during shutdown")
+            if dead.restarts >= self._max_restarts:
+                self._failed = ShardError(
+                    f"Shard {dead.index} exited with code {exitcode} after {dead.restarts} restarts, giving up"
+                )
+                logger.critical(str(self._failed))
+                raise self._failed
+            logger.error(
+                f"Shard {dead.index} (pid {dead.process.pid}) exited with code {exitcode}, restarting; "
+                "updates it had accepted are lost"
+            )
+            shard = await self._spawn(dead.index)
+            shard.restarts = dead.restarts + 1
+            self.stats["restarts"][dead.index] += 1
+            self._shards[dead.index] = shard
+            return shard
+
+    async def _relay(self, source: _Shard) -> None:
+        while True:
+            line = await source.reader.readline()
+            if not line:
+                # Канал закрыт не фронтом — воркер упал
+                if not self._closing:
+                    try:
+                        await self._respawn(source)
+                    except ShardError:
+                        pass
+                return
+            self.stats["events"] += 1
+            for shard in self._shards:
+                if shard is not source and not shard.writer.is_closing():
+                    shard.writer.write(line)
+            if self._on_event is not None:
+                message = json.loads(line)
+                self._on_event(source.index, message["event"], message.get("args", []))
+
+    async def poll(self, bot: "Bot", allowed_updates: Optional[List[str]] = None, timeout: int = 30) -> None:
+        """Long polling во фронте: обновления не разбираются, а раздаются воркерам."""
+        offset: Optional[int] = None
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset,
+                    timeout=timeout,
+                    allowed_updates=allowed_updates,
+                    request_timeout=timeout + 10,
+                )
+            except Exception as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if self._failed is not None:
+                raise self._failed
+            for update in updates:
+                await self.route(update.model_dump(mode="json", by_alias=True, exclude_unset=True))
+                offset = update.update_id + 1
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Закрыть каналы: воркеры дорабатывают принятое и завершаются."""
+        self._closing = True
+        # Перезапуск, начатый до закрытия, должен успеть положить шард в список
+        async with self._respawn_lock:
+            pass
+        for shard in self._shards:
+            shard.writer.write_eof()
+        loop = asyncio.get_running_loop()
+        for shard in self._shards:
+            await loop.run_in_executor(None, shard.process.join, timeout)
+            if shard.process.is_alive():
+                logger.warning(f"Shard {shard.index} did not stop in {timeout}s, terminating")
+                shard.process.terminate()
+            shard.writer.close()
+            if shard.relay is not None:
+                shard.relay.cancel()
+        await asyncio.gather(*(shard.relay for shard in self._shards if shard.relay), return_exceptions=True)
+        self._shards = []
@@ -1,37 +1,179 @@
+"""Погода с OpenWeatherMap.
+
+``WeatherService`` держит один пул соединений на весь бот, кэширует погоду
+по координатам на ``ttl`` секунд и склеивает одновременные промахи в один
+запрос к API (single-flight). Устаревшие, но не старше ``stale_ttl``
+данные отдаются, если обновление не успело за ``revalidate_timeout``.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
 import httpx
-from typing import Optional
-
-
-async def get_weather(lat: float, lon: float, api_key: str) -> Optional[dict]:
-    """Get current weather from OpenWeatherMap API."""
-    if not api_key:
-        return None
-    
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": api_key,
-        "units": "metric",
-        "lang": "ru",
+
+logger = logging.getLogger(__name__)
+
+OWM_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+Key = Tuple[float, float]
+
+
+class _Entry:
+    __slots__ = ("weather", "fetched_at")
+
+    def __init__(self, weather: dict, fetched_at: float) -> None:
+        self.weather = weather
+        self.fetched_at = fetched_at
+
+
+def parse_weather(data: dict) -> dict:
+    """Ответ OpenWeatherMap → словарь для ``format_weather``."""
+    return {
+        "temp": round(data["main"]["temp"]),
+        "feels_like": round(data["main"]["feels_like"]),
+        "description": data["weather"][0]["description"],
+        "wind": round(data["wind"]["speed"]),
+        "humidity": data["main"]["humidity"],
+        "icon": get_weather_emoji(data["weather"][0]["icon"]),
     }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, params=params, timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                return {
-                    "temp": round(data["main"]["temp"]),
-                    "feels_like": round(data["main"]["feels_like"]),
-                    "description": data["weather"][0]["description"],
-                    "wind": round(data["wind"]["speed"]),
-                    "humidity": data["main"]["humidity"],
-                    "icon": get_weather_emoji(data["weather"][0]["icon"]),
-                }
-    except Exception:
-        pass
-    return None
+
+
+class WeatherService:
+    """Кэширующий клиент OpenWeatherMap."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = OWM_URL,
+        ttl: float = 600,
+        stale_ttl: float = 3600,
+        revalidate_timeout: float = 0.5,
+        timeout: float = 5,
+        max_connections: int = 20,
+    ) -> None:
+        """
+        Args:
+            api_key: Ключ OpenWeatherMap (пустой — погода отключена)
+            base_url: Адрес метода ``weather`` (для тестов — фейковый сервер)
+            ttl: Сколько секунд погода считается свежей
+            stale_ttl: До какого возраста устаревшие данные ещё можно показать
+            revalidate_timeout: Сколько ждать обновления, имея устаревшие данные
+            timeout: Таймаут запроса к API
+            max_connections: Размер пула соединений
+        """
+        self._api_key = api_key
+        self._base_url = base_url
+        self._ttl = ttl
+        self._stale_ttl = max(stale_ttl, ttl)
+        self._revalidate_timeout = revalidate_timeout
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: Dict[Key, _Entry] = {}
+        self._inflight: Dict[Key, asyncio.Task] = {}
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "upstream": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._api_key)
+
+    @staticmethod
+    def _key(lat: float, lon: float) -> Key:
+        return round(lat, 4), round(lon, 4)
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_connections,
+                ),
+            )
+        return self._client
+
+    async def get(self, lat: float, lon: float) -> Optional[dict]:
+        """Текущая погода в точке или ``None``, если её не удалось получить."""
+        if not self._api_key:
+            return None
+        key = self._key(lat, lon)
+        entry = self._cache.get(key)
+        age = time.monotonic() - entry.fetched_at if entry else None
+
+        if age is not None and age < self._ttl:
+            self.stats["hits"] += 1
+            return entry.weather
+
+        task = self._refresh(key, lat, lon)
+        if age is not None and age < self._stale_ttl:
+            # Есть устаревшие данные: ждём обновление недолго, иначе отдаём их
+            try:
+                weather = await asyncio.wait_for(asyncio.shield(task), self._revalidate_timeout)
+            except asyncio.TimeoutError:
+                weather = None
+            if weather is None:
+                self.stats["stale"] += 1
+                return entry.weather
+            return weather
+
+        self.stats["misses"] += 1
+        return await asyncio.shield(task)
+
+    async def get_many(
+        self, points: Dict[Hashable, Tuple[float, float]], concurrency: int = 8
+    ) -> Dict[Hashable, Optional[dict]]:
+        """Погода для многих точек сразу, не больше ``concurrency`` запросов одновременно."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(lat: float, lon: float) -> Optional[dict]:
+            async with semaphore:
+                return await self.get(lat, lon)
+
+        names = list(points)
+        results = await asyncio.gather(*(fetch_one(*points[name]) for name in names))
+        return dict(zip(names, results))
+
+    def _refresh(self, key: Key, lat: float, lon: float) -> asyncio.Task:
+        """Запрос к API для ключа — один на все одновременные промахи."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, lat, lon), name=f"weather-{key}")
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key: Key, lat: float, lon: float) -> Optional[dict]:
+        self.stats["upstream"] += 1
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "appid": self._api_key,
+            "units": "metric",
+            "lang": "ru",
+        }
+        try:
+            resp = await self._http().get(self._base_url, params=params)
+            if resp.status_code != 200:
+                self.stats["errors"] += 1
+                logger.warning(f"Weather API returned {resp.status_code} for {key}")
+                return None
+            weather = parse_weather(resp.json())
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Weather API request for {key} failed: {e!r}")
+            return None
+        self._cache[key] = _Entry(weather, time.monotonic())
+        return weather
+
+    async def close(self) -> None:
+        """Отменить незавершённые запросы и закрыть пул соединений."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 
 def get_weather_emoji(icon_code: str) -> str:
@@ -50,6 +192,12 @@ def get_weather_emoji(icon_code: str) -> str:
     return icons.get(icon_code, "🌤️")
 
 
+def is_snowing(weather: dict) -> bool:
+    """Идёт ли снег (описание приходит на русском: ``lang=ru``)."""
+    description = weather.get("description", "").lower()
+    return "снег" in description or "snow" in description
+
+
 def format_weather(weather: dict) -> str:
     """Format weather data for display."""
     return (
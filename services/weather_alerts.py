@@ -0,0 +1,70 @@
+"""Утренние уведомления о снеге подписчикам курортов.
+
+Один прогон: подписчики всех курортов — одним запросом, погода по
+подписанным курортам — параллельно (не больше ``concurrency`` запросов к
+API), сообщения — в ``OutboundDispatcher``, который сам держит темп.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from db import Database
+from services.outbound import PRIORITY_BULK, OutboundDispatcher
+from services.weather import WeatherService, format_weather, is_snowing
+
+logger = logging.getLogger(__name__)
+
+
+def snow_alert_text(resort: dict, weather: dict) -> str:
+    return (
+        f"❄️ <b>Снег на {resort['name']}!</b>\n\n"
+        f"{format_weather(weather)}\n\n"
+        "Отличный день для катания!"
+    )
+
+
+async def run_snow_alerts(
+    db: Database,
+    weather_service: WeatherService,
+    outbound: OutboundDispatcher,
+    concurrency: int = 8,
+) -> Dict[str, float]:
+    """Разослать уведомления о снеге и вернуть статистику прогона."""
+    start = time.perf_counter()
+    subscribers = await db.get_weather_subscribers_by_resort()
+    catalogue = db.resort_catalogue
+    resorts = [catalogue.by_id[resort_id] for resort_id in subscribers if resort_id in catalogue.by_id]
+
+    weather = await weather_service.get_many(
+        {resort["id"]: (resort["lat"], resort["lon"]) for resort in resorts},
+        concurrency=concurrency,
+    )
+    fetched = time.perf_counter()
+
+    deliveries = []
+    alerts = 0
+    for resort in resorts:
+        resort_weather = weather.get(resort["id"])
+        if not resort_weather or not is_snowing(resort_weather):
+            continue
+        alerts += 1
+        text = snow_alert_text(resort, resort_weather)
+        deliveries.extend(outbound.send(telegram_id, text, priority=PRIORITY_BULK) for telegram_id in subscribers[resort["id"]])
+
+    delivered = sum(await asyncio.gather(*deliveries))
+    elapsed = time.perf_counter() - start
+    stats = {
+        "resorts": len(resorts),
+        "alerts": alerts,
+        "messages": len(deliveries),
+        "delivered": delivered,
+        "fetch_seconds": fetched - start,
+        "seconds": elapsed,
+        "messages_per_second": len(deliveries) / elapsed if elapsed else 0.0,
+    }
+    logger.info(
+        f"Snow alerts: {alerts}/{len(resorts)} resorts, {delivered}/{len(deliveries)} delivered "
+        f"in {elapsed:.2f}s (weather {stats['fetch_seconds']:.2f}s)"
+    )
+    return stats
@@ -0,0 +1,227 @@
+"""Webhook-режим: приём обновлений по HTTP (aiohttp) вместо long polling.
+
+Telegram присылает обновления POST-запросами на ``WEBHOOK_URL``.
+Обработчик:
+
+- проверяет ``X-Telegram-Bot-Api-Secret-Token``;
+- кладёт обновление в ограниченную очередь и сразу отвечает 200 — если
+  очередь полна, отвечает 429, и Telegram повторит доставку позже;
+- обрабатывает очередь несколькими воркерами;
+- при остановке перестаёт принимать (503) и дорабатывает очередь.
+
+``GET /health`` — для балансировщика: 200, пока приём открыт, 503 при
+остановке.
+"""
+import asyncio
+import logging
+import signal
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook-обработчик aiogram с ограниченной очередью и воркерами."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        queue_size: int = 1000,
+        workers: int = 16,
+        drain_timeout: float = 30.0,
+        process: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        **data: Any,
+    ) -> None:
+        """
+        Args:
+            dispatcher: Диспетчер aiogram
+            bot: Бот
+            secret_token: Ожидаемый ``X-Telegram-Bot-Api-Secret-Token``
+            queue_size: Сколько обновлений может ждать обработки
+            workers: Сколько обновлений обрабатывается одновременно
+            drain_timeout: Сколько секунд дорабатывать очередь при остановке
+            process: Что делать с сырым обновлением вместо ``dispatcher``
+                (фронт шардирования раздаёт их воркерам)
+        """
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max(1, queue_size))
+        self._workers_count = max(1, workers)
+        self._workers: List[asyncio.Task] = []
+        self._drain_timeout = drain_timeout
+        self._process = process
+        self.accepting = False
+        self.stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    @property
+    def depth(self) -> int:
+        """Обновлений в очереди."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"webhook-{i}") for i in range(self._workers_count)
+            ]
+        self.accepting = True
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if not self.accepting:
+            return web.Response(status=503, text="Shutting down")
+        if self._queue.full():
+            # Backpressure: Telegram повторит доставку, обновление не потеряется
+            self.stats["rejected"] += 1
+            return web.Response(status=429, text="Too Many Requests")
+        update = await request.json(loads=bot.session.json_loads)
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return web.Response(status=429, text="Too Many Requests")
+        self.stats["accepted"] += 1
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _work(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                if self._process is not None:
+                    await self._process(update)
+                else:
+                    await self._background_feed_update(self.bot, update)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Webhook update {update.get('update_id')} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self) -> None:
+        """Закрыть приём и доработать очередь.
+
+        Сессию бота не закрываем: ей ещё пользуются рассылки при остановке,
+        закрывает её ``bot.main``.
+        """
+        self.accepting = False
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), self._drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Webhook drain timed out, {self.depth} updates dropped")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Webhook handler closed: {self.stats}")
+
+    async def health(self, request: web.Request) -> web.Response:
+        """``GET /health``: состояние приёма и глубина очереди."""
+        return web.json_response(
+            {"status": "ok" if self.accepting else "draining", "queue": self.depth, **self.stats},
+            status=200 if self.accepting else 503,
+        )
+
+
+class WebhookServer:
+    """aiohttp-приложение с webhook-обработчиком и ``/health``."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        path: str = "/webhook",
+        secret_token: Optional[str] = None,
+        queue_size: int = 1000,
+        workers: int = 16,
+        process: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+        metrics: Optional[Metrics] = None,
+        **data: Any,
+    ) -> None:
+        self.handler = QueuedRequestHandler(
+            dispatcher,
+            bot,
+            secret_token=secret_token,
+            queue_size=queue_size,
+            workers=workers,
+            process=process,
+            **data,
+        )
+        self.app = web.Application()
+        self.handler.register(self.app, path=path)
+        self.app.router.add_get("/health", self.handler.health)
+        setup_application(self.app, dispatcher, bot=bot, **data)
+        if metrics is not None:
+            metrics.gauge("bot_queue_depth", lambda: [({"queue": "webhook"}, self.handler.depth)])
+            metrics.stats("webhook", self.handler.stats)
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8080) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.handler.start()
+        logger.info(f"Webhook server listening on {host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Остановить: приём закрывается, очередь дорабатывается."""
+        if self._runner is not None:
+            # Сначала 503 на новые запросы, затем on_shutdown -> handler.close()
+            self.handler.accepting = False
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    url: str,
+    secret_token: str,
+    path: str = "/webhook",
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    queue_size: int = 1000,
+    workers: int = 16,
+    process: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+    metrics: Optional[Metrics] = None,
+) -> None:
+    """Зарегистрировать webhook и обслуживать его до SIGTERM/SIGINT."""
+    server = WebhookServer(
+        dispatcher,
+        bot,
+        path=path,
+        secret_token=secret_token,
+        queue_size=queue_size,
+        workers=workers,
+        process=process,
+        metrics=metrics,
+    )
+    await server.start(host, port)
+    await bot.set_webhook(
+        url,
+        secret_token=secret_token,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=100,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping webhook server")
+        await server.stop()
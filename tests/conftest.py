@@ -1,5 +1,8 @@
 """Конфигурация pytest."""
 import pytest
+import pytest_asyncio
+
+from db import Database
 
 
 @pytest.fixture
@@ -35,3 +38,12 @@ def sample_resort():
         "lifts_count": 5,
         "rescue_phone": "+71234567890",
     }
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path):
+    """Инициализированная БД во временном файле."""
+    database = Database(str(tmp_path / "test.db"), pool_size=2)
+    await database.init()
+    yield database
+    await database.close()
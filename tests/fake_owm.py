@@ -0,0 +1,66 @@
+"""Локальный фейковый OpenWeatherMap для тестов и бенчмарков.
+
+    async with FakeOpenWeatherMap(delay=0.05) as owm:
+        service = WeatherService("key", base_url=owm.url)
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+
+class FakeOpenWeatherMap:
+    """aiohttp-сервер с методом ``/data/2.5/weather``.
+
+    Считает запросы (всего и по координатам), умеет отвечать с задержкой,
+    ошибкой и заданным описанием погоды для отдельных точек.
+    """
+
+    def __init__(self, delay: float = 0.0, description: str = "ясно") -> None:
+        self.delay = delay
+        self.description = description
+        self.status = 200
+        self.descriptions: Dict[Tuple[float, float], str] = {}
+        self.requests = 0
+        self.by_point: Dict[Tuple[float, float], int] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def _weather(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        point = (float(request.query["lat"]), float(request.query["lon"]))
+        self.by_point[point] = self.by_point.get(point, 0) + 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.json_response({"cod": self.status, "message": "fake error"}, status=self.status)
+        if not request.query.get("appid"):
+            return web.json_response({"cod": 401, "message": "Invalid API key"}, status=401)
+        return web.json_response({
+            "weather": [{"description": self.descriptions.get(point, self.description), "icon": "13d"}],
+            "main": {"temp": -7.4, "feels_like": -12.2, "humidity": 81},
+            "wind": {"speed": 3.6},
+            "coord": {"lat": point[0], "lon": point[1]},
+        })
+
+    async def start(self) -> "FakeOpenWeatherMap":
+        app = web.Application()
+        app.router.add_get("/data/2.5/weather", self._weather)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/data/2.5/weather"
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeOpenWeatherMap":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
@@ -0,0 +1,281 @@
+"""Локальный фейковый Telegram для тестов, бенчмарков и нагрузочных прогонов.
+
+Две стороны Telegram:
+
+- Bot API (``/bot<token>/<method>``): бот ходит сюда через
+  ``TelegramAPIServer.from_base(fake.url)`` (или ``TELEGRAM_API_URL``),
+  сервер записывает вызовы и сообщения по чатам;
+- доставка обновлений: ``push_updates`` шлёт их на webhook бота так же,
+  как Telegram, — с секретом и повтором на 429 и 5xx; для polling —
+  ``feed``, бот забирает их через ``getUpdates``.
+
+    async with FakeTelegram() as telegram:
+        bot = telegram.bot()
+"""
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+TOKEN = "42:fake-token"
+
+
+def _user(chat_id: int) -> Dict[str, Any]:
+    return {"id": chat_id, "is_bot": False, "first_name": "Райдер"}
+
+
+def _chat(chat_id: int) -> Dict[str, Any]:
+    return {"id": chat_id, "type": "private", "first_name": "Райдер"}
+
+
+def make_update(update_id: int, chat_id: int, text: str = "/ping") -> Dict[str, Any]:
+    """Обновление с текстовым сообщением от пользователя ``chat_id``."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": _chat(chat_id),
+            "from": _user(chat_id),
+            "text": text,
+        },
+    }
+
+
+def make_location(update_id: int, chat_id: int, lat: float, lon: float) -> Dict[str, Any]:
+    """Обновление с геолокацией от пользователя ``chat_id``."""
+    update = make_update(update_id, chat_id)
+    del update["message"]["text"]
+    update["message"]["location"] = {"latitude": lat, "longitude": lon}
+    return update
+
+
+def make_callback(update_id: int, chat_id: int, data: str, message_id: int = 1) -> Dict[str, Any]:
+    """Нажатие inline-кнопки ``data`` под сообщением бота ``message_id``."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(chat_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()), "chat": _chat(chat_id)},
+        },
+    }
+
+
+def buttons(markup: Optional[Dict[str, Any]]) -> List[str]:
+    """``callback_data`` всех inline-кнопок клавиатуры сообщения."""
+    if not markup:
+        return []
+    return [
+        button["callback_data"]
+        for row in markup.get("inline_keyboard", [])
+        for button in row
+        if "callback_data" in button
+    ]
+
+
+class FakeTelegram:
+    """aiohttp-сервер Bot API.
+
+    ``getMe``; ``getUpdates`` (long polling) отдаёт обновления из ``feed``;
+    ``sendMessage``, ``sendPhoto``, ``sendMediaGroup`` записываются
+    в ``messages`` по чатам — текст (или подпись) и клавиатура; остальные
+    методы отвечают ``true``.
+    """
+
+    def __init__(self, latency: float = 0.0, long_poll: float = 1.0) -> None:
+        self.latency = latency
+        self.long_poll = long_poll
+        self.calls: List[Tuple[str, Dict[str, str]]] = []
+        self.sent: List[Tuple[int, str, float]] = []
+        self.messages: Dict[int, List[Dict[str, Any]]] = {}
+        self._sent_changed = asyncio.Event()
+        self._chat_waiters: Dict[int, List[asyncio.Future]] = {}
+        self._updates: List[Dict[str, Any]] = []
+        self._updates_changed = asyncio.Event()
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    def feed(self, update: Dict[str, Any]) -> None:
+        """Поставить обновление в очередь ``getUpdates``."""
+        self._updates.append(update)
+        self._updates_changed.set()
+
+    async def _get_updates(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        # Подтверждённые ботом (меньше offset) больше не отдаём, как Telegram
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates:
+            self._updates_changed.clear()
+            timeout = min(float(params.get("timeout") or 0), self.long_poll)
+            try:
+                await asyncio.wait_for(self._updates_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        return self._updates[:limit]
+
+    def _record(self, method: str, chat_id: int, text: str, markup: Optional[str]) -> Dict[str, Any]:
+        """Записать сообщение бота, разбудить ждущих ответа в этом чате."""
+        self._message_id += 1
+        now = time.monotonic()
+        message = {
+            "message_id": self._message_id,
+            "method": method,
+            "text": text,
+            "reply_markup": json.loads(markup) if markup else None,
+            "t": now,
+        }
+        self.sent.append((chat_id, text, now))
+        self._sent_changed.set()
+        self.messages.setdefault(chat_id, []).append(message)
+        for waiter in self._chat_waiters.pop(chat_id, []):
+            if not waiter.done():
+                waiter.set_result(None)
+        return {"message_id": self._message_id, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}}
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls.append((method, params))
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self._get_updates(params)})
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == "getMe":
+            result: Any = {"id": 42, "is_bot": True, "first_name": "Snow Crew", "username": "snow_crew_bot"}
+        elif method == "sendMessage":
+            text = params.get("text", "")
+            result = self._record(method, int(params["chat_id"]), text, params.get("reply_markup"))
+            result["text"] = text
+        elif method == "sendPhoto":
+            caption = params.get("caption", "")
+            result = self._record(method, int(params["chat_id"]), caption, params.get("reply_markup"))
+            result["caption"] = caption
+            result["photo"] = [{"file_id": params.get("photo", ""), "file_unique_id": "u", "width": 1, "height": 1}]
+        elif method == "sendMediaGroup":
+            chat_id = int(params["chat_id"])
+            result = []
+            for media in json.loads(params["media"]):
+                message = self._record(method, chat_id, media.get("caption", ""), None)
+                message["photo"] = [{"file_id": media["media"], "file_unique_id": "u", "width": 1, "height": 1}]
+                result.append(message)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def wait_message(
+        self,
+        chat_id: int,
+        predicate: Callable[[Dict[str, Any]], bool],
+        after: int = 0,
+        timeout: float = 10.0,
+    ) -> Optional[Dict[str, Any]]:
+        """Первое сообщение бота в чат с индексом от ``after``, подходящее
+        под ``predicate``; ``None``, если не дождались за ``timeout``."""
+        deadline = time.monotonic() + timeout
+        index = after
+        while True:
+            messages = self.messages.get(chat_id, [])
+            for message in messages[index:]:
+                if predicate(message):
+                    return message
+            index = max(index, len(messages))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            self._chat_waiters.setdefault(chat_id, []).append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def wait_sent(self, count: int, timeout: float = 10.0) -> bool:
+        """Дождаться, пока бот отправит ``count`` сообщений."""
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._sent_changed.clear()
+            try:
+                await asyncio.wait_for(self._sent_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def bot(self, token: str = TOKEN) -> Bot:
+        """Бот, который ходит в этот сервер."""
+        session = AiohttpSession(api=TelegramAPIServer.from_base(self.url))
+        return Bot(token=token, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+
+    async def start(self) -> "FakeTelegram":
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._method)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            # Будим long polling, иначе остановка ждёт его таймаута
+            self.long_poll = 0
+            self._updates_changed.set()
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeTelegram":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+
+async def push_updates(
+    url: str,
+    updates: Iterable[Dict[str, Any]],
+    secret_token: str,
+    connections: int = 40,
+    retry_delay: float = 0.05,
+) -> Dict[str, int]:
+    """Доставить обновления на webhook, как Telegram: до ``connections``
+    запросов одновременно, на 429 и 5xx — повтор. Возвращает счётчики."""
+    counters = {"delivered": 0, "retried": 0, "rejected": 0}
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret_token}
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        while not queue.empty():
+            update = queue.get_nowait()
+            while True:
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                    if response.status < 300:
+                        counters["delivered"] += 1
+                        break
+                    if response.status != 429 and response.status < 500:
+                        counters["rejected"] += 1
+                        break
+                counters["retried"] += 1
+                await asyncio.sleep(retry_delay)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connections)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(connections)))
+    return counters
@@ -0,0 +1,31 @@
+"""Воркер-процесс для тестов шардирования.
+
+Отдельный модуль без aiogram: его импортирует каждый запущенный процесс.
+"""
+import asyncio
+import random
+import socket
+
+from services.sharding import ShardChannel, update_user_id
+
+
+def echo_worker(index: int, sock: socket.socket) -> None:
+    """Сообщает фронту, какие обновления и события получил."""
+    asyncio.run(_echo(index, sock))
+
+
+async def _echo(index: int, sock: socket.socket) -> None:
+    channel = await ShardChannel.connect(sock)
+    rng = random.Random(index)
+
+    async def feed(update):
+        await asyncio.sleep(rng.uniform(0, 0.005))
+        if update["message"]["text"] == "/like":
+            channel.send({"event": "like_added", "args": [update_user_id(update), 1]})
+        channel.send({"event": "seen", "args": [index, update_user_id(update), update["update_id"]]})
+
+    def on_event(event, args):
+        if event == "like_added":
+            channel.send({"event": "applied", "args": [index, *args]})
+
+    await channel.serve(feed, on_event=on_event)
@@ -0,0 +1,69 @@
+"""Тесты для фоновых рассылок с чекпоинтами."""
+import pytest
+
+from services.broadcasts import BroadcastManager
+from services.outbound import OutboundDispatcher
+from tests.test_outbound import FakeBot
+
+ADMIN = 999
+
+
+async def add_users(db, telegram_ids):
+    for telegram_id in telegram_ids:
+        await db.upsert_user(telegram_id, f"u{telegram_id}", "Райдер")
+
+
+def recipients(bot):
+    return sorted(chat_id for chat_id, _, _ in bot.sent if chat_id != ADMIN)
+
+
+class TestBroadcastManager:
+    @pytest.mark.asyncio
+    async def test_runs_in_chunks_and_reports(self, db):
+        await add_users(db, range(1, 24))
+        bot = FakeBot(fail_for={3}, blocked_for={5, 6})
+        outbound = OutboundDispatcher(bot, rate=1000)
+        broadcasts = BroadcastManager(db, bot, outbound, chunk_size=5, progress_interval=0)
+
+        broadcast_id = await broadcasts.submit(ADMIN, "Открытие сезона!")
+        await broadcasts.join()
+
+        job = await db.get_broadcast(broadcast_id)
+        assert job["status"] == "done" and job["total"] == 23
+        assert (job["sent"], job["failed"], job["blocked"]) == (20, 1, 2)
+        assert recipients(bot) == [i for i in range(1, 24) if i not in (3, 5, 6)]
+        # Прогресс — правки одного и того же сообщения админу
+        assert {(chat_id, message_id) for chat_id, message_id, _ in bot.edited} == {(ADMIN, 1)}
+        assert "завершена" in bot.edited[-1][2]
+
+        # Заблокировавшие бота в следующую рассылку не попадают
+        bot.sent.clear()
+        second = await broadcasts.submit(ADMIN, "Ещё новость")
+        await broadcasts.join()
+        assert (await db.get_broadcast(second))["total"] == 21
+        assert 5 not in recipients(bot) and 6 not in recipients(bot)
+
+        # Вернулся в бота — снова получает рассылки
+        await db.upsert_user(5, "u5", "Райдер")
+        assert [row["telegram_id"] for row in await db.get_broadcast_recipients(4, 1)] == [5]
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_checkpoint(self, db):
+        """После перезапуска рассылка продолжается с последней пачки."""
+        await add_users(db, range(1, 11))
+        broadcast_id = await db.create_broadcast(ADMIN, "Открытие сезона!")
+        # Первая пачка ушла до остановки бота
+        await db.save_broadcast_checkpoint(broadcast_id, 4, sent=4, failed=0, blocked=0)
+
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+        broadcasts = BroadcastManager(db, bot, outbound, chunk_size=4)
+        await broadcasts.resume()
+        await broadcasts.join()
+
+        assert recipients(bot) == list(range(5, 11))
+        job = await db.get_broadcast(broadcast_id)
+        assert job["status"] == "done" and job["sent"] == 10
+        assert await db.get_unfinished_broadcasts() == []
+        await outbound.close()
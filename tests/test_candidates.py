@@ -0,0 +1,214 @@
+"""Тесты для очереди кандидатов поиска компании."""
+import pytest
+
+from services import candidates
+from services.candidates import CandidateEngine, RankedCandidates, profile_key
+from services.matching import calculate_match_score
+
+
+async def make_rider(db, telegram_id: int, **overrides) -> int:
+    """Создать пользователя с анкетой, вернуть user_id."""
+    user_id = await db.upsert_user(telegram_id, f"u{telegram_id}", f"Райдер {telegram_id}")
+    profile = {
+        "ride_type": "🏂 Сноуборд",
+        "skill_level": "Средний",
+        "age": 25,
+        "city": "Москва",
+        "about": "Катаю",
+        "photos": [],
+        "gender": "м",
+        "location_lat": None,
+        "location_lon": None,
+    }
+    profile.update(overrides)
+    await db.upsert_profile(user_id=user_id, **profile)
+    return user_id
+
+
+async def open_queue(db, engine, user_id, filters=None):
+    profile = dict(await db.get_profile(user_id))
+    return await engine.ranked(user_id, profile, filters or {})
+
+
+def served(ranked: RankedCandidates):
+    """Все кандидаты по порядку, как их пролистает пользователь."""
+    result, cursor = [], None
+    while True:
+        page = ranked.after(cursor, 1)
+        if not page:
+            return result
+        cursor = page[0]
+        result.append((cursor[3], cursor[4]))
+
+
+class TestRankedCandidates:
+    """Тесты отсортированного набора."""
+
+    def test_order_and_cursor(self):
+        """Больший score раньше, при равном — более новая анкета."""
+        ranked = RankedCandidates()
+        ranked.upsert(profile_key(10, 1, 101))
+        ranked.upsert(profile_key(30, 2, 102))
+        ranked.upsert(profile_key(10, 3, 103))
+        assert served(ranked) == [("profile", 102), ("profile", 103), ("profile", 101)]
+
+    def test_cursor_survives_removal(self):
+        """Курсор на удалённого кандидата продолжает работать."""
+        ranked = RankedCandidates()
+        keys = [profile_key(score, score, score) for score in (50, 40, 30)]
+        for key in keys:
+            ranked.upsert(key)
+        ranked.discard("profile", 40)
+        assert ranked.after(keys[1], 1) == [keys[2]]
+
+    def test_upsert_replaces_score(self):
+        """Повторный upsert перемещает кандидата, а не дублирует."""
+        ranked = RankedCandidates()
+        ranked.upsert(profile_key(10, 1, 101))
+        ranked.upsert(profile_key(90, 1, 101))
+        assert len(ranked) == 1
+        assert ranked.after(None, 1)[0][0] == -90
+
+
+class TestCandidateEngine:
+    """Тесты движка очередей."""
+
+    @pytest.mark.asyncio
+    async def test_no_profile_cap(self, db):
+        """Очередь содержит все анкеты, а не первые 100."""
+        me = await make_rider(db, 1)
+        for telegram_id in range(2, 152):
+            await make_rider(db, telegram_id)
+        ranked = await open_queue(db, CandidateEngine(db), me)
+        assert len(ranked) == 150
+
+    @pytest.mark.asyncio
+    async def test_matches_full_rebuild_order(self, db):
+        """Порядок совпадает с полной сортировкой по calculate_match_score."""
+        me = await make_rider(db, 1)
+        await make_rider(db, 2, city="Сочи")
+        await make_rider(db, 3, skill_level="Новичок")
+        await make_rider(db, 4, ride_type="🎿 Лыжи", age=50)
+        await make_rider(db, 5)
+        ranked = await open_queue(db, CandidateEngine(db), me)
+
+        my_profile = dict(await db.get_profile(me))
+        rows = [dict(row) for row in await db.get_filtered_profiles(me)]
+        rows.sort(key=lambda row: calculate_match_score(my_profile, row), reverse=True)
+        assert served(ranked) == [("profile", row["user_id"]) for row in rows]
+
+    @pytest.mark.asyncio
+    async def test_like_and_block_update_queue(self, db):
+        """Лайк и блокировка убирают кандидата без пересборки."""
+        engine = CandidateEngine(db)
+        me = await make_rider(db, 1)
+        liked = await make_rider(db, 2)
+        blocked = await make_rider(db, 3)
+        ranked = await open_queue(db, engine, me)
+
+        await db.add_like(me, liked)
+        await db.block_user(me, blocked)
+        assert ("profile", liked) not in ranked
+        assert ("profile", blocked) not in ranked
+        assert await open_queue(db, engine, me) is ranked
+
+    @pytest.mark.asyncio
+    async def test_new_and_changed_profiles(self, db):
+        """Новые и изменённые анкеты попадают в живую очередь с новым score."""
+        engine = CandidateEngine(db)
+        me = await make_rider(db, 1)
+        other = await make_rider(db, 2, city="Сочи")
+        ranked = await open_queue(db, engine, me, filters={"skill_level": "Средний"})
+
+        newcomer = await make_rider(db, 3)
+        await db.update_profile_level(other, "Продвинутый")
+        ranked = await open_queue(db, engine, me, filters={"skill_level": "Средний"})
+        assert ("profile", newcomer) in ranked
+        assert ("profile", other) not in ranked
+
+    @pytest.mark.asyncio
+    async def test_events_follow_changes(self, db):
+        """Созданные и деактивированные события отражаются в очереди."""
+        engine = CandidateEngine(db)
+        me = await make_rider(db, 1)
+        creator = await make_rider(db, 2)
+        ranked = await open_queue(db, engine, me)
+        resort_id = (await db.list_resorts())[0]["id"]
+
+        event_id = await db.create_event(creator, resort_id, "2030-01-01", "Любой", "https://t.me/x")
+        ranked = await open_queue(db, engine, me)
+        assert ("event", event_id) in ranked
+
+        await db.deactivate_event(event_id)
+        ranked = await open_queue(db, engine, me)
+        assert ("event", event_id) not in ranked
+
+
+async def browse(engine, db, me, **kwargs):
+    """Пролистать очередь через next_candidate: ключи и строки по порядку."""
+    profile = dict(await db.get_profile(me))
+    result, cursor = [], None
+    while True:
+        candidate = await engine.next_candidate(cursor, me, profile, {}, **kwargs)
+        if candidate is None:
+            return result
+        cursor, row = candidate
+        result.append((cursor, row))
+
+
+class TestCandidatePages:
+    """Тесты keyset-построения и постраничной подгрузки кандидатов."""
+
+    @pytest.mark.asyncio
+    async def test_build_reads_keyset_pages(self, db, monkeypatch):
+        """Очередь из нескольких keyset-страниц равна очереди из одной."""
+        me = await make_rider(db, 1)
+        for telegram_id in range(2, 32):
+            await make_rider(db, telegram_id, age=18 + telegram_id)
+        full = served(await open_queue(db, CandidateEngine(db), me))
+
+        monkeypatch.setattr(candidates, "BUILD_PAGE", 7)
+        assert served(await open_queue(db, CandidateEngine(db), me)) == full
+        assert len(full) == 30
+
+    @pytest.mark.asyncio
+    async def test_next_candidate_loads_pages(self, db, monkeypatch):
+        """Показ идёт по порядку очереди, строки читаются страницами."""
+        engine = CandidateEngine(db)
+        me = await make_rider(db, 1)
+        for telegram_id in range(2, 52):
+            await make_rider(db, telegram_id, age=18 + telegram_id % 30)
+        order = served(await open_queue(db, engine, me))
+
+        fetches = []
+        fetch = db.get_profiles_by_user_ids
+
+        async def counting(user_ids):
+            user_ids = list(user_ids)
+            fetches.append(len(user_ids))
+            return await fetch(user_ids)
+
+        monkeypatch.setattr(db, "get_profiles_by_user_ids", counting)
+        shown = await browse(engine, db, me)
+        assert [(key[3], key[4]) for key, _ in shown] == order
+        assert all(row["first_name"] and row["about"] == "Катаю" for _, row in shown)
+        # 50 анкет — три страницы, без запроса на каждый свайп
+        assert len(fetches) == 3 and max(fetches) == candidates.PAGE_SIZE
+
+    @pytest.mark.asyncio
+    async def test_page_follows_changes(self, db):
+        """Изменённая анкета перечитывается, лайкнутая — пропускается."""
+        engine = CandidateEngine(db)
+        me = await make_rider(db, 1)
+        for telegram_id in range(2, 6):
+            await make_rider(db, telegram_id, age=20 + telegram_id)
+        profile = dict(await db.get_profile(me))
+
+        first, _ = await engine.next_candidate(None, me, profile, {})
+        following = (await open_queue(db, engine, me)).after(first, 2)
+        await db.add_like(me, following[0][4])
+        await db.update_about(following[1][4], "Новое описание")
+
+        key, row = await engine.next_candidate(first, me, profile, {})
+        assert key == following[1]
+        assert row["about"] == "Новое описание"
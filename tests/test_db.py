@@ -0,0 +1,189 @@
+"""Тесты для слоя базы данных."""
+import asyncio
+
+import pytest
+
+from db import Database, LikeResult
+from services.resorts import haversine_km
+
+
+class TestConnectionPool:
+    """Тесты пула соединений."""
+
+    @pytest.mark.asyncio
+    async def test_read_after_write(self, db):
+        """Читатель видит закоммиченную запись писателя."""
+        user_id = await db.upsert_user(100, "rider", "Тест")
+        user = await db.get_user_by_id(user_id)
+        assert user["telegram_id"] == 100
+        assert await db.get_user_id_by_telegram(100) == user_id
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_pool(self, db):
+        """Параллельных вызовов больше, чем соединений в пуле."""
+        user_id = await db.upsert_user(100, "rider", "Тест")
+        results = await asyncio.gather(*(db.get_user_by_id(user_id) for _ in range(20)))
+        assert all(row["id"] == user_id for row in results)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes(self, db):
+        """Параллельные записи сериализуются на одном писателе."""
+        ids = await asyncio.gather(*(db.upsert_user(i, f"u{i}", "Тест") for i in range(1, 21)))
+        assert len(set(ids)) == 20
+
+    @pytest.mark.asyncio
+    async def test_closed_pool_raises(self, tmp_path):
+        """После close() обращение к БД — ошибка, а не новое соединение."""
+        database = Database(str(tmp_path / "closed.db"), pool_size=1)
+        await database.init()
+        await database.close()
+        with pytest.raises(RuntimeError):
+            await database.get_user_by_id(1)
+
+
+class TestWriteQueue:
+    """Тесты задачи-писателя и групповых коммитов."""
+
+    @pytest.mark.asyncio
+    async def test_wal_mode(self, db):
+        """БД работает в WAL-режиме."""
+        async with db._reader() as conn:
+            async with conn.execute("PRAGMA journal_mode") as cursor:
+                row = await cursor.fetchone()
+        assert row[0] == "wal"
+
+    @pytest.mark.asyncio
+    async def test_batch_commits_all_writes(self, db):
+        """Пачка параллельных мутаций целиком видна после ожидания."""
+        user_id = await db.upsert_user(1, "a", "A")
+        targets = await asyncio.gather(*(db.upsert_user(i, f"u{i}", "U") for i in range(2, 52)))
+        await asyncio.gather(*(db.add_like(user_id, target) for target in targets))
+        assert await db.get_already_liked(user_id) == set(targets)
+
+    @pytest.mark.asyncio
+    async def test_failed_op_does_not_break_batch(self, db):
+        """Ошибка одной операции не откатывает соседние в той же пачке."""
+        user_id = await db.upsert_user(1, "a", "A")
+        results = await asyncio.gather(
+            db.add_like(user_id, user_id),
+            db.create_event(
+                creator_id=user_id,
+                resort_id=999_999,  # нет такого курорта — FOREIGN KEY
+                event_date="2030-01-01",
+                skill_level="Любой",
+                telegram_group_link="https://t.me/test",
+            ),
+            db.add_instructor("Инструктор", "@inst", "Москва", "Волен"),
+            return_exceptions=True,
+        )
+        assert results[0] is None
+        assert isinstance(results[1], Exception)
+        assert isinstance(results[2], int)
+        assert await db.has_like(user_id, user_id)
+        assert await db.get_instructor_cities() == ["Москва"]
+
+
+class TestResortCatalogue:
+    """Тесты каталога курортов в памяти."""
+
+    @pytest.mark.asyncio
+    async def test_lookups_match_sql(self, db):
+        """Выборки каталога совпадают с прежними SQL-запросами."""
+        async with db._reader() as conn:
+            async with conn.execute("SELECT * FROM resorts ORDER BY id") as cursor:
+                rows = [dict(row) for row in await cursor.fetchall()]
+            async with conn.execute("SELECT * FROM resorts WHERE address LIKE ? ORDER BY name", ("%Сочи%",)) as cursor:
+                sochi = [dict(row) for row in await cursor.fetchall()]
+
+        assert [dict(r) for r in await db.list_resorts()] == rows
+        assert dict(await db.get_resort(rows[0]["id"])) == rows[0]
+        assert await db.get_resort(-1) is None
+        assert await db.get_resort_cities() == sorted({row["address"] for row in rows if row["address"]})
+        assert [dict(r) for r in await db.get_resorts_by_city("Сочи")] == sochi
+        assert [r["id"] for r in db.resort_catalogue.rescue] == [row["id"] for row in rows if row["rescue_phone"]]
+
+    @pytest.mark.asyncio
+    async def test_no_disk_reads(self, db):
+        """Экраны курортов не ходят в БД."""
+        def forbidden():
+            raise AssertionError("resort lookup touched the database")
+
+        db._reader = forbidden
+        resorts = await db.list_resorts()
+        await db.get_resort(resorts[0]["id"])
+        await db.get_resort_cities()
+        await db.get_resorts_by_city("Сочи")
+
+    @pytest.mark.asyncio
+    async def test_reload_bumps_version_and_notifies(self, db):
+        """Перезагрузка даёт новый снимок и рассылает его подписчикам."""
+        received = []
+        db.add_listener(lambda event, *args: received.append((event, args)))
+        old = db.resort_catalogue
+        with pytest.raises(TypeError):
+            old.resorts[0]["name"] = "x"
+
+        await db._execute_write("UPDATE resorts SET rescue_phone = NULL WHERE id = ?", (old.resorts[0]["id"],))
+        new = await db.reload_resorts()
+        assert new.version == old.version + 1
+        assert received == [("resorts_changed", (new,))]
+        assert new.resorts[0]["rescue_phone"] is None
+        assert old.resorts[0] is not new.resorts[0]
+
+    @pytest.mark.asyncio
+    async def test_distance_matches_haversine(self, db):
+        for resort in db.resort_catalogue.resorts:
+            expected = haversine_km(55.7558, 37.6173, resort["lat"], resort["lon"])
+            assert db.resort_catalogue.distance_km(resort["id"], 55.7558, 37.6173) == pytest.approx(expected)
+
+
+class TestMatchEdges:
+    """Мэтч — два ребра в ``match_edges``."""
+
+    @pytest.mark.asyncio
+    async def test_match_is_symmetric(self, db):
+        alice, bob, carol = [await db.upsert_user(n, f"rider{n}", f"Райдер {n}") for n in (1, 2, 3)]
+        await db.add_match(bob, alice)
+        await db.add_match(alice, bob)
+        assert await db.has_match(alice, bob) and await db.has_match(bob, alice)
+        assert not await db.has_match(alice, carol)
+        assert [row["id"] for row in await db.get_user_matches(alice)] == [bob]
+        assert [row["id"] for row in await db.get_user_matches(bob)] == [alice]
+        assert (await db.get_stats())["matches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_block_removes_both_edges(self, db):
+        alice, bob, carol = [await db.upsert_user(n, f"rider{n}", f"Райдер {n}") for n in (1, 2, 3)]
+        await db.add_match(alice, bob)
+        await db.add_match(carol, alice)
+        await db.block_user(bob, alice)
+        assert not await db.has_match(alice, bob) and not await db.has_match(bob, alice)
+        assert [row["id"] for row in await db.get_user_matches(alice)] == [carol]
+        assert list(await db.get_user_matches(bob)) == []
+
+
+class TestLikeAndMatch:
+    """Лайк и мэтч одной операцией."""
+
+    @pytest.mark.asyncio
+    async def test_reciprocal_like_creates_match_once(self, db):
+        alice, bob = [await db.upsert_user(n, f"rider{n}", f"Райдер {n}") for n in (1, 2)]
+        assert await db.like_and_match(alice, bob) == LikeResult(liked=True, matched=False)
+        assert await db.like_and_match(alice, bob) == LikeResult(liked=False, matched=False)
+        assert await db.like_and_match(bob, alice) == LikeResult(liked=True, matched=True)
+        assert await db.like_and_match(bob, alice) == LikeResult(liked=False, matched=False)
+        assert await db.has_match(alice, bob) and await db.has_match(bob, alice)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_clicks_notify_once(self, db):
+        """Двойные клики и встречные лайки в одной пачке писателя."""
+        alice, bob = [await db.upsert_user(n, f"rider{n}", f"Райдер {n}") for n in (1, 2)]
+        results = await asyncio.gather(
+            db.like_and_match(alice, bob),
+            db.like_and_match(bob, alice),
+            db.like_and_match(alice, bob),
+            db.like_and_match(bob, alice),
+        )
+        assert sum(result.liked for result in results) == 2
+        assert sum(result.matched for result in results) == 1
+        assert (await db.get_stats())["matches"] == 1
@@ -0,0 +1,106 @@
+"""Тесты для FSM-хранилища поверх SQLite."""
+import asyncio
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from services.fsm_storage import SQLiteStorage, decode_data, encode_data
+
+
+class DemoStates(StatesGroup):
+    browsing = State()
+
+
+def make_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+class TestSQLiteStorage:
+    """Тесты хранилища FSM."""
+
+    def test_encode_roundtrip(self):
+        """Данные (включая кортежи) переживают сериализацию."""
+        data = {"candidates": [("profile", 1), ("event", 2)], "filters": {"ride_type": "🏂"}}
+        assert decode_data(encode_data(data)) == data
+        assert encode_data({}) is None
+        assert decode_data(None) == {}
+
+    @pytest.mark.asyncio
+    async def test_state_and_data_survive_restart(self, db):
+        """Состояние и данные доступны новому экземпляру хранилища."""
+        storage = SQLiteStorage(db)
+        key = make_key(100)
+        await storage.set_state(key, DemoStates.browsing)
+        await storage.set_data(key, {"candidates": [("profile", 7)], "candidate_index": 1})
+        await storage.close()
+
+        restored = SQLiteStorage(db)
+        assert await restored.get_state(key) == DemoStates.browsing.state
+        assert await restored.get_data(key) == {"candidates": [("profile", 7)], "candidate_index": 1}
+        await restored.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_returns_copy(self, db):
+        """Изменение результата get_data не меняет хранилище."""
+        storage = SQLiteStorage(db)
+        key = make_key(100)
+        await storage.set_data(key, {"a": 1})
+        data = await storage.get_data(key)
+        data["a"] = 2
+        assert await storage.get_data(key) == {"a": 1}
+        await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self, db):
+        """LRU-кэш не растёт больше лимита, вытесненные ключи читаются из БД."""
+        storage = SQLiteStorage(db, cache_size=10)
+        for user_id in range(50):
+            await storage.set_data(make_key(user_id), {"n": user_id})
+        assert len(storage._cache) == 10
+        await storage.close()
+        assert await storage.get_data(make_key(0)) == {"n": 0}
+
+    @pytest.mark.asyncio
+    async def test_cleared_key_is_deleted(self, db):
+        """Пустое состояние и данные удаляют строку из таблицы."""
+        storage = SQLiteStorage(db)
+        key = make_key(100)
+        await storage.set_state(key, DemoStates.browsing)
+        await storage.close()
+        await storage.set_state(key, None)
+        await storage.close()
+        assert await db.get_fsm_record("1:100:100:::default") is None
+
+    @pytest.mark.asyncio
+    async def test_evicted_key_readable_while_flushing(self, db):
+        """Ключ, вытесненный из кэша во время сброса, не читается из БД устаревшим."""
+        storage = SQLiteStorage(db, cache_size=1)
+        key, other = make_key(100), make_key(200)
+        await storage.set_data(key, {"step": 1})
+        await storage.close()
+
+        flushing, release = asyncio.Event(), asyncio.Event()
+        flush = storage._flush
+
+        async def slow_flush(records):
+            flushing.set()
+            await release.wait()
+            await flush(records)
+
+        storage._dirty._flush = slow_flush
+        await storage.set_data(key, {"step": 2})
+        task = asyncio.create_task(storage._dirty.flush())
+        await flushing.wait()
+        try:
+            # Пока пачка пишется, ключ вытесняется и читается заново
+            await storage.get_data(other)
+            assert await storage.get_data(key) == {"step": 2}
+            await storage.update_data(key, {"next": True})
+        finally:
+            release.set()
+            await task
+            await storage.close()
+        restored = SQLiteStorage(db)
+        assert await restored.get_data(key) == {"step": 2, "next": True}
+        await restored.close()
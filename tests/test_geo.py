@@ -0,0 +1,118 @@
+"""Тесты для геоиндекса."""
+import random
+
+import pytest
+
+from services.candidates import CandidateEngine
+from services.geo import GeoDirectory, GeoIndex
+from services.matching import calculate_match_score
+from services.resorts import haversine_km, sort_by_distance
+from tests.test_candidates import make_rider, served
+
+
+def random_points(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    points = [(i, rng.uniform(-89, 89), rng.uniform(-180, 180)) for i in range(count)]
+    # Россия: плотнее, плюс точки у 180-го меридиана и у полюса
+    points += [(count + i, rng.uniform(43, 70), rng.uniform(30, 180)) for i in range(count)]
+    points += [(2 * count + i, rng.uniform(60, 70), rng.choice([-1, 1]) * rng.uniform(178, 180)) for i in range(50)]
+    points += [(2 * count + 50 + i, rng.uniform(88, 90), rng.uniform(-180, 180)) for i in range(20)]
+    return points
+
+
+def brute_within(points, lat, lon, radius_km):
+    found = [(key, haversine_km(lat, lon, p_lat, p_lon)) for key, p_lat, p_lon in points]
+    return sorted(item for item in found if item[1] <= radius_km)
+
+
+class TestGeoIndex:
+    """Запросы индекса совпадают с полным перебором."""
+
+    QUERIES = [
+        (55.7558, 37.6173),  # Москва
+        (43.68, 40.26),  # Красная Поляна
+        (65.0, 179.9),  # у 180-го меридиана
+        (65.0, -179.9),
+        (89.5, 10.0),  # у полюса
+        (0.0, 0.0),
+    ]
+
+    @pytest.fixture
+    def index(self):
+        index = GeoIndex()
+        self.points = random_points(2000)
+        for key, lat, lon in self.points:
+            index.upsert(key, lat, lon)
+        return index
+
+    def test_within_matches_brute_force(self, index):
+        for lat, lon in self.QUERIES:
+            for radius in (10, 50, 100, 500, 3000):
+                assert sorted(index.within(lat, lon, radius)) == brute_within(self.points, lat, lon, radius)
+
+    def test_nearest_matches_brute_force(self, index):
+        for lat, lon in self.QUERIES:
+            expected = brute_within(self.points, lat, lon, float("inf"))
+            expected.sort(key=lambda item: item[1])
+            nearest = index.nearest(lat, lon, 5)
+            assert [dist for _, dist in nearest] == [dist for _, dist in expected[:5]]
+
+    def test_upsert_moves_and_remove(self):
+        index = GeoIndex()
+        index.upsert("a", 55.75, 37.61)
+        index.upsert("a", 43.68, 40.26)
+        assert len(index) == 1
+        assert index.within(55.75, 37.61, 100) == []
+        index.remove("a")
+        assert index.nearest(43.68, 40.26) == []
+
+
+class TestGeoDirectory:
+    """Геоиндекс бота поверх БД."""
+
+    @pytest.mark.asyncio
+    async def test_nearest_resorts_match_sort_by_distance(self, db):
+        geo = GeoDirectory(db)
+        await geo.load()
+        resorts = [dict(row) for row in await db.list_resorts()]
+        expected = sort_by_distance(55.7558, 37.6173, resorts)[:5]
+        assert geo.nearest_resorts(55.7558, 37.6173, 5) == expected
+
+        rescue = geo.resorts_within(55.7558, 37.6173, 100, rescue_only=True)
+        assert all(resort["rescue_phone"] and dist <= 100 for resort, dist in rescue)
+
+    @pytest.mark.asyncio
+    async def test_riders_follow_profile_updates(self, db):
+        geo = GeoDirectory(db)
+        await geo.load()
+        rider = await make_rider(db, 1, location_lat=55.75, location_lon=37.61)
+        assert [user_id for user_id, _ in geo.riders_within(55.76, 37.62, 50)] == [rider]
+
+        await db.update_profile_location(rider, 43.68, 40.26)
+        assert geo.riders_within(55.76, 37.62, 50) == []
+        await db.update_profile_city(rider, "Москва", None, None)
+        assert geo.nearest_riders(43.68, 40.26, 1) == []
+
+        await db.update_profile_location(rider, 43.68, 40.26)
+        await db.delete_profile(rider)
+        assert geo.nearest_riders(43.68, 40.26, 1) == []
+
+    @pytest.mark.asyncio
+    async def test_engine_with_geo_keeps_order(self, db):
+        """Бонус за расстояние из индекса даёт тот же порядок, что и скалярный score."""
+        geo = GeoDirectory(db)
+        await geo.load()
+        engine = CandidateEngine(db, geo=geo)
+        me = await make_rider(db, 1, location_lat=55.75, location_lon=37.61)
+        rng = random.Random(3)
+        for telegram_id in range(2, 40):
+            await make_rider(
+                db, telegram_id, location_lat=rng.uniform(54.5, 57), location_lon=rng.uniform(36, 39.5)
+            )
+        await make_rider(db, 40)
+
+        my_profile = dict(await db.get_profile(me))
+        ranked = await engine.ranked(me, my_profile, {}, 55.75, 37.61)
+        rows = [dict(row) for row in await db.get_filtered_profiles(me)]
+        rows.sort(key=lambda row: calculate_match_score(my_profile, row, 55.75, 37.61), reverse=True)
+        assert served(ranked) == [("profile", row["user_id"]) for row in rows]
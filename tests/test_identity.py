@@ -0,0 +1,83 @@
+"""Тесты для кэша идентичности и IdentityMiddleware."""
+import pytest
+
+from aiogram.types import User
+from middlewares.identity import IdentityMiddleware
+from services.identity import IdentityCache
+
+
+class TestUpsertUser:
+    @pytest.mark.asyncio
+    async def test_returning_same_id_on_update(self, db):
+        user_id = await db.upsert_user(100, "rider", "Райдер")
+        assert await db.upsert_user(100, "rider2", "Райдер") == user_id
+        assert await db.upsert_user(200, "other", "Другой") != user_id
+        row = await db.get_user_identity(100)
+        assert (row["id"], row["username"], row["undeliverable"]) == (user_id, "rider2", 0)
+
+
+class TestIdentityCache:
+    @pytest.mark.asyncio
+    async def test_repeat_updates_do_not_write(self, db):
+        identity = IdentityCache(db)
+        user_id = await identity.resolve(100, "rider", "Райдер")
+        for _ in range(10):
+            assert await identity.resolve(100, "rider", "Райдер") == user_id
+        assert identity.stats == {"hits": 10, "reads": 1, "writes": 1}
+
+    @pytest.mark.asyncio
+    async def test_known_user_after_restart_is_read_not_written(self, db):
+        user_id = await db.upsert_user(100, "rider", "Райдер")
+        identity = IdentityCache(db)
+        assert await identity.resolve(100, "rider", "Райдер") == user_id
+        assert identity.stats["writes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_name_change_writes(self, db):
+        identity = IdentityCache(db)
+        user_id = await identity.resolve(100, "rider", "Райдер")
+        assert await identity.resolve(100, "new_rider", "Райдер") == user_id
+        assert identity.stats["writes"] == 2
+        assert (await db.get_user_identity(100))["username"] == "new_rider"
+
+    @pytest.mark.asyncio
+    async def test_undeliverable_user_is_reset_on_next_update(self, db):
+        identity = IdentityCache(db)
+        await identity.resolve(100, "rider", "Райдер")
+        broadcast_id = await db.create_broadcast(1, "Открытие сезона!")
+        await db.save_broadcast_checkpoint(broadcast_id, 1, sent=0, failed=0, blocked=1, undeliverable={100})
+        assert len(identity) == 0
+        assert (await db.get_user_identity(100))["undeliverable"] == 1
+
+        await identity.resolve(100, "rider", "Райдер")
+        assert (await db.get_user_identity(100))["undeliverable"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lru_is_bounded(self, db):
+        identity = IdentityCache(db, size=2)
+        for telegram_id in (1, 2, 1, 3):
+            await identity.resolve(telegram_id, "", "Райдер")
+        assert len(identity) == 2
+        # Вытеснен самый давний — 2, а не недавно использованный 1
+        reads = identity.stats["reads"]
+        await identity.resolve(1, "", "Райдер")
+        assert identity.stats["reads"] == reads
+
+
+class TestIdentityMiddleware:
+    @pytest.mark.asyncio
+    async def test_injects_user_id(self, db):
+        middleware = IdentityMiddleware(IdentityCache(db))
+        seen = {}
+
+        async def handler(event, data):
+            seen.update(data)
+
+        user = User(id=100, is_bot=False, first_name="Райдер", username="rider")
+        await middleware(handler, object(), {"event_from_user": user})
+        assert seen["user_id"] == await db.get_user_id_by_telegram(100)
+
+        # Без отправителя (например, служебные обновления) — ничего не добавляем
+        seen.clear()
+        await middleware(handler, object(), {})
+        assert "user_id" not in seen
@@ -0,0 +1,60 @@
+"""Тесты для нагрузочного прогона: фейковый Bot API, синтетическая база, сценарии."""
+import pytest
+
+from benchmarks.loadtest import bot_process, check, percentile, run_journeys
+from benchmarks.population import populate
+from db import Database
+from tests.fake_owm import FakeOpenWeatherMap
+from tests.fake_telegram import FakeTelegram
+
+
+class TestReport:
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 0.5) == pytest.approx(50.5)
+        assert percentile(values, 0.99) == pytest.approx(99.01)
+        assert percentile([], 0.95) == 0.0
+
+    def test_gate(self):
+        results = {"browse": {"errors": 0, "step_p95": 0.130}, "resort": {"errors": 2, "step_p95": 0.05}}
+        baseline = {"browse": {"step_p95": 0.100}, "resort": {"step_p95": 0.05}}
+        failures = check(results, baseline, tolerance=0.25, max_p95_ms=0)
+        assert len(failures) == 2
+        assert failures[0].startswith("browse: p95 шага 130.0 ms")
+        assert failures[1].startswith("resort: 2 сценариев с ошибкой")
+        assert check(results, baseline, tolerance=0.5, max_p95_ms=100) == [
+            "browse: p95 шага 130.0 ms > 100 ms",
+            "resort: 2 сценариев с ошибкой",
+        ]
+
+
+class TestLoadTest:
+    @pytest.mark.asyncio
+    async def test_journeys_against_bot_process(self, tmp_path):
+        path = str(tmp_path / "loadtest.db")
+        db = Database(path)
+        await db.init()
+        try:
+            population = await populate(db, users=60, likes_per_user=5, events=5, chats=10)
+        finally:
+            await db.close()
+        assert len(population.users) == 60 and population.located
+
+        async with FakeTelegram() as telegram, FakeOpenWeatherMap() as owm:
+            async with bot_process(path, telegram, owm.url, log_path=str(tmp_path / "bot.log")):
+                results = await run_journeys(
+                    telegram,
+                    population,
+                    {"create_profile": 1, "browse": 1, "resort": 1},
+                    journeys=6,
+                    concurrency=3,
+                )
+
+        assert sum(summary["ok"] for summary in results.values()) == 6
+        assert all(summary["errors"] == 0 for summary in results.values())
+        for summary in results.values():
+            if summary["ok"]:
+                assert 0 < summary["step_p50"] <= summary["step_p95"] <= summary["step_p99"]
+                assert summary["per_second"] > 0
+        methods = {method for method, _ in telegram.calls}
+        assert {"getUpdates", "sendMessage", "answerCallbackQuery"} <= methods
@@ -0,0 +1,31 @@
+"""Тесты для LoggingMiddleware."""
+import pytest
+from aiogram import Dispatcher, Router
+from aiogram.types import Message
+
+from middlewares import LoggingMiddleware
+from tests.fake_telegram import FakeTelegram, make_update
+
+
+class TestLoggingMiddleware:
+    @pytest.mark.asyncio
+    async def test_update_passes_through_on_dp_update(self, caplog):
+        """На dp.update дальше уходит Update, а не вложенное сообщение."""
+        router = Router()
+        seen = []
+
+        @router.message()
+        async def reply(message: Message) -> None:
+            seen.append(message.text)
+
+        dp = Dispatcher()
+        dp.update.outer_middleware(LoggingMiddleware())
+        dp.include_router(router)
+        caplog.set_level("DEBUG", logger="middlewares.logging")
+        async with FakeTelegram() as telegram:
+            bot = telegram.bot()
+            await dp.feed_raw_update(bot, make_update(1, 555, "/ping"))
+            await bot.session.close()
+
+        assert seen == ["/ping"]
+        assert "[555] message:/ping" in caplog.text
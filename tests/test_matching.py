@@ -1,6 +1,8 @@
 """Тесты для умного матчинга."""
+import random
+
 import pytest
-from handlers.buddy_search import calculate_match_score
+from services.matching import LEVELS, CandidateBlock, calculate_match_score, score_batch
 
 
 class TestMatchScore:
@@ -127,3 +129,72 @@ class TestMatchScore:
         score_with_about = calculate_match_score(profile1, profile2_with_about)
         
         assert score_with_about > score_no_about
+
+
+class TestScoreBatch:
+    """Векторный скоринг совпадает со скалярным."""
+
+    USER = {
+        "ride_type": "🏂 Сноуборд",
+        "skill_level": "Средний",
+        "city": "Москва",
+        "age": 25,
+        "about": "Описание",
+        "photos": '["photo1"]',
+    }
+
+    CANDIDATES = [
+        USER,
+        {"ride_type": "🎿 Лыжи", "skill_level": "Средний", "city": "Москва", "age": 25},
+        {"ride_type": "🏂 Сноуборд", "skill_level": "Средний", "city": "Санкт-Петербург", "age": 25},
+        {"ride_type": "🏂 Сноуборд", "skill_level": "Средний", "city": "Москва", "age": 50},
+        {"ride_type": "🏂 Сноуборд", "skill_level": "Новичок", "city": "Москва", "age": 25},
+        {"ride_type": "🏂 Сноуборд", "skill_level": "Продвинутый", "city": "Москва", "age": 33},
+        {},
+        {"photos": None, "about": ""},
+        {"photos": '["photo1"]', "about": "Какое-то описание"},
+        {"age": 0, "skill_level": "Эксперт"},
+        {"location_lat": 55.76, "location_lon": 37.62},
+        {"location_lat": 55.90, "location_lon": 37.80},
+        {"location_lat": 56.06, "location_lon": 37.39},
+        {"location_lat": 59.93, "location_lon": 30.33},
+        {"location_lat": 0.0, "location_lon": 37.62},
+    ]
+
+    def assert_identical(self, user, candidates, user_lat=None, user_lon=None):
+        expected = [calculate_match_score(user, c, user_lat, user_lon) for c in candidates]
+        batch = score_batch(user, CandidateBlock.from_profiles(candidates), user_lat, user_lon)
+        assert batch.tolist() == expected
+
+    def test_existing_cases(self):
+        """Все пары из скалярных тестов дают тот же score."""
+        for user in (self.USER, {}, {"photos": None}, {"about": ""}, self.CANDIDATES[4]):
+            self.assert_identical(user, self.CANDIDATES)
+
+    def test_with_location(self):
+        """Бонус за расстояние совпадает на всех порогах."""
+        self.assert_identical(self.USER, self.CANDIDATES, 55.7558, 37.6173)
+        self.assert_identical(self.USER, self.CANDIDATES, 0.0, 37.6173)
+
+    def test_random_profiles(self):
+        """Случайный набор профилей."""
+        rng = random.Random(42)
+        candidates = [
+            {
+                "ride_type": rng.choice(["🏂 Сноуборд", "🎿 Лыжи", None]),
+                "skill_level": rng.choice(LEVELS + ["", None]),
+                "city": rng.choice(["Москва", "Сочи", "Кировск", None]),
+                "age": rng.choice([0, None, rng.randint(14, 70)]),
+                "location_lat": rng.choice([None, rng.uniform(43, 68)]),
+                "location_lon": rng.choice([None, rng.uniform(30, 90)]),
+                "about": rng.choice(["", None, "текст"]),
+                "photos": rng.choice([None, '["p"]']),
+            }
+            for _ in range(2000)
+        ]
+        self.assert_identical(self.USER, candidates, 55.7558, 37.6173)
+        self.assert_identical(candidates[0], candidates, 43.68, 40.26)
+
+    def test_empty_block(self):
+        """Пустой блок — пустой массив."""
+        assert len(score_batch(self.USER, CandidateBlock.from_profiles([]))) == 0
@@ -0,0 +1,117 @@
+"""Тесты для метрик производительности."""
+import asyncio
+
+import aiohttp
+import pytest
+from aiogram import Dispatcher, Router
+from aiogram.types import CallbackQuery, Message
+
+from middlewares.metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from services.metrics import Histogram, Metrics, perf_report, start_metrics_server
+from tests.fake_telegram import FakeTelegram, make_update
+
+
+class TestHistogram:
+    def test_quantiles_interpolate_within_buckets(self):
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(10):
+            histogram.observe(0.5)
+        assert histogram.count == 100
+        assert histogram.sum == pytest.approx(90 * 0.005 + 10 * 0.5)
+        assert histogram.quantile(0.5) < 0.01
+        assert 0.1 < histogram.quantile(0.95) < 1.0
+
+    def test_render_prometheus_format(self):
+        metrics = Metrics()
+        metrics.observe("bot_api_seconds", 0.003, method="sendMessage")
+        metrics.inc("bot_handler_errors_total", router="profile", handler='say "hi"')
+        metrics.gauge("bot_queue_depth", lambda: [({"queue": "outbound"}, 7)])
+
+        text = metrics.render()
+        assert "# TYPE bot_api_seconds histogram" in text
+        assert 'bot_api_seconds_bucket{method="sendMessage",le="0.0025"} 0' in text
+        assert 'bot_api_seconds_bucket{method="sendMessage",le="0.005"} 1' in text
+        assert 'bot_api_seconds_bucket{method="sendMessage",le="+Inf"} 1' in text
+        assert 'bot_api_seconds_count{method="sendMessage"} 1' in text
+        assert 'bot_handler_errors_total{handler="say \\"hi\\"",router="profile"} 1' in text
+        assert 'bot_queue_depth{queue="outbound"} 7' in text
+
+
+def _dispatcher(metrics: Metrics, db) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def slow_reply(message: Message) -> None:
+        await db.get_stats()
+        await asyncio.sleep(0.02)
+        await message.answer("ok")
+
+    @router.callback_query()
+    async def broken_button(query: CallbackQuery) -> None:
+        raise ValueError("boom")
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(HandlerMetricsMiddleware(metrics))
+    dp.include_router(router)
+    return dp
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_handler_db_and_api_time_per_update(self, db):
+        metrics = Metrics()
+        async with FakeTelegram(latency=0.01) as telegram:
+            bot = telegram.bot()
+            bot.session.middleware(ApiMetricsMiddleware(metrics))
+            dp = _dispatcher(metrics, db)
+
+            for update_id in range(5):
+                await dp.feed_raw_update(bot, make_update(update_id, 100 + update_id))
+            callback = {
+                "update_id": 10,
+                "callback_query": {"id": "q", "from": {"id": 1, "is_bot": False, "first_name": "T"},
+                                   "chat_instance": "c", "data": "x"},
+            }
+            with pytest.raises(ValueError):
+                await dp.feed_raw_update(bot, callback)
+            await bot.session.close()
+
+        handlers = {dict(labels)["handler"]: h for labels, h in metrics.histograms("bot_handler_seconds").items()}
+        assert handlers["_dispatcher.<locals>.slow_reply"].count == 5
+        assert handlers["_dispatcher.<locals>.slow_reply"].quantile(0.5) >= 0.02
+        assert {dict(labels)["router"] for labels in metrics.histograms("bot_handler_seconds")} == {"test_metrics"}
+
+        errors = metrics.counters("bot_handler_errors_total")
+        assert [dict(labels)["handler"] for labels in errors] == ["_dispatcher.<locals>.broken_button"]
+
+        updates = metrics.histograms("bot_update_seconds")
+        assert {dict(labels)["type"] for labels in updates} == {"message", "callback_query"}
+        db_time = metrics.histograms("bot_update_db_seconds")[(("type", "message"),)]
+        api_time = metrics.histograms("bot_update_api_seconds")[(("type", "message"),)]
+        assert db_time.count == 5 and db_time.sum > 0
+        assert api_time.sum >= 5 * 0.01
+        assert metrics.histograms("bot_api_seconds")[(("method", "sendMessage"),)].count == 5
+
+        report = perf_report(metrics)
+        assert "test_metrics._dispatcher.&lt;locals&gt;.slow_reply" in report
+        assert "обработчики 1" in report
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self):
+        metrics = Metrics()
+        metrics.inc("bot_updates_unhandled_total", type="message")
+        runner = await start_metrics_server(metrics, "127.0.0.1", 0)
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.status == 200
+                    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                    assert 'bot_updates_unhandled_total{type="message"} 1' in await response.text()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,206 @@
+"""Тесты для версионированных миграций схемы."""
+import shutil
+
+import aiosqlite
+import pytest
+
+from db import Database
+from services.migrations import MIGRATIONS_DIR, Migrator, deferred_online, discover, load_module, split_statements
+
+SEED = next(migration for migration in discover() if migration.name == "seed_resorts")
+
+
+async def _indexes(path):
+    async with aiosqlite.connect(path) as conn:
+        async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") as cursor:
+            return {row[0] for row in await cursor.fetchall()}
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    """Копия каталога миграций, куда тест может дописать свои."""
+    directory = tmp_path / "migrations"
+    shutil.copytree(MIGRATIONS_DIR, directory, ignore=shutil.ignore_patterns("__pycache__"))
+    return directory
+
+
+class TestDiscover:
+    def test_ordered_with_checksums(self):
+        migrations = discover()
+        versions = [migration.version for migration in migrations]
+        assert versions == sorted(versions) and versions[0] == 1
+        assert all(len(migration.checksum) == 16 for migration in migrations)
+
+    def test_duplicate_version_rejected(self, migrations_dir):
+        (migrations_dir / "0001_again.sql").write_text("SELECT 1;")
+        with pytest.raises(ValueError):
+            discover(migrations_dir)
+
+    def test_online_migration_only_indexes(self, migrations_dir):
+        (migrations_dir / "0100_bad.sql").write_text("-- online\nALTER TABLE users ADD COLUMN x TEXT;\n")
+        with pytest.raises(ValueError):
+            discover(migrations_dir)
+
+    def test_split_statements(self):
+        sql = "-- комментарий\nCREATE TABLE a (x TEXT DEFAULT ';');\n\nCREATE INDEX i ON a(x);\n-- хвост\n"
+        assert split_statements(sql) == ["CREATE TABLE a (x TEXT DEFAULT ';');", "CREATE INDEX i ON a(x);"]
+
+
+class TestDatabaseMigrations:
+    @pytest.mark.asyncio
+    async def test_fresh_database_then_noop_restart(self, tmp_path):
+        path = str(tmp_path / "bot.db")
+        db = Database(path)
+        await db.init()
+        assert len(await db.list_resorts()) == len(load_module(SEED).RESORTS)
+        await db.close()
+
+        async with aiosqlite.connect(path) as conn:
+            applied = await Migrator().applied(conn)
+            assert sorted(applied) == [migration.version for migration in discover()]
+            async with conn.execute("SELECT MAX(applied_at) FROM schema_version") as cursor:
+                applied_at = (await cursor.fetchone())[0]
+
+        db = Database(path)
+        await db.init()
+        await db.close()
+        async with aiosqlite.connect(path) as conn:
+            async with conn.execute("SELECT COUNT(*), MAX(applied_at) FROM schema_version") as cursor:
+                assert tuple(await cursor.fetchone()) == (len(applied), applied_at)
+
+    @pytest.mark.asyncio
+    async def test_legacy_database_is_adopted(self, tmp_path):
+        path = str(tmp_path / "legacy.db")
+        async with aiosqlite.connect(path) as conn:
+            # Схема первых версий бота: без фото, геолокации и недоступности
+            await conn.executescript(
+                """
+                CREATE TABLE users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    telegram_id INTEGER NOT NULL UNIQUE,
+                    username TEXT,
+                    first_name TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    last_state TEXT
+                );
+                CREATE TABLE profiles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL UNIQUE,
+                    ride_type TEXT NOT NULL,
+                    skill_level TEXT NOT NULL,
+                    age INTEGER NOT NULL,
+                    city TEXT NOT NULL,
+                    about TEXT NOT NULL
+                );
+                INSERT INTO users (telegram_id, username, first_name) VALUES (100, 'rider', 'Райдер');
+                """
+            )
+            await conn.commit()
+
+        db = Database(path)
+        await db.init()
+        try:
+            user_id = await db.get_user_id_by_telegram(100)
+            await db.upsert_profile(user_id, "🎿 Лыжи", "Средний", 25, "Москва", "", ["p1"], "м", 55.7, 37.6)
+            profile = await db.get_profile(user_id)
+            assert profile["location_lat"] == 55.7
+            assert (await db.get_user_identity(100))["undeliverable"] == 0
+        finally:
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_matches_become_edges(self, tmp_path, migrations_dir):
+        path = str(tmp_path / "bot.db")
+        edges = migrations_dir / "0005_match_edges.sql"
+        source = edges.read_text()
+        edges.unlink()
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        ids = [await db.upsert_user(n, "", "Райдер") for n in (1, 2, 3)]
+        await db.close()
+        async with aiosqlite.connect(path) as conn:
+            await conn.executemany(
+                "INSERT INTO matches (user1_id, user2_id) VALUES (?, ?)",
+                [(ids[0], ids[1]), (ids[1], ids[2])],
+            )
+            await conn.commit()
+
+        edges.write_text(source)
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        try:
+            assert [row["id"] for row in await db.get_user_matches(ids[1])] in ([ids[0], ids[2]], [ids[2], ids[0]])
+            assert await db.has_match(ids[2], ids[1])
+            assert (await db.get_stats())["matches"] == 2
+        finally:
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_online_before_regular_migration_is_not_deferred(self, tmp_path, migrations_dir):
+        path = str(tmp_path / "bot.db")
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        await db.close()
+
+        # Индекс, потом обычная миграция, удаляющая его таблицу
+        (migrations_dir / "0100_index.sql").write_text("-- online\nCREATE INDEX idx_test_chats ON chats(created_at);\n")
+        (migrations_dir / "0101_drop.sql").write_text("DROP TABLE chat_messages;\nDROP TABLE chats;\n")
+        pending = Migrator(migrations_dir).migrations[-2:]
+        assert deferred_online(pending) == []
+        assert deferred_online(pending[:1]) == pending[:1]
+
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        await db.close()
+        async with aiosqlite.connect(path) as conn:
+            assert {100, 101} <= set(await Migrator(migrations_dir).applied(conn))
+
+    @pytest.mark.asyncio
+    async def test_online_migration_runs_after_start(self, tmp_path, migrations_dir):
+        path = str(tmp_path / "bot.db")
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        await db.close()
+
+        (migrations_dir / "0100_profiles_age.sql").write_text(
+            "-- online\nCREATE INDEX IF NOT EXISTS idx_test_profiles_age ON profiles(age);\n"
+        )
+        db = Database(path, migrations_dir=migrations_dir)
+        await db.init()
+        try:
+            # База уже отвечает, пока индекс строится
+            assert await db.get_user_id_by_telegram(100) is None
+            await db.wait_migrations()
+            assert "idx_test_profiles_age" in await _indexes(path)
+        finally:
+            await db.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_migration_is_rolled_back(self, tmp_path, migrations_dir):
+        path = str(tmp_path / "bot.db")
+        (migrations_dir / "0100_broken.sql").write_text(
+            "CREATE TABLE half_done (id INTEGER);\nINSERT INTO no_such_table VALUES (1);\n"
+        )
+        db = Database(path, migrations_dir=migrations_dir)
+        with pytest.raises(aiosqlite.OperationalError):
+            await db.init()
+        await db._pool.close()
+
+        async with aiosqlite.connect(path) as conn:
+            applied = await Migrator(migrations_dir).applied(conn)
+            assert 100 not in applied and 3 in applied
+            async with conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'") as cursor:
+                assert await cursor.fetchone() is None
+
+    @pytest.mark.asyncio
+    async def test_dry_run_leaves_no_trace(self, tmp_path):
+        path = str(tmp_path / "bot.db")
+        migrator = Migrator()
+        async with aiosqlite.connect(path) as conn:
+            pending = migrator.pending(await migrator.applied(conn))
+            await conn.commit()
+            timings = await migrator.dry_run(conn, pending)
+            assert len(timings) == len(pending)
+            assert await migrator.applied(conn) == {}
+            async with conn.execute("SELECT name FROM sqlite_master WHERE name = 'users'") as cursor:
+                assert await cursor.fetchone() is None
@@ -0,0 +1,140 @@
+"""Тесты для очереди исходящих сообщений."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.outbound import PRIORITY_BULK, PRIORITY_HIGH, OutboundDispatcher, TokenBucket
+
+
+class FakeBot:
+    """Записывает отправленные сообщения вместо Telegram."""
+
+    def __init__(self, latency: float = 0.0, fail_for=(), flood_for=(), blocked_for=()) -> None:
+        self.latency = latency
+        self.fail_for = set(fail_for)
+        self.flood_for = set(flood_for)  # Первая отправка в эти чаты — RetryAfter
+        self.blocked_for = set(blocked_for)  # Эти пользователи заблокировали бота
+        self.sent = []
+        self.edited = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if chat_id in self.fail_for:
+            raise RuntimeError("chat not found")
+        if chat_id in self.flood_for:
+            self.flood_for.discard(chat_id)
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Flood control", retry_after=0)
+        if chat_id in self.blocked_for:
+            raise TelegramForbiddenError(
+                SendMessage(chat_id=chat_id, text=text), "Forbidden: bot was blocked by the user"
+            )
+        self.sent.append((chat_id, text, time.monotonic()))
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.edited.append((chat_id, message_id, text))
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+class TestOutboundDispatcher:
+    @pytest.mark.asyncio
+    async def test_delivers_and_reports(self):
+        bot = FakeBot(fail_for={3})
+        outbound = OutboundDispatcher(bot, rate=1000)
+        results = await asyncio.gather(*(outbound.send(chat_id, "hi") for chat_id in range(5)))
+        assert results == [True, True, True, False, True]
+        assert outbound.stats["sent"] == 4 and outbound.stats["failed"] == 1
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_respects_rate(self):
+        """50 сообщений при 100/с и ведре на 10 — не быстрее ~0.4 с."""
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=100, workers=16)
+        outbound._bucket = TokenBucket(rate=100, burst=10)
+        start = time.monotonic()
+        await asyncio.gather(*(outbound.send(chat_id, "hi") for chat_id in range(50)))
+        assert time.monotonic() - start >= 0.38
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_parallel_sends(self):
+        """Медленный API не сериализует отправку: воркеры работают параллельно."""
+        bot = FakeBot(latency=0.05)
+        outbound = OutboundDispatcher(bot, rate=1000, workers=10)
+        start = time.monotonic()
+        await asyncio.gather(*(outbound.send(chat_id, "hi") for chat_id in range(20)))
+        assert time.monotonic() - start < 0.5
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_queue(self):
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+        for chat_id in range(10):
+            outbound.send(chat_id, "hi")
+        await outbound.close()
+        assert len(bot.sent) == 10
+
+    @pytest.mark.asyncio
+    async def test_priority_lanes(self):
+        """Мэтч уходит раньше уже стоящей в очереди рассылки."""
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000, workers=1)
+        bulk = [outbound.send(chat_id, "рассылка", priority=PRIORITY_BULK) for chat_id in range(5)]
+        match = outbound.send(100, "мэтч", priority=PRIORITY_HIGH)
+        await asyncio.gather(match, *bulk)
+        assert bot.sent[0][0] == 100
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_per_chat_limit_does_not_block_others(self):
+        """Частые сообщения в один чат разносятся во времени, остальные идут сразу."""
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000, workers=2, chat_rate=10, chat_burst=1)
+        await asyncio.gather(
+            *(outbound.send(1, f"a{i}") for i in range(3)),
+            *(outbound.send(chat_id, "b") for chat_id in range(2, 6)),
+        )
+        chat_times = [sent_at for chat_id, _, sent_at in bot.sent if chat_id == 1]
+        assert [text for chat_id, text, _ in bot.sent if chat_id == 1] == ["a0", "a1", "a2"]
+        assert all(later - earlier >= 0.09 for earlier, later in zip(chat_times, chat_times[1:]))
+        others = [sent_at for chat_id, _, sent_at in bot.sent if chat_id != 1]
+        assert max(others) < chat_times[1]
+        assert outbound.stats["deferred"] == 2
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_retried(self):
+        """RetryAfter не считается недоставкой: сообщение повторяется."""
+        bot = FakeBot(flood_for={7})
+        outbound = OutboundDispatcher(bot, rate=1000)
+        assert await outbound.send(7, "hi") is True
+        assert outbound.stats["retried"] == 1 and outbound.stats["failed"] == 0
+        assert [chat_id for chat_id, _, _ in bot.sent] == [7]
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_blocked_chat_is_reported(self):
+        """«Bot was blocked» не повторяется, слушатели узнают о чате."""
+        bot = FakeBot(blocked_for={5})
+        outbound = OutboundDispatcher(bot, rate=1000)
+        events = []
+        outbound.add_listener(lambda event, *args: events.append((event, *args)))
+        assert await outbound.send(5, "hi") is False
+        assert events == [("chat_blocked", 5)]
+        assert outbound.stats["blocked"] == 1 and outbound.stats["retried"] == 0
+        await outbound.close()
@@ -0,0 +1,237 @@
+"""Регрессия планов запросов: ``EXPLAIN QUERY PLAN`` каждого метода ``Database``.
+
+На засеянной базе вызываются все методы, а профайлер с порогом 0 мс строит
+план каждого их запроса. Тест падает на полном проходе по таблице
+(``SCAN`` без индекса или по неполному индексу) и на сортировке во
+временном B-дереве — кроме методов из ``ALLOWED``, у которых полный проход
+и есть смысл. Проверяется база и без статистики (как у бота), и после
+``ANALYZE``: планировщик не должен сменить индекс на проход по таблице.
+"""
+import asyncio
+import inspect
+import re
+import shutil
+
+import aiosqlite
+import pytest
+
+from benchmarks.population import TELEGRAM_BASE, _in_chunks, populate
+from db import Database
+
+USERS = 2000
+
+# Методы, которым полный проход нужен по смыслу
+ALLOWED = {
+    "get_all_users": "все пользователи",
+    "get_all_profiles": "все анкеты",
+    "get_filtered_profiles": "все анкеты под фильтр",
+    "get_candidate_profiles": "keyset-страницы всех анкет для ранжирования",
+    "get_profile_locations": "координаты всех анкет для геоиндекса при старте",
+    "reload_resorts": "справочник курортов целиком",
+    "get_instructor_cities": "DISTINCT по всем инструкторам",
+    "get_weather_subscribers_by_resort": "все подписки для утренней рассылки",
+    "create_broadcast": "число получателей, один раз на рассылку",
+    "cleanup_rate_limits": "периодическая чистка маленькой таблицы",
+    "get_stats": "счётчики для админа",
+}
+
+# Методы без SQL: каталог курортов в памяти, write-behind, жизненный цикл
+WITHOUT_SQL = {
+    "init",
+    "close",
+    "wait_migrations",
+    "list_resorts",
+    "get_resort",
+    "get_resort_cities",
+    "get_resorts_by_city",
+}
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+
+async def _seed(path: str) -> None:
+    db = Database(path)
+    await db.init()
+    try:
+        await populate(db, USERS, likes_per_user=10, events=300, chats=500)
+        user_ids = list(range(1, USERS + 1))
+        resorts = [resort["id"] for resort in await db.list_resorts()]
+        await _in_chunks(
+            db.add_review(user_id, resorts[user_id % len(resorts)], 1 + user_id % 5, "Отлично")
+            for user_id in user_ids
+        )
+        await _in_chunks(
+            db.subscribe_weather(user_id, resorts[user_id % len(resorts)]) for user_id in user_ids
+        )
+        await _in_chunks(
+            db.add_event_reminder(user_id, 1 + user_id % 300, "2030-01-01T09:00:00") for user_id in user_ids
+        )
+        # Отправленные копятся, неотправленных — единицы процентов
+        await db.mark_reminders_sent(reminder_id for reminder_id in range(1, USERS + 1) if reminder_id % 20)
+        await _in_chunks(
+            db.add_instructor(f"Инструктор {n}", f"https://t.me/instructor{n}", f"Город {n % 20}", "Курорт")
+            for n in range(300)
+        )
+    finally:
+        await db.close()
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    """Файлы засеянной базы: без статистики и после ANALYZE."""
+    directory = tmp_path_factory.mktemp("plans")
+    plain = str(directory / "plain.db")
+    analyzed = str(directory / "analyzed.db")
+    asyncio.run(_seed(plain))
+    shutil.copy(plain, analyzed)
+
+    async def analyze() -> None:
+        async with aiosqlite.connect(analyzed) as conn:
+            await conn.execute("ANALYZE")
+            await conn.commit()
+
+    asyncio.run(analyze())
+    return {"plain": plain, "analyzed": analyzed}
+
+
+async def _exercise(db: Database) -> None:
+    """Вызвать каждый метод ``Database`` с SQL на реальных данных."""
+    telegram_id = TELEGRAM_BASE
+    user_id = await db.get_user_id_by_telegram(telegram_id)
+    other, third = user_id + 1, user_id + 2
+    resort_id = (await db.list_resorts())[0]["id"]
+
+    await db.upsert_user(telegram_id, "rider0", "Райдер 0")
+    await db.get_user_identity(telegram_id)
+    await db.get_user_by_id(user_id)
+    await db.get_all_users()
+
+    await db.save_fsm_records({"fsm:1": ("state", b"{}"), "fsm:2": (None, None)})
+    await db.get_fsm_record("fsm:1")
+    await db.rate_limit_hit("message:1", 0.0, 2.0, 60.0)
+    await db.cleanup_rate_limits(0.0)
+
+    await db.get_profile(user_id)
+    await db.upsert_profile(user_id, "🎿 Лыжи", "Средний", 30, "Москва", "Катаю", ["p1"], "м", 55.7, 37.6)
+    await db.update_profile_photos(user_id, ["p1", "p2"])
+    await db.update_profile_city(user_id, "Москва", 55.7, 37.6)
+    await db.update_profile_level(user_id, "Продвинутый")
+    await db.update_profile_ride_type(user_id, "🏂 Сноуборд")
+    await db.update_about(user_id, "Катаю с 2010 года")
+    await db.update_profile_location(user_id, 55.8, 37.5)
+    await db.get_all_profiles(user_id)
+    await db.get_profile_locations()
+    await db.get_profiles_by_user_ids([other, third])
+    await db.get_filtered_profiles(user_id, "🎿 Лыжи", "Средний", limit=20)
+    await db.get_candidate_profiles(user_id, limit=20)
+    await db.get_candidate_profiles(user_id, "🎿 Лыжи", "Средний", before_id=USERS // 2, limit=20)
+
+    await db.add_like(user_id, other)
+    await db.has_like(user_id, other)
+    await db.get_already_liked(user_id)
+    await db.get_who_liked_me(user_id)
+    await db.add_match(user_id, other)
+    await db.has_match(user_id, other)
+    await db.like_and_match(other, user_id)
+    await db.get_user_matches(user_id)
+    await db.remove_like(user_id, other)
+    await db.block_user(user_id, third)
+    await db.get_blocked_users(user_id)
+    await db.is_blocked(user_id, third)
+    await db.unblock_user(user_id, third)
+
+    await db.reload_resorts()
+    await db.add_review(user_id, resort_id, 5, "Отлично")
+    await db.get_user_resort_review(user_id, resort_id)
+    await db.get_resort_reviews(resort_id)
+    await db.get_resort_rating(resort_id)
+
+    event_id = await db.create_event(user_id, resort_id, "2030-01-01", "Любой", "https://t.me/+event")
+    await db.get_active_events()
+    await db.get_event(event_id)
+    await db.get_events_by_ids([event_id, 1, 2])
+    await db.get_user_events(user_id)
+    await db.add_event_reminder(user_id, event_id, "2029-12-31T09:00:00")
+    scheduled = await db.get_scheduled_reminders()
+    reminder_ids = [row["id"] for row in scheduled[:3]]
+    await db.get_due_reminders(reminder_ids)
+    await db.mark_reminders_sent(reminder_ids)
+    await db.deactivate_event(event_id)
+    await db.cleanup_old_events()
+
+    chat_id = await db.get_or_create_chat(user_id, other)
+    await db.add_chat_message(chat_id, user_id, "Привет!")
+    await db.get_chat_messages(chat_id)
+
+    await db.add_instructor("Инструктор", "https://t.me/instructor", "Москва", "КАНТ")
+    await db.get_instructor_cities()
+    await db.get_instructors_by_city("Москва")
+
+    await db.subscribe_weather(user_id, resort_id)
+    await db.get_weather_subscribers(resort_id)
+    await db.get_weather_subscribers_by_resort()
+    await db.get_user_weather_subscriptions(user_id)
+    await db.unsubscribe_weather(user_id, resort_id)
+
+    broadcast_id = await db.create_broadcast(1, "Открытие сезона!")
+    await db.get_broadcast(broadcast_id)
+    await db.get_unfinished_broadcasts()
+    await db.get_broadcast_recipients(0, 100)
+    await db.set_broadcast_progress_message(broadcast_id, 1)
+    await db.save_broadcast_checkpoint(broadcast_id, 100, 99, 0, 1, undeliverable=[telegram_id + 5])
+
+    await db.get_stats()
+    await db.delete_profile(third)
+
+
+def _violations(plan, partial):
+    """Строки плана с полным проходом по таблице или временным B-деревом."""
+    bad = []
+    for line in plan:
+        step = line.strip()
+        scan = _SCAN.match(step)
+        # Проход по частичному индексу читает только нужные строки
+        if scan and scan.group(2) not in partial:
+            bad.append(step)
+        elif "TEMP B-TREE" in step:
+            bad.append(step)
+    return bad
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("variant", ["plain", "analyzed"])
+async def test_no_full_scans_or_temp_btrees(seeded, variant):
+    async with aiosqlite.connect(seeded[variant]) as conn:
+        async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'") as cursor:
+            partial = {row[0] for row in await cursor.fetchall()}
+
+    db = Database(seeded[variant])
+    await db.init()
+    try:
+        db.profiler.reset()
+        db.profiler.slow_ms = 0
+        await _exercise(db)
+        await db.profiler.join()
+        statements = db.profiler.statements()
+    finally:
+        await db.close()
+
+    failures = []
+    for stats in statements:
+        plan = db.profiler.plan(stats.sql)
+        if stats.method in ALLOWED or not plan:
+            continue
+        if _violations(plan, partial):
+            failures.append(f"{stats.method}: {stats.sql}\n    " + "\n    ".join(plan))
+    assert not failures, "Планы без индекса:\n" + "\n".join(failures)
+
+    # Новый метод Database нужно вызвать в _exercise (или объяснить исключение)
+    public = {
+        name
+        for name, attr in vars(Database).items()
+        if inspect.iscoroutinefunction(attr) and not name.startswith("_")
+    }
+    unchecked = public - WITHOUT_SQL - {stats.method for stats in statements}
+    assert not unchecked, f"Методы без проверки плана: {sorted(unchecked)}"
+    assert set(ALLOWED) <= public
+
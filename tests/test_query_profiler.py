@@ -0,0 +1,75 @@
+"""Тесты для профилирования запросов Database."""
+import logging
+
+import pytest
+
+from services.query_profiler import normalize_sql, profile_report
+
+
+def _by_method(db):
+    return {stats.method: stats for stats in db.profiler.statements()}
+
+
+class TestQueryProfiler:
+    def test_normalize_sql(self):
+        sql = """
+            SELECT * FROM profiles
+            WHERE user_id IN (?, ?, ?) AND city = ?
+        """
+        assert normalize_sql(sql) == "SELECT * FROM profiles WHERE user_id IN (?…) AND city = ?"
+        assert normalize_sql("SELECT ? , ?") == "SELECT ?…"
+
+    @pytest.mark.asyncio
+    async def test_reads_and_writes_are_attributed_to_methods(self, db):
+        db.profiler.reset()
+        user_ids = [await db.upsert_user(100 + i, f"u{i}", "Тест") for i in range(3)]
+        for user_id in user_ids:
+            await db.get_user_by_id(user_id)
+        await db.get_user_by_id(10**9)
+        await db.get_profiles_by_user_ids(user_ids)
+        await db.get_profiles_by_user_ids(user_ids[:2])
+
+        stats = _by_method(db)
+        reads = stats["get_user_by_id"]
+        assert reads.sql == "SELECT * FROM users WHERE id = ?"
+        assert reads.calls == 4 and reads.rows == 3
+        assert reads.histogram.quantile(0.95) > 0
+        # Запись выполняется задачей-писателем, но учитывается под методом
+        assert stats["upsert_user"].calls >= 3
+        # IN разной длины — одна строка статистики
+        assert "IN (?…)" in stats["get_profiles_by_user_ids"].sql
+        assert stats["get_profiles_by_user_ids"].calls == 2
+
+        calls, total = db.profiler.by_method()["get_user_by_id"]
+        assert calls == 4 and total == pytest.approx(reads.total)
+
+    @pytest.mark.asyncio
+    async def test_slow_queries_are_logged_with_plan(self, db, caplog):
+        user_id = await db.upsert_user(1, "u", "Тест")
+        db.set_profiling(slow_ms=0)
+        with caplog.at_level(logging.WARNING, logger="db.slow"):
+            await db.get_user_by_id(user_id)
+            await db.profiler.join()
+
+        entry = next(entry for entry in db.profiler.slow_log if entry["method"] == "get_user_by_id")
+        assert entry["rows"] == 1
+        assert any("USING INTEGER PRIMARY KEY" in line for line in entry["plan"])
+        assert any("get_user_by_id" in record.message and "SEARCH" in record.message for record in caplog.records)
+        assert "get_user_by_id" in profile_report(db.profiler)
+
+    @pytest.mark.asyncio
+    async def test_toggle_at_runtime_and_from_other_process(self, db):
+        events = []
+        db.add_listener(lambda event, *args: events.append((event, *args)))
+
+        db.set_profiling(enabled=False)
+        assert events[-1] == ("profiling_changed", False, None)
+        db.profiler.reset()
+        await db.get_user_by_id(1)
+        assert db.profiler.statements() == []
+
+        # Событие из другого воркера (EventBridge -> emit) применяется здесь
+        db.emit("profiling_changed", True, 250.0)
+        assert db.profiler.enabled and db.profiler.slow_ms == 250.0
+        await db.get_user_by_id(1)
+        assert _by_method(db)["get_user_by_id"].calls == 1
@@ -0,0 +1,110 @@
+"""Тесты для ограничения частоты запросов (GCRA)."""
+import datetime
+
+import pytest
+
+from aiogram.types import CallbackQuery, Chat, Message, User
+from middlewares.rate_limit import RateLimitMiddleware
+from services.rate_limiter import RateLimiter, SharedRateLimiter
+
+
+class TestRateLimiter:
+    def test_burst_then_steady_rate(self):
+        limiter = RateLimiter(rate=30, period=60, sweep=0)
+        assert all(limiter.hit(1, now=0.0) == 0 for _ in range(30))
+        # Ведро пустое: следующий запрос — через интервал 60/30 = 2 с
+        assert limiter.hit(1, now=0.0) == pytest.approx(2.0)
+        assert limiter.hit(1, now=1.0) == pytest.approx(1.0)
+        assert limiter.hit(1, now=2.0) == 0
+        assert limiter.hit(1, now=2.0) > 0
+        # Другой пользователь не затронут
+        assert limiter.hit(2, now=2.0) == 0
+
+    def test_burst_smaller_than_rate(self):
+        limiter = RateLimiter(rate=10, period=10, burst=3, sweep=0)
+        assert [limiter.hit(1, now=0.0) == 0 for _ in range(4)] == [True, True, True, False]
+
+    def test_idle_users_are_evicted(self):
+        limiter = RateLimiter(rate=10, period=10, sweep=0)
+        for user_id in range(1000):
+            limiter.hit(user_id, now=0.0)
+        assert len(limiter) == 1000
+        # Через секунду ведро каждого снова полное
+        assert limiter.evict_idle(now=1.0) == 1000
+        assert len(limiter) == 0
+
+        # Освободившиеся слоты переиспользуются, массив не растёт
+        slots = len(limiter._tats)
+        for user_id in range(1000, 2000):
+            limiter.hit(user_id, now=2.0)
+        assert len(limiter._tats) == slots
+
+    def test_sweep_evicts_incrementally(self):
+        limiter = RateLimiter(rate=10, period=10, sweep=2)
+        for user_id in range(100):
+            limiter.hit(user_id, now=0.0)
+        # Каждый запрос проверяет два слота: активных не трогает
+        for _ in range(100):
+            limiter.hit(0, now=0.5)
+        assert len(limiter) == 100
+        for _ in range(100):
+            limiter.hit(0, now=5.0)
+        assert len(limiter) == 1
+
+
+class TestSharedRateLimiter:
+    @pytest.mark.asyncio
+    async def test_limit_is_shared_through_database(self, db):
+        first = SharedRateLimiter(db, "message", rate=3, period=60)
+        second = SharedRateLimiter(db, "message", rate=3, period=60)
+        callbacks = SharedRateLimiter(db, "callback", rate=3, period=60)
+
+        results = [await limiter.acquire(7) for limiter in (first, second, first, second)]
+        assert results[:3] == [0, 0, 0]
+        assert results[3] == pytest.approx(20.0, abs=1)
+        # У кнопок свой лимит
+        assert await callbacks.acquire(7) == 0
+
+        assert await db.cleanup_rate_limits(now=10**12) == 2
+
+
+class _FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, method, request_timeout=None):
+        self.calls.append(method)
+
+
+def _user(user_id):
+    return User(id=user_id, is_bot=False, first_name="Тест")
+
+
+class TestRateLimitMiddleware:
+    @pytest.mark.asyncio
+    async def test_messages_and_callbacks_limited_separately(self):
+        bot = _FakeBot()
+        messages = RateLimitMiddleware(rate_limit=2, period=60)
+        callbacks = RateLimitMiddleware(rate_limit=3, period=60)
+        handled = []
+
+        async def handler(event, data):
+            handled.append(type(event).__name__)
+
+        message = Message(
+            message_id=1,
+            date=datetime.datetime.now(),
+            chat=Chat(id=5, type="private"),
+            from_user=_user(5),
+            text="/start",
+        ).as_(bot)
+        query = CallbackQuery(id="q", from_user=_user(5), chat_instance="c", data="x").as_(bot)
+
+        for _ in range(3):
+            await messages(handler, message, {})
+        for _ in range(4):
+            await callbacks(handler, query, {})
+
+        assert handled == ["Message"] * 2 + ["CallbackQuery"] * 3
+        # Отказ: сообщение в чат и ответ на нажатие кнопки
+        assert [type(call).__name__ for call in bot.calls] == ["SendMessage", "AnswerCallbackQuery"]
@@ -0,0 +1,108 @@
+"""Тесты для планировщика напоминаний."""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from bot import bot_runtime
+from config import Config
+from services.outbound import OutboundDispatcher
+from services.reminders import REMIND_AT_FORMAT, ReminderScheduler
+from tests.test_outbound import FakeBot
+
+
+async def make_event(db, telegram_id: int):
+    user_id = await db.upsert_user(telegram_id, f"u{telegram_id}", "Райдер")
+    resort_id = db.resort_catalogue.resorts[0]["id"]
+    event_id = await db.create_event(user_id, resort_id, "01.02.2027", "Любой", "https://t.me/group")
+    return user_id, event_id
+
+
+def now_text() -> str:
+    return datetime.now().strftime(REMIND_AT_FORMAT)
+
+
+async def wait_for_sent(bot, count: int, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while len(bot.sent) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class TestReminderScheduler:
+    @pytest.mark.asyncio
+    async def test_loads_due_and_accepts_new(self, db):
+        user_id, event_id = await make_event(db, 1)
+        await db.add_event_reminder(user_id, event_id, "2000-01-01 00:00")
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+        reminders = ReminderScheduler(db, outbound)
+        await reminders.load()
+        reminders.start()
+
+        await wait_for_sent(bot, 1)
+        assert [chat_id for chat_id, _, _ in bot.sent] == [1]
+
+        # Новое напоминание приходит сразу, а не на следующем часовом проходе
+        other_id, _ = await make_event(db, 2)
+        start = time.monotonic()
+        await db.add_event_reminder(other_id, event_id, now_text())
+        await wait_for_sent(bot, 2)
+        assert bot.sent[-1][0] == 2 and bot.sent[-1][2] - start < 0.5
+
+        await reminders.close()
+        await outbound.close()
+        assert await db.get_scheduled_reminders() == []
+
+    @pytest.mark.asyncio
+    async def test_sleeps_exactly_until_due(self, db):
+        user_id, event_id = await make_event(db, 1)
+        await db.add_event_reminder(user_id, event_id, "2100-01-01 00:00")
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+        reminders = ReminderScheduler(db, outbound)
+        await reminders.load()
+        reminders.start()
+
+        # Переносим напоминание на «через 0.3 с»: планировщик просыпается к нему
+        due = time.time() + 0.3
+        reminders.schedule((await db.get_scheduled_reminders())[0]["id"], due)
+        await wait_for_sent(bot, 1)
+        assert bot.sent and 0 <= time.time() - due < 0.2
+        assert reminders.stats["lag_max"] < 0.1
+
+        await reminders.close()
+        await outbound.close()
+
+    @pytest.mark.asyncio
+    async def test_skips_inactive_events(self, db):
+        user_id, event_id = await make_event(db, 1)
+        await db.add_event_reminder(user_id, event_id, "2000-01-01 00:00")
+        await db.deactivate_event(event_id)
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+        reminders = ReminderScheduler(db, outbound)
+        reminders.schedule(1, time.time())
+        reminders.start()
+        await asyncio.sleep(0.1)
+        assert bot.sent == [] and reminders.stats["sent"] == 0
+
+        await reminders.close()
+        await outbound.close()
+
+
+class TestShardWorkerRuntime:
+    @pytest.mark.asyncio
+    async def test_no_scheduler_without_background(self, tmp_path):
+        """Воркер без фоновых задач не копит напоминания из чужих событий."""
+        config = Config(bot_token="123456:TEST", database_path=str(tmp_path / "bot.db"), weather_api_key="")
+        async with bot_runtime(config, shards=2, background=False, metrics_port=0) as (_, dp):
+            db = dp["db"]
+            user_id, event_id = await make_event(db, 1)
+            await db.add_event_reminder(user_id, event_id, "2100-01-01 00:00")
+            # Так событие из другого воркера приходит через EventBridge
+            db.emit("reminder_added", 99, "2100-01-01 00:00")
+
+            assert not any(isinstance(getattr(listener, "__self__", None), ReminderScheduler) for listener in db._listeners)
+            depth = {labels["queue"]: value for labels, value in dp["metrics"].gauges("bot_queue_depth")}
+            assert depth["reminders"] == 0
@@ -0,0 +1,154 @@
+"""Тесты для шардирования обработки обновлений по процессам."""
+import asyncio
+import random
+import time
+
+import pytest
+
+from services.sharding import (
+    EventBridge,
+    KeyedSerializer,
+    ShardError,
+    ShardRouter,
+    shard_for,
+    update_user_id,
+)
+from tests.fake_telegram import make_update
+from tests.shard_echo import echo_worker
+
+
+class TestRouting:
+    def test_update_user_id(self):
+        assert update_user_id(make_update(1, 555)) == 555
+        callback = {"update_id": 2, "callback_query": {"id": "x", "from": {"id": 777}, "chat_instance": "c"}}
+        assert update_user_id(callback) == 777
+        assert update_user_id({"update_id": 3}) is None
+
+    def test_shard_for_is_stable_and_spread(self):
+        shards = [shard_for(user_id, 4) for user_id in range(100_000, 101_000)]
+        assert shards == [shard_for(user_id, 4) for user_id in range(100_000, 101_000)]
+        assert all(200 <= shards.count(index) <= 300 for index in range(4))
+        assert shard_for(None, 4) == 0 and shard_for(123, 1) == 0
+
+    @pytest.mark.asyncio
+    async def test_serializer_keeps_per_key_order(self):
+        serializer = KeyedSerializer(max_inflight=8)
+        done = []
+
+        def job(key, n):
+            async def run():
+                await asyncio.sleep(random.uniform(0, 0.003))
+                done.append((key, n))
+            return run
+
+        start = time.monotonic()
+        for n in range(20):
+            for key in ("a", "b", "c"):
+                await serializer.submit(key, job(key, n))
+        await serializer.join()
+        for key in ("a", "b", "c"):
+            assert [n for k, n in done if k == key] == list(range(20))
+        # Ключи шли параллельно, а не 60 задач подряд
+        assert time.monotonic() - start < 20 * 3 * 0.003
+
+
+class _Recorder:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class TestEventBridge:
+    @pytest.mark.asyncio
+    async def test_forwards_local_and_applies_remote(self, db):
+        channel = _Recorder()
+        bridge = EventBridge(db, channel)
+        received = []
+        db.add_listener(lambda event, *args: received.append((event, *args)))
+
+        await db.reload_resorts()  # Каталог каждый процесс читает сам
+        db.emit("like_added", 1, 2)
+        assert channel.sent == [{"event": "like_added", "args": [1, 2]}]
+
+        # Чужое событие доходит до слушателей, но не уходит обратно
+        bridge.apply("user_blocked", [3, 4])
+        assert received[-1] == ("user_blocked", 3, 4)
+        assert len(channel.sent) == 1
+
+
+class TestShardRouter:
+    @pytest.mark.asyncio
+    async def test_routes_by_user_in_order_across_processes(self):
+        events = []
+        router = ShardRouter(3, target=echo_worker, on_event=lambda index, event, args: events.append((event, args)))
+        await router.start()
+        try:
+            users = list(range(1000, 1030))
+            for update_id in range(300):
+                user = users[update_id % len(users)]
+                await router.route(make_update(update_id, user, "/like" if update_id == 0 else "/ping"))
+
+            deadline = time.monotonic() + 30
+            while sum(event == "seen" for event, _ in events) < 300 and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            while sum(event == "applied" for event, _ in events) < 2 and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            await router.close()
+
+        seen = [args for event, args in events if event == "seen"]
+        assert len(seen) == 300
+        shards = {}
+        for index, user, update_id in seen:
+            shards.setdefault(user, set()).add(index)
+            assert index == shard_for(user, 3)
+        assert all(len(indexes) == 1 for indexes in shards.values())
+        assert {index for index, _, _ in seen} == {0, 1, 2}
+        # Порядок обновлений пользователя сохраняется
+        for user in users:
+            ids = [update_id for _, seen_user, update_id in seen if seen_user == user]
+            assert ids == sorted(ids)
+
+        # Событие воркера дошло до двух других
+        applied = sorted(args[0] for event, args in events if event == "applied")
+        assert applied == sorted({0, 1, 2} - {shard_for(1000, 3)})
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_is_restarted(self, caplog):
+        events = []
+        router = ShardRouter(2, target=echo_worker, on_event=lambda index, event, args: events.append((event, args)))
+        await router.start()
+        try:
+            user = next(user for user in range(1000, 2000) if shard_for(user, 2) == 1)
+            victim = router._shards[1].process
+            victim.kill()
+            await asyncio.get_running_loop().run_in_executor(None, victim.join)
+
+            # Обновления упавшего шарда уходят в новый воркер, фронт не падает
+            for update_id in range(5):
+                await router.route(make_update(update_id, user, "/ping"))
+            deadline = time.monotonic() + 30
+            while sum(event == "seen" for event, _ in events) < 5 and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            assert router.stats["restarts"] == [0, 1]
+        finally:
+            await router.close()
+
+        assert [args for event, args in events if event == "seen"] == [[1, user, n] for n in range(5)]
+        assert f"Shard 1 (pid {victim.pid}) exited with code -9" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_restarts(self):
+        router = ShardRouter(2, target=echo_worker, max_restarts=0)
+        await router.start()
+        try:
+            user = next(user for user in range(1000, 2000) if shard_for(user, 2) == 0)
+            victim = router._shards[0].process
+            victim.kill()
+            await asyncio.get_running_loop().run_in_executor(None, victim.join)
+            with pytest.raises(ShardError, match="Shard 0 exited with code -9"):
+                await router.route(make_update(1, user, "/ping"))
+        finally:
+            await router.close()
@@ -0,0 +1,68 @@
+"""Тесты для погодного сервиса (против фейкового OpenWeatherMap)."""
+import asyncio
+
+import pytest
+
+from services.weather import WeatherService, format_weather
+from tests.fake_owm import FakeOpenWeatherMap
+
+SHEREGESH = (52.9453, 87.9256)
+
+
+class TestWeatherService:
+    """Кэш, single-flight и stale-while-revalidate."""
+
+    @pytest.mark.asyncio
+    async def test_parses_and_caches(self):
+        async with FakeOpenWeatherMap() as owm:
+            service = WeatherService("key", base_url=owm.url)
+            weather = await service.get(*SHEREGESH)
+            assert weather["temp"] == -7 and weather["icon"] == "🌨️"
+            assert "Ветер: 4 м/с" in format_weather(weather)
+            assert await service.get(*SHEREGESH) == weather
+            assert owm.requests == 1
+            await service.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_request(self):
+        """50 одновременных открытий курорта — один запрос к API."""
+        async with FakeOpenWeatherMap(delay=0.05) as owm:
+            service = WeatherService("key", base_url=owm.url)
+            results = await asyncio.gather(*(service.get(*SHEREGESH) for _ in range(50)))
+            assert owm.requests == 1
+            assert all(result == results[0] for result in results)
+            await service.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_served_while_revalidating(self):
+        """Медленный API — отдаём устаревшие данные, обновление идёт в фоне."""
+        async with FakeOpenWeatherMap() as owm:
+            service = WeatherService("key", base_url=owm.url, ttl=0, stale_ttl=60, revalidate_timeout=0.01)
+            first = await service.get(*SHEREGESH)
+
+            owm.delay, owm.description = 0.2, "снег"
+            assert await service.get(*SHEREGESH) == first
+            assert service.stats["stale"] == 1
+
+            await asyncio.sleep(0.3)
+            owm.delay = 0
+            assert (await service.get(*SHEREGESH))["description"] == "снег"
+            await service.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_fall_back_to_stale(self):
+        async with FakeOpenWeatherMap() as owm:
+            service = WeatherService("key", base_url=owm.url, ttl=0, stale_ttl=60)
+            first = await service.get(*SHEREGESH)
+            owm.status = 500
+            assert await service.get(*SHEREGESH) == first
+            assert await service.get(0.0, 0.0) is None
+            await service.close()
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_key(self):
+        async with FakeOpenWeatherMap() as owm:
+            service = WeatherService("", base_url=owm.url)
+            assert await service.get(*SHEREGESH) is None
+            assert owm.requests == 0
+            await service.close()
@@ -0,0 +1,48 @@
+"""Тесты для утренней рассылки о снеге."""
+import pytest
+
+from services.outbound import OutboundDispatcher
+from services.weather import WeatherService
+from services.weather_alerts import run_snow_alerts
+from tests.fake_owm import FakeOpenWeatherMap
+from tests.test_outbound import FakeBot
+
+
+@pytest.mark.asyncio
+async def test_snow_alerts_pipeline(db):
+    """Снег только на одном курорте — уведомления получают только его подписчики."""
+    resorts = list(db.resort_catalogue.resorts[:4])
+    snowy = resorts[0]
+    for telegram_id in range(1, 9):
+        user_id = await db.upsert_user(telegram_id, f"u{telegram_id}", "Райдер")
+        await db.subscribe_weather(user_id, resorts[telegram_id % 4]["id"])
+
+    async with FakeOpenWeatherMap(delay=0.2) as owm:
+        owm.descriptions[(snowy["lat"], snowy["lon"])] = "небольшой снег"
+        weather_service = WeatherService("key", base_url=owm.url)
+        bot = FakeBot()
+        outbound = OutboundDispatcher(bot, rate=1000)
+
+        stats = await run_snow_alerts(db, weather_service, outbound, concurrency=4)
+
+        assert stats["resorts"] == 4 and stats["alerts"] == 1
+        assert sorted(chat_id for chat_id, _, _ in bot.sent) == [4, 8]
+        assert all(snowy["name"] in text for _, text, _ in bot.sent)
+        # Все 4 курорта запрошены параллельно, а не по очереди
+        assert owm.requests == 4
+        assert stats["fetch_seconds"] < 0.6
+        await outbound.close()
+        await weather_service.close()
+
+
+@pytest.mark.asyncio
+async def test_subscribers_grouped_in_one_query(db):
+    resort_ids = [resort["id"] for resort in db.resort_catalogue.resorts[:2]]
+    for telegram_id in (10, 11):
+        user_id = await db.upsert_user(telegram_id, "u", "Райдер")
+        for resort_id in resort_ids:
+            await db.subscribe_weather(user_id, resort_id)
+    grouped = await db.get_weather_subscribers_by_resort()
+    assert {resort_id: sorted(ids) for resort_id, ids in grouped.items()} == {
+        resort_id: [10, 11] for resort_id in resort_ids
+    }
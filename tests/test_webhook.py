@@ -0,0 +1,76 @@
+"""Тесты для webhook-режима (против фейкового Telegram)."""
+import asyncio
+
+import aiohttp
+import pytest
+from aiogram import Dispatcher, Router
+from aiogram.types import Message
+
+from services.webhook import WebhookServer
+from tests.fake_telegram import FakeTelegram, make_update, push_updates
+
+SECRET = "s3cret"
+
+
+def ping_dispatcher(delay: float = 0.0) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def pong(message: Message) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        await message.answer("pong")
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+class TestWebhookServer:
+    @pytest.mark.asyncio
+    async def test_updates_are_processed_end_to_end(self):
+        async with FakeTelegram() as telegram:
+            bot = telegram.bot()
+            server = WebhookServer(ping_dispatcher(), bot, secret_token=SECRET)
+            await server.start("127.0.0.1", 0)
+            url = f"http://127.0.0.1:{server.port}"
+
+            counters = await push_updates(
+                f"{url}/webhook", (make_update(i, 1000 + i) for i in range(50)), SECRET
+            )
+            assert counters["delivered"] == 50
+            assert await telegram.wait_sent(50)
+            assert sorted(chat_id for chat_id, _, _ in telegram.sent) == list(range(1000, 1050))
+
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{url}/webhook", json=make_update(99, 1)) as response:
+                    assert response.status == 401
+                async with session.get(f"{url}/health") as response:
+                    assert response.status == 200
+                    assert (await response.json())["processed"] == 50
+
+            await server.stop()
+            await bot.session.close()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_pushes_back_and_drains(self):
+        """Очередь полна — 429 (Telegram повторит); при остановке очередь дорабатывается."""
+        async with FakeTelegram() as telegram:
+            bot = telegram.bot()
+            server = WebhookServer(ping_dispatcher(delay=0.05), bot, secret_token=SECRET, queue_size=5, workers=2)
+            await server.start("127.0.0.1", 0)
+
+            counters = await push_updates(
+                f"http://127.0.0.1:{server.port}/webhook",
+                (make_update(i, 2000 + i) for i in range(30)),
+                SECRET,
+                connections=10,
+            )
+            assert counters["delivered"] == 30 and counters["retried"] > 0
+            assert server.handler.stats["rejected"] == counters["retried"]
+
+            # Всё принятое обрабатывается до конца остановки
+            await server.stop()
+            assert server.handler.stats["processed"] == 30
+            assert len(telegram.sent) == 30
+            await bot.session.close()